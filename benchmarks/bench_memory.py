@@ -0,0 +1,161 @@
+"""
+Memory and allocation harness for rendering large texts and sign batches.
+
+Each stage runs under tracemalloc and reports the peak memory reached while
+it ran, the memory still held after it returned (after a garbage collection)
+and the number of allocations it made, counted from the difference between
+snapshots taken before the stage and when it returns. Afterwards the memory
+held by each cache is reported.
+
+Usage:
+    python benchmarks/bench_memory.py [--text-size N] [--batch N] [--output FILE]
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+import sutton_signwriting_font as font
+from sutton_signwriting_font.cache import cache_clear, get_cache
+from sutton_signwriting_core.fsw import fsw_columns
+
+import corpus
+
+COLUMN_OPTIONS = {"height": 500, "width": 250}
+
+Stage = Tuple[str, Callable[[], Any]]
+
+
+def deep_size(value: Any, seen: Set[int]) -> int:
+    """Returns the size of an object and everything it references, once."""
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, Mapping):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(v, seen) for v in value)
+    return size
+
+
+def cache_memory() -> Dict[str, Dict[str, int]]:
+    """Returns entries and approximate bytes held by each cache."""
+    report = {}
+    for name, info in font.cache_info().items():
+        seen: Set[int] = set()
+        entries = get_cache(name).items()
+        report[name] = {
+            "entries": info.currsize,
+            "bytes": sum(deep_size(k, seen) + deep_size(v, seen) for k, v in entries),
+        }
+    return report
+
+
+def snapshot() -> tracemalloc.Snapshot:
+    """Takes a tracemalloc snapshot without the blocks of earlier snapshots."""
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    )
+
+
+def allocations(after: tracemalloc.Snapshot, before: tracemalloc.Snapshot) -> int:
+    """Returns the number of blocks allocated between two snapshots."""
+    return sum(
+        stat.count_diff
+        for stat in after.compare_to(before, "traceback")
+        if stat.count_diff > 0
+    )
+
+
+def measure(func: Callable[[], Any]) -> Dict[str, int]:
+    """Runs a stage under tracemalloc and returns its memory use."""
+    gc.collect()
+    before = snapshot()
+    start, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    returned = snapshot()
+    # Retained memory excludes the result, which the caller would own.
+    del result
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    return {
+        "peak_bytes": peak - start,
+        "retained_bytes": current - start,
+        "allocations": allocations(returned, before),
+    }
+
+
+def stages(text_size: int, batch: int, png: bool) -> List[Stage]:
+    """Builds the measured stages."""
+    text = corpus.fsw_text(text_size)
+    signs = [
+        corpus.fsw_sign(size, seed)
+        for seed in range(batch // 4)
+        for size in corpus.SIGN_SIZES
+    ]
+
+    def load_store() -> int:
+        count = font.load_symbol_store()
+        font.unload_symbol_store()
+        return count
+
+    result: List[Stage] = [
+        ("symbol store load", load_store),
+        ("fsw_columns layout", lambda: fsw_columns(text, COLUMN_OPTIONS)),
+        ("fsw_columns_svg", lambda: font.fsw_columns_svg(text, COLUMN_OPTIONS)),
+        ("sign batch svg", lambda: [font.fsw_sign_svg(sign) for sign in signs]),
+    ]
+    if png:
+        result += [
+            ("fsw_columns_png", lambda: font.fsw_columns_png(text, COLUMN_OPTIONS)),
+            ("sign batch png", lambda: [font.fsw_sign_png(sign) for sign in signs]),
+        ]
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--text-size", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    try:
+        font.fsw_symbol_png("S10000")
+        png = True
+    except Exception:
+        print("cairosvg can not rasterize here, skipping png stages", file=sys.stderr)
+        png = False
+
+    cache_clear()
+    tracemalloc.start()
+    results: Dict[str, Dict[str, int]] = {}
+    print(f"{'stage':<22} {'peak KiB':>12} {'retained KiB':>14} {'allocs':>10}")
+    for name, func in stages(args.text_size, args.batch, png):
+        stats = measure(func)
+        results[name] = stats
+        print(
+            f"{name:<22} {stats['peak_bytes'] / 1024:12.1f} "
+            f"{stats['retained_bytes'] / 1024:14.1f} {stats['allocations']:10d}"
+        )
+    tracemalloc.stop()
+
+    caches = cache_memory()
+    print(f"\n{'cache':<22} {'entries':>12} {'KiB':>14}")
+    for name, stats in caches.items():
+        print(f"{name:<22} {stats['entries']:12d} {stats['bytes'] / 1024:14.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"stages": results, "caches": caches}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
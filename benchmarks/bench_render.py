@@ -0,0 +1,212 @@
+"""
+Benchmark suite for the public render functions and the symbol database.
+
+Times symbol, sign and column SVG, PNG and data url generation for FSW and
+SWU over a range of sign sizes and text lengths, plus the database queries.
+Each case runs with warm caches and with cold caches (all caches cleared
+before every call). Results are written as JSON, and a saved result can be
+used as a baseline to flag regressions.
+
+Usage:
+    python benchmarks/bench_render.py [--output FILE] [--compare BASELINE]
+        [--threshold RATIO] [--filter TEXT] [--repeat N] [--min-time SECONDS]
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import sutton_signwriting_font as font
+from sutton_signwriting_font import cache_clear
+from sutton_signwriting_font.db import (
+    get_symbol_size,
+    get_symbol_svg,
+    get_symbols_info,
+)
+
+import corpus
+
+Case = Tuple[str, Callable[[], Any]]
+
+COLUMN_OPTIONS = {"height": 500, "width": 250}
+
+
+def png_available() -> bool:
+    """Checks that cairosvg can rasterize in this environment."""
+    try:
+        font.fsw_symbol_png("S10000")
+    except Exception:
+        return False
+    return True
+
+
+def render_cases(png: bool) -> List[Case]:
+    """Builds the named render cases for FSW and SWU."""
+    cases: List[Case] = []
+    for fmt in ("fsw", "swu"):
+        make_sign = getattr(corpus, f"{fmt}_sign")
+        make_text = getattr(corpus, f"{fmt}_text")
+        render = {
+            name: getattr(font, f"{fmt}_{name}")
+            for name in (
+                "symbol_svg",
+                "symbol_png",
+                "symbol_png_data_url",
+                "sign_svg",
+                "sign_png",
+                "sign_png_data_url",
+                "columns_svg",
+                "columns_png",
+                "columns_png_data_url",
+            )
+        }
+        symbol = make_sign(1)[-13:] if fmt == "fsw" else make_sign(1)[-3:]
+        kinds = ["svg", "png", "png_data_url"] if png else ["svg"]
+
+        for kind in kinds:
+            func = render[f"symbol_{kind}"]
+            cases.append((f"{fmt}.symbol_{kind}", lambda f=func: f(symbol)))
+        for size in corpus.SIGN_SIZES:
+            sign = make_sign(size)
+            for kind in kinds:
+                func = render[f"sign_{kind}"]
+                name = f"{fmt}.sign_{kind}[{size}]"
+                cases.append((name, lambda f=func, s=sign: f(s)))
+        for size in corpus.TEXT_SIZES:
+            text = make_text(size)
+            for kind in kinds:
+                func = render[f"columns_{kind}"]
+                name = f"{fmt}.columns_{kind}[{size}]"
+                cases.append(
+                    (name, lambda f=func, t=text: f(t, COLUMN_OPTIONS)),
+                )
+    return cases
+
+
+def db_cases() -> List[Case]:
+    """Builds the named database query cases."""
+    cases: List[Case] = [
+        ("db.get_symbol_size", lambda: get_symbol_size("S10000")),
+        ("db.get_symbol_svg", lambda: get_symbol_svg("S10000")),
+    ]
+    for size in (1, 16, 128):
+        keys = [f"S1{i // 96:02x}{i // 16 % 6}{i % 16:x}" for i in range(size)]
+        cases.append(
+            (f"db.get_symbols_info[{size}]", lambda k=keys: get_symbols_info(k))
+        )
+    return cases
+
+
+def run_case(func: Callable[[], Any], cold: bool, number: int) -> float:
+    """Returns the mean time per call in seconds over one run."""
+    total = 0.0
+    for _ in range(number):
+        if cold:
+            cache_clear()
+        start = time.perf_counter()
+        func()
+        total += time.perf_counter() - start
+    return total / number
+
+
+def measure(
+    func: Callable[[], Any], cold: bool, repeat: int, min_time: float
+) -> Dict[str, float]:
+    """Times a case, calibrating the number of calls per run to min_time."""
+    func()
+    number = 1
+    while run_case(func, cold, number) * number < min_time and number < 1_000_000:
+        number *= 2
+    runs = [run_case(func, cold, number) * 1e6 for _ in range(repeat)]
+    return {
+        "min_us": min(runs),
+        "median_us": statistics.median(runs),
+        "mean_us": statistics.fmean(runs),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> List[str]:
+    """Prints a comparison table and returns the names of regressed cases."""
+    regressions: List[str] = []
+    print(f"\n{'case':<44} {'base us':>10} {'new us':>10} {'ratio':>7}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]["median_us"]
+        new = result["median_us"]
+        ratio = new / base if base else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  improved"
+        print(f"{name:<44} {base:10.2f} {new:10.2f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="relative slowdown of the median reported as a regression",
+    )
+    parser.add_argument("--filter", default="", help="only run matching cases")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    args = parser.parse_args()
+
+    png = png_available()
+    if not png:
+        print("cairosvg can not rasterize here, skipping png cases", file=sys.stderr)
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, func in render_cases(png) + db_cases():
+        for cache in ("warm", "cold"):
+            full_name = f"{name}/{cache}"
+            if args.filter not in full_name:
+                continue
+            result = measure(func, cache == "cold", args.repeat, args.min_time)
+            results[full_name] = result
+            print(f"{full_name:<44} {result['median_us']:12.2f} us")
+
+    if args.output:
+        report = {
+            "meta": {
+                "version": font.__version__,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "png": png,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
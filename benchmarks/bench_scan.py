@@ -0,0 +1,92 @@
+"""
+Benchmark of the single-pass sign scanners against the parse chain of
+sutton_signwriting_core that the render functions used before.
+
+Usage:
+    python benchmarks/bench_scan.py [--number N]
+"""
+
+import argparse
+import timeit
+from typing import Callable, List
+
+from sutton_signwriting_core.convert import fsw_to_swu
+from sutton_signwriting_core.fsw import fsw_info, fsw_parse_sign
+from sutton_signwriting_core.style import style_parse
+from sutton_signwriting_core.swu import swu_info, swu_parse_sign
+
+from sutton_signwriting_font.scan import fsw_scan_sign, swu_scan_sign
+
+FSW_SIGNS: List[str] = [
+    "M507x515S10e00492x485",
+    "AS14c20S27106M518x529S14c20481x471S27106503x489",
+    "AS10011S10019S2e704S2e748M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475-C",
+    "AS18701S1870aS2e734S20500M518x533S1870a489x515S18701482x490S20500508x496S2e734500x468-P10G_lightblue_D_red,white_Z2-D01_blue_",
+]
+SWU_SIGNS: List[str] = [fsw_to_swu(sign) for sign in FSW_SIGNS]
+
+
+def fsw_chain(sign: str) -> None:
+    # fsw_sign_svg parsed the sign, gathered info and parsed the style,
+    # then fsw_sign_svg_body parsed the sign and the style again.
+    parsed = fsw_parse_sign(sign)
+    fsw_info(sign)
+    style_parse(parsed.get("style", ""))
+    parsed = fsw_parse_sign(sign)
+    style_parse(parsed.get("style", ""))
+
+
+def fsw_scan(sign: str) -> None:
+    scan = fsw_scan_sign(sign)
+    style_parse(scan.style if scan else "")
+
+
+def fsw_scan_fast(sign: str) -> None:
+    scan = fsw_scan_sign(sign, strict=False)
+    style_parse(scan.style if scan else "")
+
+
+def swu_chain(sign: str) -> None:
+    parsed = swu_parse_sign(sign)
+    swu_info(sign)
+    style_parse(parsed.get("style", ""))
+    parsed = swu_parse_sign(sign)
+    style_parse(parsed.get("style", ""))
+
+
+def swu_scan(sign: str) -> None:
+    scan = swu_scan_sign(sign)
+    style_parse(scan.style if scan else "")
+
+
+def swu_scan_fast(sign: str) -> None:
+    scan = swu_scan_sign(sign, strict=False)
+    style_parse(scan.style if scan else "")
+
+
+def measure(func: Callable[[str], None], signs: List[str], number: int) -> float:
+    """Returns the best time per sign in microseconds."""
+    timer = timeit.Timer(lambda: [func(sign) for sign in signs])
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / number / len(signs) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    cases = [
+        ("fsw parse chain", fsw_chain, FSW_SIGNS),
+        ("fsw scan strict", fsw_scan, FSW_SIGNS),
+        ("fsw scan fast", fsw_scan_fast, FSW_SIGNS),
+        ("swu parse chain", swu_chain, SWU_SIGNS),
+        ("swu scan strict", swu_scan, SWU_SIGNS),
+        ("swu scan fast", swu_scan_fast, SWU_SIGNS),
+    ]
+    for name, func, signs in cases:
+        print(f"{name:<18} {measure(func, signs, args.number):8.2f} us/sign")
+
+
+if __name__ == "__main__":
+    main()
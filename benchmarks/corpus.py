@@ -0,0 +1,91 @@
+"""
+Deterministic signs and texts of increasing size for the benchmarks.
+"""
+
+import random
+from typing import List
+
+from sutton_signwriting_core.convert import fsw_to_swu
+
+from sutton_signwriting_font.db import get_symbols_info
+
+SYMBOLS: List[str] = [
+    "S10000",
+    "S10011",
+    "S10019",
+    "S14c20",
+    "S18701",
+    "S1870a",
+    "S20500",
+    "S27106",
+    "S2e704",
+    "S2e734",
+    "S2e748",
+    "S33b10",
+]
+"""Symbol keys used to build signs."""
+
+PUNCTUATION: List[str] = ["S38800464x496", "S38700463x496", "S38a00464x493"]
+"""Punctuation mixed into texts."""
+
+SIGN_SIZES: List[int] = [1, 4, 8, 16]
+"""Number of symbols of the benchmark signs."""
+
+TEXT_SIZES: List[int] = [10, 100, 500]
+"""Number of signs and punctuation of the benchmark texts."""
+
+
+def fsw_sign(size: int, seed: int = 0) -> str:
+    """
+    Builds a valid FSW sign with a sorting prefix.
+
+    Args:
+        size: number of symbols
+        seed: random seed
+
+    Returns:
+        FSW sign
+    """
+    rng = random.Random(seed * 1000 + size)
+    keys = [rng.choice(SYMBOLS) for _ in range(size)]
+    info = get_symbols_info(keys)
+    spatials = []
+    max_x = max_y = 0
+    for key in keys:
+        x = rng.randint(460, 520)
+        y = rng.randint(460, 520)
+        max_x = max(max_x, x + info[key]["width"])
+        max_y = max(max_y, y + info[key]["height"])
+        spatials.append(f"{key}{x}x{y}")
+    return f"A{''.join(keys)}M{max_x}x{max_y}{''.join(spatials)}"
+
+
+def fsw_text(size: int, seed: int = 0) -> str:
+    """
+    Builds an FSW text of signs of varying size and punctuation.
+
+    Args:
+        size: number of signs and punctuation
+        seed: random seed
+
+    Returns:
+        FSW text
+    """
+    rng = random.Random(seed)
+    segments = []
+    for i in range(size):
+        if i % 7 == 6:
+            segments.append(rng.choice(PUNCTUATION))
+        else:
+            segments.append(fsw_sign(rng.choice(SIGN_SIZES[:3]), seed=i % 23))
+    return " ".join(segments)
+
+
+def swu_sign(size: int, seed: int = 0) -> str:
+    """SWU version of `fsw_sign`."""
+    return fsw_to_swu(fsw_sign(size, seed))
+
+
+def swu_text(size: int, seed: int = 0) -> str:
+    """SWU version of `fsw_text`."""
+    return fsw_to_swu(fsw_text(size, seed))
@@ -1,60 +1,137 @@
 """
 sutton_signwriting_font – public entry point.
+
+Public names are imported from their submodules on first access, so
+importing the package is cheap and only the parts in use are loaded.
 """
 
 from __future__ import annotations
 
-from .db import (
-    get_db_path,
-    get_symbol_size,
-    get_symbol_svg,
-    get_symbols_info,
-)
-
-from .fsw import (
-    fsw_symbol_normalize,
-    fsw_symbol_svg_body,
-    fsw_symbol_svg,
-    fsw_symbol_png,
-    fsw_symbol_png_data_url,
-    fsw_sign_normalize,
-    fsw_sign_svg_body,
-    fsw_sign_svg,
-    fsw_sign_png,
-    fsw_sign_png_data_url,
-    fsw_column_svg,
-    fsw_column_png,
-    fsw_columns_svg,
-    fsw_columns_png,
-    fsw_columns_png_data_url,
-)
-
-from .swu import (
-    swu_symbol_normalize,
-    swu_symbol_svg_body,
-    swu_symbol_svg,
-    swu_symbol_png,
-    swu_symbol_png_data_url,
-    swu_sign_normalize,
-    swu_sign_svg_body,
-    swu_sign_svg,
-    swu_sign_png,
-    swu_sign_png_data_url,
-    swu_column_svg,
-    swu_column_png,
-    swu_columns_svg,
-    swu_columns_png,
-    swu_columns_png_data_url,
-)
-
-from .datatypes import (
-    ScaleObject,
-    SignSpatial,
-    ColumnSegment,
-    ColumnOptions,
-    StyleObject,
-)
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from .db import (
+        get_db_path,
+        get_symbol_size,
+        get_symbol_svg,
+        get_symbols_info,
+        load_symbol_store,
+        unload_symbol_store,
+        symbol_store_loaded,
+    )
+
+    from .fsw import (
+        fsw_symbol_normalize,
+        fsw_symbol_svg_body,
+        fsw_symbol_svg,
+        fsw_symbol_png,
+        fsw_symbol_png_data_url,
+        fsw_symbol_array,
+        fsw_sign_normalize,
+        fsw_sign_svg_body,
+        fsw_sign_svg,
+        fsw_sign_png,
+        fsw_sign_png_data_url,
+        fsw_sign_array,
+        fsw_signs_array,
+        fsw_sign_display_list,
+        fsw_column_svg,
+        fsw_column_png,
+        fsw_columns_svg,
+        fsw_columns_png,
+        fsw_columns_png_data_url,
+        fsw_columns_svg_lazy,
+        fsw_columns_png_lazy,
+        fsw_columns_document,
+        fsw_column_display_list,
+        fsw_columns_display_list,
+    )
+
+    from .swu import (
+        swu_symbol_normalize,
+        swu_symbol_svg_body,
+        swu_symbol_svg,
+        swu_symbol_png,
+        swu_symbol_png_data_url,
+        swu_symbol_array,
+        swu_sign_normalize,
+        swu_sign_svg_body,
+        swu_sign_svg,
+        swu_sign_png,
+        swu_sign_png_data_url,
+        swu_sign_array,
+        swu_signs_array,
+        swu_sign_display_list,
+        swu_column_svg,
+        swu_column_png,
+        swu_columns_svg,
+        swu_columns_png,
+        swu_columns_png_data_url,
+        swu_columns_svg_lazy,
+        swu_columns_png_lazy,
+        swu_columns_document,
+        swu_column_display_list,
+        swu_columns_display_list,
+    )
+
+    from .columns import ColumnDocument, LazyColumns
+
+    from .scan import SignScan, fsw_scan_sign, swu_scan_sign
+
+    from .cache import CacheInfo, LRUCache, cache_clear, cache_info
+
+    from .timing import (
+        StageTiming,
+        Timings,
+        add_timing_hook,
+        collect_timings,
+        remove_timing_hook,
+    )
+
+    from .metrics import metrics_text, reset_metrics
+
+    from .render_cache import AsyncSingleFlight, DiskCache, RenderCache, SingleFlight
+
+    from .scheduler import PriorityClass, RenderScheduler, estimate_cost
 
+    from .pipeline import (
+        RenderItem,
+        RenderPipeline,
+        Stage,
+        default_stages,
+        render_items,
+    )
+
+    from .server import RenderServer
+
+    from .archive import ArchiveCache, ArchiveReader, ArchiveWriter, compact_archive
+
+    from .display import (
+        DisplayItem,
+        DisplayList,
+        display_list_json,
+        pack_display_list,
+        unpack_display_list,
+    )
+
+    from .warmup import WarmUpReport, warm_up
+
+    from .shared import (
+        SharedSymbolStore,
+        attach_symbol_store,
+        detach_symbol_store,
+        publish_symbol_store,
+    )
+
+    from .datatypes import (
+        ScaleObject,
+        PngOptions,
+        SignSpatial,
+        ColumnSegment,
+        ColumnOptions,
+        StyleObject,
+    )
 
 __all__ = [
     # DB
@@ -62,40 +139,119 @@ __all__ = [
     "get_symbol_size",
     "get_symbol_svg",
     "get_symbols_info",
+    "load_symbol_store",
+    "unload_symbol_store",
+    "symbol_store_loaded",
     # FSW
     "fsw_symbol_normalize",
     "fsw_symbol_svg_body",
     "fsw_symbol_svg",
     "fsw_symbol_png",
     "fsw_symbol_png_data_url",
+    "fsw_symbol_array",
     "fsw_sign_normalize",
     "fsw_sign_svg_body",
     "fsw_sign_svg",
     "fsw_sign_png",
     "fsw_sign_png_data_url",
+    "fsw_sign_array",
+    "fsw_signs_array",
+    "fsw_sign_display_list",
     "fsw_column_svg",
     "fsw_column_png",
     "fsw_columns_svg",
     "fsw_columns_png",
     "fsw_columns_png_data_url",
+    "fsw_columns_svg_lazy",
+    "fsw_columns_png_lazy",
+    "fsw_columns_document",
+    "fsw_column_display_list",
+    "fsw_columns_display_list",
     # SWU
     "swu_symbol_normalize",
     "swu_symbol_svg_body",
     "swu_symbol_svg",
     "swu_symbol_png",
     "swu_symbol_png_data_url",
+    "swu_symbol_array",
     "swu_sign_normalize",
     "swu_sign_svg_body",
     "swu_sign_svg",
     "swu_sign_png",
     "swu_sign_png_data_url",
+    "swu_sign_array",
+    "swu_signs_array",
+    "swu_sign_display_list",
     "swu_column_svg",
     "swu_column_png",
     "swu_columns_svg",
     "swu_columns_png",
     "swu_columns_png_data_url",
+    "swu_columns_svg_lazy",
+    "swu_columns_png_lazy",
+    "swu_columns_document",
+    "swu_column_display_list",
+    "swu_columns_display_list",
+    # Columns
+    "ColumnDocument",
+    "LazyColumns",
+    # Scan
+    "SignScan",
+    "fsw_scan_sign",
+    "swu_scan_sign",
+    # Cache
+    "CacheInfo",
+    "LRUCache",
+    "cache_clear",
+    "cache_info",
+    # Timing
+    "StageTiming",
+    "Timings",
+    "add_timing_hook",
+    "collect_timings",
+    "remove_timing_hook",
+    # Metrics
+    "metrics_text",
+    "reset_metrics",
+    # Render cache
+    "RenderCache",
+    "SingleFlight",
+    "AsyncSingleFlight",
+    "DiskCache",
+    # Scheduler
+    "RenderScheduler",
+    "PriorityClass",
+    "estimate_cost",
+    # Pipeline
+    "RenderPipeline",
+    "RenderItem",
+    "Stage",
+    "default_stages",
+    "render_items",
+    # Server
+    "RenderServer",
+    # Archive
+    "ArchiveReader",
+    "ArchiveWriter",
+    "ArchiveCache",
+    "compact_archive",
+    # Display lists
+    "DisplayItem",
+    "DisplayList",
+    "display_list_json",
+    "pack_display_list",
+    "unpack_display_list",
+    # Warm-up
+    "WarmUpReport",
+    "warm_up",
+    # Shared memory
+    "SharedSymbolStore",
+    "publish_symbol_store",
+    "attach_symbol_store",
+    "detach_symbol_store",
     # Data types
     "ScaleObject",
+    "PngOptions",
     "SignSpatial",
     "ColumnSegment",
     "ColumnOptions",
@@ -103,3 +259,124 @@ __all__ = [
 ]
 
 __version__ = "1.0.0"
+
+_LAZY_IMPORTS: Dict[str, str] = {
+    "get_db_path": ".db",
+    "get_symbol_size": ".db",
+    "get_symbol_svg": ".db",
+    "get_symbols_info": ".db",
+    "load_symbol_store": ".db",
+    "unload_symbol_store": ".db",
+    "symbol_store_loaded": ".db",
+    "fsw_symbol_normalize": ".fsw",
+    "fsw_symbol_svg_body": ".fsw",
+    "fsw_symbol_svg": ".fsw",
+    "fsw_symbol_png": ".fsw",
+    "fsw_symbol_png_data_url": ".fsw",
+    "fsw_symbol_array": ".fsw",
+    "fsw_sign_normalize": ".fsw",
+    "fsw_sign_svg_body": ".fsw",
+    "fsw_sign_svg": ".fsw",
+    "fsw_sign_png": ".fsw",
+    "fsw_sign_png_data_url": ".fsw",
+    "fsw_sign_array": ".fsw",
+    "fsw_signs_array": ".fsw",
+    "fsw_sign_display_list": ".fsw",
+    "fsw_column_svg": ".fsw",
+    "fsw_column_png": ".fsw",
+    "fsw_columns_svg": ".fsw",
+    "fsw_columns_png": ".fsw",
+    "fsw_columns_png_data_url": ".fsw",
+    "fsw_columns_svg_lazy": ".fsw",
+    "fsw_columns_png_lazy": ".fsw",
+    "fsw_columns_document": ".fsw",
+    "fsw_column_display_list": ".fsw",
+    "fsw_columns_display_list": ".fsw",
+    "swu_symbol_normalize": ".swu",
+    "swu_symbol_svg_body": ".swu",
+    "swu_symbol_svg": ".swu",
+    "swu_symbol_png": ".swu",
+    "swu_symbol_png_data_url": ".swu",
+    "swu_symbol_array": ".swu",
+    "swu_sign_normalize": ".swu",
+    "swu_sign_svg_body": ".swu",
+    "swu_sign_svg": ".swu",
+    "swu_sign_png": ".swu",
+    "swu_sign_png_data_url": ".swu",
+    "swu_sign_array": ".swu",
+    "swu_signs_array": ".swu",
+    "swu_sign_display_list": ".swu",
+    "swu_column_svg": ".swu",
+    "swu_column_png": ".swu",
+    "swu_columns_svg": ".swu",
+    "swu_columns_png": ".swu",
+    "swu_columns_png_data_url": ".swu",
+    "swu_columns_svg_lazy": ".swu",
+    "swu_columns_png_lazy": ".swu",
+    "swu_columns_document": ".swu",
+    "swu_column_display_list": ".swu",
+    "swu_columns_display_list": ".swu",
+    "ColumnDocument": ".columns",
+    "LazyColumns": ".columns",
+    "SignScan": ".scan",
+    "fsw_scan_sign": ".scan",
+    "swu_scan_sign": ".scan",
+    "CacheInfo": ".cache",
+    "LRUCache": ".cache",
+    "cache_clear": ".cache",
+    "cache_info": ".cache",
+    "StageTiming": ".timing",
+    "Timings": ".timing",
+    "add_timing_hook": ".timing",
+    "collect_timings": ".timing",
+    "remove_timing_hook": ".timing",
+    "metrics_text": ".metrics",
+    "reset_metrics": ".metrics",
+    "RenderCache": ".render_cache",
+    "SingleFlight": ".render_cache",
+    "AsyncSingleFlight": ".render_cache",
+    "DiskCache": ".render_cache",
+    "RenderScheduler": ".scheduler",
+    "PriorityClass": ".scheduler",
+    "estimate_cost": ".scheduler",
+    "RenderPipeline": ".pipeline",
+    "RenderItem": ".pipeline",
+    "Stage": ".pipeline",
+    "default_stages": ".pipeline",
+    "render_items": ".pipeline",
+    "RenderServer": ".server",
+    "ArchiveReader": ".archive",
+    "ArchiveWriter": ".archive",
+    "ArchiveCache": ".archive",
+    "compact_archive": ".archive",
+    "DisplayItem": ".display",
+    "DisplayList": ".display",
+    "display_list_json": ".display",
+    "pack_display_list": ".display",
+    "unpack_display_list": ".display",
+    "WarmUpReport": ".warmup",
+    "warm_up": ".warmup",
+    "SharedSymbolStore": ".shared",
+    "publish_symbol_store": ".shared",
+    "attach_symbol_store": ".shared",
+    "detach_symbol_store": ".shared",
+    "ScaleObject": ".datatypes",
+    "PngOptions": ".datatypes",
+    "SignSpatial": ".datatypes",
+    "ColumnSegment": ".datatypes",
+    "ColumnOptions": ".datatypes",
+    "StyleObject": ".datatypes",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,511 @@
+"""
+Packed archive of rendered outputs with random access.
+
+An archive is a single file of named payloads, such as the PNG files of a
+rendered dictionary. `ArchiveWriter` appends payloads in segments, each
+ending with an index sorted by the hash of the names, so adding to an
+archive never rewrites a payload. `ArchiveReader` maps the file into memory
+and finds a name by binary search of the segment indexes, returning the
+payload without reading the rest of the file.
+
+A lookup searches the segments from the newest back to the last merged
+one, whose index holds every name of the archive. The writer merges the
+index when a commit would leave more than ``merge_segments`` indexes to
+search, so lookups stay O(log n) at the cost of rewriting the index, not
+the payloads, every few commits. `compact_archive` also drops the payloads
+of replaced names.
+
+Layout, little-endian::
+
+    header    magic 'SSWA', version, reserved, offset of the last footer
+    segment   names and payloads, index entries sorted by name hash, footer
+
+Each index entry holds the 16 byte hashes of the name and the payload and
+the offsets and lengths of the name and the payload. Each footer holds the
+number of entries, whether the index is merged, the offset of the index and
+the offset of the footer of the previous segment. The header is updated
+after a segment is written, so an interrupted append leaves the archive as
+it was before, and the next writer drops the partial segment. Identical
+payloads can be stored once and shared by their names, found by the payload
+hashes of the index. An archive has one writer at a time.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+MAGIC = b"SSWA"
+"""Magic bytes at the start of an archive."""
+
+VERSION = 2
+"""Version of the archive layout."""
+
+EXTENSION = ".sswa"
+"""File extension of archives."""
+
+_FOOTER_MAGIC = b"SSWI"
+_header = struct.Struct("<4sHHQ")
+_entry = struct.Struct("<16s16sQIQH")
+_footer = struct.Struct("<4sIIQQ")
+_MERGED = 1
+
+
+def name_hash(name: str) -> bytes:
+    """
+    Returns the hash of a name used by the archive index.
+
+    Args:
+        name: payload name
+
+    Returns:
+        16 byte hash
+    """
+    return hashlib.sha256(name.encode("utf-8")).digest()[:16]
+
+
+def _payload_hash(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()[:16]
+
+
+class ArchiveEntry(NamedTuple):
+    """
+    Location of a payload in an archive.
+    """
+
+    name: str
+    """Name of the payload."""
+    offset: int
+    """File offset of the payload."""
+    size: int
+    """Size of the payload in bytes."""
+
+
+class _Segment(NamedTuple):
+    start: int
+    entries: int
+
+
+class _Record(NamedTuple):
+    key: bytes
+    digest: bytes
+    offset: int
+    size: int
+    name_offset: int
+    name_size: int
+
+
+def _read_header(data: "mmap.mmap | bytes", path: str) -> int:
+    magic, version, _, last = _header.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"not a SignWriting archive: {path}")
+    if version != VERSION:
+        raise ValueError(f"unsupported archive version {version}: {path}")
+    return int(last)
+
+
+def _read_segments(data: "mmap.mmap | bytes", last: int, path: str) -> List[_Segment]:
+    """Reads the segments to search from newest to the last merged one."""
+    segments = []
+    footer = last
+    while footer:
+        magic, count, flags, index, previous = _footer.unpack_from(data, footer)
+        if magic != _FOOTER_MAGIC or previous >= footer:
+            raise ValueError(f"corrupt archive segment at {footer}: {path}")
+        segments.append(_Segment(index, count))
+        if flags & _MERGED:
+            break
+        footer = previous
+    return segments
+
+
+class ArchiveReader(Mapping[str, bytes]):
+    """
+    Memory-mapped reader of an archive.
+
+    The archive is read as it was when the reader was opened. Payloads are
+    found by binary search, in the newest segment first, so a name added
+    again replaces the earlier payload.
+
+    Args:
+        path: archive file
+
+    Example:
+        >>> with ArchiveReader('dictionary.sswa') as archive:
+        ...     png = archive['5f3b5e1f0c3a4c2d9e8b7a6f5e4d3c2b.png']
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        last = _read_header(self._mmap, path)
+        self._segments = _read_segments(self._mmap, last, path)
+        self._length: Optional[int] = None
+
+    def _record(self, segment: _Segment, position: int) -> _Record:
+        return _Record._make(
+            _entry.unpack_from(self._mmap, segment.start + position * _entry.size)
+        )
+
+    def _name(self, name_offset: int, name_size: int) -> str:
+        return self._mmap[name_offset : name_offset + name_size].decode("utf-8")
+
+    def _hash(self, segment: _Segment, position: int) -> bytes:
+        start = segment.start + position * _entry.size
+        return self._mmap[start : start + 16]
+
+    def find(self, name: str) -> Optional[ArchiveEntry]:
+        """
+        Finds the location of a payload.
+
+        Args:
+            name: payload name
+
+        Returns:
+            location of the payload, or None if the name is not in the archive
+        """
+        key = name_hash(name)
+        for segment in self._segments:
+            low, high = 0, segment.entries
+            while low < high:
+                middle = (low + high) // 2
+                if self._hash(segment, middle) < key:
+                    low = middle + 1
+                else:
+                    high = middle
+            position = low
+            while position < segment.entries and self._hash(segment, position) == key:
+                record = self._record(segment, position)
+                if self._name(record.name_offset, record.name_size) == name:
+                    return ArchiveEntry(name, record.offset, record.size)
+                position += 1
+        return None
+
+    def view(self, name: str) -> memoryview:
+        """
+        Returns a payload without copying it.
+
+        The view is valid until the reader is closed.
+
+        Args:
+            name: payload name
+
+        Returns:
+            read-only view of the payload
+
+        Raises:
+            KeyError: if the name is not in the archive
+        """
+        entry = self.find(name)
+        if entry is None:
+            raise KeyError(name)
+        return memoryview(self._mmap)[entry.offset : entry.offset + entry.size]
+
+    def __getitem__(self, name: str) -> bytes:
+        entry = self.find(name)
+        if entry is None:
+            raise KeyError(name)
+        return self._mmap[entry.offset : entry.offset + entry.size]
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self.find(name) is not None
+
+    def entries(self) -> Iterator[ArchiveEntry]:
+        """
+        Returns the current entry of every name, newest segment first.
+
+        Returns:
+            iterator of the payload locations
+        """
+        for name, record in self._records():
+            yield ArchiveEntry(name, record.offset, record.size)
+
+    def _records(self) -> Iterator[Tuple[str, _Record]]:
+        seen: Set[str] = set()
+        for segment in self._segments:
+            for position in range(segment.entries):
+                record = self._record(segment, position)
+                name = self._name(record.name_offset, record.name_size)
+                if name not in seen:
+                    seen.add(name)
+                    yield name, record
+
+    def __iter__(self) -> Iterator[str]:
+        return (entry.name for entry in self.entries())
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = sum(1 for _ in self.entries())
+        return self._length
+
+    def close(self) -> None:
+        """Unmaps the archive."""
+        self._mmap.close()
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class ArchiveWriter:
+    """
+    Appends payloads to an archive.
+
+    Payloads are written as they are added and become visible to readers
+    with the next `commit`, which writes the index of the segment. Closing
+    the writer commits.
+
+    Opening an archive reads its indexes, not its payloads. The writer keeps
+    the index entry of every name in memory, so that a commit can write a
+    merged index of all names when the archive has ``merge_segments``
+    indexes to search. A merge writes 54 bytes per name.
+
+    Args:
+        path: archive file, created if missing
+        dedupe: store identical payloads once
+        merge_segments: maximum number of indexes a lookup searches
+
+    Example:
+        >>> with ArchiveWriter('dictionary.sswa') as archive:
+        ...     archive.add('5f3b5e1f0c3a4c2d9e8b7a6f5e4d3c2b.png', png)
+    """
+
+    def __init__(
+        self, path: str, dedupe: bool = True, merge_segments: int = 16
+    ) -> None:
+        self.path = path
+        self.dedupe = dedupe
+        self.merge_segments = max(1, merge_segments)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _Record] = {}
+        self._records: Dict[str, _Record] = {}
+        self._payloads: Dict[bytes, Tuple[int, int]] = {}
+        self._segments = 0
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, "r+b" if exists else "w+b")
+        if not exists:
+            self._file.write(_header.pack(MAGIC, VERSION, 0, 0))
+            self._file.flush()
+            self._last = 0
+            self._end = _header.size
+            return
+        with ArchiveReader(path) as reader:
+            self._last = _read_header(reader._mmap, path)
+            self._end = self._last + _footer.size if self._last else _header.size
+            self._segments = len(reader._segments)
+            for name, record in reader._records():
+                self._records[name] = record
+                if dedupe and any(record.digest):
+                    self._payloads[record.digest] = (record.offset, record.size)
+        # Drop a segment left partly written by an interrupted writer.
+        self._file.truncate(self._end)
+
+    def _write(self, data: bytes) -> int:
+        offset = self._end
+        self._file.seek(offset)
+        self._file.write(data)
+        self._end += len(data)
+        return offset
+
+    def add(self, name: str, data: bytes) -> None:
+        """
+        Adds a payload, replacing an earlier payload of the same name.
+
+        Args:
+            name: payload name
+            data: payload
+        """
+        encoded = name.encode("utf-8")
+        if len(encoded) > 0xFFFF:
+            raise ValueError("name is too long")
+        with self._lock:
+            found = None
+            # Without dedupe the payload hash is left empty.
+            digest = _payload_hash(data) if self.dedupe else bytes(16)
+            if self.dedupe:
+                found = self._payloads.get(digest)
+            if found is None:
+                found = (self._write(data), len(data))
+                if self.dedupe:
+                    self._payloads[digest] = found
+            name_offset = self._write(encoded)
+            # A name added twice to one segment keeps its last payload.
+            self._pending[name] = _Record(
+                name_hash(name), digest, found[0], found[1], name_offset, len(encoded)
+            )
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._pending or name in self._records
+
+    def __len__(self) -> int:
+        return len(self._records.keys() | self._pending.keys())
+
+    def commit(self) -> None:
+        """
+        Writes the index of the added payloads and makes them visible.
+
+        The index holds every name of the archive when the archive would
+        otherwise have more than ``merge_segments`` indexes to search.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            self._records.update(self._pending)
+            merge = self._segments >= self.merge_segments
+            records = self._records if merge else self._pending
+            index_offset = self._write(
+                b"".join(_entry.pack(*record) for record in sorted(records.values()))
+            )
+            footer = self._write(
+                _footer.pack(
+                    _FOOTER_MAGIC,
+                    len(records),
+                    _MERGED if merge else 0,
+                    index_offset,
+                    self._last,
+                )
+            )
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.seek(0)
+            self._file.write(_header.pack(MAGIC, VERSION, 0, footer))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._last = footer
+            self._segments = 1 if merge else self._segments + 1
+            self._pending.clear()
+
+    def close(self) -> None:
+        """Commits and closes the archive."""
+        if self._file.closed:
+            return
+        self.commit()
+        self._file.close()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def compact_archive(path: str, target: Optional[str] = None) -> int:
+    """
+    Rewrites an archive as one segment without replaced payloads.
+
+    Args:
+        path: archive file
+        target: file to write, None to replace the archive
+
+    Returns:
+        number of payloads
+    """
+    temp = (target or path) + ".tmp"
+    with ArchiveReader(path) as reader, ArchiveWriter(temp) as writer:
+        for entry in sorted(reader.entries()):
+            writer.add(entry.name, reader[entry.name])
+        count = len(writer)
+    os.replace(temp, target or path)
+    return count
+
+
+class ArchiveCache:
+    """
+    Cache of rendered files in an archive, a drop-in for `DiskCache`.
+
+    Cached files are visible to `get` at once and are committed to the
+    archive every ``commit_every`` files and on `close`.
+
+    Args:
+        path: archive file, created if missing
+        commit_every: number of added files per segment
+
+    Example:
+        >>> cache = ArchiveCache('/var/cache/sutton-font.sswa')
+        >>> cache.put('/fsw/sign.png?text=M525x535S2e748483x510', png)
+        >>> cache.get('/fsw/sign.png?text=M525x535S2e748483x510') == png
+        True
+    """
+
+    def __init__(self, path: str, commit_every: int = 256) -> None:
+        self.path = path
+        self.commit_every = commit_every
+        self._lock = threading.Lock()
+        self._writer = ArchiveWriter(path)
+        self._reader = ArchiveReader(path)
+        self._pending: Dict[str, bytes] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Returns the cached data for a key.
+
+        Args:
+            key: cache key
+
+        Returns:
+            data, or None if the key is not cached
+        """
+        with self._lock:
+            data = self._pending.get(key)
+            if data is None:
+                data = self._reader.get(key)
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Stores data for a key.
+
+        Args:
+            key: cache key
+            data: data to store
+        """
+        with self._lock:
+            self._writer.add(key, data)
+            self._pending[key] = data
+            if len(self._pending) >= self.commit_every:
+                self._commit()
+
+    def _commit(self) -> None:
+        self._writer.commit()
+        self._reader.close()
+        self._reader = ArchiveReader(self.path)
+        self._pending.clear()
+
+    def commit(self) -> None:
+        """Commits the cached files to the archive."""
+        with self._lock:
+            self._commit()
+
+    def close(self) -> None:
+        """Commits and closes the archive."""
+        with self._lock:
+            self._writer.close()
+            self._reader.close()
+            self._pending.clear()
+
+
+__all__ = [
+    "MAGIC",
+    "VERSION",
+    "EXTENSION",
+    "ArchiveEntry",
+    "ArchiveReader",
+    "ArchiveWriter",
+    "ArchiveCache",
+    "compact_archive",
+    "name_hash",
+]
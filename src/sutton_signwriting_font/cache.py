@@ -0,0 +1,437 @@
+"""
+Bounded, thread-safe caches for parse and style results.
+
+The same sign, symbol and style strings are parsed again and again, both
+within one render and across requests. The cached functions in this module
+memoize the parse results in LRU caches and return them frozen (mappings
+become read-only and lists become tuples), so that a caller can not corrupt
+a cached entry.
+"""
+
+import threading
+from collections import OrderedDict
+from functools import wraps
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from sutton_signwriting_core.datatypes import StyleObject, SymbolObject
+from sutton_signwriting_core.fsw import fsw_parse_symbol
+from sutton_signwriting_core.style import style_compose, style_parse
+from sutton_signwriting_core.swu import swu_parse_symbol
+
+from .scan import SignScan, fsw_scan_sign, swu_scan_sign
+from .timing import timed_function
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+F = TypeVar("F", bound=Callable[..., Any])
+
+DEFAULT_MAXSIZE = 4096
+"""Default number of entries kept by each parse cache."""
+
+
+class CacheInfo(NamedTuple):
+    """
+    Statistics of a cache.
+    """
+
+    hits: int
+    """Number of lookups that found an entry."""
+    misses: int
+    """Number of lookups that did not find an entry."""
+    evictions: int
+    """Number of entries dropped to stay within the size limit."""
+    maxsize: int
+    """Maximum number of entries."""
+    currsize: int
+    """Current number of entries."""
+
+
+class LRUCache(Generic[K, V]):
+    """
+    A thread-safe least recently used cache with hit statistics.
+
+    Args:
+        maxsize: maximum number of entries, 0 disables the cache
+
+    Example:
+        >>> cache = LRUCache(2)
+        >>> cache.put('a', 1)
+        >>> cache.get('a')
+        1
+        >>> cache.info().hits
+        1
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE) -> None:
+        self._data: "OrderedDict[K, V]" = OrderedDict()
+        self._maxsize = max(0, maxsize)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def lookup(self, key: K) -> Tuple[bool, Optional[V]]:
+        """
+        Looks up an entry and marks it as recently used.
+
+        Args:
+            key: cache key
+
+        Returns:
+            tuple of (found, value)
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self._misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return True, value
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """
+        Returns the value for a key, or a default if it is not cached.
+
+        Args:
+            key: cache key
+            default: value returned when the key is not cached
+
+        Returns:
+            cached value or default
+        """
+        found, value = self.lookup(key)
+        return value if found else default
+
+    def put(self, key: K, value: V) -> None:
+        """
+        Stores an entry, evicting the least recently used entries if needed.
+
+        Args:
+            key: cache key
+            value: value to store
+        """
+        with self._lock:
+            if not self._maxsize:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def items(self) -> List[Tuple[K, V]]:
+        """
+        Returns the entries from least to most recently used.
+
+        Returns:
+            list of (key, value) tuples
+        """
+        with self._lock:
+            return list(self._data.items())
+
+    def resize(self, maxsize: int) -> None:
+        """
+        Changes the maximum number of entries.
+
+        Args:
+            maxsize: maximum number of entries, 0 disables the cache
+        """
+        with self._lock:
+            self._maxsize = max(0, maxsize)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Removes all entries and resets the statistics."""
+        with self._lock:
+            self._data.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def info(self) -> CacheInfo:
+        """Returns the statistics of the cache."""
+        with self._lock:
+            return CacheInfo(
+                self._hits,
+                self._misses,
+                self._evictions,
+                self._maxsize,
+                len(self._data),
+            )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+
+_caches: Dict[str, LRUCache[Any, Any]] = {}
+
+
+def register_cache(name: str, cache: LRUCache[Any, Any]) -> None:
+    """
+    Registers a cache so that its statistics are reported by `cache_info`.
+
+    Args:
+        name: unique name of the cache
+        cache: the cache
+    """
+    _caches[name] = cache
+
+
+def get_cache(name: str) -> LRUCache[Any, Any]:
+    """
+    Returns a registered cache.
+
+    Args:
+        name: name of the cache
+
+    Returns:
+        the cache
+    """
+    return _caches[name]
+
+
+def cache_info() -> Dict[str, CacheInfo]:
+    """
+    Returns the statistics of every registered cache.
+
+    Returns:
+        dict mapping cache name to its statistics
+
+    Example:
+        >>> cache_info()['style_parse']
+        CacheInfo(hits=0, misses=0, evictions=0, maxsize=4096, currsize=0)
+    """
+    return {name: cache.info() for name, cache in _caches.items()}
+
+
+def cache_clear() -> None:
+    """Empties every registered cache."""
+    for cache in _caches.values():
+        cache.clear()
+
+
+def freeze(value: Any) -> Any:
+    """
+    Returns a read-only copy of a parse result.
+
+    Dicts become read-only mappings and lists become tuples, recursively.
+    Named tuples keep their type.
+
+    Args:
+        value: a parse result
+
+    Returns:
+        frozen parse result
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if hasattr(value, "_fields"):
+        return type(value)(*(freeze(v) for v in value))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """
+    Returns a mutable copy of a frozen parse result.
+
+    Args:
+        value: a frozen parse result
+
+    Returns:
+        parse result with dicts and lists
+    """
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)) and not hasattr(value, "_fields"):
+        return [thaw(v) for v in value]
+    return value
+
+
+def hashable_key(value: Any) -> Hashable:
+    """
+    Builds a cache key from nested arguments such as style objects.
+
+    Mappings and sequences are frozen, and numbers are tagged with their
+    type, so that ``1``, ``1.0`` and ``True`` give different keys, as they
+    can give different outputs.
+
+    Args:
+        value: argument value
+
+    Returns:
+        hashable key
+    """
+    if isinstance(value, Mapping):
+        return (Mapping, tuple(sorted((k, hashable_key(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return tuple(hashable_key(v) for v in value)
+    if isinstance(value, (bool, int, float, complex)):
+        return (type(value), value)
+    return value  # type: ignore[no-any-return]
+
+
+def memoize(
+    name: str,
+    maxsize: int = DEFAULT_MAXSIZE,
+    key: Optional[Callable[..., Hashable]] = None,
+) -> Callable[[F], F]:
+    """
+    Decorator that caches the frozen results of a function in a named LRU cache.
+
+    Args:
+        name: name of the cache for `cache_info`
+        maxsize: maximum number of entries
+        key: function that builds the cache key from the arguments
+
+    Returns:
+        decorator
+    """
+
+    def decorator(func: F) -> F:
+        cache: LRUCache[Hashable, Any] = LRUCache(maxsize)
+        register_cache(name, cache)
+
+        @wraps(func)
+        def wrapper(*args: Any) -> Any:
+            cache_key = key(*args) if key else args
+            found, value = cache.lookup(cache_key)
+            if not found:
+                value = freeze(func(*args))
+                cache.put(cache_key, value)
+            return value
+
+        wrapper.cache = cache  # type: ignore[attr-defined]
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+@timed_function("parse")
+@memoize("fsw_parse_symbol")
+def fsw_parse_symbol_cached(fsw_sym: str) -> SymbolObject:
+    """
+    Cached `fsw_parse_symbol` that returns a read-only result.
+
+    Args:
+        fsw_sym: an FSW symbol string
+
+    Returns:
+        read-only mapping with 'symbol', 'coord', 'style' keys
+    """
+    return fsw_parse_symbol(fsw_sym)
+
+
+@timed_function("parse")
+@memoize("swu_parse_symbol")
+def swu_parse_symbol_cached(swu_sym: str) -> SymbolObject:
+    """
+    Cached `swu_parse_symbol` that returns a read-only result.
+
+    Args:
+        swu_sym: an SWU symbol string
+
+    Returns:
+        read-only mapping with 'symbol', 'coord', 'style' keys
+    """
+    return swu_parse_symbol(swu_sym)
+
+
+@timed_function("parse")
+@memoize("fsw_scan_sign")
+def fsw_scan_sign_cached(fsw_sign: str) -> Optional[SignScan]:
+    """
+    Cached strict `fsw_scan_sign`.
+
+    Args:
+        fsw_sign: an FSW sign with optional style string
+
+    Returns:
+        scanned sign, or None if the sign is malformed
+    """
+    return fsw_scan_sign(fsw_sign)
+
+
+@timed_function("parse")
+@memoize("swu_scan_sign")
+def swu_scan_sign_cached(swu_sign: str) -> Optional[SignScan]:
+    """
+    Cached strict `swu_scan_sign`.
+
+    Args:
+        swu_sign: an SWU sign with optional style string
+
+    Returns:
+        scanned sign, or None if the sign is malformed
+    """
+    return swu_scan_sign(swu_sign)
+
+
+@timed_function("parse")
+@memoize("style_parse")
+def style_parse_cached(style_string: str) -> StyleObject:
+    """
+    Cached `style_parse` that returns a read-only result.
+
+    Args:
+        style_string: a style string
+
+    Returns:
+        read-only mapping with style elements
+    """
+    return style_parse(style_string)
+
+
+@timed_function("compose")
+@memoize("style_compose", key=hashable_key)
+def style_compose_cached(style_dict: StyleObject) -> Optional[str]:
+    """
+    Cached `style_compose` that also accepts frozen style objects.
+
+    Args:
+        style_dict: a style object, mutable or frozen
+
+    Returns:
+        style string
+    """
+    return style_compose(thaw(style_dict))
+
+
+__all__ = [
+    "DEFAULT_MAXSIZE",
+    "CacheInfo",
+    "LRUCache",
+    "register_cache",
+    "hashable_key",
+    "get_cache",
+    "cache_info",
+    "cache_clear",
+    "freeze",
+    "thaw",
+    "memoize",
+    "fsw_parse_symbol_cached",
+    "swu_parse_symbol_cached",
+    "fsw_scan_sign_cached",
+    "swu_scan_sign_cached",
+    "style_parse_cached",
+    "style_compose_cached",
+]
@@ -0,0 +1,740 @@
+"""
+Command line bulk renderer.
+
+``sutton-font render`` reads FSW or SWU symbols, signs or texts, one per
+line, from files or stdin and renders them to SVG or PNG files in an output
+directory or archive::
+
+    sutton-font render dictionary.txt --format png --width 200 --jobs 8 -o out/
+    sutton-font render dictionary.txt --format png -o dictionary.zip
+    sutton-font render dictionary.txt --format png -o dictionary.sswa
+
+Each output file is named by a hash of the normalized input and the render
+options, see `item_key`, so identical inputs are rendered once. Finished
+items are recorded in a manifest, and running the same command again after
+an interruption resumes where it stopped. Zip and tar outputs are rendered
+into a ``.parts`` directory next to the archive and packed when all items
+are done. Packed archives, see `ArchiveWriter`, are written as the items
+finish, with the manifest in the ``.parts`` directory.
+
+Large renders can be split across machines that share the output
+directory. Each machine renders one shard, selected by a stable hash of the
+normalized sign, and writes its own manifest. ``sutton-font merge`` then
+combines the shard manifests and reports missing and duplicate items::
+
+    sutton-font render dictionary.txt --shard 0/4 -o /shared/out/
+    ...
+    sutton-font render dictionary.txt --shard 3/4 -o /shared/out/
+    sutton-font merge /shared/out/ --inputs dictionary.txt -o dictionary.zip
+
+``sutton-font dataset`` renders signs to memory-mapped NumPy shards for
+training models, see `build_dataset`::
+
+    sutton-font dataset corpus.txt --size 128x128 --jitter 4 --jobs 8 -o data/
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from . import fsw, swu
+from .archive import EXTENSION, ArchiveWriter
+from .pipeline import RenderItem, RenderPipeline, Stage, compose, default_stages
+
+MANIFEST = "manifest.jsonl"
+"""File name of the manifest in an output directory."""
+
+_extensions = {"svg": "svg", "png": "png"}
+_archives = (".zip", ".tar", ".tar.gz", ".tgz", EXTENSION)
+_shard_manifest = re.compile(r"^manifest-(\d+)-of-(\d+)\.jsonl$")
+
+
+class RenderSummary(NamedTuple):
+    """
+    Counts of a bulk render.
+    """
+
+    rendered: int
+    """Number of items rendered by this run."""
+    skipped: int
+    """Number of items already rendered by an earlier run."""
+    duplicates: int
+    """Number of inputs with the same key as an earlier input."""
+    errors: int
+    """Number of items that failed to render."""
+
+
+class MergeReport(NamedTuple):
+    """
+    Result of merging shard manifests.
+    """
+
+    items: int
+    """Number of items rendered by all shards."""
+    shards: int
+    """Number of shards merged."""
+    missing_shards: List[int]
+    """Shards without a manifest."""
+    missing: List[str]
+    """Inputs not rendered by any shard."""
+    duplicates: List[str]
+    """Keys rendered by more than one shard."""
+    errors: List[str]
+    """Inputs that failed to render."""
+
+    @property
+    def ok(self) -> bool:
+        """True if every item was rendered exactly once."""
+        return not (
+            self.missing_shards or self.missing or self.duplicates or self.errors
+        )
+
+
+def normalize_item(text: str, kind: str = "sign") -> str:
+    """
+    Normalizes a symbol or sign, so that placements of it match.
+
+    Args:
+        text: FSW or SWU symbol, sign or text
+        kind: 'symbol', 'sign' or 'columns'
+
+    Returns:
+        normalized symbol or sign, or the stripped text if it is not a valid
+        symbol or sign, or for columns
+    """
+    text = text.strip()
+    if kind == "columns":
+        return text
+    module, prefix = (fsw, "fsw") if text.isascii() else (swu, "swu")
+    normalized: str = getattr(module, f"{prefix}_{kind}_normalize")(text)
+    return normalized or text
+
+
+def item_key(
+    text: str,
+    kind: str = "sign",
+    format: str = "svg",
+    options: Optional[Mapping[str, Any]] = None,
+) -> str:
+    """
+    Returns the stable key of a render, used as its file name.
+
+    Args:
+        text: FSW or SWU symbol, sign or text
+        kind: 'symbol', 'sign' or 'columns'
+        format: 'svg' or 'png'
+        options: scale for symbols and signs, column options for columns
+
+    Returns:
+        hexadecimal hash of the normalized input and the options
+
+    Example:
+        >>> item_key('M525x535S2e748483x510S10011501x466') == item_key('M518x529S2e748476x504S10011494x460')
+        True
+    """
+    data = json.dumps(
+        [normalize_item(text, kind), kind, format, dict(options or {})],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """
+    Parses a shard given as index/count.
+
+    Args:
+        shard: shard index from 0 and the number of shards, such as '2/8'
+
+    Returns:
+        shard index and number of shards
+
+    Raises:
+        ValueError: if the shard is not valid
+    """
+    match = re.fullmatch(r"(\d+)/(\d+)", shard.strip())
+    if not match:
+        raise ValueError(f"shard must be index/count: {shard}")
+    index, count = int(match.group(1)), int(match.group(2))
+    if not 0 <= index < count:
+        raise ValueError(f"shard index must be from 0 to {count - 1}: {shard}")
+    return index, count
+
+
+def shard_of(text: str, count: int, kind: str = "sign") -> int:
+    """
+    Returns the shard of a symbol, sign or text.
+
+    The shard depends only on the normalized input, so it is the same on
+    every machine and for every render option.
+
+    Args:
+        text: FSW or SWU symbol, sign or text
+        count: number of shards
+        kind: 'symbol', 'sign' or 'columns'
+
+    Returns:
+        shard index from 0 to count - 1
+    """
+    digest = hashlib.sha256(normalize_item(text, kind).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def manifest_name(shard: Optional[Tuple[int, int]] = None) -> str:
+    """
+    Returns the file name of the manifest of a shard.
+
+    Args:
+        shard: shard index and number of shards, None for an unsharded run
+
+    Returns:
+        manifest file name
+    """
+    if shard is None:
+        return MANIFEST
+    return f"manifest-{shard[0]}-of-{shard[1]}.jsonl"
+
+
+def read_inputs(paths: Sequence[str], stdin: Optional[IO[str]] = None) -> Iterator[str]:
+    """
+    Reads the non-empty lines of input files.
+
+    Args:
+        paths: input files, '-' or no files for stdin
+        stdin: stream read for '-', defaults to `sys.stdin`
+
+    Returns:
+        iterator of the stripped lines
+    """
+    for path in paths or ["-"]:
+        if path == "-":
+            lines: Iterable[str] = stdin or sys.stdin
+            for line in lines:
+                if line.strip():
+                    yield line.strip()
+            continue
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+
+
+def read_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Reads the entries of a manifest by key.
+
+    A partly written last line, left by an interrupted run, is ignored.
+
+    Args:
+        path: manifest file
+
+    Returns:
+        dict mapping item key to its latest entry, empty if there is no
+        manifest
+    """
+    entries: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                entries[entry["key"]] = entry
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def _output_files(key: str, item: RenderItem) -> List[str]:
+    ext = _extensions[item.format]
+    if item.kind == "columns":
+        return [f"{key}-{i}.{ext}" for i in range(len(item.output))]
+    return [f"{key}.{ext}"]
+
+
+def _pipeline(format: str, jobs: int) -> RenderPipeline:
+    pipeline = RenderPipeline(
+        default_stages(rasterize_workers=jobs, processes=jobs > 1)
+    )
+    if format == "svg" and jobs > 1:
+        pipeline.replace("compose", Stage("compose", compose, jobs, True))
+    return pipeline
+
+
+def render_files(
+    texts: Iterable[str],
+    directory: str,
+    kind: str = "sign",
+    format: str = "svg",
+    options: Optional[Mapping[str, Any]] = None,
+    jobs: int = 1,
+    progress: Optional[IO[str]] = None,
+    shard: Optional[Tuple[int, int]] = None,
+    archive: Optional[ArchiveWriter] = None,
+) -> RenderSummary:
+    """
+    Renders symbols, signs or texts to files in a directory.
+
+    Items already in the manifest of the directory are skipped, so an
+    interrupted run resumes where it stopped. Items that failed are
+    recorded with their error and retried by the next run.
+
+    Args:
+        texts: FSW or SWU symbols, signs or texts
+        directory: output directory, created if missing
+        kind: 'symbol', 'sign' or 'columns'
+        format: 'svg' or 'png'
+        options: scale for symbols and signs, column options for columns
+        jobs: number of worker processes
+        progress: stream for progress messages, None for none
+        shard: shard index and number of shards to render only the inputs
+            of one shard, with a manifest of its own
+        archive: packed archive to write the files to instead of the
+            directory, which then only holds the manifest
+
+    Returns:
+        counts of the render, without the inputs of other shards
+    """
+    if format not in _extensions:
+        raise ValueError(f"unknown format: {format}")
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, manifest_name(shard))
+    done = {
+        key
+        for key, entry in read_manifest(manifest_path).items()
+        if "files" in entry
+        # Items of an uncommitted archive segment are rendered again.
+        and (archive is None or all(name in archive for name in entry["files"]))
+    }
+    seen = set()
+    counts = dict(rendered=0, skipped=0, duplicates=0, errors=0)
+    keys: Dict[str, str] = {}
+
+    def pending() -> Iterator[RenderItem]:
+        for text in texts:
+            if shard is not None and shard_of(text, shard[1], kind) != shard[0]:
+                continue
+            key = item_key(text, kind, format, options)
+            if key in seen:
+                counts["duplicates"] += 1
+            elif key in done:
+                seen.add(key)
+                counts["skipped"] += 1
+            else:
+                seen.add(key)
+                keys[text] = key
+                yield RenderItem(text, kind, format, options)
+
+    started = time.monotonic()
+    with open(manifest_path, "a+", encoding="utf-8") as manifest:
+        # End a line left partly written by an interrupted run.
+        if manifest.tell() > 0:
+            manifest.seek(manifest.tell() - 1)
+            if manifest.read(1) != "\n":
+                manifest.write("\n")
+        for item in _pipeline(format, jobs).run(pending(), ordered=False):
+            key = keys.pop(item.text)
+            entry: Dict[str, Any] = {"key": key, "text": item.text}
+            if item.error is not None or item.output is None:
+                entry["error"] = repr(item.error) if item.error else "empty render"
+                counts["errors"] += 1
+            else:
+                files = _output_files(key, item)
+                outputs = item.output if kind == "columns" else [item.output]
+                for name, output in zip(files, outputs):
+                    if isinstance(output, str):
+                        output = output.encode("utf-8")
+                    if archive is not None:
+                        archive.add(name, output)
+                    else:
+                        _write_atomic(os.path.join(directory, name), output)
+                entry["files"] = files
+                counts["rendered"] += 1
+            manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            manifest.flush()
+            finished = counts["rendered"] + counts["errors"]
+            if archive is not None and finished % 1000 == 0:
+                archive.commit()
+            if progress is not None and finished % 1000 == 0:
+                rate = finished / max(time.monotonic() - started, 1e-9)
+                print(
+                    f"{finished} rendered, {counts['errors']} errors, {rate:.0f}/s",
+                    file=progress,
+                )
+    return RenderSummary(**counts)
+
+
+def pack_archive(directory: str, archive: str) -> int:
+    """
+    Packs the rendered files and manifest of a directory into an archive.
+
+    Args:
+        directory: output directory of `render_files`
+        archive: .zip, .tar, .tar.gz, .tgz or .sswa file to write
+
+    Returns:
+        number of files packed
+    """
+    entries = read_manifest(os.path.join(directory, MANIFEST))
+    names = sorted(
+        name for entry in entries.values() for name in entry.get("files", [])
+    )
+    names.append(MANIFEST)
+    temp = archive + ".tmp"
+    if os.path.exists(temp):
+        os.remove(temp)
+    if archive.endswith(EXTENSION):
+        with ArchiveWriter(temp) as writer:
+            for name in names:
+                with open(os.path.join(directory, name), "rb") as f:
+                    writer.add(name, f.read())
+    elif archive.endswith(".zip"):
+        with zipfile.ZipFile(temp, "w") as z:
+            for name in names:
+                z.write(os.path.join(directory, name), name)
+    elif archive.endswith(_archives):
+        compressed = not archive.endswith(".tar")
+        with tarfile.open(temp, "w:gz" if compressed else "w") as t:
+            for name in names:
+                t.add(os.path.join(directory, name), name)
+    else:
+        raise ValueError(f"unknown archive type: {archive}")
+    os.replace(temp, archive)
+    return len(names)
+
+
+def merge_manifests(
+    directory: str,
+    texts: Optional[Iterable[str]] = None,
+    kind: str = "sign",
+    format: str = "svg",
+    options: Optional[Mapping[str, Any]] = None,
+) -> MergeReport:
+    """
+    Combines the shard manifests of a directory into its manifest.
+
+    Every shard manifest must have the same number of shards. Items
+    rendered by more than one shard are reported as duplicates, and with
+    the inputs given, inputs rendered by no shard as missing. The merged
+    manifest is written even if items are missing, so it can be packed and
+    checked.
+
+    Args:
+        directory: output directory shared by the shards
+        texts: inputs of the render, None to skip the check for missing
+            items
+        kind: 'symbol', 'sign' or 'columns' of the render
+        format: 'svg' or 'png' of the render
+        options: render options of the render
+
+    Returns:
+        report of the merge
+
+    Raises:
+        ValueError: if there are no shard manifests or their shard counts
+            differ
+    """
+    found: Dict[int, str] = {}
+    counts = set()
+    for name in os.listdir(directory):
+        match = _shard_manifest.match(name)
+        if match:
+            found[int(match.group(1))] = name
+            counts.add(int(match.group(2)))
+    if not counts:
+        raise ValueError(f"no shard manifests in {directory}")
+    if len(counts) > 1:
+        raise ValueError(f"shard manifests of different shard counts: {counts}")
+    (count,) = counts
+
+    merged: Dict[str, Dict[str, Any]] = {}
+    failed: Dict[str, Dict[str, Any]] = {}
+    duplicates = []
+    for index in sorted(found):
+        entries = read_manifest(os.path.join(directory, found[index]))
+        for key, entry in entries.items():
+            if "files" not in entry:
+                failed[key] = entry
+            elif key in merged:
+                duplicates.append(key)
+            else:
+                merged[key] = entry
+    missing = []
+    if texts is not None:
+        for text in texts:
+            key = item_key(text, kind, format, options)
+            if key not in merged and key not in failed:
+                missing.append(text)
+                # Report repeated inputs once.
+                failed[key] = {}
+    errors = [entry.get("text") for key, entry in failed.items() if key not in merged]
+
+    path = os.path.join(directory, MANIFEST)
+    lines = (
+        json.dumps(merged[key], ensure_ascii=False) + "\n" for key in sorted(merged)
+    )
+    _write_atomic(path, "".join(lines).encode("utf-8"))
+    return MergeReport(
+        len(merged),
+        count,
+        [index for index in range(count) if index not in found],
+        missing,
+        sorted(set(duplicates)),
+        [text for text in errors if text],
+    )
+
+
+def _options(args: argparse.Namespace) -> Dict[str, Any]:
+    options: Dict[str, Any] = {}
+    if args.width:
+        options["width"] = args.width
+    if args.height:
+        options["height"] = args.height
+    return options
+
+
+def _render(args: argparse.Namespace) -> int:
+    archive = args.output if args.output.endswith(_archives) else None
+    directory = archive + ".parts" if archive else args.output
+    progress = None if args.quiet else sys.stderr
+    shard = parse_shard(args.shard) if args.shard else None
+    # Packed archives are written directly, except by shards, which would
+    # write to the same file.
+    writer = None
+    if archive and archive.endswith(EXTENSION) and shard is None:
+        writer = ArchiveWriter(archive)
+    try:
+        summary = render_files(
+            read_inputs(args.inputs),
+            directory,
+            args.kind,
+            args.format,
+            _options(args),
+            args.jobs,
+            progress,
+            shard,
+            writer,
+        )
+        if writer is not None and not summary.errors:
+            with open(os.path.join(directory, MANIFEST), "rb") as f:
+                writer.add(MANIFEST, f.read())
+    finally:
+        if writer is not None:
+            writer.close()
+    if progress is not None:
+        print(
+            f"{summary.rendered} rendered, {summary.skipped} already done, "
+            f"{summary.duplicates} duplicates, {summary.errors} errors",
+            file=progress,
+        )
+    if summary.errors:
+        return 1
+    # The other shards may still be running, so sharded renders are packed
+    # by merge.
+    if archive and shard is None and writer is None:
+        pack_archive(directory, archive)
+    return 0
+
+
+def _merge(args: argparse.Namespace) -> int:
+    texts = read_inputs(args.inputs) if args.inputs else None
+    report = merge_manifests(
+        args.directory, texts, args.kind, args.format, _options(args)
+    )
+    if args.shards is not None and args.shards != report.shards:
+        print(f"expected {args.shards} shards, found {report.shards}", file=sys.stderr)
+        return 1
+    print(f"{report.items} items from {report.shards} shards", file=sys.stderr)
+    for index in report.missing_shards:
+        print(f"missing shard: {index}/{report.shards}", file=sys.stderr)
+    for text in report.missing:
+        print(f"missing: {text}", file=sys.stderr)
+    for key in report.duplicates:
+        print(f"duplicate: {key}", file=sys.stderr)
+    for text in report.errors:
+        print(f"error: {text}", file=sys.stderr)
+    if not report.ok:
+        return 1
+    if args.output:
+        pack_archive(args.directory, args.output)
+    return 0
+
+
+def _dataset(args: argparse.Namespace) -> int:
+    from .dataset import Augmentation, build_dataset
+
+    progress = None if args.quiet else sys.stderr
+    augmentation = None
+    if args.jitter or args.scale or args.colors:
+        augmentation = Augmentation(
+            args.jitter,
+            args.scale or (1.0, 1.0),
+            tuple(args.colors.split(",")) if args.colors else (),
+        )
+    summary = build_dataset(
+        read_inputs(args.inputs),
+        args.output,
+        args.size,
+        args.mode,
+        args.shard_size,
+        args.jobs,
+        augmentation,
+        args.seed,
+        progress=progress,
+    )
+    if progress is not None:
+        print(
+            f"{summary.rows} rows in {summary.shards} shards, "
+            f"{summary.errors} errors",
+            file=progress,
+        )
+    return 1 if summary.errors else 0
+
+
+def _pair(
+    separator: str, kind: Callable[[str], Any]
+) -> Callable[[str], Tuple[Any, Any]]:
+    def parse(value: str) -> Tuple[Any, Any]:
+        first, _, second = value.partition(separator)
+        try:
+            return kind(first), kind(second)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid value: {value}") from None
+
+    return parse
+
+
+def _add_render_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--kind", choices=("symbol", "sign", "columns"), default="sign")
+    parser.add_argument("--format", choices=("svg", "png"), default="svg")
+    parser.add_argument("--width", type=int, help="png width, or column width")
+    parser.add_argument("--height", type=int, help="png height, or column height")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs the ``sutton-font`` command.
+
+    Args:
+        argv: command line arguments, None for `sys.argv`
+
+    Returns:
+        exit status
+    """
+    parser = argparse.ArgumentParser(
+        prog="sutton-font", description="Sutton SignWriting font tools."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    render = commands.add_parser(
+        "render",
+        help="render symbols, signs or texts to files",
+        description="Render FSW or SWU lines to SVG or PNG files.",
+    )
+    render.add_argument("inputs", nargs="*", help="input files, '-' for stdin")
+    render.add_argument(
+        "-o", "--output", required=True, help="output directory or archive"
+    )
+    _add_render_options(render)
+    render.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes"
+    )
+    render.add_argument(
+        "--shard", help="render only shard index/count of the inputs, such as 0/4"
+    )
+    render.add_argument("-q", "--quiet", action="store_true")
+    merge = commands.add_parser(
+        "merge",
+        help="merge the manifests of a sharded render",
+        description="Merge shard manifests and check for missing or duplicate items.",
+    )
+    merge.add_argument("directory", help="output directory of the shards")
+    merge.add_argument(
+        "--inputs", nargs="+", help="input files of the render, to find missing items"
+    )
+    _add_render_options(merge)
+    merge.add_argument("--shards", type=int, help="expected number of shards")
+    merge.add_argument("-o", "--output", help="archive to pack the merged render into")
+    dataset = commands.add_parser(
+        "dataset",
+        help="render signs to NumPy arrays for training",
+        description="Render FSW or SWU signs to memory-mapped .npy shards.",
+    )
+    dataset.add_argument("inputs", nargs="*", help="input files, '-' for stdin")
+    dataset.add_argument("-o", "--output", required=True, help="output directory")
+    dataset.add_argument(
+        "--size", type=_pair("x", int), default=(128, 128), help="image size, WxH"
+    )
+    dataset.add_argument("--mode", choices=("gray", "mask", "rgba"), default="gray")
+    dataset.add_argument("--shard-size", type=int, default=10000, help="rows per shard")
+    dataset.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes"
+    )
+    dataset.add_argument("--jitter", type=int, default=0, help="largest symbol offset")
+    dataset.add_argument(
+        "--scale", type=_pair(",", float), help="size factor range, such as 0.8,1.2"
+    )
+    dataset.add_argument("--colors", help="comma separated symbol line colors")
+    dataset.add_argument("--seed", type=int, default=0, help="augmentation seed")
+    dataset.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args(argv)
+    if args.command == "merge":
+        return _merge(args)
+    if args.command == "dataset":
+        return _dataset(args)
+    return _render(args)
+
+
+__all__ = [
+    "MANIFEST",
+    "RenderSummary",
+    "MergeReport",
+    "normalize_item",
+    "item_key",
+    "parse_shard",
+    "shard_of",
+    "manifest_name",
+    "read_inputs",
+    "read_manifest",
+    "render_files",
+    "pack_archive",
+    "merge_manifests",
+    "main",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
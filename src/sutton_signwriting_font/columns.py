@@ -0,0 +1,450 @@
+"""
+Lazy and incremental column rendering for long texts.
+"""
+
+import bisect
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import (
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+    overload,
+)
+
+from sutton_signwriting_core.datatypes import (
+    ColumnOptions,
+    ColumnSegment,
+    ColumnsResult,
+)
+
+T = TypeVar("T")
+
+ColumnRenderer = Callable[[List[ColumnSegment], Optional[ColumnOptions]], T]
+"""A column render function such as `fsw_column_svg` or `swu_column_png`."""
+
+ColumnLayout = Callable[[str, Optional[ColumnOptions]], ColumnsResult]
+"""A column layout function such as `fsw_columns` or `swu_columns`."""
+
+TextParser = Callable[[str], List[str]]
+"""A text parser such as `fsw_parse_text` or `swu_parse_text`."""
+
+
+class LazyColumns(Sequence[T], Generic[T]):
+    """
+    A read-only sequence of column images rendered on first access.
+
+    The text is laid out once when the sequence is created, so the number of
+    columns and their widths are available without rendering anything.
+    Column ``i`` is rendered the first time it is accessed and then kept.
+    With ``prefetch`` set, accessing column ``i`` also schedules columns
+    ``i + 1`` to ``i + prefetch`` for rendering on a background thread.
+
+    Args:
+        layout: the result of `fsw_columns` or `swu_columns`
+        render: function that renders one column with its options
+        prefetch: number of following columns to render ahead in the background
+
+    Example:
+        >>> cols = LazyColumns(fsw_columns(fsw_text, opts), fsw_column_svg)
+        >>> len(cols), cols.widths
+        (1, [150])
+        >>> cols[0].startswith('<svg')
+        True
+    """
+
+    def __init__(
+        self,
+        layout: ColumnsResult,
+        render: ColumnRenderer[T],
+        prefetch: int = 0,
+    ) -> None:
+        self._options: ColumnOptions = layout.get("options", {})
+        self._widths: List[int] = list(layout.get("widths", []))
+        self._columns: List[List[ColumnSegment]] = layout.get("columns", [])
+        self._render = render
+        self._prefetch = max(0, prefetch)
+        self._rendered: Dict[int, T] = {}
+        self._pending: Dict[int, "Future[T]"] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def widths(self) -> List[int]:
+        """Widths of each column."""
+        return list(self._widths)
+
+    @property
+    def options(self) -> ColumnOptions:
+        """Column options merged with the defaults."""
+        return self._options
+
+    def column(self, index: int) -> List[ColumnSegment]:
+        """
+        Returns the layout data of a column without rendering it.
+
+        Args:
+            index: column index
+
+        Returns:
+            array of column data
+        """
+        return self._columns[index]
+
+    def column_options(self, index: int) -> ColumnOptions:
+        """
+        Returns the options used to render a column.
+
+        Args:
+            index: column index
+
+        Returns:
+            object of column options with the width of the column
+        """
+        return {**self._options, "width": self._widths[index]}
+
+    def is_rendered(self, index: int) -> bool:
+        """
+        Checks if a column has already been rendered.
+
+        Args:
+            index: column index
+
+        Returns:
+            True if the column is available without rendering
+        """
+        with self._lock:
+            return self._normalize(index) in self._rendered
+
+    def close(self) -> None:
+        """Stops the background prefetch thread, if any."""
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "LazyColumns[T]":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[T]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[T, List[T]]:
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self)))]
+        return self._get(self._normalize(index))
+
+    def _normalize(self, index: int) -> int:
+        count = len(self._columns)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("column index out of range")
+        return index
+
+    def _render_column(self, index: int) -> T:
+        return self._render(self._columns[index], self.column_options(index))
+
+    def _get(self, index: int) -> T:
+        with self._lock:
+            found = index in self._rendered
+            result = self._rendered.get(index)
+            pending = None if found else self._pending.get(index)
+        if not found:
+            if pending is not None and not pending.cancelled():
+                result = pending.result()
+            else:
+                result = self._render_column(index)
+                with self._lock:
+                    result = self._rendered.setdefault(index, result)
+        self._schedule(index)
+        return result  # type: ignore[return-value]
+
+    def _schedule(self, index: int) -> None:
+        if not self._prefetch:
+            return
+        last = min(len(self._columns), index + 1 + self._prefetch)
+        scheduled = []
+        with self._lock:
+            for ahead in range(index + 1, last):
+                if ahead in self._rendered or ahead in self._pending:
+                    continue
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix="columns-prefetch"
+                    )
+                future = self._executor.submit(self._render_column, ahead)
+                self._pending[ahead] = future
+                scheduled.append((ahead, future))
+        # A future that is already done runs its callback right away, and
+        # the callback takes the lock.
+        for ahead, future in scheduled:
+            future.add_done_callback(partial(self._store, ahead))
+
+    def _store(self, index: int, future: "Future[T]") -> None:
+        with self._lock:
+            self._pending.pop(index, None)
+            if not future.cancelled() and future.exception() is None:
+                self._rendered.setdefault(index, future.result())
+
+
+class ColumnDocument:
+    """
+    A text with a column layout that can be edited one segment at a time.
+
+    The document keeps the segments of the text, their column layout and
+    the rendered columns. An edit re-runs the layout from the column
+    before the edited segment onwards and keeps every rendered column
+    whose layout did not change. Each edit returns the indexes of the
+    columns that must be redrawn.
+
+    Layout is restarted at a column that begins with a sign (or at the
+    start of the text), because only there does a fresh layout of the
+    remaining segments match the layout of the full text.
+
+    Args:
+        text: a text of signs and punctuation
+        options: an object of column options
+        layout: function that lays out a text as columns
+        parse_text: function that splits a text into segments
+        render_svg: function that renders one column as svg
+        render_png: function that renders one column as png
+
+    Example:
+        >>> doc = fsw_columns_document(fsw_text, {"height": 250, "width": 150})
+        >>> doc.replace(1, 'S38800464x496')
+        [0]
+        >>> doc.svg(0).startswith('<svg')
+        True
+    """
+
+    def __init__(
+        self,
+        text: str,
+        options: Optional[ColumnOptions],
+        layout: ColumnLayout,
+        parse_text: TextParser,
+        render_svg: ColumnRenderer[str],
+        render_png: ColumnRenderer[bytes],
+    ) -> None:
+        self._options = options
+        self._layout = layout
+        self._parse_text = parse_text
+        self._render_svg = render_svg
+        self._render_png = render_png
+        self._segments: List[str] = parse_text(text) if text else []
+        self._values: ColumnOptions = {}
+        self._widths: List[int] = []
+        self._columns: List[List[ColumnSegment]] = []
+        self._starts: List[int] = []
+        self._svgs: Dict[int, str] = {}
+        self._pngs: Dict[int, bytes] = {}
+        self._lock = threading.RLock()
+        self._relayout(0)
+
+    @property
+    def segments(self) -> List[str]:
+        """Signs and punctuation of the text, in order."""
+        return list(self._segments)
+
+    @property
+    def text(self) -> str:
+        """The text of the document."""
+        return " ".join(self._segments)
+
+    @property
+    def widths(self) -> List[int]:
+        """Widths of each column."""
+        return list(self._widths)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def column(self, index: int) -> List[ColumnSegment]:
+        """
+        Returns the layout data of a column.
+
+        Args:
+            index: column index
+
+        Returns:
+            array of column data
+        """
+        return self._columns[index]
+
+    def column_options(self, index: int) -> ColumnOptions:
+        """
+        Returns the options used to render a column.
+
+        Args:
+            index: column index
+
+        Returns:
+            object of column options with the width of the column
+        """
+        return {**self._values, "width": self._widths[index]}
+
+    def column_of(self, segment: int) -> int:
+        """
+        Finds the column that holds a segment.
+
+        Args:
+            segment: segment index
+
+        Returns:
+            column index
+        """
+        return max(bisect.bisect_right(self._starts, segment) - 1, 0)
+
+    def svg(self, index: int) -> str:
+        """
+        Returns the svg image of a column, rendering it if needed.
+
+        Args:
+            index: column index
+
+        Returns:
+            svg column
+        """
+        with self._lock:
+            if index not in self._svgs:
+                self._svgs[index] = self._render_svg(
+                    self._columns[index], self.column_options(index)
+                )
+            return self._svgs[index]
+
+    def png(self, index: int) -> bytes:
+        """
+        Returns the png image of a column, rendering it if needed.
+
+        Args:
+            index: column index
+
+        Returns:
+            png column bytes
+        """
+        with self._lock:
+            if index not in self._pngs:
+                self._pngs[index] = self._render_png(
+                    self._columns[index], self.column_options(index)
+                )
+            return self._pngs[index]
+
+    def svgs(self) -> List[str]:
+        """Returns the svg images of all columns."""
+        return [self.svg(i) for i in range(len(self))]
+
+    def pngs(self) -> List[bytes]:
+        """Returns the png images of all columns."""
+        return [self.png(i) for i in range(len(self))]
+
+    def insert(self, index: int, text: str) -> List[int]:
+        """
+        Inserts signs or punctuation before a segment.
+
+        Args:
+            index: segment index, or the number of segments to append
+            text: a text of signs and punctuation
+
+        Returns:
+            indexes of the columns that changed
+        """
+        if not 0 <= index <= len(self._segments):
+            raise IndexError("segment index out of range")
+        return self._edit(index, index, self._parse_text(text))
+
+    def delete(self, index: int, count: int = 1) -> List[int]:
+        """
+        Deletes segments.
+
+        Args:
+            index: index of the first segment to delete
+            count: number of segments to delete
+
+        Returns:
+            indexes of the columns that changed
+        """
+        if not 0 <= index < len(self._segments) or count < 1:
+            raise IndexError("segment index out of range")
+        return self._edit(index, min(index + count, len(self._segments)), [])
+
+    def replace(self, index: int, text: str) -> List[int]:
+        """
+        Replaces a segment with signs or punctuation.
+
+        Args:
+            index: segment index
+            text: a text of signs and punctuation
+
+        Returns:
+            indexes of the columns that changed
+        """
+        if not 0 <= index < len(self._segments):
+            raise IndexError("segment index out of range")
+        return self._edit(index, index + 1, self._parse_text(text))
+
+    def _edit(self, start: int, end: int, segments: List[str]) -> List[int]:
+        with self._lock:
+            # The segment before the edit may change column as well.
+            column = self.column_of(max(start - 1, 0))
+            self._segments[start:end] = segments
+            return self._relayout(column)
+
+    def _relayout(self, column: int) -> List[int]:
+        while column > 0 and self._columns[column][0]["segment"] != "sign":
+            column -= 1
+        first = self._starts[column] if column < len(self._starts) else 0
+
+        tail: ColumnsResult = {}
+        if first < len(self._segments):
+            tail = self._layout(" ".join(self._segments[first:]), self._options)
+        if not self._values:
+            self._values = tail.get("options", {})
+
+        starts: List[int] = []
+        for col in tail.get("columns", []):
+            starts.append(first)
+            first += len(col)
+
+        old_columns = self._columns
+        old_widths = self._widths
+        self._columns = old_columns[:column] + tail.get("columns", [])
+        self._widths = old_widths[:column] + tail.get("widths", [])
+        self._starts = self._starts[:column] + starts
+
+        changed: List[int] = []
+        for i in range(column, max(len(old_columns), len(self._columns))):
+            same = (
+                i < len(old_columns)
+                and i < len(self._columns)
+                and old_widths[i] == self._widths[i]
+                and old_columns[i] == self._columns[i]
+            )
+            if not same:
+                self._svgs.pop(i, None)
+                self._pngs.pop(i, None)
+                if i < len(self._columns):
+                    changed.append(i)
+        return changed
+
+
+__all__ = [
+    "ColumnDocument",
+    "LazyColumns",
+]
@@ -0,0 +1,115 @@
+"""
+CSS styling for style-independent SVG output.
+
+In CSS mode the symbol fragments of a sign are emitted unchanged, each in a
+``<svg class="sym-N">`` wrapper where ``N`` is the 1-based spatial index used
+by detailsym. Colors from the style string become rules of a single
+``<style>`` block in the header, so the symbol part of a sign can be cached
+once and reused for every color scheme.
+
+A ``<style>`` block applies to the whole document it is inlined in, so the
+rules are scoped by a class on the root ``<svg>`` element, named after a
+hash of the rules. Images with different colors on one page keep their own
+colors, and images with the same colors share the class.
+"""
+
+import hashlib
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from sutton_signwriting_core.datatypes import StyleObject
+
+
+def sign_css_rules(
+    styling: StyleObject,
+    symbols: Sequence[str],
+    colorize: Callable[[str], str],
+    scope: str = "",
+) -> List[str]:
+    """
+    Creates the CSS rules for the colors of a styled sign.
+
+    Line and fill colors follow the same precedence as the inline output:
+    detailsym over colorize over the sign detail.
+
+    Args:
+        styling: parsed style of the sign
+        symbols: symbols of the sign in spatial order
+        colorize: function that returns the color of a symbol
+        scope: selector prefix that limits the rules to one sign
+
+    Returns:
+        list of CSS rules
+
+    Example:
+        >>> sign_css_rules(style_parse('-D_red,white_'), ['S10011'], fsw_colorize)
+        ['.sym-line{fill:red}', '.sym-fill{fill:white}']
+    """
+    rules: List[str] = []
+
+    detail = styling.get("detail", [])
+    if detail:
+        rules.append(f"{scope}.sym-line{{fill:{detail[0]}}}")
+    if len(detail) > 1:
+        rules.append(f"{scope}.sym-fill{{fill:{detail[1]}}}")
+
+    if styling.get("colorize"):
+        for index, symbol in enumerate(symbols, 1):
+            rules.append(f"{scope}.sym-{index} .sym-line{{fill:{colorize(symbol)}}}")
+
+    details: Dict[int, List[str]] = {}
+    for sym in styling.get("detailsym", []):
+        index = sym.get("index", 0)
+        if 1 <= index <= len(symbols):
+            details[index] = sym.get("detail", [])
+    for index, sym_detail in sorted(details.items()):
+        if sym_detail:
+            rules.append(f"{scope}.sym-{index} .sym-line{{fill:{sym_detail[0]}}}")
+        if len(sym_detail) > 1:
+            rules.append(f"{scope}.sym-{index} .sym-fill{{fill:{sym_detail[1]}}}")
+
+    return rules
+
+
+def scope_css_rules(rules: Sequence[str]) -> Tuple[str, List[str]]:
+    """
+    Scopes CSS rules to the image with a class named after the rules.
+
+    Args:
+        rules: list of CSS rules
+
+    Returns:
+        class name for the root element and the scoped rules
+
+    Example:
+        >>> scope_css_rules(['.sym-line{fill:red}'])
+        ('css-c9173f15', ['.css-c9173f15 .sym-line{fill:red}'])
+    """
+    digest = hashlib.blake2b("".join(rules).encode("utf-8"), digest_size=4)
+    scope = f"css-{digest.hexdigest()}"
+    return scope, [f".{scope} {rule}" for rule in rules]
+
+
+def css_style_block(rules: Sequence[str]) -> str:
+    """
+    Wraps CSS rules in a ``<style>`` element.
+
+    Args:
+        rules: list of CSS rules
+
+    Returns:
+        style element with a trailing newline, or an empty string without rules
+
+    Example:
+        >>> css_style_block(['.sym-line{fill:red}'])
+        '  <style>.sym-line{fill:red}</style>\\n'
+    """
+    if not rules:
+        return ""
+    return f"  <style>{''.join(rules)}</style>\n"
+
+
+__all__ = [
+    "sign_css_rules",
+    "scope_css_rules",
+    "css_style_block",
+]
@@ -0,0 +1,382 @@
+"""
+Tensor datasets of rendered signs for training models.
+
+`build_dataset` renders FSW or SWU signs on worker processes to fixed size
+``uint8`` arrays and writes them straight into memory-mapped ``.npy``
+shards, which NumPy loads with ``numpy.load(path, mmap_mode="r")``. Every
+input line gets a row, in input order, so labels kept next to the corpus
+line up with the rows. ``index.jsonl`` maps each row to its shard and sign,
+and ``dataset.json`` records the shape, mode, seed and augmentation. NumPy
+is installed with the ``array`` extra.
+
+Augmentations are drawn from a random generator seeded by the dataset
+seed and the row number, so building a dataset again from the same corpus
+and seed gives the same pixels, whatever the number of workers.
+"""
+
+import json
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import (
+    IO,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+try:
+    import numpy
+except ImportError as error:
+    raise ImportError(
+        "Datasets require numpy: pip install 'sutton-signwriting-font[array]'"
+    ) from error
+
+from sutton_signwriting_core.convert import swu_to_fsw
+from sutton_signwriting_core.fsw import fsw_compose_sign, fsw_parse_sign
+from sutton_signwriting_core.style import style_compose, style_parse
+
+from .db import get_symbol_size
+from .fsw import fsw_sign_normalize, fsw_sign_svg
+from .processes import mp_context
+from .raster import load_surface, svg_to_array
+
+INDEX = "index.jsonl"
+"""File name of the index in a dataset directory."""
+
+METADATA = "dataset.json"
+"""File name of the metadata in a dataset directory."""
+
+MODES = ("gray", "mask", "rgba")
+"""Pixel modes: gray on white, alpha mask or RGBA."""
+
+
+class Augmentation(NamedTuple):
+    """
+    Random changes applied to each sign before it is rendered.
+    """
+
+    jitter: int = 0
+    """Largest offset of each symbol, in sign coordinates."""
+    scale: Tuple[float, float] = (1.0, 1.0)
+    """Smallest and largest size factor of the sign."""
+    colors: Tuple[str, ...] = ()
+    """Line colors to pick from for each symbol."""
+
+
+class DatasetSummary(NamedTuple):
+    """
+    Counts of a dataset build.
+    """
+
+    rows: int
+    """Rows written, one per input."""
+    shards: int
+    """Shard files written."""
+    errors: int
+    """Inputs that are not valid signs or failed to render, left blank."""
+
+
+def shard_name(index: int) -> str:
+    """
+    Returns the file name of a shard.
+
+    Args:
+        index: shard index
+
+    Returns:
+        shard file name
+    """
+    return f"shard-{index:05d}.npy"
+
+
+def augment_sign(
+    fsw_sign: str, augmentation: Augmentation, seed: Any = 0
+) -> Tuple[str, Optional[int]]:
+    """
+    Applies random symbol offsets, size and colors to a sign.
+
+    Args:
+        fsw_sign: an FSW sign
+        augmentation: changes to apply
+        seed: seed of the random generator
+
+    Returns:
+        augmented FSW sign, and its render width in pixels or None for the
+        natural width
+
+    Example:
+        >>> augment_sign('M518x529S14c20481x471S27106503x489', Augmentation(colors=('red',)))
+        ('M518x529S14c20481x471S27106503x489--D01_red_D02_red_', None)
+    """
+    sign = fsw_parse_sign(fsw_sign)
+    spatials = sign.get("spatials") or []
+    if not spatials:
+        return fsw_sign, None
+    rng = random.Random(seed)
+    jitter = augmentation.jitter
+    if jitter:
+        for spatial in spatials:
+            x, y = spatial["coord"]
+            spatial["coord"] = [
+                min(max(x + rng.randint(-jitter, jitter), 250), 749),
+                min(max(y + rng.randint(-jitter, jitter), 250), 749),
+            ]
+    right, bottom = 250, 250
+    for spatial in spatials:
+        size = get_symbol_size(spatial["symbol"]) or (0, 0)
+        right = max(right, spatial["coord"][0] + size[0])
+        bottom = max(bottom, spatial["coord"][1] + size[1])
+    if jitter:
+        sign["max"] = [min(right, 749), min(bottom, 749)]
+    if augmentation.colors:
+        styling = style_parse(sign.get("style") or "")
+        styling["detailsym"] = [
+            {"index": i + 1, "detail": [rng.choice(augmentation.colors)]}
+            for i in range(len(spatials))
+        ]
+        sign["style"] = style_compose(styling) or ""
+    width = None
+    if augmentation.scale != (1.0, 1.0):
+        left = min(spatial["coord"][0] for spatial in spatials)
+        factor = rng.uniform(*augmentation.scale)
+        width = max(1, round((right - left) * factor))
+    return fsw_compose_sign(sign) or fsw_sign, width
+
+
+def _to_gray(rgba: "numpy.ndarray", out: "numpy.ndarray") -> None:
+    pixels = rgba.astype(numpy.uint32)
+    luma = (pixels[..., 0] * 299 + pixels[..., 1] * 587 + pixels[..., 2] * 114) // 1000
+    alpha = pixels[..., 3]
+    # Blend over a white background
+    out[...] = (luma * alpha + 255 * (255 - alpha) + 127) // 255
+
+
+def _render_rows(
+    path: str,
+    rows: Sequence[Tuple[int, str, Optional[int]]],
+    canvas: Tuple[int, int],
+    mode: str,
+) -> Dict[int, str]:
+    shard = numpy.load(path, mmap_mode="r+")
+    errors: Dict[int, str] = {}
+    for row, sign, width in rows:
+        try:
+            if not sign:
+                raise ValueError("invalid sign")
+            svg = fsw_sign_svg(sign)
+            if mode == "gray":
+                _to_gray(svg_to_array(svg, width, canvas=canvas), shard[row])
+            else:
+                svg_to_array(
+                    svg, width, canvas=canvas, mask=mode == "mask", out=shard[row]
+                )
+        except Exception as error:
+            errors[row] = repr(error)
+            shard[row] = 255 if mode == "gray" else 0
+    shard.flush()
+    del shard
+    return errors
+
+
+def _truncate_shard(path: str, rows: int) -> None:
+    # Rewrites the shape in the header, padded to its old length, and drops
+    # the unused rows at the end.
+    with open(path, "r+b") as f:
+        version = numpy.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(f)
+        end = f.tell()
+        start = 10 if version == (1, 0) else 12
+        header = repr(
+            {
+                "descr": numpy.lib.format.dtype_to_descr(dtype),
+                "fortran_order": fortran_order,
+                "shape": (rows,) + shape[1:],
+            }
+        )
+        f.seek(start)
+        f.write(header.ljust(end - start - 1).encode("latin1") + b"\n")
+        f.truncate(end + rows * int(numpy.prod(shape[1:])) * dtype.itemsize)
+
+
+def build_dataset(
+    texts: Iterable[str],
+    directory: str,
+    canvas: Tuple[int, int] = (128, 128),
+    mode: str = "gray",
+    shard_size: int = 10000,
+    jobs: int = 1,
+    augmentation: Optional[Augmentation] = None,
+    seed: int = 0,
+    chunk_size: int = 64,
+    progress: Optional[IO[str]] = None,
+) -> DatasetSummary:
+    """
+    Renders signs to memory-mapped ``.npy`` shards of fixed size images.
+
+    Each shard holds up to ``shard_size`` rows shaped ``(height, width)``
+    for gray and mask, or ``(height, width, 4)`` for rgba. Signs are
+    centered on the canvas and signs larger than the canvas are scaled
+    down to fit. Inputs that are not valid signs are left blank and
+    recorded in the index with their error.
+
+    Args:
+        texts: FSW or SWU signs
+        directory: output directory, created if missing
+        canvas: image width and height in pixels
+        mode: 'gray', 'mask' or 'rgba'
+        shard_size: rows per shard
+        jobs: number of worker processes
+        augmentation: random changes applied to each sign, None for none
+        seed: seed of the augmentations
+        chunk_size: rows rendered by a worker at a time
+        progress: stream for progress messages, None for none
+
+    Returns:
+        counts of the build
+    """
+    if mode not in MODES:
+        raise ValueError(f"unknown mode: {mode}")
+    if shard_size < 1 or chunk_size < 1:
+        raise ValueError("shard_size and chunk_size must be positive")
+    load_surface()
+    os.makedirs(directory, exist_ok=True)
+    shape = (canvas[1], canvas[0]) + ((4,) if mode == "rgba" else ())
+    executor = ProcessPoolExecutor(jobs, mp_context) if jobs > 1 else None
+    pending: Deque[Tuple["Future[Dict[int, str]]", List[Dict[str, Any]]]] = deque()
+    shard_rows: List[int] = []
+    chunk: List[Tuple[int, str, Optional[int]]] = []
+    entries: List[Dict[str, Any]] = []
+    errors = 0
+    started = time.monotonic()
+
+    def submit() -> None:
+        path = os.path.join(directory, shard_name(len(shard_rows) - 1))
+        if executor is not None:
+            future = executor.submit(_render_rows, path, list(chunk), canvas, mode)
+        else:
+            future = Future()
+            future.set_result(_render_rows(path, chunk, canvas, mode))
+        pending.append((future, list(entries)))
+        chunk.clear()
+        entries.clear()
+
+    def finish() -> None:
+        nonlocal errors
+        future, done = pending.popleft()
+        failed = future.result()
+        for entry in done:
+            if entry["row"] % shard_size in failed:
+                entry["error"] = failed[entry["row"] % shard_size]
+                errors += 1
+            index.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        rows = done[-1]["row"] + 1
+        if progress is not None and rows // 1000 > (rows - len(done)) // 1000:
+            rate = rows / max(time.monotonic() - started, 1e-9)
+            print(f"{rows} rendered, {errors} errors, {rate:.0f}/s", file=progress)
+
+    try:
+        with open(os.path.join(directory, INDEX), "w", encoding="utf-8") as index:
+            row = -1
+            for row, text in enumerate(texts):
+                text = text.strip()
+                if row % shard_size == 0:
+                    if chunk:
+                        submit()
+                    path = os.path.join(directory, shard_name(len(shard_rows)))
+                    # The shard is allocated once, the workers map it to
+                    # write their rows.
+                    numpy.lib.format.open_memmap(
+                        path, "w+", numpy.uint8, (shard_size,) + shape
+                    ).flush()
+                    shard_rows.append(0)
+                sign = fsw_sign_normalize(text if text.isascii() else swu_to_fsw(text))
+                entry: Dict[str, Any] = {
+                    "row": row,
+                    "shard": shard_name(len(shard_rows) - 1),
+                    "text": text,
+                }
+                width = None
+                if augmentation is not None and sign:
+                    sign, width = augment_sign(sign, augmentation, f"{seed}:{row}")
+                    entry["sign"] = sign
+                    if width is not None:
+                        entry["width"] = width
+                chunk.append((row % shard_size, sign, width))
+                entries.append(entry)
+                shard_rows[-1] += 1
+                if len(chunk) >= chunk_size:
+                    submit()
+                while len(pending) > 2 * max(jobs, 1):
+                    finish()
+            if chunk:
+                submit()
+            while pending:
+                finish()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    if shard_rows and shard_rows[-1] < shard_size:
+        _truncate_shard(
+            os.path.join(directory, shard_name(len(shard_rows) - 1)), shard_rows[-1]
+        )
+    metadata = {
+        "rows": row + 1,
+        "canvas": list(canvas),
+        "mode": mode,
+        "dtype": "uint8",
+        "shape": list(shape),
+        "shards": [
+            {"file": shard_name(i), "rows": rows} for i, rows in enumerate(shard_rows)
+        ],
+        "seed": seed,
+        "augmentation": augmentation._asdict() if augmentation else None,
+        "errors": errors,
+    }
+    with open(os.path.join(directory, METADATA), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    return DatasetSummary(row + 1, len(shard_rows), errors)
+
+
+def load_shards(directory: str, mode: str = "r") -> List["numpy.memmap"]:
+    """
+    Opens the shards of a dataset as memory-mapped arrays.
+
+    Args:
+        directory: dataset directory
+        mode: memory map mode, 'r' to read or 'r+' to write
+
+    Returns:
+        shard arrays in row order
+    """
+    with open(os.path.join(directory, METADATA), encoding="utf-8") as f:
+        metadata = json.load(f)
+    return [
+        numpy.load(os.path.join(directory, shard["file"]), mmap_mode=mode)
+        for shard in metadata["shards"]
+    ]
+
+
+__all__ = [
+    "INDEX",
+    "METADATA",
+    "MODES",
+    "Augmentation",
+    "DatasetSummary",
+    "shard_name",
+    "augment_sign",
+    "build_dataset",
+    "load_shards",
+]
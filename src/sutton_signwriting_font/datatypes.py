@@ -27,8 +27,24 @@ class ScaleObject(TypedDict):
     """Height for image."""
 
 
+class PngOptions(TypedDict):
+    """
+    Encoding options for PNG images.
+    """
+
+    mode: NotRequired[str]
+    """Pixel mode: 'rgba', 'gray', 'bilevel' or 'palette'."""
+    level: NotRequired[int]
+    """zlib compression level, from 0 for none to 9 for smallest."""
+    strategy: NotRequired[str]
+    """zlib strategy: 'default', 'filtered', 'huffman', 'rle' or 'fixed'."""
+    filter: NotRequired[str]
+    """PNG row filter: 'none', 'sub' or 'up'."""
+
+
 __all__ = [
     "ScaleObject",
+    "PngOptions",
     "SignSpatial",
     "DetailSym",
     "StyleObject",
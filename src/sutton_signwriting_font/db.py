@@ -1,6 +1,9 @@
 import sqlite3
 from importlib.resources import files
-from typing import Dict, List, Optional, Tuple, TypedDict
+from typing import Dict, List, Mapping, Optional, Tuple, TypedDict
+
+from .metrics import observe_query
+from .timing import timed_function
 
 
 class SymbolInfo(TypedDict):
@@ -9,11 +12,66 @@ class SymbolInfo(TypedDict):
     height: int
 
 
+# In-memory symbol store, used instead of SQLite once loaded
+_store: Optional[Mapping[str, SymbolInfo]] = None
+
+
 def get_db_path() -> str:
     """Returns the path to the bundled SQLite database."""
     return str(files("sutton_signwriting_font").joinpath("db", "iswa2010.db"))
 
 
+def load_symbol_store() -> int:
+    """
+    Loads every symbol of the database into memory.
+
+    Once loaded, the symbol queries are answered from memory instead of
+    opening the SQLite database for each call.
+
+    Returns:
+        number of symbols loaded
+
+    Example:
+        >>> load_symbol_store()
+        37811
+    """
+    global _store
+    conn = sqlite3.connect(get_db_path())
+    try:
+        rows = conn.execute("SELECT symkey, svg, width, height FROM symbol").fetchall()
+    finally:
+        conn.close()
+    observe_query("symbol_store", len(rows))
+    _store = {
+        row[0]: {"svg": row[1], "width": row[2], "height": row[3]} for row in rows
+    }
+    return len(_store)
+
+
+def unload_symbol_store() -> None:
+    """Drops the in-memory symbol store and returns to SQLite queries."""
+    global _store
+    _store = None
+
+
+def set_symbol_store(store: Optional[Mapping[str, SymbolInfo]]) -> None:
+    """
+    Answers the symbol queries from a mapping of symbol keys.
+
+    Args:
+        store: symbol information by key, such as a shared symbol store, or
+            None to return to SQLite queries
+    """
+    global _store
+    _store = store
+
+
+def symbol_store_loaded() -> bool:
+    """Returns True if the symbol queries are answered from memory."""
+    return _store is not None
+
+
+@timed_function("lookup")
 def get_symbol_size(key: str) -> Optional[Tuple[int, int]]:
     """
     Queries the width and height for a symbol key.
@@ -24,17 +82,22 @@ def get_symbol_size(key: str) -> Optional[Tuple[int, int]]:
     Returns:
         Tuple of (width, height) if found, else None.
     """
+    if _store is not None:
+        info = _store.get(key)
+        return (info["width"], info["height"]) if info else None
     conn = sqlite3.connect(get_db_path())
     try:
         cur = conn.cursor()
         res = cur.execute(
             "SELECT width, height FROM symbol WHERE symkey = ?", (key,)
         ).fetchone()
+        observe_query("symbol_size", 1 if res else 0)
         return res if res else None
     finally:
         conn.close()
 
 
+@timed_function("lookup")
 def get_symbol_svg(key: str) -> Optional[Tuple[str, int, int]]:
     """
     Queries the SVG fragment, width, and height for a symbol key.
@@ -45,17 +108,22 @@ def get_symbol_svg(key: str) -> Optional[Tuple[str, int, int]]:
     Returns:
         Tuple of (svg_fragment, width, height) if found, else None.
     """
+    if _store is not None:
+        info = _store.get(key)
+        return (info["svg"], info["width"], info["height"]) if info else None
     conn = sqlite3.connect(get_db_path())
     try:
         cur = conn.cursor()
         res = cur.execute(
             "SELECT svg, width, height FROM symbol WHERE symkey = ?", (key,)
         ).fetchone()
+        observe_query("symbol_svg", 1 if res else 0)
         return res if res else None
     finally:
         conn.close()
 
 
+@timed_function("lookup")
 def get_symbols_info(keys: List[str]) -> Dict[str, SymbolInfo]:
     """
     Batch queries SVG fragments, widths, and heights for multiple symbol keys.
@@ -68,6 +136,9 @@ def get_symbols_info(keys: List[str]) -> Dict[str, SymbolInfo]:
     """
     if not keys:
         return {}
+    if _store is not None:
+        store = _store
+        return {key: store[key] for key in keys if key in store}
     conn = sqlite3.connect(get_db_path())
     try:
         cur = conn.cursor()
@@ -76,6 +147,7 @@ def get_symbols_info(keys: List[str]) -> Dict[str, SymbolInfo]:
             f"SELECT symkey, svg, width, height FROM symbol WHERE symkey IN ({placeholders})",
             keys,
         ).fetchall()
+        observe_query("symbols_info", len(res))
         return {
             row[0]: {"svg": row[1], "width": row[2], "height": row[3]} for row in res
         }
@@ -88,4 +160,8 @@ __all__ = [
     "get_symbol_size",
     "get_symbol_svg",
     "get_symbols_info",
+    "load_symbol_store",
+    "unload_symbol_store",
+    "set_symbol_store",
+    "symbol_store_loaded",
 ]
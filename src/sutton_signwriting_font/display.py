@@ -0,0 +1,230 @@
+"""
+Display lists of placed symbols for client-side rendering.
+
+A display list describes an image by the symbols placed on it, for clients
+that keep their own copies of the symbol glyphs and draw them directly. It
+holds the box of the image and, for each symbol, its key, position, line
+and fill colors and zoom. The display list functions of signs and columns,
+such as `fsw_sign_display_list`, build them from the same layout and
+styling as the SVG images, without composing any markup.
+
+Positions and the box are in the pixels of the image: each symbol glyph is
+drawn with its top left corner at ``x`` and ``y``, scaled by ``zoom``, and
+the box is the visible area as in an SVG ``viewBox``.
+
+`display_list_json` writes a list as JSON, and `pack_display_list` as
+bytes with 16 bytes per symbol. The packed layout, little-endian::
+
+    header   magic 'SSDL', version, number of colors, number of symbols,
+             box as four float32
+    colors   length and UTF-8 text of each distinct color
+    symbols  symbol id, line and fill color indexes, x, y and zoom as float32
+"""
+
+import json
+import struct
+from typing import Dict, List, NamedTuple, Tuple
+
+from sutton_signwriting_core.convert import id_to_key, key_to_id
+
+from .scan import SignScan
+
+MAGIC = b"SSDL"
+"""Magic bytes at the start of a packed display list."""
+
+VERSION = 1
+"""Version of the packed layout."""
+
+_header = struct.Struct("<4sBBH4f")
+_symbol = struct.Struct("<HBB3f")
+
+
+class DisplayItem(NamedTuple):
+    """
+    A symbol placed on an image.
+    """
+
+    symbol: str
+    """FSW symbol key, such as 'S14c20'."""
+    x: float
+    """Left edge of the symbol."""
+    y: float
+    """Top edge of the symbol."""
+    line: str
+    """Line color."""
+    fill: str
+    """Fill color."""
+    zoom: float
+    """Scale of the symbol glyph."""
+
+
+class DisplayList(NamedTuple):
+    """
+    The symbols of an image with its box.
+    """
+
+    box: Tuple[float, float, float, float]
+    """Left, top, width and height of the image."""
+    items: List[DisplayItem]
+    """Placed symbols, in drawing order."""
+
+
+def sign_display_box(
+    scan: SignScan, padding: float = 0, zoom: float = 1
+) -> Tuple[float, float, float, float]:
+    """
+    Returns the box of a sign image, with padding around its symbols.
+
+    Args:
+        scan: scanned sign
+        padding: padding around the symbols
+        zoom: scale of the image
+
+    Returns:
+        left, top, width and height
+    """
+    if scan.spatials:
+        x1 = min(x for _, x, _ in scan.spatials)
+        y1 = min(y for _, _, y in scan.spatials)
+        width = (scan.max[0] - x1) or 20
+        height = (scan.max[1] - y1) or 20
+    else:
+        x1 = y1 = 490
+        width = height = 20
+    return (
+        (x1 - padding) * zoom,
+        (y1 - padding) * zoom,
+        (width + 2 * padding) * zoom,
+        (height + 2 * padding) * zoom,
+    )
+
+
+def _number(value: float) -> float:
+    # Whole numbers are written without a fraction
+    return int(value) if value == int(value) else value
+
+
+def display_list_json(display: DisplayList) -> str:
+    """
+    Writes a display list as compact JSON.
+
+    Args:
+        display: display list
+
+    Returns:
+        JSON object with the box and a list of symbols
+
+    Example:
+        >>> display_list_json(DisplayList((0, 0, 10, 20), [DisplayItem("S10000", 1, 2.5, "black", "white", 1)]))
+        '{"box":[0,0,10,20],"symbols":[{"symbol":"S10000","x":1,"y":2.5,"line":"black","fill":"white","zoom":1}]}'
+    """
+    return json.dumps(
+        {
+            "box": [_number(value) for value in display.box],
+            "symbols": [
+                {
+                    "symbol": item.symbol,
+                    "x": _number(item.x),
+                    "y": _number(item.y),
+                    "line": item.line,
+                    "fill": item.fill,
+                    "zoom": _number(item.zoom),
+                }
+                for item in display.items
+            ],
+        },
+        separators=(",", ":"),
+    )
+
+
+def pack_display_list(display: DisplayList) -> bytes:
+    """
+    Packs a display list into bytes.
+
+    Args:
+        display: display list
+
+    Returns:
+        packed display list
+
+    Raises:
+        ValueError: if there are more than 255 colors or 65535 symbols, or a
+            color is longer than 255 bytes
+    """
+    colors: Dict[str, int] = {}
+    for item in display.items:
+        colors.setdefault(item.line, len(colors))
+        colors.setdefault(item.fill, len(colors))
+    if len(colors) > 255:
+        raise ValueError("too many colors for a display list")
+    if len(display.items) > 0xFFFF:
+        raise ValueError("too many symbols for a display list")
+    parts = [
+        _header.pack(MAGIC, VERSION, len(colors), len(display.items), *display.box)
+    ]
+    for color in colors:
+        encoded = color.encode("utf-8")
+        if len(encoded) > 255:
+            raise ValueError(f"color too long for a display list: {color}")
+        parts.append(bytes([len(encoded)]) + encoded)
+    for item in display.items:
+        parts.append(
+            _symbol.pack(
+                key_to_id(item.symbol),
+                colors[item.line],
+                colors[item.fill],
+                item.x,
+                item.y,
+                item.zoom,
+            )
+        )
+    return b"".join(parts)
+
+
+def unpack_display_list(data: bytes) -> DisplayList:
+    """
+    Reads a packed display list.
+
+    Args:
+        data: packed display list
+
+    Returns:
+        display list, with the numbers as float32 values
+
+    Raises:
+        ValueError: if the data is not a packed display list
+    """
+    if len(data) < _header.size:
+        raise ValueError("not a display list")
+    magic, version, color_count, count, *box = _header.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a display list")
+    if version != VERSION:
+        raise ValueError(f"unsupported display list version {version}")
+    position = _header.size
+    colors: List[str] = []
+    for _ in range(color_count):
+        if position >= len(data):
+            raise ValueError("truncated display list")
+        length = data[position]
+        colors.append(data[position + 1 : position + 1 + length].decode("utf-8"))
+        position += 1 + length
+    if len(data) != position + count * _symbol.size:
+        raise ValueError("truncated display list")
+    items = [
+        DisplayItem(id_to_key(id_), x, y, colors[line], colors[fill], zoom)
+        for id_, line, fill, x, y, zoom in _symbol.iter_unpack(data[position:])
+    ]
+    return DisplayList((box[0], box[1], box[2], box[3]), items)
+
+
+__all__ = [
+    "MAGIC",
+    "VERSION",
+    "DisplayItem",
+    "DisplayList",
+    "sign_display_box",
+    "display_list_json",
+    "pack_display_list",
+    "unpack_display_list",
+]
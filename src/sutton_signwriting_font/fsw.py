@@ -1,35 +1,59 @@
-from typing import Dict, List, Optional
-
-import base64
-
-import cairosvg
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Sequence, Tuple
 
 from sutton_signwriting_core.fsw import (
     fsw_is_type,
     fsw_colorize,
     fsw_column_defaults_merge,
     fsw_columns,
-    fsw_info,
-    fsw_parse_sign,
-    fsw_parse_symbol,
+    fsw_parse_text,
 )
 
 from sutton_signwriting_core.datatypes import (
-    SignSpatial,
     ColumnSegment,
     ColumnOptions,
     StyleObject,
 )
 
 from .datatypes import (
+    PngOptions,
     ScaleObject,
 )
 
-from sutton_signwriting_core.style import style_parse, style_compose
-
 from sutton_signwriting_core.convert import to_zoom
 
-from .db import get_symbol_size, get_symbol_svg, get_symbols_info
+from .db import SymbolInfo, get_symbol_size, get_symbol_svg, get_symbols_info
+
+from .columns import ColumnDocument, LazyColumns
+
+from .scan import SignScan, Spatial
+
+from .cache import (
+    fsw_parse_symbol_cached,
+    fsw_scan_sign_cached,
+    style_compose_cached,
+    style_parse_cached,
+    memoize,
+)
+
+from .css import css_style_block, scope_css_rules, sign_css_rules
+
+from .display import DisplayItem, DisplayList, sign_display_box
+
+from .lod import get_symbol_svg_lod, sign_lod_level
+
+from .minify import minify_svg
+
+from .raster import png_data_url, svg_to_array, svg_to_png, svgs_to_array
+
+from .metrics import counted_render
+
+from .timing import timed_function
+
+if TYPE_CHECKING:
+    import numpy
+
+# Column layout, timed as a render stage
+_fsw_layout = timed_function("layout")(fsw_columns)
 
 
 def fsw_symbol_normalize(fsw_sym: str) -> str:
@@ -46,7 +70,7 @@ def fsw_symbol_normalize(fsw_sym: str) -> str:
         >>> fsw_symbol_normalize('S20500-C')
         'S20500493x493-C'
     """
-    parsed = fsw_parse_symbol(fsw_sym)
+    parsed = fsw_parse_symbol_cached(fsw_sym)
     if not parsed.get("symbol"):
         return ""
 
@@ -76,16 +100,28 @@ def fsw_symbol_svg_body(fsw_sym: str) -> str:
         >>> fsw_symbol_svg_body('S20500-C')
         '  <text font-size="0">S20500-C</text>\\n  <svg x="493" y="493">...</svg>'
     """
-    parsed = fsw_parse_symbol(fsw_sym)
+    return _fsw_symbol_svg_body(fsw_sym, None)
+
+
+@timed_function("compose")
+def _fsw_symbol_svg_body(
+    fsw_sym: str, symbols: Optional[Mapping[str, SymbolInfo]]
+) -> str:
+    # Symbol body with the symbol information given, or from the store
+    parsed = fsw_parse_symbol_cached(fsw_sym)
     if not parsed.get("symbol"):
         return ""
 
-    res = get_symbol_svg(parsed["symbol"])
+    if symbols is None:
+        res = get_symbol_svg(parsed["symbol"])
+    else:
+        info = symbols.get(parsed["symbol"])
+        res = (info["svg"], info["width"], info["height"]) if info else None
     if not res:
         return ""
     sym_svg, sym_width, sym_height = res
 
-    styling = style_parse(parsed.get("style", ""))
+    styling = style_parse_cached(parsed.get("style", ""))
 
     if coord := parsed.get("coord"):
         x1, y1 = coord
@@ -127,12 +163,16 @@ def fsw_symbol_svg_body(fsw_sym: str) -> str:
     return f'  <text font-size="0">{fsw_sym}</text>{background}\n{sym_svg}'
 
 
-def fsw_symbol_svg(fsw_sym: str) -> str:
+def fsw_symbol_svg(
+    fsw_sym: str, compact: bool = False, precision: Optional[int] = None
+) -> str:
     """
     Creates an SVG image from an FSW symbol key with an optional style string.
 
     Args:
         fsw_sym: an FSW symbol key with optional style string
+        compact: drop optional markup and whitespace, see `minify_svg`
+        precision: with ``compact``, decimals to round coordinates to
 
     Returns:
         symbol svg
@@ -141,18 +181,30 @@ def fsw_symbol_svg(fsw_sym: str) -> str:
         >>> fsw_symbol_svg('S20500-C')
         '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" ...>...</svg>'
     """
-    parsed = fsw_parse_symbol(fsw_sym)
+    return _fsw_symbol_svg(fsw_sym, None, compact, precision)
+
+
+@counted_render("symbol", "svg")
+@timed_function("compose")
+def _fsw_symbol_svg(
+    fsw_sym: str,
+    symbols: Optional[Mapping[str, SymbolInfo]],
+    compact: bool = False,
+    precision: Optional[int] = None,
+) -> str:
+    # Symbol image with the symbol information given, or from the store
+    parsed = fsw_parse_symbol_cached(fsw_sym)
     blank = '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="1" height="1"></svg>'
     if not parsed.get("symbol"):
         return blank
 
     if not parsed.get("coord"):
         norm = fsw_symbol_normalize(fsw_sym)
-        parsed = fsw_parse_symbol(norm)
+        parsed = fsw_parse_symbol_cached(norm)
         if not parsed.get("symbol"):
             return blank
 
-    styling = style_parse(parsed.get("style", ""))
+    styling = style_parse_cached(parsed.get("style", ""))
 
     coord = parsed["coord"]
     x1, y1 = coord
@@ -177,18 +229,25 @@ def fsw_symbol_svg(fsw_sym: str) -> str:
         sizing = f' width="{width}" height="{height}"'
     svg = f'<svg{classes}{id_} version="1.1" xmlns="http://www.w3.org/2000/svg"{sizing} viewBox="{x1} {y1} {(x2 - x1)} {(y2 - y1)}">\n'
 
-    body = fsw_symbol_svg_body(fsw_sym)
+    body = _fsw_symbol_svg_body(fsw_sym, symbols)
 
-    return svg + body + "\n</svg>"
+    svg += body + "\n</svg>"
+    return minify_svg(svg, precision) if compact else svg
 
 
-def fsw_symbol_png(fsw_sym: str, scale: Optional[ScaleObject] = None) -> bytes:
+@counted_render("symbol", "png")
+def fsw_symbol_png(
+    fsw_sym: str,
+    scale: Optional[ScaleObject] = None,
+    encoding: Optional[PngOptions] = None,
+) -> bytes:
     """
     Creates a binary PNG image from an FSW symbol key with an optional style string.
 
     Args:
         fsw_sym: an FSW symbol key with optional style string
         scale: options for scaling to specific width or height
+        encoding: pixel mode and compression of the png
 
     Returns:
         symbol png bytes
@@ -199,23 +258,27 @@ def fsw_symbol_png(fsw_sym: str, scale: Optional[ScaleObject] = None) -> bytes:
         True
     """
     svg = fsw_symbol_svg(fsw_sym)
-    png = cairosvg.svg2png(
-        bytestring=svg.encode("utf-8"),
-        output_width=scale.get("width") if scale else None,
-        output_height=scale.get("height") if scale else None,
+    return svg_to_png(
+        svg,
+        scale.get("width") if scale else None,
+        scale.get("height") if scale else None,
+        encoding,
     )
-    if not isinstance(png, bytes):
-        raise ValueError("Failed to convert SVG to PNG")
-    return png
 
 
-def fsw_symbol_png_data_url(fsw_sym: str, scale: Optional[ScaleObject] = None) -> str:
+@counted_render("symbol", "data_url")
+def fsw_symbol_png_data_url(
+    fsw_sym: str,
+    scale: Optional[ScaleObject] = None,
+    encoding: Optional[PngOptions] = None,
+) -> str:
     """
     Creates a data url PNG image from an FSW symbol key with an optional style string.
 
     Args:
         fsw_sym: an FSW symbol key with optional style string
         scale: options for scaling to specific width or height
+        encoding: pixel mode and compression of the png
 
     Returns:
         symbol png data url
@@ -224,8 +287,44 @@ def fsw_symbol_png_data_url(fsw_sym: str, scale: Optional[ScaleObject] = None) -
         >>> fsw_symbol_png_data_url('S20500-C').startswith('data:image/png;base64,')
         True
     """
-    png = fsw_symbol_png(fsw_sym, scale)
-    return "data:image/png;base64," + base64.b64encode(png).decode("utf-8")
+    png = fsw_symbol_png(fsw_sym, scale, encoding)
+    return png_data_url(png)
+
+
+@counted_render("symbol", "array")
+def fsw_symbol_array(
+    fsw_sym: str,
+    scale: Optional[ScaleObject] = None,
+    canvas: Optional[Tuple[int, int]] = None,
+    mask: bool = False,
+    center: bool = True,
+) -> "numpy.ndarray":
+    """
+    Creates an RGBA pixel array from an FSW symbol key with an optional style string.
+
+    Args:
+        fsw_sym: an FSW symbol key with optional style string
+        scale: options for scaling to specific width or height
+        canvas: fixed output width and height
+        mask: return the alpha channel only
+        center: center the symbol on the canvas
+
+    Returns:
+        (height, width, 4) uint8 array, or (height, width) uint8 mask
+
+    Example:
+        >>> fsw_symbol_array('S20500-C').shape
+        (12, 10, 4)
+    """
+    svg = fsw_symbol_svg(fsw_sym)
+    return svg_to_array(
+        svg,
+        scale.get("width") if scale else None,
+        scale.get("height") if scale else None,
+        canvas,
+        mask,
+        center,
+    )
 
 
 def fsw_sign_normalize(fsw_sign: str) -> str:
@@ -242,27 +341,26 @@ def fsw_sign_normalize(fsw_sign: str) -> str:
         >>> fsw_sign_normalize('M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475')
         'M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475'
     """
-    parsed = fsw_parse_sign(fsw_sign)
-    if not parsed.get("spatials"):
+    scan = fsw_scan_sign_cached(fsw_sign)
+    if not scan or not scan.spatials:
         return ""
 
-    symbols = [spatial["symbol"] for spatial in parsed["spatials"]]
-    symbolsizes = get_symbols_info(symbols)
+    symbolsizes = get_symbols_info([symbol for symbol, _, _ in scan.spatials])
     if not symbolsizes:
         return ""
 
-    def bbox(spatials: List[SignSpatial]) -> Dict[str, int]:
-        x1 = min(s["coord"][0] for s in spatials)
-        y1 = min(s["coord"][1] for s in spatials)
-        x2 = max(s["coord"][0] + symbolsizes[s["symbol"]]["width"] for s in spatials)
-        y2 = max(s["coord"][1] + symbolsizes[s["symbol"]]["height"] for s in spatials)
+    def bbox(spatials: Sequence[Spatial]) -> Dict[str, int]:
+        x1 = min(x for _, x, _ in spatials)
+        y1 = min(y for _, _, y in spatials)
+        x2 = max(x + symbolsizes[symbol]["width"] for symbol, x, _ in spatials)
+        y2 = max(y + symbolsizes[symbol]["height"] for symbol, _, y in spatials)
         return {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
 
-    hsyms = [s for s in parsed["spatials"] if fsw_is_type(s["symbol"], "hcenter")]
+    hsyms = [s for s in scan.spatials if fsw_is_type(s[0], "hcenter")]
 
-    vsyms = [s for s in parsed["spatials"] if fsw_is_type(s["symbol"], "vcenter")]
+    vsyms = [s for s in scan.spatials if fsw_is_type(s[0], "vcenter")]
 
-    abox = bbox(parsed["spatials"])
+    abox = bbox(scan.spatials)
     max_ = [abox["x2"], abox["y2"]]
 
     if hsyms:
@@ -280,20 +378,16 @@ def fsw_sign_normalize(fsw_sign: str) -> str:
         (abox["y2"] + abox["y1"]) // 2 - 500,
     ]
 
-    sequence_part = "A" + "".join(parsed["sequence"]) if parsed.get("sequence") else ""
-    box = parsed["box"]
+    sequence_part = "A" + "".join(scan.sequence) if scan.sequence else ""
     new_max_str = f"{max_[0] - offset[0]}x{max_[1] - offset[1]}"
     spatials_str = "".join(
-        [
-            s["symbol"] + f"{s['coord'][0] - offset[0]}x{s['coord'][1] - offset[1]}"
-            for s in parsed["spatials"]
-        ]
+        [symbol + f"{x - offset[0]}x{y - offset[1]}" for symbol, x, y in scan.spatials]
     )
-    style = parsed.get("style", "")
 
-    return sequence_part + box + new_max_str + spatials_str + style
+    return sequence_part + scan.box + new_max_str + spatials_str + scan.style
 
 
+@timed_function("compose")
 def fsw_sign_svg_body(fsw_sign: str) -> str:
     """
     Creates the body of an SVG image from an FSW sign with an optional style string.
@@ -308,29 +402,58 @@ def fsw_sign_svg_body(fsw_sign: str) -> str:
         >>> fsw_sign_svg_body('M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475-C')
         '  <text font-size="0">M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475-C</text>\\n  <svg x="476" y="466">...</svg>...'
     """
-    parsed = fsw_parse_sign(fsw_sign)
-    spatials = parsed.get("spatials")
-    if not spatials:
+    scan = fsw_scan_sign_cached(fsw_sign)
+    if not scan or not scan.spatials:
         return (
             ""  # Or call fsw_symbol_svg_body if desired, but matching JS returns blank
         )
 
-    styling = style_parse(parsed.get("style", ""))
+    return _fsw_sign_svg_body(fsw_sign, scan, style_parse_cached(scan.style))
+
+
+@memoize("fsw_sign_css_symbols")
+def _fsw_sign_css_symbols(
+    spatials: Tuple[Spatial, ...], lod: Optional[int] = None
+) -> str:
+    # Style-independent symbol part of a sign in CSS mode
+    return _fsw_sign_css_svgs(
+        spatials, lod, get_symbols_info([symbol for symbol, _, _ in spatials])
+    )
+
+
+def _fsw_sign_css_svgs(
+    spatials: Tuple[Spatial, ...],
+    lod: Optional[int],
+    syms_info: Mapping[str, SymbolInfo],
+) -> str:
+    svgs: List[str] = []
+    for index, (symbol, x, y) in enumerate(spatials, 1):
+        info = syms_info.get(symbol)
+        if info:
+            sym_svg = _symbol_svg_lod(symbol, info["svg"], lod)
+            svgs.append(f'  <svg class="sym-{index}" x="{x}" y="{y}">{sym_svg}</svg>')
+    return "\n".join(svgs)
 
-    # Apply detailsym to spatials
-    if detailsym := styling.get("detailsym"):
-        for sym in detailsym:
-            index = sym.get("index", 0) - 1
-            if 0 <= index < len(spatials):
-                spatials[index]["detail"] = sym.get("detail", [])
 
-    syms_info = get_symbols_info([s["symbol"] for s in spatials])
+def _symbol_svg_lod(symbol: str, svg: str, lod: Optional[int]) -> str:
+    if lod is None:
+        return svg
+    return get_symbol_svg_lod(symbol, lod) or svg
 
-    x_coords = [s["coord"][0] for s in spatials]
-    y_coords = [s["coord"][1] for s in spatials]
-    x1 = min(x_coords)
-    y1 = min(y_coords)
-    x2, y2 = parsed["max"]
+
+def _fsw_sign_svg_body(
+    fsw_sign: str,
+    scan: SignScan,
+    styling: StyleObject,
+    css: bool = False,
+    lod: Optional[int] = None,
+    symbols: Optional[Mapping[str, SymbolInfo]] = None,
+) -> str:
+    spatials = scan.spatials
+
+    x1 = min(x for _, x, _ in spatials)
+    y1 = min(y for _, _, y in spatials)
+    x2, y2 = scan.max
 
     background = ""
     if padding := styling.get("padding"):
@@ -343,24 +466,43 @@ def fsw_sign_svg_body(fsw_sign: str) -> str:
 
     svg_body = f'  <text font-size="0">{fsw_sign}</text>{background}'
 
+    if css:
+        if symbols is None:
+            sym_svgs = _fsw_sign_css_symbols(spatials, lod)
+        else:
+            sym_svgs = _fsw_sign_css_svgs(spatials, lod, symbols)
+        return svg_body + "\n" + sym_svgs if sym_svgs else svg_body
+
+    # Apply detailsym to spatials
+    details: Dict[int, List[str]] = {}
+    for sym in styling.get("detailsym", []):
+        index = sym.get("index", 0) - 1
+        if 0 <= index < len(spatials):
+            details[index] = sym.get("detail", [])
+
+    syms_info = (
+        get_symbols_info([symbol for symbol, _, _ in spatials])
+        if symbols is None
+        else symbols
+    )
+
     detail = styling.get("detail", [])
 
     line_base = detail[0] if detail else ""
     fill_base = detail[1] if len(detail) > 1 else ""
 
     svgs: List[str] = []
-    for spatial in spatials:
-        symbol = spatial["symbol"]
-        coord = spatial["coord"]
+    for index, (symbol, x, y) in enumerate(spatials):
         info = syms_info.get(symbol)
         if not info:
             continue
-        sym_svg = info["svg"]
+        sym_svg = _symbol_svg_lod(symbol, info["svg"], lod)
+        sym_detail = details.get(index, [])
 
         # Line color
         line = line_base
-        if "detail" in spatial and spatial["detail"]:
-            line = spatial["detail"][0]
+        if sym_detail:
+            line = sym_detail[0]
         elif styling.get("colorize"):
             line = fsw_colorize(symbol)
         if line:
@@ -370,14 +512,14 @@ def fsw_sign_svg_body(fsw_sign: str) -> str:
 
         # Fill color
         fill = fill_base
-        if "detail" in spatial and len(spatial["detail"]) > 1:
-            fill = spatial["detail"][1]
+        if len(sym_detail) > 1:
+            fill = sym_detail[1]
         if fill:
             sym_svg = sym_svg.replace(
                 'class="sym-fill" fill="#ffffff"', f'class="sym-fill" fill="{fill}"'
             )
 
-        svgs.append(f'  <svg x="{coord[0]}" y="{coord[1]}">{sym_svg}</svg>')
+        svgs.append(f'  <svg x="{x}" y="{y}">{sym_svg}</svg>')
 
     if svgs:
         svg_body += "\n" + "\n".join(svgs)
@@ -385,12 +527,30 @@ def fsw_sign_svg_body(fsw_sign: str) -> str:
     return svg_body
 
 
-def fsw_sign_svg(fsw_sign: str) -> str:
+def fsw_sign_svg(
+    fsw_sign: str,
+    css: bool = False,
+    lod: Optional[int] = None,
+    compact: bool = False,
+    precision: Optional[int] = None,
+) -> str:
     """
     Creates an SVG image from an FSW sign with an optional style string.
 
+    With ``css`` set, the symbol fragments are left unchanged and the colors
+    of the style string are set by a ``<style>`` block in the header, so the
+    symbols can be reused for any color scheme. The rules are scoped by a
+    class on the root element, see `scope_css_rules`.
+
+    With ``lod`` set, the symbols are drawn with the simplified paths of
+    that level of detail, for images too small to show the curves.
+
     Args:
         fsw_sign: an FSW sign with optional style string
+        css: set colors with CSS rules instead of rewriting the fragments
+        lod: level of detail from `lod_level`, or None for full detail
+        compact: drop optional markup and whitespace, see `minify_svg`
+        precision: with ``compact``, decimals to round coordinates to
 
     Returns:
         sign svg
@@ -399,47 +559,104 @@ def fsw_sign_svg(fsw_sign: str) -> str:
         >>> fsw_sign_svg('M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475-C')
         '<svg ...> ... </svg>'
     """
-    parsed = fsw_parse_sign(fsw_sign)
+    return _fsw_sign_svg(fsw_sign, None, None, css, lod, compact, precision)
+
+
+@counted_render("sign", "svg")
+@timed_function("compose")
+def _fsw_sign_svg(
+    fsw_sign: str,
+    scan: Optional[SignScan],
+    symbols: Optional[Mapping[str, SymbolInfo]],
+    css: bool = False,
+    lod: Optional[int] = None,
+    compact: bool = False,
+    precision: Optional[int] = None,
+) -> str:
+    # Sign image from a sign scan and symbol information, when the render
+    # pipeline has them already, or scanned and looked up here
+    if scan is None:
+        scan = fsw_scan_sign_cached(fsw_sign)
     blank = '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="1" height="1"></svg>'
-    if not parsed.get("box"):
+    if not scan:
         return blank
 
-    info = fsw_info(fsw_sign)
-    x1 = info["minX"]
-    y1 = info["minY"]
-    x2 = x1 + info["width"]
-    y2 = y1 + info["height"]
-
-    styling = style_parse(parsed.get("style", ""))
+    styling = style_parse_cached(scan.style)
 
-    classes = f' class="{styling["classes"]}"' if styling.get("classes") else ""
+    # Sizing as gathered by fsw_info
+    if scan.spatials:
+        x1 = min(x for _, x, _ in scan.spatials)
+        y1 = min(y for _, _, y in scan.spatials)
+        width = (scan.max[0] - x1) or 20
+        height = (scan.max[1] - y1) or 20
+        info_padding = styling.get("padding", 0)
+        info_zoom = styling.get("zoom", 1)
+    else:
+        x1 = 490
+        y1 = 490
+        width = 20
+        height = 20
+        info_padding = 0
+        info_zoom = 1
+    x2 = x1 + width
+    y2 = y1 + height
+
+    rules: List[str] = []
+    class_names = [styling["classes"]] if styling.get("classes") else []
+    if css and scan.spatials:
+        sign_symbols = [symbol for symbol, _, _ in scan.spatials]
+        rules = sign_css_rules(styling, sign_symbols, fsw_colorize)
+        if rules:
+            scope, rules = scope_css_rules(rules)
+            class_names.append(scope)
+
+    classes = f' class="{" ".join(class_names)}"' if class_names else ""
     id_ = f' id="{styling["id"]}"' if styling.get("id") else ""
 
-    padding = styling.get("padding", 0) + info["padding"]
+    padding = styling.get("padding", 0) + info_padding
     x1 -= padding
     y1 -= padding
     x2 += padding
     y2 += padding
 
     sizing = ""
-    zoom = to_zoom(styling.get("zoom")) * to_zoom(info["zoom"])
+    zoom = to_zoom(styling.get("zoom")) * to_zoom(info_zoom)
     if zoom != "x":
         sizing = f' width="{(x2 - x1) * zoom}" height="{(y2 - y1) * zoom}"'
 
     svg = f'<svg{classes}{id_} version="1.1" xmlns="http://www.w3.org/2000/svg"{sizing} viewBox="{x1} {y1} {(x2 - x1)} {(y2 - y1)}" preserveAspectRatio="xMidYMid meet">\n'
 
-    body = fsw_sign_svg_body(fsw_sign)
+    if not scan.spatials:
+        return svg + "\n</svg>"
 
-    return svg + body + "\n</svg>"
+    svg += css_style_block(rules)
+    svg += _fsw_sign_svg_body(fsw_sign, scan, styling, css, lod, symbols)
+    svg += "\n</svg>"
+    return minify_svg(svg, precision) if compact else svg
 
 
-def fsw_sign_png(fsw_sign: str, scale: Optional[ScaleObject] = None) -> bytes:
+def _fsw_sign_lod(fsw_sign: str, scale: Optional[ScaleObject]) -> Optional[int]:
+    # Level of detail for a raster image of a sign
+    scan = fsw_scan_sign_cached(fsw_sign)
+    if not scan:
+        return None
+    zoom = to_zoom(style_parse_cached(scan.style).get("zoom"))
+    return sign_lod_level(scan, scale, zoom)
+
+
+@counted_render("sign", "png")
+def fsw_sign_png(
+    fsw_sign: str,
+    scale: Optional[ScaleObject] = None,
+    encoding: Optional[PngOptions] = None,
+) -> bytes:
     """
     Creates a binary PNG image from an FSW sign with an optional style string.
 
     Args:
         fsw_sign: an FSW sign with optional style string
         scale: options for scaling to specific width or height
+        encoding: pixel mode and compression of the png
 
     Returns:
         sign png bytes
@@ -449,24 +666,28 @@ def fsw_sign_png(fsw_sign: str, scale: Optional[ScaleObject] = None) -> bytes:
         >>> png[:8] == b'\\x89PNG\\r\\n\x1a\\n'  # Valid PNG header
         True
     """
-    svg = fsw_sign_svg(fsw_sign)
-    png = cairosvg.svg2png(
-        bytestring=svg.encode("utf-8"),
-        output_width=scale.get("width") if scale else None,
-        output_height=scale.get("height") if scale else None,
+    svg = fsw_sign_svg(fsw_sign, lod=_fsw_sign_lod(fsw_sign, scale))
+    return svg_to_png(
+        svg,
+        scale.get("width") if scale else None,
+        scale.get("height") if scale else None,
+        encoding,
     )
-    if not isinstance(png, bytes):
-        raise ValueError("Failed to convert SVG to PNG")
-    return png
 
 
-def fsw_sign_png_data_url(fsw_sign: str, scale: Optional[ScaleObject] = None) -> str:
+@counted_render("sign", "data_url")
+def fsw_sign_png_data_url(
+    fsw_sign: str,
+    scale: Optional[ScaleObject] = None,
+    encoding: Optional[PngOptions] = None,
+) -> str:
     """
     Creates a data url PNG image from an FSW sign with an optional style string.
 
     Args:
         fsw_sign: an FSW sign with optional style string
         scale: options for scaling to specific width or height
+        encoding: pixel mode and compression of the png
 
     Returns:
         sign png data url
@@ -475,12 +696,209 @@ def fsw_sign_png_data_url(fsw_sign: str, scale: Optional[ScaleObject] = None) ->
         >>> fsw_sign_png_data_url('M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475-C').startswith('data:image/png;base64,')
         True
     """
-    png = fsw_sign_png(fsw_sign, scale)
-    return "data:image/png;base64," + base64.b64encode(png).decode("utf-8")
+    png = fsw_sign_png(fsw_sign, scale, encoding)
+    return png_data_url(png)
+
+
+@counted_render("sign", "array")
+def fsw_sign_array(
+    fsw_sign: str,
+    scale: Optional[ScaleObject] = None,
+    canvas: Optional[Tuple[int, int]] = None,
+    mask: bool = False,
+    center: bool = True,
+) -> "numpy.ndarray":
+    """
+    Creates an RGBA pixel array from an FSW sign with an optional style string.
+
+    The pixels are read straight from the rasterizer, without encoding and
+    decoding a PNG image.
+
+    Args:
+        fsw_sign: an FSW sign with optional style string
+        scale: options for scaling to specific width or height
+        canvas: fixed output width and height
+        mask: return the alpha channel only
+        center: center the sign on the canvas
+
+    Returns:
+        (height, width, 4) uint8 array, or (height, width) uint8 mask
+
+    Example:
+        >>> fsw_sign_array('M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475-C', canvas=(64, 96), mask=True).shape
+        (96, 64)
+    """
+    svg = fsw_sign_svg(fsw_sign, lod=_fsw_sign_lod(fsw_sign, scale))
+    return svg_to_array(
+        svg,
+        scale.get("width") if scale else None,
+        scale.get("height") if scale else None,
+        canvas,
+        mask,
+        center,
+    )
+
+
+@counted_render("signs", "array")
+def fsw_signs_array(
+    fsw_signs: Sequence[str],
+    canvas: Tuple[int, int],
+    scale: Optional[ScaleObject] = None,
+    mask: bool = False,
+    center: bool = True,
+    out: Optional["numpy.ndarray"] = None,
+) -> "numpy.ndarray":
+    """
+    Creates a batch of pixel arrays from FSW signs on a fixed size canvas.
+
+    Args:
+        fsw_signs: FSW signs with optional style strings
+        canvas: output width and height
+        scale: options for scaling to specific width or height
+        mask: return the alpha channels only
+        center: center the signs on the canvas
+        out: array to write the batch to, shaped like the output
+
+    Returns:
+        (count, height, width, 4) uint8 array, or (count, height, width) uint8 masks
+
+    Example:
+        >>> fsw_signs_array(['AS14c20S27106M518x529S14c20481x471S27106503x489'] * 3, (64, 64)).shape
+        (3, 64, 64, 4)
+    """
+    return svgs_to_array(
+        [
+            fsw_sign_svg(fsw_sign, lod=_fsw_sign_lod(fsw_sign, scale))
+            for fsw_sign in fsw_signs
+        ],
+        canvas,
+        scale.get("width") if scale else None,
+        scale.get("height") if scale else None,
+        mask,
+        center,
+        out,
+    )
+
+
+def _fsw_sign_display_items(
+    scan: SignScan, styling: StyleObject, dx: float, dy: float, zoom: float
+) -> List[DisplayItem]:
+    # Symbols of a sign colored as by _fsw_sign_svg_body, scaled by zoom and
+    # moved by dx and dy
+    spatials = scan.spatials
+    details: Dict[int, List[str]] = {}
+    for sym in styling.get("detailsym", []):
+        index = sym.get("index", 0) - 1
+        if 0 <= index < len(spatials):
+            details[index] = sym.get("detail", [])
+
+    syms_info = get_symbols_info([symbol for symbol, _, _ in spatials])
+
+    detail = styling.get("detail", [])
+
+    items: List[DisplayItem] = []
+    for index, (symbol, x, y) in enumerate(spatials):
+        if not syms_info.get(symbol):
+            continue
+        sym_detail = details.get(index, [])
+        line = detail[0] if detail else ""
+        if sym_detail:
+            line = sym_detail[0]
+        elif styling.get("colorize"):
+            line = fsw_colorize(symbol)
+        fill = detail[1] if len(detail) > 1 else ""
+        if len(sym_detail) > 1:
+            fill = sym_detail[1]
+        items.append(
+            DisplayItem(
+                symbol,
+                dx + x * zoom,
+                dy + y * zoom,
+                line or "black",
+                fill or "white",
+                zoom,
+            )
+        )
+    return items
+
+
+def _fsw_symbol_display_items(
+    fsw_sym: str, dx: float, dy: float, zoom: float
+) -> List[DisplayItem]:
+    # The symbol placed and colored as by fsw_symbol_svg_body
+    parsed = fsw_parse_symbol_cached(fsw_sym)
+    if not parsed.get("symbol"):
+        return []
+    size = get_symbol_size(parsed["symbol"])
+    if not size:
+        return []
+    if coord := parsed.get("coord"):
+        x, y = coord
+    else:
+        x = 500 - ((size[0] + 1) // 2)
+        y = 500 - ((size[1] + 1) // 2)
+
+    styling = style_parse_cached(parsed.get("style", ""))
+    detail = styling.get("detail", [])
+    line = detail[0] if detail else "black"
+    if styling.get("colorize"):
+        line = fsw_colorize(parsed["symbol"])
+    fill = detail[1] if len(detail) > 1 else "white"
+    return [
+        DisplayItem(parsed["symbol"], dx + x * zoom, dy + y * zoom, line, fill, zoom)
+    ]
+
+
+@counted_render("sign", "display")
+def fsw_sign_display_list(fsw_sign: str) -> Optional[DisplayList]:
+    """
+    Creates a display list from an FSW sign with an optional style string.
+
+    The symbols are placed and colored as in `fsw_sign_svg`, for clients
+    that draw the symbol glyphs themselves.
+
+    Args:
+        fsw_sign: an FSW sign with optional style string
+
+    Returns:
+        display list, or None if the sign is not valid
+
+    Example:
+        >>> display = fsw_sign_display_list('AS14c20S27106M518x529S14c20481x471S27106503x489-D_red_')
+        >>> display.box, display.items[0]
+        ((481.0, 471.0, 37.0, 58.0), DisplayItem(symbol='S14c20', x=481.0, y=471.0, line='red', fill='white', zoom=1.0))
+    """
+    scan = fsw_scan_sign_cached(fsw_sign)
+    if not scan:
+        return None
+    styling = style_parse_cached(scan.style)
+    zoom = to_zoom(styling.get("zoom"))
+    return DisplayList(
+        sign_display_box(scan, styling.get("padding", 0), zoom),
+        _fsw_sign_display_items(scan, styling, 0, 0, zoom),
+    )
+
+
+def _fsw_column_item_text(item: ColumnSegment, values: ColumnOptions) -> str:
+    # Text of a column item with the column style merged into its own
+    text = item["text"]
+    dash_index = text.find("-")
+    if dash_index > 0:
+        item_style = text[dash_index:]
+        new_style: StyleObject = {
+            **values["style"],
+            **style_parse_cached(item_style),
+        }
+        return text.replace(item_style, style_compose_cached(new_style) or "")
+    return text + (style_compose_cached(values["style"]) or "")
 
 
 def fsw_column_svg(
-    column: List[ColumnSegment], options: Optional[ColumnOptions] = None
+    column: List[ColumnSegment],
+    options: Optional[ColumnOptions] = None,
+    css: bool = False,
+    compact: bool = False,
+    precision: Optional[int] = None,
 ) -> str:
     """
     Creates an SVG column image for an array of column data.
@@ -492,6 +910,9 @@ def fsw_column_svg(
     Args:
         column: an array of column data
         options: an object of column options
+        css: set the colors of signs with CSS rules, see `fsw_sign_svg`
+        compact: drop optional markup and whitespace, see `minify_svg`
+        precision: with ``compact``, decimals to round coordinates to
 
     Returns:
         svg column
@@ -501,6 +922,20 @@ def fsw_column_svg(
         >>> fsw_column_svg(col, {"height": 250, "width": 150}).startswith('<svg')
         True
     """
+    return _fsw_column_svg(column, options, None, css, compact, precision)
+
+
+@counted_render("column", "svg")
+@timed_function("compose")
+def _fsw_column_svg(
+    column: List[ColumnSegment],
+    options: Optional[ColumnOptions],
+    symbols: Optional[Mapping[str, SymbolInfo]],
+    css: bool = False,
+    compact: bool = False,
+    precision: Optional[int] = None,
+) -> str:
+    # Column image with the symbol information given, or from the store
     blank = '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="1" height="1"></svg>'
     if not isinstance(column, list):
         return blank
@@ -517,35 +952,41 @@ def fsw_column_svg(
 
     sizing = f' width="{values["width"]}" height="{values["height"]}"'
 
-    svg = f'<svg version="1.1" xmlns="http://www.w3.org/2000/svg"{sizing} viewBox="{x1} {y1} {(x2 - x1)} {(y2 - y1)}">\n{background}'
-
-    for item in column:
-        dash_index = item["text"].find("-")
-        if dash_index > 0:
-            item_style = item["text"][dash_index:]
-            new_style: StyleObject = {**values["style"], **style_parse(item_style)}
-            item["text"] = item["text"].replace(
-                item_style, style_compose(new_style) or ""
-            )
-        else:
-            item["text"] += style_compose(values["style"]) or ""
-
-        item["zoom"] = to_zoom(item["zoom"]) * to_zoom(values["style"]["zoom"])
-
-        svg += f'<g transform="translate({item["x"]},{item["y"]}) scale({item["zoom"]}) translate({-item["minX"]},{-item["minY"]}) ">\n'
-        if item["segment"] == "sign":
-            svg += fsw_sign_svg_body(item["text"])
-        else:
-            svg += fsw_symbol_svg_body(item["text"])
-        svg += "\n</g>\n"
-
-    svg += "</svg>"
-
-    return svg
-
-
+    rules: List[str] = []
+    body = ""
+    for index, item in enumerate(column, 1):
+        text = _fsw_column_item_text(item, values)
+        zoom = to_zoom(item["zoom"]) * to_zoom(values["style"]["zoom"])
+
+        group = f' class="item-{index}"' if css else ""
+        body += f'<g{group} transform="translate({item["x"]},{item["y"]}) scale({zoom}) translate({-item["minX"]},{-item["minY"]}) ">\n'
+        if item["segment"] != "sign":
+            body += _fsw_symbol_svg_body(text, symbols)
+        elif (scan := fsw_scan_sign_cached(text)) and scan.spatials:
+            styling = style_parse_cached(scan.style)
+            if css:
+                sign_symbols = [symbol for symbol, _, _ in scan.spatials]
+                rules += sign_css_rules(
+                    styling, sign_symbols, fsw_colorize, f".item-{index} "
+                )
+            body += _fsw_sign_svg_body(text, scan, styling, css, symbols=symbols)
+        body += "\n</g>\n"
+
+    classes = ""
+    if rules:
+        scope, rules = scope_css_rules(rules)
+        classes = f' class="{scope}"'
+
+    svg = f'<svg{classes} version="1.1" xmlns="http://www.w3.org/2000/svg"{sizing} viewBox="{x1} {y1} {(x2 - x1)} {(y2 - y1)}">\n'
+    svg += css_style_block(rules) + background + body + "</svg>"
+    return minify_svg(svg, precision) if compact else svg
+
+
+@counted_render("column", "png")
 def fsw_column_png(
-    column: List[ColumnSegment], options: Optional[ColumnOptions] = None
+    column: List[ColumnSegment],
+    options: Optional[ColumnOptions] = None,
+    encoding: Optional[PngOptions] = None,
 ) -> bytes:
     """
     Creates a binary PNG column image for an array of column data.
@@ -557,6 +998,7 @@ def fsw_column_png(
     Args:
         column: an array of column data
         options: an object of column options
+        encoding: pixel mode and compression of the png
 
     Returns:
         png column bytes
@@ -567,14 +1009,16 @@ def fsw_column_png(
         True
     """
     svg = fsw_column_svg(column, options)
-    png = cairosvg.svg2png(bytestring=svg.encode("utf-8"))
-    if not isinstance(png, bytes):
-        raise ValueError("Failed to convert SVG to PNG")
-    return png
+    return svg_to_png(svg, encoding=encoding)
 
 
+@counted_render("columns", "svg")
 def fsw_columns_svg(
-    fsw_text: str, options: Optional[ColumnOptions] = None
+    fsw_text: str,
+    options: Optional[ColumnOptions] = None,
+    css: bool = False,
+    compact: bool = False,
+    precision: Optional[int] = None,
 ) -> List[str]:
     """
     Creates an array of SVG column images for an FSW text.
@@ -582,6 +1026,9 @@ def fsw_columns_svg(
     Args:
         fsw_text: a text of FSW signs and punctuation
         options: an object of column options
+        css: set the colors of signs with CSS rules, see `fsw_sign_svg`
+        compact: drop optional markup and whitespace, see `minify_svg`
+        precision: with ``compact``, decimals to round coordinates to
 
     Returns:
         array of svg columns
@@ -592,17 +1039,26 @@ def fsw_columns_svg(
         >>> len(fsw_columns_svg(fsw_text, opts))
         1
     """
-    cols = fsw_columns(fsw_text, options)
+    cols = _fsw_layout(fsw_text, options)
     svgs = []
     for i, col in enumerate(cols["columns"]):
         svgs.append(
-            fsw_column_svg(col, {**cols["options"], "width": cols["widths"][i]})
+            fsw_column_svg(
+                col,
+                {**cols["options"], "width": cols["widths"][i]},
+                css,
+                compact,
+                precision,
+            )
         )
     return svgs
 
 
+@counted_render("columns", "png")
 def fsw_columns_png(
-    fsw_text: str, options: Optional[ColumnOptions] = None
+    fsw_text: str,
+    options: Optional[ColumnOptions] = None,
+    encoding: Optional[PngOptions] = None,
 ) -> List[bytes]:
     """
     Creates an array of PNG column images for an FSW text.
@@ -610,6 +1066,7 @@ def fsw_columns_png(
     Args:
         fsw_text: a text of FSW signs and punctuation
         options: an object of column options
+        encoding: pixel mode and compression of the pngs
 
     Returns:
         array of PNG data
@@ -621,15 +1078,14 @@ def fsw_columns_png(
         1
     """
     svgs = fsw_columns_svg(fsw_text, options)
-    pngs = []
-    for svg in svgs:
-        png = cairosvg.svg2png(bytestring=svg.encode("utf-8"))
-        pngs.append(png)
-    return pngs
+    return [svg_to_png(svg, encoding=encoding) for svg in svgs]
 
 
+@counted_render("columns", "data_url")
 def fsw_columns_png_data_url(
-    fsw_text: str, options: Optional[ColumnOptions] = None
+    fsw_text: str,
+    options: Optional[ColumnOptions] = None,
+    encoding: Optional[PngOptions] = None,
 ) -> List[str]:
     """
     Creates an array of PNG data url column images for an FSW text.
@@ -637,6 +1093,7 @@ def fsw_columns_png_data_url(
     Args:
         fsw_text: a text of FSW signs and punctuation
         options: an object of column options
+        encoding: pixel mode and compression of the pngs
 
     Returns:
         array of PNG data urls
@@ -647,26 +1104,183 @@ def fsw_columns_png_data_url(
         >>> all(u.startswith('data:image/png;base64,') for u in fsw_columns_png_data_url(fsw_text, opts))
         True
     """
-    pngs = fsw_columns_png(fsw_text, options)
+    pngs = fsw_columns_png(fsw_text, options, encoding)
+    return [png_data_url(png) for png in pngs]
+
+
+@counted_render("column", "display")
+def fsw_column_display_list(
+    column: List[ColumnSegment], options: Optional[ColumnOptions] = None
+) -> DisplayList:
+    """
+    Creates a display list for an array of column data.
+
+    .. note:: This is an internal helper; `column` and `options` must be generated in tandem
+              by the calling function (`fsw_columns_display_list`) to ensure compatibility.
+              Standalone use may produce incorrect output if values are mismatched.
+
+    Args:
+        column: an array of column data
+        options: an object of column options
+
+    Returns:
+        display list of the column
+
+    Example:
+        >>> col = [{"x": 56, "y": 20, "minX": 481, "minY": 471, "width": 37, "height": 58, "lane": 0, "padding": 0, "segment": "sign", "text": "AS14c20S27106M518x529S14c20481x471S27106503x489", "zoom": 1}]
+        >>> fsw_column_display_list(col, {"height": 250, "width": 150}).items[0]
+        DisplayItem(symbol='S14c20', x=56.0, y=20.0, line='black', fill='white', zoom=1.0)
+    """
+    if not isinstance(column, list):
+        return DisplayList((0, 0, 1, 1), [])
+
+    values = fsw_column_defaults_merge(options)
+    items: List[DisplayItem] = []
+    for item in column:
+        text = _fsw_column_item_text(item, values)
+        zoom = to_zoom(item["zoom"]) * to_zoom(values["style"]["zoom"])
+        dx = item["x"] - zoom * item["minX"]
+        dy = item["y"] - zoom * item["minY"]
+        if item["segment"] != "sign":
+            items += _fsw_symbol_display_items(text, dx, dy, zoom)
+        elif scan := fsw_scan_sign_cached(text):
+            styling = style_parse_cached(scan.style)
+            items += _fsw_sign_display_items(scan, styling, dx, dy, zoom)
+    return DisplayList((0, 0, values["width"], values["height"]), items)
+
+
+@counted_render("columns", "display")
+def fsw_columns_display_list(
+    fsw_text: str, options: Optional[ColumnOptions] = None
+) -> List[DisplayList]:
+    """
+    Creates an array of display lists, one per column, for an FSW text.
+
+    Args:
+        fsw_text: a text of FSW signs and punctuation
+        options: an object of column options
+
+    Returns:
+        array of column display lists
+    """
+    cols = _fsw_layout(fsw_text, options)
     return [
-        "data:image/png;base64," + base64.b64encode(png).decode("utf-8") for png in pngs
+        fsw_column_display_list(col, {**cols["options"], "width": cols["widths"][i]})
+        for i, col in enumerate(cols["columns"])
     ]
 
 
+def fsw_columns_svg_lazy(
+    fsw_text: str, options: Optional[ColumnOptions] = None, prefetch: int = 0
+) -> LazyColumns[str]:
+    """
+    Creates a lazy sequence of SVG column images for an FSW text.
+
+    The text is laid out once. The column count and widths are available
+    immediately and each column is rendered only when it is accessed.
+
+    Args:
+        fsw_text: a text of FSW signs and punctuation
+        options: an object of column options
+        prefetch: number of following columns to render in the background after an access
+
+    Returns:
+        lazy sequence of svg columns
+
+    Example:
+        >>> fsw_text = "AS14c20S27106M518x529S14c20481x471S27106503x489 AS18701S1870aS2e734S20500M518x533S1870a489x515S18701482x490S20500508x496S2e734500x468 S38800464x496"
+        >>> cols = fsw_columns_svg_lazy(fsw_text, {"height": 250, "width": 150})
+        >>> len(cols), cols.widths
+        (1, [150])
+        >>> cols[0].startswith('<svg')
+        True
+    """
+    return LazyColumns(_fsw_layout(fsw_text, options), fsw_column_svg, prefetch)
+
+
+def fsw_columns_png_lazy(
+    fsw_text: str, options: Optional[ColumnOptions] = None, prefetch: int = 0
+) -> LazyColumns[bytes]:
+    """
+    Creates a lazy sequence of PNG column images for an FSW text.
+
+    The text is laid out once. The column count and widths are available
+    immediately and each column is rendered only when it is accessed.
+
+    Args:
+        fsw_text: a text of FSW signs and punctuation
+        options: an object of column options
+        prefetch: number of following columns to render in the background after an access
+
+    Returns:
+        lazy sequence of PNG data
+
+    Example:
+        >>> fsw_text = "AS14c20S27106M518x529S14c20481x471S27106503x489 AS18701S1870aS2e734S20500M518x533S1870a489x515S18701482x490S20500508x496S2e734500x468 S38800464x496"
+        >>> cols = fsw_columns_png_lazy(fsw_text, {"height": 250, "width": 150})
+        >>> len(cols[0]) > 0
+        True
+    """
+    return LazyColumns(_fsw_layout(fsw_text, options), fsw_column_png, prefetch)
+
+
+def fsw_columns_document(
+    fsw_text: str, options: Optional[ColumnOptions] = None
+) -> ColumnDocument:
+    """
+    Creates an editable column document for an FSW text.
+
+    Edits re-run the layout only from the column before the edited sign and
+    keep the rendered images of every column that did not change.
+
+    Args:
+        fsw_text: a text of FSW signs and punctuation
+        options: an object of column options
+
+    Returns:
+        column document
+
+    Example:
+        >>> fsw_text = "AS14c20S27106M518x529S14c20481x471S27106503x489 AS18701S1870aS2e734S20500M518x533S1870a489x515S18701482x490S20500508x496S2e734500x468 S38800464x496"
+        >>> doc = fsw_columns_document(fsw_text, {"height": 250, "width": 150})
+        >>> doc.svg(0).startswith('<svg')
+        True
+        >>> doc.replace(1, 'S38800464x496')
+        [0]
+    """
+    return ColumnDocument(
+        fsw_text,
+        options,
+        _fsw_layout,
+        fsw_parse_text,
+        fsw_column_svg,
+        fsw_column_png,
+    )
+
+
 __all__ = [
     "fsw_symbol_normalize",
     "fsw_symbol_svg_body",
     "fsw_symbol_svg",
     "fsw_symbol_png",
     "fsw_symbol_png_data_url",
+    "fsw_symbol_array",
     "fsw_sign_normalize",
     "fsw_sign_svg_body",
     "fsw_sign_svg",
     "fsw_sign_png",
     "fsw_sign_png_data_url",
+    "fsw_sign_array",
+    "fsw_signs_array",
+    "fsw_sign_display_list",
     "fsw_column_svg",
     "fsw_column_png",
+    "fsw_column_display_list",
     "fsw_columns_svg",
     "fsw_columns_png",
     "fsw_columns_png_data_url",
+    "fsw_columns_display_list",
+    "fsw_columns_svg_lazy",
+    "fsw_columns_png_lazy",
+    "fsw_columns_document",
 ]
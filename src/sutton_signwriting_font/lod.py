@@ -0,0 +1,255 @@
+"""
+Level-of-detail variants of the symbol paths for small images.
+
+The symbol paths in the font are drawn for large sizes, with many curve
+segments that cannot be told apart in a small thumbnail but still have to
+be parsed and filled by the rasterizer. Each level replaces the curves of
+a symbol with a polygon that stays within a tolerance of the outline,
+simplified with the Ramer-Douglas-Peucker algorithm.
+
+Variants are built at first use and kept in the ``symbol_lod`` cache. The
+PNG and array render functions of signs pick a level from the output
+scale with `lod_level`, so that the error stays under a fraction of an
+output pixel.
+"""
+
+import math
+import re
+from typing import List, Optional, Tuple
+
+from .cache import memoize
+from .datatypes import ScaleObject
+from .db import get_symbol_svg
+from .scan import SignScan
+
+LOD_TOLERANCES = (0.4, 0.8, 1.6, 3.2)
+"""Largest distance from the outline of each level, in symbol pixels."""
+
+MAX_ERROR = 0.2
+"""Largest distance from the outline in output pixels when picking a level."""
+
+Point = Tuple[float, float]
+
+_command = re.compile(r"([MmLlCcZz])([^MmLlCcZz]*)")
+_number = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_path_data = re.compile(r'( d=")([^"]*)(")')
+_scale = re.compile(r"scale\(([-+\d.eE]+)[ ,]+([-+\d.eE]+)\)")
+
+
+def lod_level(scale: float) -> Optional[int]:
+    """
+    Picks the coarsest level whose error is not visible at a scale.
+
+    Args:
+        scale: output pixels per symbol pixel
+
+    Returns:
+        level, or None for the full detail paths
+
+    Example:
+        >>> lod_level(0.25)
+        1
+    """
+    level = None
+    for index, tolerance in enumerate(LOD_TOLERANCES):
+        if tolerance * scale <= MAX_ERROR:
+            level = index
+    return level
+
+
+def sign_lod_level(
+    scan: SignScan, scale: Optional[ScaleObject] = None, zoom: float = 1
+) -> Optional[int]:
+    """
+    Picks a level for a sign rendered to a width or height.
+
+    Padding is left out of the size of the sign and the result is not
+    shrunk to a canvas, so the scale is never underestimated.
+
+    Args:
+        scan: scanned sign
+        scale: options for scaling to specific width or height
+        zoom: zoom of the sign when no scale is given
+
+    Returns:
+        level, or None for the full detail paths
+    """
+    if not scan.spatials:
+        return None
+    x1 = min(x for _, x, _ in scan.spatials)
+    y1 = min(y for _, _, y in scan.spatials)
+    width = scan.max[0] - x1 or 20
+    height = scan.max[1] - y1 or 20
+    factors = []
+    if scale and scale.get("width"):
+        factors.append(scale["width"] / width)
+    if scale and scale.get("height"):
+        factors.append(scale["height"] / height)
+    return lod_level(min(factors) if factors else zoom)
+
+
+def _flatten(d: str, tolerance: float) -> List[List[Point]]:
+    # Splits path data into polygons, with the curves split into lines
+    # close enough to the curve.
+    polygons: List[List[Point]] = []
+    current: List[Point] = []
+    x = y = 0.0
+    start = (x, y)
+    for command, arguments in _command.findall(d):
+        numbers = [float(number) for number in _number.findall(arguments)]
+        relative = command.islower()
+        kind = command.upper()
+        if kind == "Z":
+            if current:
+                polygons.append(current)
+            current = []
+            x, y = start
+            continue
+        size = 6 if kind == "C" else 2
+        for i in range(0, len(numbers) - size + 1, size):
+            values = numbers[i : i + size]
+            if relative:
+                values = [value + (y if j % 2 else x) for j, value in enumerate(values)]
+            if kind == "M" and i == 0:
+                if current:
+                    polygons.append(current)
+                x, y = values
+                start = (x, y)
+                current = [start]
+            elif kind == "C":
+                x1, y1, x2, y2, x3, y3 = values
+                # Segments for the tolerance, from the second differences
+                bend = max(
+                    math.hypot(x - 2 * x1 + x2, y - 2 * y1 + y2),
+                    math.hypot(x1 - 2 * x2 + x3, y1 - 2 * y2 + y3),
+                )
+                steps = max(1, min(32, math.ceil(math.sqrt(0.75 * bend / tolerance))))
+                for step in range(1, steps + 1):
+                    t = step / steps
+                    u = 1 - t
+                    current.append(
+                        (
+                            u**3 * x
+                            + 3 * u * u * t * x1
+                            + 3 * u * t * t * x2
+                            + t**3 * x3,
+                            u**3 * y
+                            + 3 * u * u * t * y1
+                            + 3 * u * t * t * y2
+                            + t**3 * y3,
+                        )
+                    )
+                x, y = x3, y3
+            else:
+                x, y = values
+                current.append((x, y))
+    if current:
+        polygons.append(current)
+    return polygons
+
+
+def _simplify(points: List[Point], tolerance: float) -> List[Point]:
+    # Ramer-Douglas-Peucker, without recursion. The distance is measured to
+    # the segment rather than its line, so spikes past its ends are kept.
+    if len(points) < 3:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (ax, ay), (bx, by) = points[first], points[last]
+        dx, dy = bx - ax, by - ay
+        length = dx * dx + dy * dy
+        farthest, distance = 0, 0.0
+        for i in range(first + 1, last):
+            px, py = points[i]
+            t = ((px - ax) * dx + (py - ay) * dy) / length if length else 0.0
+            t = min(max(t, 0.0), 1.0)
+            d = math.hypot(px - ax - t * dx, py - ay - t * dy)
+            if d > distance:
+                farthest, distance = i, d
+        if distance > tolerance:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def simplify_path(d: str, tolerance: float) -> str:
+    """
+    Replaces the curves of path data with a simplified polygon.
+
+    Args:
+        d: path data with M, L, C and Z commands, absolute or relative
+        tolerance: largest distance from the outline, in path units
+
+    Returns:
+        path data with relative lines and integer coordinates
+
+    Example:
+        >>> simplify_path("M0 0 l10 0 10 1 10 0 0 10 -30 0z", 2)
+        'M0 0l30 1 0 10 -30 0z'
+    """
+    parts = []
+    for polygon in _flatten(d, tolerance / 2):
+        points = [(round(x), round(y)) for x, y in _simplify(polygon, tolerance / 2)]
+        x, y = points[0]
+        move = f"M{x} {y}l"
+        lines = []
+        for px, py in points[1:]:
+            if (px, py) != (x, y):
+                lines.append(f"{px - x} {py - y}")
+                x, y = px, py
+        if lines:
+            parts.append(move + " ".join(lines) + "z")
+    return "".join(parts)
+
+
+def simplify_symbol_svg(svg: str, tolerance: float) -> str:
+    """
+    Simplifies the paths of a symbol SVG fragment.
+
+    Args:
+        svg: symbol svg fragment
+        tolerance: largest distance from the outline, in symbol pixels
+
+    Returns:
+        symbol svg fragment
+    """
+    match = _scale.search(svg)
+    units = min(abs(float(match[1])), abs(float(match[2]))) if match else 1.0
+    if not units:
+        return svg
+    return _path_data.sub(
+        lambda path: path[1] + simplify_path(path[2], tolerance / units) + path[3], svg
+    )
+
+
+@memoize("symbol_lod")
+def get_symbol_svg_lod(key: str, level: int) -> Optional[str]:
+    """
+    Returns the SVG fragment of a symbol at a level of detail.
+
+    Args:
+        key: FSW symbol key
+        level: index into `LOD_TOLERANCES`
+
+    Returns:
+        symbol svg fragment, or None if the symbol is not found
+    """
+    found = get_symbol_svg(key)
+    if not found:
+        return None
+    return simplify_symbol_svg(found[0], LOD_TOLERANCES[level])
+
+
+__all__ = [
+    "LOD_TOLERANCES",
+    "MAX_ERROR",
+    "lod_level",
+    "sign_lod_level",
+    "simplify_path",
+    "simplify_symbol_svg",
+    "get_symbol_svg_lod",
+]
@@ -0,0 +1,478 @@
+"""
+Library-wide metrics with Prometheus text exposition.
+
+Counters and histograms are kept in process memory and rendered on demand
+by `metrics_text` in the Prometheus text format, so a service can serve
+them from any HTTP endpoint without extra dependencies. Cache statistics
+are read from the caches when the metrics are rendered.
+"""
+
+import bisect
+import threading
+from contextvars import ContextVar
+from functools import wraps
+from typing import (
+    Callable,
+    Dict,
+    List,
+    ParamSpec,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from .cache import cache_info
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+"""Default histogram buckets in seconds."""
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """
+    A monotonically increasing count, optionally split by labels.
+
+    Args:
+        name: metric name
+        documentation: help text
+        labelnames: names of the labels
+
+    Example:
+        >>> renders = Counter("renders_total", "Renders.", ["kind"])
+        >>> renders.inc(kind="sign")
+        >>> renders.value(kind="sign")
+        1.0
+    """
+
+    type_name = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        Increases the count.
+
+        Args:
+            amount: non-negative amount to add
+            labels: a value for each label name
+        """
+        if amount < 0:
+            raise ValueError("counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """
+        Returns the current count.
+
+        Args:
+            labels: a value for each label name
+
+        Returns:
+            count
+        """
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def clear(self) -> None:
+        """Resets all counts."""
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[str]:
+        """Returns the sample lines in Prometheus text format."""
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram:
+    """
+    A distribution of observed values in cumulative buckets.
+
+    Args:
+        name: metric name
+        documentation: help text
+        labelnames: names of the labels
+        buckets: increasing upper bounds of the buckets
+
+    Example:
+        >>> seconds = Histogram("rasterize_seconds", "Rasterization time.")
+        >>> seconds.observe(0.003)
+        >>> seconds.count()
+        1
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Records one value.
+
+        Args:
+            value: observed value
+            labels: a value for each label name
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        """
+        Returns the number of observations.
+
+        Args:
+            labels: a value for each label name
+
+        Returns:
+            number of observations
+        """
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], [0.0]))
+            return sum(counts)
+
+    def clear(self) -> None:
+        """Removes all observations."""
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[str]:
+        """Returns the sample lines in Prometheus text format."""
+        with self._lock:
+            items = sorted(
+                (key, list(counts), total[0])
+                for key, (counts, total) in self._values.items()
+            )
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, counts, total in items:
+            cumulative = 0
+            bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(names, key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+Metric = Union[Counter, Histogram]
+M = TypeVar("M", Counter, Histogram)
+
+_registry: Dict[str, Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def register_metric(metric: M) -> M:
+    """
+    Adds a metric to the output of `metrics_text`.
+
+    Args:
+        metric: a counter or histogram with a unique name
+
+    Returns:
+        the metric
+    """
+    with _registry_lock:
+        if metric.name in _registry:
+            raise ValueError(f"duplicate metric name: {metric.name}")
+        _registry[metric.name] = metric
+    return metric
+
+
+def get_metric(name: str) -> Metric:
+    """
+    Returns a registered metric.
+
+    Args:
+        name: metric name
+
+    Returns:
+        the metric
+    """
+    return _registry[name]
+
+
+def reset_metrics() -> None:
+    """Resets every registered metric."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        metric.clear()
+
+
+RENDERS = register_metric(
+    Counter(
+        "sutton_font_renders_total",
+        "Render calls by kind and format.",
+        ["kind", "format"],
+    )
+)
+OUTPUT_BYTES = register_metric(
+    Counter(
+        "sutton_font_output_bytes_total",
+        "Bytes of svg, png and data url output.",
+        ["format"],
+    )
+)
+DB_QUERIES = register_metric(
+    Counter(
+        "sutton_font_db_queries_total",
+        "Symbol database queries by query.",
+        ["query"],
+    )
+)
+DB_ROWS = register_metric(
+    Counter(
+        "sutton_font_db_rows_total",
+        "Rows fetched from the symbol database by query.",
+        ["query"],
+    )
+)
+RASTERIZE_SECONDS = register_metric(
+    Histogram(
+        "sutton_font_rasterize_seconds",
+        "Time spent converting svg to png.",
+    )
+)
+COALESCED = register_metric(
+    Counter(
+        "sutton_font_coalesced_total",
+        "Render calls that waited for an identical call in flight.",
+        ["cache"],
+    )
+)
+SCHEDULE_WAIT_SECONDS = register_metric(
+    Histogram(
+        "sutton_font_schedule_wait_seconds",
+        "Time render jobs waited in the scheduler queue by priority.",
+        ["priority"],
+    )
+)
+
+_CACHE_FIELDS = (
+    ("hits", "counter", "Cache lookups that found an entry."),
+    ("misses", "counter", "Cache lookups that did not find an entry."),
+    ("evictions", "counter", "Entries dropped to stay within the size limit."),
+    ("currsize", "gauge", "Entries currently held."),
+    ("maxsize", "gauge", "Maximum number of entries."),
+)
+
+
+def _cache_lines() -> List[str]:
+    stats = cache_info()
+    lines: List[str] = []
+    for field, type_name, documentation in _CACHE_FIELDS:
+        suffix = "_total" if type_name == "counter" else ""
+        name = f"sutton_font_cache_{field}{suffix}"
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {type_name}")
+        for cache, info in sorted(stats.items()):
+            labels = _format_labels(("cache",), (cache,))
+            lines.append(f"{name}{labels} {getattr(info, field)}")
+    return lines
+
+
+def metrics_text() -> str:
+    """
+    Renders all metrics in the Prometheus text exposition format.
+
+    Returns:
+        metrics text, served with content type
+        ``text/plain; version=0.0.4``
+
+    Example:
+        >>> print(metrics_text())
+        # HELP sutton_font_renders_total Render calls by kind and format.
+        # TYPE sutton_font_renders_total counter
+        sutton_font_renders_total{kind="sign",format="svg"} 12
+        ...
+    """
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines: List[str] = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        lines.extend(metric.samples())
+    lines.extend(_cache_lines())
+    return "\n".join(lines) + "\n"
+
+
+_rendering: ContextVar[bool] = ContextVar("sutton_font_rendering", default=False)
+
+
+def _output_size(result: object) -> int:
+    if isinstance(result, (str, bytes)):
+        return len(result)
+    if isinstance(result, list):
+        return sum(_output_size(item) for item in result)
+    return getattr(result, "nbytes", 0)
+
+
+def counted_render(
+    kind: str, format: str
+) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    Decorator that counts the calls and output bytes of a render function.
+
+    Only the outermost render call is counted, so a png render does not
+    also count the svg it rasterizes.
+
+    Args:
+        kind: what is rendered, such as 'sign' or 'columns'
+        format: output format, 'svg', 'png', 'data_url', 'array' or 'display'
+
+    Returns:
+        decorator
+    """
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        @wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if _rendering.get():
+                return func(*args, **kwargs)
+            token = _rendering.set(True)
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                _rendering.reset(token)
+            RENDERS.inc(kind=kind, format=format)
+            OUTPUT_BYTES.inc(_output_size(result), format=format)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def observe_query(query: str, rows: int) -> None:
+    """
+    Counts a symbol database query and the rows it fetched.
+
+    Args:
+        query: query name
+        rows: number of rows fetched
+    """
+    DB_QUERIES.inc(query=query)
+    DB_ROWS.inc(rows, query=query)
+
+
+def observe_rasterize(seconds: float) -> None:
+    """
+    Records the duration of one svg to png conversion.
+
+    Args:
+        seconds: duration in seconds
+    """
+    RASTERIZE_SECONDS.observe(seconds)
+
+
+def observe_coalesced(cache: str) -> None:
+    """
+    Counts a call that shared the result of an identical call in flight.
+
+    Args:
+        cache: cache name
+    """
+    COALESCED.inc(cache=cache)
+
+
+def observe_schedule_wait(priority: str, seconds: float) -> None:
+    """
+    Records how long a render job waited before it started.
+
+    Args:
+        priority: priority class of the job
+        seconds: duration in seconds
+    """
+    SCHEDULE_WAIT_SECONDS.observe(seconds, priority=priority)
+
+
+__all__ = [
+    "DEFAULT_BUCKETS",
+    "Counter",
+    "Histogram",
+    "register_metric",
+    "get_metric",
+    "reset_metrics",
+    "metrics_text",
+    "counted_render",
+    "observe_query",
+    "observe_rasterize",
+    "observe_coalesced",
+    "observe_schedule_wait",
+]
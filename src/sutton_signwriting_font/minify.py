@@ -0,0 +1,134 @@
+"""
+Compact SVG output for inline images.
+
+The SVG images of symbols, signs and columns are written to be readable,
+with indentation, a hidden ``<text>`` element holding the source string and
+a nested ``<svg>`` element positioning each symbol. `minify_svg` rewrites
+them for embedding in HTML pages and JSON responses: the optional
+whitespace and text elements are dropped, each symbol wrapper is merged
+into the transform of its group and the path data is written without
+separators that the SVG grammar does not need.
+
+The result draws the same image. With a precision, coordinates are
+rounded to that many decimals, in the units of their own element.
+"""
+
+import re
+from typing import Match, Optional
+
+_float = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_n = f"({_float})"
+_text = re.compile(r'<text font-size="0">[^<]*</text>')
+_symbol = re.compile(
+    rf'<svg((?: class="[^"]*")?) x="{_n}" y="{_n}">'
+    rf'<g transform="translate\({_n},{_n}\) scale\({_n},{_n}\)">'
+    r"((?:<path [^>]*/>)*)</g></svg>"
+)
+_group = re.compile(
+    rf'<g((?: class="[^"]*")?) transform="translate\({_n},{_n}\) '
+    rf'scale\({_n}\) translate\({_n},{_n}\) ">'
+)
+_position = re.compile(rf' (x|y|width|height)="{_n}"')
+_path_data = re.compile(r' d="([^"]*)"')
+_path_token = re.compile(rf"[A-Za-z]|{_float}")
+_between = re.compile(r">\s+<")
+
+
+def _format(value: float, precision: Optional[int]) -> str:
+    # Fixed point without trailing zeros; the font writes at most 12 decimals
+    text = f"{value:.{12 if precision is None else precision}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def _scale(value: str, precision: Optional[int]) -> str:
+    # Scales multiply font units of up to several thousands, so they keep
+    # significant digits rather than decimals.
+    if precision is None:
+        return value
+    return f"{float(value):.{precision + 3}g}"
+
+
+def minify_path(d: str, precision: Optional[int] = None) -> str:
+    """
+    Writes path data with the fewest separators.
+
+    Args:
+        d: path data
+        precision: decimals to round the coordinates to, if any
+
+    Returns:
+        path data
+
+    Example:
+        >>> minify_path("M980 2602 l0 -498 -75 -74 c-61 -61 -77 -72 -85 -60z")
+        'M980 2602l0-498-75-74c-61-61-77-72-85-60z'
+    """
+    parts = []
+    number = False
+    for token in _path_token.findall(d):
+        if token.isalpha():
+            parts.append(token)
+            number = False
+            continue
+        if precision is not None:
+            token = _format(float(token), precision)
+        if number and not token.startswith("-"):
+            parts.append(" ")
+        parts.append(token)
+        number = True
+    return "".join(parts)
+
+
+def minify_svg(svg: str, precision: Optional[int] = None) -> str:
+    """
+    Rewrites a symbol, sign or column SVG image in its most compact form.
+
+    Args:
+        svg: svg image
+        precision: decimals to round the coordinates to, if any
+
+    Returns:
+        svg image
+
+    Example:
+        >>> minify_svg('<svg width="20.0" height="20.0">\\n  <text font-size="0">S10000</text>\\n</svg>')
+        '<svg width="20" height="20"></svg>'
+    """
+
+    def symbol(match: Match[str]) -> str:
+        classes, x, y, dx, dy, sx, sy, paths = match.groups()
+        translate = (
+            _format(float(x) + float(dx), precision)
+            + ","
+            + _format(float(y) + float(dy), precision)
+        )
+        scale = _scale(sx, precision) + "," + _scale(sy, precision)
+        return (
+            f'<g{classes} transform="translate({translate}) scale({scale})">{paths}</g>'
+        )
+
+    def group(match: Match[str]) -> str:
+        classes, x, y, zoom, dx, dy = match.groups()
+        s = float(zoom)
+        translate = (
+            _format(float(x) + s * float(dx), precision)
+            + ","
+            + _format(float(y) + s * float(dy), precision)
+        )
+        scale = f" scale({_scale(zoom, precision)})" if s != 1 else ""
+        return f'<g{classes} transform="translate({translate}){scale}">'
+
+    svg = _text.sub("", svg)
+    svg = svg.replace(' preserveAspectRatio="xMidYMid meet"', "")
+    svg = _between.sub("><", svg).strip().replace(" />", "/>")
+    svg = _symbol.sub(symbol, svg)
+    svg = _group.sub(group, svg)
+    svg = _position.sub(
+        lambda match: f' {match[1]}="{_format(float(match[2]), precision)}"', svg
+    )
+    return _path_data.sub(lambda match: f' d="{minify_path(match[1], precision)}"', svg)
+
+
+__all__ = ["minify_path", "minify_svg"]
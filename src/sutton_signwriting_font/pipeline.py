@@ -0,0 +1,470 @@
+"""
+Staged render pipeline for bulk rendering.
+
+The render path is split into the stages parse, resolve, layout, compose,
+rasterize and encode, each a function from one `RenderItem` to the next.
+The stages are connected by bounded queues and each stage runs on its own
+worker threads, or on worker processes for CPU bound stages such as
+rasterization, so all stages of a long batch run at the same time.
+
+Each stage builds on the results of the earlier ones: compose draws the
+sign scan of the parse stage with the symbols of the resolve stage, so a
+replaced parse or resolve stage changes the images.
+
+Any stage can be replaced and custom stages, such as watermarking or
+uploading, can be inserted between them. A stage that raises records the
+error on the item, which then skips the remaining stages.
+"""
+
+import queue
+import re
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
+
+from sutton_signwriting_core.convert import swu_to_key
+from sutton_signwriting_core.datatypes import ColumnOptions, ColumnsResult
+from sutton_signwriting_core.fsw import fsw_columns
+from sutton_signwriting_core.swu import swu_columns
+
+from . import fsw, swu
+from .cache import (
+    fsw_parse_symbol_cached,
+    fsw_scan_sign_cached,
+    swu_parse_symbol_cached,
+    swu_scan_sign_cached,
+    thaw,
+)
+from .db import SymbolInfo, get_symbols_info
+from .processes import mp_context
+from .raster import png_data_url, svg_to_png
+from .timing import timed_function
+
+_fsw_layout = timed_function("layout")(fsw_columns)
+_swu_layout = timed_function("layout")(swu_columns)
+
+_fsw_symbol = re.compile(r"S[123][0-9a-f]{2}[0-5][0-9a-f]")
+_swu_symbol = re.compile("[\U00040001-\U0004f480]")
+
+
+class RenderItem(NamedTuple):
+    """
+    A render job and the results of the stages it has passed.
+    """
+
+    text: str
+    """FSW or SWU symbol, sign or text."""
+    kind: str = "sign"
+    """What is rendered: 'symbol', 'sign' or 'columns'."""
+    format: str = "svg"
+    """Output format: 'svg', 'png' or 'data_url'."""
+    options: Optional[Mapping[str, Any]] = None
+    """Scale for symbols and signs, column options for columns."""
+    parsed: Any = None
+    """Parsed symbol or sign scan, set by the parse stage."""
+    symbols: Optional[Dict[str, SymbolInfo]] = None
+    """Symbol information by key, set by the resolve stage."""
+    layout: Optional[ColumnsResult] = None
+    """Column layout, set by the layout stage for columns."""
+    svgs: Tuple[str, ...] = ()
+    """SVG images, one per symbol or sign and one per column."""
+    pngs: Tuple[bytes, ...] = ()
+    """PNG images, set by the rasterize stage."""
+    output: Any = None
+    """Result in the requested format, set by the encode stage."""
+    error: Optional[BaseException] = None
+    """Exception raised by a stage."""
+
+
+StageFunction = Callable[[RenderItem], Optional[RenderItem]]
+"""A stage function; returning None drops the item from the output."""
+
+
+class Stage(NamedTuple):
+    """
+    A pipeline stage.
+    """
+
+    name: str
+    """Stage name."""
+    func: StageFunction
+    """Function applied to each item, picklable for process stages."""
+    workers: int = 1
+    """Number of items processed at the same time."""
+    processes: bool = False
+    """Run the function on worker processes instead of threads."""
+    queue_size: int = 64
+    """Maximum number of items waiting for the stage."""
+
+
+def _is_fsw(item: RenderItem) -> bool:
+    return item.text.isascii()
+
+
+def parse(item: RenderItem) -> RenderItem:
+    """Parses a symbol or scans a sign, using the parse caches."""
+    if item.kind == "symbol":
+        parse_symbol = (
+            fsw_parse_symbol_cached if _is_fsw(item) else swu_parse_symbol_cached
+        )
+        return item._replace(parsed=thaw(parse_symbol(item.text)))
+    if item.kind == "sign":
+        scan_sign = fsw_scan_sign_cached if _is_fsw(item) else swu_scan_sign_cached
+        return item._replace(parsed=scan_sign(item.text))
+    return item
+
+
+def resolve(item: RenderItem) -> RenderItem:
+    """Looks up the symbols of the item in the symbol store or database."""
+    if item.kind == "symbol":
+        symbols = [item.parsed["symbol"]] if item.parsed else []
+    elif item.kind == "sign":
+        symbols = (
+            [symbol for symbol, _, _ in item.parsed.spatials] if item.parsed else []
+        )
+    else:
+        pattern = _fsw_symbol if _is_fsw(item) else _swu_symbol
+        symbols = pattern.findall(item.text)
+    keys = symbols if _is_fsw(item) else [swu_to_key(symbol) for symbol in symbols]
+    return item._replace(symbols=get_symbols_info(list(dict.fromkeys(keys))))
+
+
+def layout(item: RenderItem) -> RenderItem:
+    """Lays out a text as columns."""
+    if item.kind != "columns":
+        return item
+    columns = _fsw_layout if _is_fsw(item) else _swu_layout
+    options = cast(Optional[ColumnOptions], item.options)
+    return item._replace(layout=columns(item.text, options))
+
+
+def compose(item: RenderItem) -> RenderItem:
+    """
+    Composes the SVG images of the item from the sign scan of the parse
+    stage, the symbols of the resolve stage and the column layout.
+    """
+    module, prefix = (fsw, "fsw") if _is_fsw(item) else (swu, "swu")
+    if item.kind == "sign":
+        sign_svg = getattr(module, f"_{prefix}_sign_svg")
+        return item._replace(svgs=(sign_svg(item.text, item.parsed, item.symbols),))
+    if item.kind == "symbol":
+        symbol_svg = getattr(module, f"_{prefix}_symbol_svg")
+        return item._replace(svgs=(symbol_svg(item.text, item.symbols),))
+    if item.layout is None:
+        raise ValueError("columns must be laid out before they are composed")
+    column_svg = getattr(module, f"_{prefix}_column_svg")
+    cols = item.layout
+    return item._replace(
+        svgs=tuple(
+            column_svg(
+                column, {**cols["options"], "width": cols["widths"][i]}, item.symbols
+            )
+            for i, column in enumerate(cols["columns"])
+        )
+    )
+
+
+def rasterize(item: RenderItem) -> RenderItem:
+    """Converts the SVG images to PNG, scaled for symbols and signs."""
+    if item.format == "svg":
+        return item
+    width = height = None
+    if item.kind != "columns" and item.options:
+        width = item.options.get("width")
+        height = item.options.get("height")
+    return item._replace(
+        pngs=tuple(svg_to_png(svg, width, height) for svg in item.svgs)
+    )
+
+
+def encode(item: RenderItem) -> RenderItem:
+    """Sets the output in the requested format."""
+    if item.format == "svg":
+        images: Sequence[Any] = item.svgs
+    elif item.format == "png":
+        images = item.pngs
+    else:
+        images = [png_data_url(png) for png in item.pngs]
+    if item.kind == "columns":
+        return item._replace(output=list(images))
+    return item._replace(output=images[0] if images else None)
+
+
+def default_stages(
+    workers: int = 1, rasterize_workers: int = 1, processes: bool = False
+) -> List[Stage]:
+    """
+    Returns the stages of the render path.
+
+    Args:
+        workers: threads of each stage other than rasterize
+        rasterize_workers: workers of the rasterize stage
+        processes: rasterize on worker processes
+
+    Returns:
+        list of the parse, resolve, layout, compose, rasterize and encode
+        stages
+    """
+    return [
+        Stage("parse", parse, workers),
+        Stage("resolve", resolve, workers),
+        Stage("layout", layout, workers),
+        Stage("compose", compose, workers),
+        Stage("rasterize", rasterize, rasterize_workers, processes),
+        Stage("encode", encode, workers),
+    ]
+
+
+def render_items(
+    texts: Iterable[str],
+    kind: str = "sign",
+    format: str = "svg",
+    options: Optional[Mapping[str, Any]] = None,
+) -> Iterator[RenderItem]:
+    """
+    Creates render items for symbols, signs or texts.
+
+    Args:
+        texts: FSW or SWU symbols, signs or texts
+        kind: 'symbol', 'sign' or 'columns'
+        format: 'svg', 'png' or 'data_url'
+        options: scale for symbols and signs, column options for columns
+
+    Returns:
+        iterator of render items
+    """
+    if kind not in ("symbol", "sign", "columns"):
+        raise ValueError(f"unknown kind: {kind}")
+    if format not in ("svg", "png", "data_url"):
+        raise ValueError(f"unknown format: {format}")
+    for text in texts:
+        yield RenderItem(text, kind, format, options)
+
+
+_DONE = object()
+_POLL = 0.1
+
+
+class _Stopped(Exception):
+    pass
+
+
+class RenderPipeline:
+    """
+    Runs render items through stages connected by bounded queues.
+
+    Args:
+        stages: the stages in order, defaults to `default_stages`
+
+    Example:
+        >>> pipeline = RenderPipeline(default_stages(rasterize_workers=4, processes=True))
+        >>> pipeline.insert_after("compose", Stage("watermark", add_watermark))
+        >>> for item in pipeline.run(render_items(fsw_signs, format="png")):
+        ...     save(item.output)
+    """
+
+    def __init__(self, stages: Optional[Sequence[Stage]] = None) -> None:
+        self.stages: List[Stage] = list(default_stages() if stages is None else stages)
+
+    def _index(self, name: str) -> int:
+        for index, stage in enumerate(self.stages):
+            if stage.name == name:
+                return index
+        raise KeyError(f"no stage named {name}")
+
+    def replace(self, name: str, stage: Stage) -> None:
+        """
+        Replaces a stage.
+
+        Args:
+            name: name of the stage to replace
+            stage: the new stage
+        """
+        self.stages[self._index(name)] = stage
+
+    def insert_before(self, name: str, stage: Stage) -> None:
+        """
+        Inserts a stage before another.
+
+        Args:
+            name: name of the following stage
+            stage: the new stage
+        """
+        self.stages.insert(self._index(name), stage)
+
+    def insert_after(self, name: str, stage: Stage) -> None:
+        """
+        Inserts a stage after another.
+
+        Args:
+            name: name of the preceding stage
+            stage: the new stage
+        """
+        self.stages.insert(self._index(name) + 1, stage)
+
+    def remove(self, name: str) -> None:
+        """
+        Removes a stage.
+
+        Args:
+            name: name of the stage
+        """
+        del self.stages[self._index(name)]
+
+    def run(
+        self, items: Iterable[RenderItem], ordered: bool = True
+    ) -> Iterator[RenderItem]:
+        """
+        Runs items through the stages.
+
+        Reading the items stops while the first queue is full, so a long
+        input is not read ahead of the pipeline. Closing the returned
+        iterator stops the pipeline.
+
+        Args:
+            items: items to render
+            ordered: yield the items in input order instead of as they finish
+
+        Returns:
+            iterator of the finished items, with the output or the error set
+        """
+        stages = list(self.stages)
+        queues: List["queue.Queue[Any]"] = [
+            queue.Queue(stage.queue_size) for stage in stages
+        ]
+        queues.append(queue.Queue(stages[-1].queue_size if stages else 64))
+        stop = threading.Event()
+        failure: List[BaseException] = []
+        executors: Dict[int, Executor] = {
+            index: ProcessPoolExecutor(max(1, stage.workers), mp_context)
+            for index, stage in enumerate(stages)
+            if stage.processes
+        }
+
+        def put(target: "queue.Queue[Any]", value: Any) -> None:
+            while not stop.is_set():
+                try:
+                    target.put(value, timeout=_POLL)
+                    return
+                except queue.Full:
+                    pass
+            raise _Stopped
+
+        def get(source: "queue.Queue[Any]") -> Any:
+            while not stop.is_set():
+                try:
+                    return source.get(timeout=_POLL)
+                except queue.Empty:
+                    pass
+            raise _Stopped
+
+        def feed() -> None:
+            try:
+                for sequence, item in enumerate(items):
+                    put(queues[0], (sequence, item))
+            except _Stopped:
+                return
+            except BaseException as error:
+                failure.append(error)
+            try:
+                put(queues[0], _DONE)
+            except _Stopped:
+                pass
+
+        remaining = [max(1, stage.workers) for stage in stages]
+        lock = threading.Lock()
+
+        def work(index: int) -> None:
+            stage = stages[index]
+            source, target = queues[index], queues[index + 1]
+            executor = executors.get(index)
+            try:
+                while True:
+                    entry = get(source)
+                    if entry is _DONE:
+                        # Let the other workers of the stage see the end.
+                        put(source, _DONE)
+                        with lock:
+                            remaining[index] -= 1
+                            last = remaining[index] == 0
+                        if last:
+                            put(target, _DONE)
+                        return
+                    sequence, item = entry
+                    if item is not None and item.error is None:
+                        try:
+                            if executor is not None:
+                                item = executor.submit(stage.func, item).result()
+                            else:
+                                item = stage.func(item)
+                        except Exception as error:
+                            item = item._replace(error=error)
+                    put(target, (sequence, item))
+            except _Stopped:
+                return
+
+        # The feeder may be blocked reading the items, so it is not joined.
+        threading.Thread(target=feed, name="pipeline-feed", daemon=True).start()
+        threads = [
+            threading.Thread(target=work, args=(index,), name=f"pipeline-{stage.name}")
+            for index, stage in enumerate(stages)
+            for _ in range(remaining[index])
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            waiting: Dict[int, Optional[RenderItem]] = {}
+            expected = 0
+            while True:
+                entry = get(queues[-1])
+                if entry is _DONE:
+                    break
+                sequence, item = entry
+                if not ordered:
+                    if item is not None:
+                        yield item
+                    continue
+                waiting[sequence] = item
+                while expected in waiting:
+                    ready = waiting.pop(expected)
+                    expected += 1
+                    if ready is not None:
+                        yield ready
+            if failure:
+                raise failure[0]
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            for executor in executors.values():
+                executor.shutdown(cancel_futures=True)
+
+
+__all__ = [
+    "RenderItem",
+    "Stage",
+    "StageFunction",
+    "parse",
+    "resolve",
+    "layout",
+    "compose",
+    "rasterize",
+    "encode",
+    "default_stages",
+    "render_items",
+    "RenderPipeline",
+]
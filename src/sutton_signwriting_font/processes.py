@@ -0,0 +1,21 @@
+"""
+Start method of the worker processes of the package.
+
+The render pipeline, the render server and the dataset builder start their
+worker processes from programs that already run threads: stage workers, the
+event loop and its executor threads. A forked child inherits the locks held
+by those threads at the time of the fork, which are never released in the
+child. Worker processes are therefore started with the forkserver method
+where the platform has it, and by spawning a fresh interpreter otherwise.
+"""
+
+import multiprocessing
+from multiprocessing.context import BaseContext
+
+mp_context: BaseContext = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+"""Context for the process pools of the package."""
+
+
+__all__ = ["mp_context"]
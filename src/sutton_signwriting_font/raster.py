@@ -0,0 +1,525 @@
+"""
+Rasterization and encoding shared by the PNG render functions.
+
+cairosvg is imported on the first PNG render, so processes that only
+produce SVG never load it. It is installed with the ``png`` extra.
+
+The array renders read the pixels straight from the cairo surface,
+without encoding a PNG. They also need NumPy, which is imported on the
+first array render. PNG renders with encoding options also read the
+surface and encode the PNG with `encode_png`, which only needs the
+standard library and converts the pixels with NumPy when it is installed.
+"""
+
+import base64
+import re
+import struct
+import sys
+import time
+import zlib
+from array import array
+from operator import and_
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .datatypes import PngOptions
+from .metrics import observe_rasterize
+from .timing import timed
+
+if TYPE_CHECKING:
+    import numpy
+
+_svg2png: Optional[Callable[..., Any]] = None
+_surface: Optional[Tuple[Any, Any]] = None
+_numpy: Any = None
+_numpy_missing = False
+
+
+def load_rasterizer() -> Callable[..., Any]:
+    """
+    Imports cairosvg if it is not imported yet.
+
+    Returns:
+        the cairosvg svg2png function
+    """
+    global _svg2png
+    if _svg2png is None:
+        try:
+            from cairosvg import svg2png
+        except ImportError as error:
+            raise ImportError(
+                "PNG output requires cairosvg: "
+                "pip install 'sutton-signwriting-font[png]'"
+            ) from error
+        _svg2png = svg2png
+    return _svg2png
+
+
+def svg_to_png(
+    svg: str,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    encoding: Optional[PngOptions] = None,
+) -> bytes:
+    """
+    Rasterizes an SVG image as PNG.
+
+    Without encoding options, the PNG is encoded by cairo as full color
+    RGBA at the default compression.
+
+    Args:
+        svg: svg image
+        width: output width in pixels
+        height: output height in pixels
+        encoding: pixel mode and compression of the png
+
+    Returns:
+        png bytes
+    """
+    if encoding:
+        surface = _render_surface(svg, width, height)
+        with timed("encode"):
+            return encode_png(*_surface_rgba(surface), encoding)
+    svg2png = load_rasterizer()
+    start = time.perf_counter()
+    with timed("rasterize"):
+        png = svg2png(
+            bytestring=svg.encode("utf-8"),
+            output_width=width,
+            output_height=height,
+        )
+    observe_rasterize(time.perf_counter() - start)
+    if not isinstance(png, bytes):
+        raise ValueError("Failed to convert SVG to PNG")
+    return png
+
+
+def load_surface() -> Tuple[Any, Any]:
+    """
+    Imports the cairosvg surface classes if they are not imported yet.
+
+    Returns:
+        the cairosvg Tree and PNGSurface classes
+    """
+    global _surface
+    if _surface is None:
+        try:
+            from cairosvg.parser import Tree
+            from cairosvg.surface import PNGSurface
+        except ImportError as error:
+            raise ImportError(
+                "PNG output requires cairosvg: "
+                "pip install 'sutton-signwriting-font[png]'"
+            ) from error
+        _surface = (Tree, PNGSurface)
+    return _surface
+
+
+def _load_numpy() -> Any:
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError as error:
+            raise ImportError(
+                "Array output requires numpy: "
+                "pip install 'sutton-signwriting-font[array]'"
+            ) from error
+        _numpy = numpy
+    return _numpy
+
+
+def _optional_numpy() -> Any:
+    # NumPy if it is installed, without retrying a failed import
+    global _numpy_missing
+    if _numpy is None and not _numpy_missing:
+        try:
+            _load_numpy()
+        except ImportError:
+            _numpy_missing = True
+    return _numpy
+
+
+def _render_surface(svg: str, width: Optional[int], height: Optional[int]) -> Any:
+    Tree, PNGSurface = load_surface()
+    start = time.perf_counter()
+    with timed("rasterize"):
+        tree = Tree(bytestring=svg.encode("utf-8"))
+        surface = PNGSurface(
+            tree, None, 96, output_width=width, output_height=height
+        ).cairo
+        surface.flush()
+    observe_rasterize(time.perf_counter() - start)
+    return surface
+
+
+def _rasterize(svg: str, width: Optional[int], height: Optional[int]) -> Any:
+    surface = _render_surface(svg, width, height)
+    return _numpy.ndarray(
+        (surface.get_height(), surface.get_width(), 4),
+        _numpy.uint8,
+        surface.get_data(),
+        strides=(surface.get_stride(), 4, 1),
+    )
+
+
+# cairo stores premultiplied ARGB in native byte order
+_RGBA = [2, 1, 0, 3] if sys.byteorder == "little" else [1, 2, 3, 0]
+_ALPHA = _RGBA[3]
+
+
+def _to_rgba(pixels: Any, out: Any) -> None:
+    np = _numpy
+    out[...] = pixels[..., _RGBA]
+    alpha = out[..., 3:].astype(np.uint16)
+    partial = (alpha > 0) & (alpha < 255)
+    if partial.any():
+        rgb = out[..., :3].astype(np.uint16) * 255 + alpha // 2
+        np.floor_divide(rgb, alpha, out=rgb, where=partial)
+        np.copyto(out[..., :3], np.minimum(rgb, 255), where=partial)
+
+
+def svg_to_array(
+    svg: str,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    canvas: Optional[Tuple[int, int]] = None,
+    mask: bool = False,
+    center: bool = True,
+    out: Optional["numpy.ndarray"] = None,
+) -> "numpy.ndarray":
+    """
+    Rasterizes an SVG image as a NumPy array, without encoding a PNG.
+
+    With a canvas, the image is placed on a transparent canvas of that size,
+    centered or in the top left corner. An image larger than the canvas is
+    scaled down to fit.
+
+    Args:
+        svg: svg image
+        width: image width in pixels
+        height: image height in pixels
+        canvas: output width and height in pixels
+        mask: return the alpha channel only
+        center: center the image on the canvas
+        out: array to write the output to, shaped like the output
+
+    Returns:
+        (height, width, 4) uint8 RGBA array, or (height, width) uint8 mask
+    """
+    _load_numpy()
+    pixels = _rasterize(svg, width, height)
+    rows, cols = pixels.shape[:2]
+    if canvas is None:
+        canvas = (cols, rows)
+    elif cols > canvas[0] or rows > canvas[1]:
+        fit = min(canvas[0] / cols, canvas[1] / rows)
+        pixels = _rasterize(
+            svg,
+            min(canvas[0], max(1, round(cols * fit))),
+            min(canvas[1], max(1, round(rows * fit))),
+        )
+        rows, cols = pixels.shape[:2]
+
+    shape = (canvas[1], canvas[0]) + (() if mask else (4,))
+    if out is None:
+        out = _numpy.zeros(shape, _numpy.uint8)
+    elif out.shape != shape:
+        raise ValueError(f"Output array shape {out.shape} is not {shape}")
+    else:
+        out[...] = 0
+    top = (canvas[1] - rows) // 2 if center else 0
+    left = (canvas[0] - cols) // 2 if center else 0
+    target = out[top : top + rows, left : left + cols]
+    if mask:
+        target[...] = pixels[..., _ALPHA]
+    else:
+        _to_rgba(pixels, target)
+    return out
+
+
+def svgs_to_array(
+    svgs: Sequence[str],
+    canvas: Tuple[int, int],
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    mask: bool = False,
+    center: bool = True,
+    out: Optional["numpy.ndarray"] = None,
+) -> "numpy.ndarray":
+    """
+    Rasterizes SVG images as a batch of NumPy arrays on a fixed size canvas.
+
+    Args:
+        svgs: svg images
+        canvas: output width and height in pixels
+        width: image width in pixels
+        height: image height in pixels
+        mask: return the alpha channels only
+        center: center the images on the canvas
+        out: array to write the batch to, shaped like the output
+
+    Returns:
+        (count, height, width, 4) uint8 RGBA array, or (count, height, width)
+        uint8 masks
+    """
+    _load_numpy()
+    shape = (len(svgs), canvas[1], canvas[0]) + (() if mask else (4,))
+    if out is None:
+        out = _numpy.empty(shape, _numpy.uint8)
+    elif out.shape != shape:
+        raise ValueError(f"Output array shape {out.shape} is not {shape}")
+    for i, svg in enumerate(svgs):
+        svg_to_array(svg, width, height, canvas, mask, center, out[i])
+    return out
+
+
+PNG_MODES = ("rgba", "gray", "bilevel", "palette")
+"""Pixel modes of `encode_png`."""
+
+_strategies = {
+    "default": zlib.Z_DEFAULT_STRATEGY,
+    "filtered": zlib.Z_FILTERED,
+    "huffman": zlib.Z_HUFFMAN_ONLY,
+    "rle": zlib.Z_RLE,
+    "fixed": zlib.Z_FIXED,
+}
+_filters = {"none": 0, "sub": 1, "up": 2}
+_partial = re.compile(rb"[\x01-\xfe]")
+# Flags for bilevel pixels: dark gray and mostly opaque alpha
+_dark = bytes(int(value < 128) for value in range(256))
+_opaque = bytes(int(value >= 128) for value in range(256))
+_paper_bits = bytes.maketrans(b"\x00\x01", b"10")
+
+
+def _surface_rgba(surface: Any) -> Tuple[bytes, int, int]:
+    width, height, stride = (
+        surface.get_width(),
+        surface.get_height(),
+        surface.get_stride(),
+    )
+    data = bytes(surface.get_data())
+    if stride != width * 4:
+        data = b"".join(
+            data[row * stride : row * stride + width * 4] for row in range(height)
+        )
+    rgba = bytearray(len(data))
+    for channel, offset in enumerate(_RGBA):
+        rgba[channel::4] = data[offset::4]
+    # Only the antialiased edges are partly transparent.
+    alpha = rgba[3::4]
+    for match in _partial.finditer(alpha):
+        value = alpha[match.start()]
+        start = match.start() * 4
+        for i in range(start, start + 3):
+            rgba[i] = min(255, (rgba[i] * 255 + value // 2) // value)
+    return bytes(rgba), width, height
+
+
+def _gray(rgba: bytes) -> bytes:
+    red, green, blue = rgba[0::4], rgba[1::4], rgba[2::4]
+    if red == green == blue:
+        return bytes(red)
+    np = _optional_numpy()
+    if np is not None:
+        pixels = np.frombuffer(rgba, np.uint8).reshape(-1, 4).astype(np.uint32)
+        gray = pixels[:, :3] @ np.array([299, 587, 114], np.uint32) // 1000
+        return bytes(gray.astype(np.uint8).tobytes())
+    return bytes(
+        (r * 299 + g * 587 + b * 114) // 1000 for r, g, b in zip(red, green, blue)
+    )
+
+
+def _bilevel(rgba: bytes, width: int, height: int) -> bytes:
+    # Rows of bits, 0 for ink and 1 for paper, padded with paper to a byte
+    gray, alpha = _gray(rgba), rgba[3::4]
+    np = _optional_numpy()
+    if np is not None:
+        ink = (np.frombuffer(gray, np.uint8) < 128) & (
+            np.frombuffer(alpha, np.uint8) >= 128
+        )
+        return bytes((np.packbits(ink.reshape(height, width), axis=1) ^ 0xFF).tobytes())
+    ink = bytes(map(and_, gray.translate(_dark), alpha.translate(_opaque)))
+    row_bytes = (width + 7) // 8
+    return b"".join(
+        int(
+            ink[start : start + width]
+            .translate(_paper_bits)
+            .ljust(row_bytes * 8, b"1"),
+            2,
+        ).to_bytes(row_bytes, "big")
+        for start in range(0, len(ink), width)
+    )
+
+
+def _palette(rgba: bytes) -> Tuple[List[bytes], bytes]:
+    np = _optional_numpy()
+    # Drops low bits of every channel until at most 256 colors are left.
+    for bits in range(8):
+        mask = 0xFF ^ ((1 << bits) - 1)
+        table = bytes(
+            (value & mask) | ((value & mask) >> (8 - bits)) if bits else value
+            for value in range(256)
+        )
+        quantized = rgba.translate(table)
+        if np is not None:
+            colors, inverse = np.unique(
+                np.frombuffer(quantized, np.uint32), return_inverse=True
+            )
+        else:
+            pixels = array("I", quantized)
+            colors = set(pixels)
+        if len(colors) <= 256:
+            break
+    # Transparent colors first, so the tRNS chunk stays short
+    if np is not None:
+        order = np.argsort(colors.view(np.uint8)[3::4], kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        palette = [bytes(color.tobytes()) for color in colors[order]]
+        return palette, bytes(rank[inverse].astype(np.uint8).tobytes())
+    ordered = sorted(
+        colors, key=lambda color: (color.to_bytes(4, sys.byteorder)[3], color)
+    )
+    lookup: Dict[int, int] = {color: i for i, color in enumerate(ordered)}
+    palette = [color.to_bytes(4, sys.byteorder) for color in ordered]
+    return palette, bytes(map(lookup.__getitem__, pixels))
+
+
+def _subtract(a: bytes, b: bytes) -> bytes:
+    # Bytewise (a - b) & 0xFF in one big integer subtraction: with the top
+    # bit of every byte set in a and cleared in b no byte borrows from the
+    # next, and the top bits are fixed afterwards.
+    high = int.from_bytes(b"\x80" * len(a), "big")
+    x, y = int.from_bytes(a, "big"), int.from_bytes(b, "big")
+    return (((x | high) - (y & ~high)) ^ ((x ^ y ^ high) & high)).to_bytes(
+        len(a), "big"
+    )
+
+
+def _filter_rows(data: bytes, row_size: int, step: int, filter: int) -> bytes:
+    if filter == 1:
+        # Each byte minus the byte of the pixel to its left, none for the first
+        left = bytearray(step) + data[:-step]
+        for start in range(0, len(data), row_size):
+            left[start : start + step] = bytes(step)
+        data = _subtract(data, bytes(left))
+    elif filter == 2:
+        data = _subtract(data, bytes(row_size) + data[:-row_size])
+    kind = bytes([filter])
+    return b"".join(
+        kind + data[start : start + row_size] for start in range(0, len(data), row_size)
+    )
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data))
+    )
+
+
+def encode_png(
+    rgba: bytes, width: int, height: int, options: Optional[PngOptions] = None
+) -> bytes:
+    """
+    Encodes straight RGBA pixels as PNG.
+
+    Gray keeps the alpha channel. Bilevel writes one bit per pixel, black
+    for dark opaque pixels and transparent for the rest. Palette keeps up
+    to 256 colors with their alpha, dropping low bits of the channels of
+    images with more colors. The 'sub' and 'up' row filters can help full
+    color images, but are slower to apply than 'none'.
+
+    The row filters subtract the bytes of the whole image as big integers.
+    The gray, bilevel and palette conversions work on whole images with
+    NumPy when it is installed. Without it, bilevel translates bytes, while
+    the gray conversion of colored pixels and the palette lookup take one
+    Python step per pixel, several times slower than with NumPy.
+
+    Args:
+        rgba: pixels, four bytes per pixel, row by row
+        width: image width in pixels
+        height: image height in pixels
+        options: pixel mode, compression level, strategy and row filter
+
+    Returns:
+        png bytes
+    """
+    options = options or {}
+    mode = options.get("mode", "rgba")
+    if mode not in PNG_MODES:
+        raise ValueError(f"unknown png mode: {mode}")
+    if options.get("strategy", "default") not in _strategies:
+        raise ValueError(f"unknown zlib strategy: {options.get('strategy')}")
+    if options.get("filter", "none") not in _filters:
+        raise ValueError(f"unknown png filter: {options.get('filter')}")
+    if len(rgba) != width * height * 4:
+        raise ValueError("pixel data does not match the image size")
+
+    chunks = []
+    if mode == "rgba":
+        depth, color, step, data = 8, 6, 4, bytes(rgba)
+    elif mode == "gray":
+        gray_alpha = bytearray(width * height * 2)
+        gray_alpha[0::2] = _gray(rgba)
+        gray_alpha[1::2] = rgba[3::4]
+        depth, color, step, data = 8, 4, 2, bytes(gray_alpha)
+    elif mode == "bilevel":
+        data = _bilevel(rgba, width, height)
+        depth, color, step = 1, 0, 1
+        chunks.append(_chunk(b"tRNS", b"\x00\x01"))
+    else:
+        palette, data = _palette(rgba)
+        depth, color, step = 8, 3, 1
+        chunks.append(_chunk(b"PLTE", b"".join(entry[:3] for entry in palette)))
+        alphas = bytes(entry[3] for entry in palette).rstrip(b"\xff")
+        if alphas:
+            chunks.append(_chunk(b"tRNS", alphas))
+
+    row_size = len(data) // height if height else 0
+    filtered = _filter_rows(
+        data, row_size, step, _filters[options.get("filter", "none")]
+    )
+    compressor = zlib.compressobj(
+        options.get("level", zlib.Z_DEFAULT_COMPRESSION),
+        zlib.DEFLATED,
+        zlib.MAX_WBITS,
+        9,
+        _strategies[options.get("strategy", "default")],
+    )
+    compressed = compressor.compress(filtered) + compressor.flush()
+    header = struct.pack(">IIBBBBB", width, height, depth, color, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _chunk(b"IHDR", header)
+        + b"".join(chunks)
+        + _chunk(b"IDAT", compressed)
+        + _chunk(b"IEND", b"")
+    )
+
+
+def png_data_url(png: bytes) -> str:
+    """
+    Encodes PNG bytes as a data url.
+
+    Args:
+        png: png bytes
+
+    Returns:
+        png data url
+    """
+    with timed("encode"):
+        return "data:image/png;base64," + base64.b64encode(png).decode("utf-8")
+
+
+__all__ = [
+    "load_rasterizer",
+    "load_surface",
+    "svg_to_png",
+    "encode_png",
+    "svg_to_array",
+    "svgs_to_array",
+    "png_data_url",
+]
@@ -0,0 +1,417 @@
+"""
+Render output cache with coalescing of identical concurrent calls.
+
+When many requests ask for the same render at once, only the first one
+computes it. The others wait for that computation and share its result,
+or its exception. `SingleFlight` coalesces calls across threads and
+`AsyncSingleFlight` across the tasks of an event loop. `RenderCache` keeps
+the finished renders in an LRU cache and coalesces the misses for both.
+`DiskCache` keeps rendered files across process restarts.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    ParamSpec,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+from .cache import LRUCache, hashable_key, register_cache
+from .metrics import observe_coalesced
+
+P = ParamSpec("P")
+R = TypeVar("R")
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+DEFAULT_RENDER_MAXSIZE = 1024
+"""Default number of renders kept by a render cache."""
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Runs one call per key at a time across threads.
+
+    Args:
+        name: name reported in the coalesced calls metric
+
+    Example:
+        >>> flight = SingleFlight()
+        >>> flight.do('sign', lambda: render(sign))
+    """
+
+    def __init__(self, name: str = "") -> None:
+        self.name = name
+        self._calls: Dict[K, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: K, func: Callable[[], V], timeout: Optional[float] = None) -> V:
+        """
+        Calls a function, or waits for the call already running for the key.
+
+        The first caller runs the function in its own thread and is not
+        subject to the timeout. Exceptions are raised in every caller.
+
+        Args:
+            key: key of identical calls
+            func: function to call
+            timeout: seconds to wait for a call in flight, None waits forever
+
+        Returns:
+            result of the call
+
+        Raises:
+            TimeoutError: if the call in flight does not finish in time
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+        if leader:
+            try:
+                call.value = func()
+            except BaseException as error:
+                call.error = error
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.value  # type: ignore[no-any-return]
+
+        observe_coalesced(self.name)
+        if not call.done.wait(timeout):
+            raise TimeoutError(f"call in flight did not finish in {timeout} seconds")
+        if call.error is not None:
+            raise call.error
+        return call.value  # type: ignore[no-any-return]
+
+    def in_flight(self) -> int:
+        """Returns the number of keys with a call running."""
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight(Generic[K, V]):
+    """
+    Runs one call per key at a time across the tasks of an event loop.
+
+    The call runs in its own task, so a caller that times out or is
+    cancelled does not cancel it for the others.
+
+    Args:
+        name: name reported in the coalesced calls metric
+
+    Example:
+        >>> flight = AsyncSingleFlight()
+        >>> await flight.do('sign', lambda: render_async(sign))
+    """
+
+    def __init__(self, name: str = "") -> None:
+        self.name = name
+        self._tasks: Dict[Tuple[asyncio.AbstractEventLoop, K], "asyncio.Task[V]"] = {}
+
+    async def do(
+        self,
+        key: K,
+        func: Callable[[], Awaitable[V]],
+        timeout: Optional[float] = None,
+    ) -> V:
+        """
+        Awaits a call, or the call already running for the key.
+
+        Args:
+            key: key of identical calls
+            func: function that returns the awaitable to run
+            timeout: seconds to wait for the call, None waits forever
+
+        Returns:
+            result of the call
+
+        Raises:
+            TimeoutError: if the call does not finish in time
+        """
+        loop_key = (asyncio.get_running_loop(), key)
+        task = self._tasks.get(loop_key)
+        if task is None:
+
+            async def run() -> V:
+                return await func()
+
+            task = asyncio.ensure_future(run())
+            self._tasks[loop_key] = task
+            task.add_done_callback(lambda done: self._done(loop_key, done))
+        else:
+            observe_coalesced(self.name)
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    def _done(
+        self, loop_key: Tuple[asyncio.AbstractEventLoop, K], task: "asyncio.Task[V]"
+    ) -> None:
+        if self._tasks.get(loop_key) is task:
+            del self._tasks[loop_key]
+        # Mark the exception as retrieved when every caller timed out.
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        """Returns the number of keys with a call running."""
+        return len(self._tasks)
+
+
+class RenderCache:
+    """
+    LRU cache of render results with coalescing of concurrent misses.
+
+    Results are shared between callers and must not be modified.
+
+    Args:
+        maxsize: maximum number of renders kept, 0 only coalesces
+        timeout: seconds a caller waits for an identical render in flight,
+            None waits forever
+        name: name of the cache for `cache_info` and the metrics
+
+    Example:
+        >>> renders = RenderCache(timeout=5)
+        >>> png = renders.render(fsw_sign_png, 'M525x535S2e748483x510S10011501x466')
+        >>> png = await renders.render_async(fsw_sign_png, 'M525x535S2e748483x510S10011501x466')
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_RENDER_MAXSIZE,
+        timeout: Optional[float] = None,
+        name: str = "render",
+    ) -> None:
+        self.name = name
+        self.timeout = timeout
+        self.cache: LRUCache[Hashable, Any] = LRUCache(maxsize)
+        register_cache(name, self.cache)
+        self._flight: SingleFlight[Hashable, Any] = SingleFlight(name)
+        self._async_flight: AsyncSingleFlight[Hashable, Any] = AsyncSingleFlight(name)
+
+    def _call(self, key: Hashable, func: Callable[[], R]) -> Callable[[], R]:
+        def call() -> R:
+            # A caller that missed the cache while the previous render of
+            # the key was finishing leads a new call after it is stored.
+            if key in self.cache:
+                found, cached = self.cache.lookup(key)
+                if found:
+                    return cast(R, cached)
+            value = func()
+            self.cache.put(key, value)
+            return value
+
+        return call
+
+    def render(self, func: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+        """
+        Returns a cached render, rendering it once if needed.
+
+        Args:
+            func: render function, such as `fsw_sign_png`
+            args: positional arguments of the render function
+            kwargs: keyword arguments of the render function
+
+        Returns:
+            render result
+
+        Raises:
+            TimeoutError: if an identical render in flight does not finish
+                within the timeout
+        """
+        key = (func, hashable_key(args), hashable_key(kwargs))
+        found, value = self.cache.lookup(key)
+        if found:
+            return cast(R, value)
+        call = self._call(key, lambda: func(*args, **kwargs))
+        return cast(R, self._flight.do(key, call, self.timeout))
+
+    async def render_async(
+        self, func: Callable[P, R], *args: P.args, **kwargs: P.kwargs
+    ) -> R:
+        """
+        Returns a cached render, rendering it once in a worker thread if needed.
+
+        Identical calls are coalesced with the other tasks of the event loop
+        and with `render` calls in other threads.
+
+        Args:
+            func: render function, such as `fsw_sign_png`
+            args: positional arguments of the render function
+            kwargs: keyword arguments of the render function
+
+        Returns:
+            render result
+
+        Raises:
+            TimeoutError: if the render does not finish within the timeout
+        """
+        key = (func, hashable_key(args), hashable_key(kwargs))
+        found, value = self.cache.lookup(key)
+        if found:
+            return cast(R, value)
+        call = self._call(key, lambda: func(*args, **kwargs))
+        value = await self._async_flight.do(
+            key,
+            lambda: asyncio.to_thread(self._flight.do, key, call, self.timeout),
+            self.timeout,
+        )
+        return cast(R, value)
+
+    def clear(self) -> None:
+        """Removes all cached renders."""
+        self.cache.clear()
+
+
+class DiskCache:
+    """
+    Rendered files stored in a directory under the hash of their key.
+
+    Writes are atomic, so several processes can share the directory. When
+    the files grow past ``max_bytes``, the least recently used are removed.
+
+    Args:
+        directory: cache directory, created if missing
+        max_bytes: size limit of the cache, None for no limit
+
+    Example:
+        >>> disk = DiskCache('/var/cache/sutton-font', max_bytes=2**30)
+        >>> disk.put('/fsw/sign.png?text=M525x535S2e748483x510', png)
+        >>> disk.get('/fsw/sign.png?text=M525x535S2e748483x510') == png
+        True
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    def path(self, key: str) -> str:
+        """
+        Returns the file path for a key.
+
+        Args:
+            key: cache key
+
+        Returns:
+            file path
+        """
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest[2:])
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Returns the cached data for a key.
+
+        Args:
+            key: cache key
+
+        Returns:
+            data, or None if the key is not cached
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        # The access time may not be updated, so mark the file as used.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Stores data for a key.
+
+        Args:
+            key: cache key
+            data: data to store
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+        if self.max_bytes is not None:
+            with self._lock:
+                if self._size is None:
+                    self._size = sum(size for _, size, _ in self._files())
+                else:
+                    self._size += len(data)
+                if self._size > self.max_bytes:
+                    self._size = self._prune(self.max_bytes * 9 // 10)
+
+    def _files(self) -> List[Tuple[float, int, str]]:
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.startswith(".tmp-"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _prune(self, target: int) -> int:
+        files = sorted(self._files())
+        size = sum(size for _, size, _ in files)
+        for _, file_size, path in files:
+            if size <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+        return size
+
+    def clear(self) -> None:
+        """Removes every cached file."""
+        with self._lock:
+            self._size = self._prune(0)
+
+
+__all__ = [
+    "DEFAULT_RENDER_MAXSIZE",
+    "SingleFlight",
+    "AsyncSingleFlight",
+    "RenderCache",
+    "DiskCache",
+]
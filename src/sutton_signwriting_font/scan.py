@@ -0,0 +1,210 @@
+"""
+Single-pass sign scanners specialized for rendering.
+
+The scanners read the sequence, box, max coordinate, spatials and style
+string of a sign in one pass and return them as a lightweight tuple, so the
+render functions do not have to run the separate parse, info and style
+passes of `sutton_signwriting_core` on the same string.
+"""
+
+import re
+from typing import NamedTuple, Optional, Tuple
+
+from sutton_signwriting_core.regex import (
+    fsw_pattern_coord,
+    fsw_pattern_null_or_symbol,
+    fsw_pattern_symbol,
+    style_pattern_full,
+    swu_pattern_coord,
+    swu_pattern_null_or_symbol,
+    swu_pattern_symbol,
+)
+
+Spatial = Tuple[str, int, int]
+"""A spatial symbol as (symbol, x, y)."""
+
+
+class SignScan(NamedTuple):
+    """
+    The render-relevant fields of a sign string.
+    """
+
+    sequence: Tuple[str, ...]
+    """Symbols of the sorting prefix, empty if there is no prefix."""
+    box: str
+    """Signbox marker or lane."""
+    max: Tuple[int, int]
+    """Preprocessed x, y coordinate."""
+    spatials: Tuple[Spatial, ...]
+    """Symbols with coordinates."""
+    style: str
+    """Style string, empty if there is no style."""
+
+
+_fsw_strict = re.compile(
+    rf"(?:A((?:{fsw_pattern_null_or_symbol})+))?([BLMR])([0-9]{{3}})x([0-9]{{3}})"
+    rf"((?:{fsw_pattern_symbol}{fsw_pattern_coord})*)"
+)
+_swu_strict = re.compile(
+    rf"(?:\U0001D800((?:{swu_pattern_null_or_symbol})+))?([\U0001D801-\U0001D804])"
+    rf"({swu_pattern_coord})((?:{swu_pattern_symbol}{swu_pattern_coord})*)"
+)
+_style = re.compile(style_pattern_full)
+
+_SWU_NUMBER = 0x1D80C - 250
+
+
+def fsw_scan_sign(fsw_sign: str, strict: bool = True) -> Optional[SignScan]:
+    """
+    Scans an FSW sign with optional style string in a single pass.
+
+    In strict mode every symbol key, coordinate and the style string are
+    validated exactly as `fsw_parse_sign` does. Fast mode only checks the
+    structure (markers, lengths and numbers) and takes any text after the
+    signbox that starts with a dash as the style string.
+
+    Args:
+        fsw_sign: an FSW sign with optional style string
+        strict: validate every field of the sign
+
+    Returns:
+        scanned sign, or None if the sign is malformed
+
+    Example:
+        >>> fsw_scan_sign('AS10011S10019M525x535S10011501x466S10019476x475-C')
+        SignScan(sequence=('S10011', 'S10019'), box='M', max=(525, 535), spatials=(('S10011', 501, 466), ('S10019', 476, 475)), style='-C')
+    """
+    if not isinstance(fsw_sign, str):
+        return None
+    if strict:
+        m = _fsw_strict.match(fsw_sign)
+        if not m:
+            return None
+        prefix, box, max_x, max_y, signbox = m.groups()
+        sequence = (
+            tuple(prefix[i : i + 6] for i in range(0, len(prefix), 6)) if prefix else ()
+        )
+        spatials = tuple(
+            (
+                signbox[i : i + 6],
+                int(signbox[i + 6 : i + 9]),
+                int(signbox[i + 10 : i + 13]),
+            )
+            for i in range(0, len(signbox), 13)
+        )
+        s = _style.match(fsw_sign, m.end())
+        style = s.group(0) if s else ""
+        return SignScan(sequence, box, (int(max_x), int(max_y)), spatials, style)
+
+    size = len(fsw_sign)
+    pos = 0
+    seq = []
+    if fsw_sign[:1] == "A":
+        pos = 1
+        while fsw_sign[pos : pos + 1] == "S":
+            seq.append(fsw_sign[pos : pos + 6])
+            pos += 6
+        if not seq:
+            return None
+    box = fsw_sign[pos : pos + 1]
+    if pos + 8 > size or box not in "BLMR" or fsw_sign[pos + 4] != "x":
+        return None
+    # Numbers are checked with isdigit, as int() also takes signs, spaces and
+    # underscores; non-ASCII digits are ruled out for the whole sign below.
+    x = fsw_sign[pos + 1 : pos + 4]
+    y = fsw_sign[pos + 5 : pos + 8]
+    if not (x.isdigit() and y.isdigit()):
+        return None
+    max_ = (int(x), int(y))
+    pos += 8
+    spat = []
+    while pos + 13 <= size and fsw_sign[pos] == "S":
+        x = fsw_sign[pos + 6 : pos + 9]
+        y = fsw_sign[pos + 10 : pos + 13]
+        if fsw_sign[pos + 9] != "x" or not (x.isdigit() and y.isdigit()):
+            return None
+        spat.append((fsw_sign[pos : pos + 6], int(x), int(y)))
+        pos += 13
+    if not fsw_sign[:pos].isascii():
+        return None
+    style = fsw_sign[pos:] if fsw_sign[pos : pos + 1] == "-" else ""
+    return SignScan(tuple(seq), box, max_, tuple(spat), style)
+
+
+def swu_scan_sign(swu_sign: str, strict: bool = True) -> Optional[SignScan]:
+    """
+    Scans an SWU sign with optional style string in a single pass.
+
+    In strict mode every symbol, number and the style string are validated
+    exactly as `swu_parse_sign` does. Fast mode only checks the structure
+    (marker and number ranges) and takes any text after the signbox that
+    starts with a dash as the style string.
+
+    Args:
+        swu_sign: an SWU sign with optional style string
+        strict: validate every field of the sign
+
+    Returns:
+        scanned sign, or None if the sign is malformed
+
+    Example:
+        >>> swu_scan_sign('𝠀񀀒񀀚𝠃𝤟𝤩񀀒𝤇𝣤񀀚𝣮𝣭-C')
+        SignScan(sequence=('񀀒', '񀀚'), box='𝠃', max=(525, 535), spatials=(('񀀒', 501, 466), ('񀀚', 476, 475)), style='-C')
+    """
+    if not isinstance(swu_sign, str):
+        return None
+    if strict:
+        m = _swu_strict.match(swu_sign)
+        if not m:
+            return None
+        prefix, box, max_, signbox = m.groups()
+        spatials = tuple(
+            (
+                signbox[i],
+                ord(signbox[i + 1]) - _SWU_NUMBER,
+                ord(signbox[i + 2]) - _SWU_NUMBER,
+            )
+            for i in range(0, len(signbox), 3)
+        )
+        s = _style.match(swu_sign, m.end())
+        return SignScan(
+            tuple(prefix) if prefix else (),
+            box,
+            (ord(max_[0]) - _SWU_NUMBER, ord(max_[1]) - _SWU_NUMBER),
+            spatials,
+            s.group(0) if s else "",
+        )
+
+    size = len(swu_sign)
+    pos = 0
+    seq = []
+    if swu_sign[:1] == "\U0001D800":
+        pos = 1
+        while pos < size and "\U00040000" <= swu_sign[pos] <= "\U0004F480":
+            seq.append(swu_sign[pos])
+            pos += 1
+        if not seq:
+            return None
+    if pos + 3 > size or not "\U0001D801" <= swu_sign[pos] <= "\U0001D804":
+        return None
+    box = swu_sign[pos]
+    nums = [ord(c) - _SWU_NUMBER for c in swu_sign[pos + 1 : pos + 3]]
+    pos += 3
+    spat = []
+    while pos + 3 <= size and "\U00040001" <= swu_sign[pos] <= "\U0004F480":
+        nums.append(ord(swu_sign[pos + 1]) - _SWU_NUMBER)
+        nums.append(ord(swu_sign[pos + 2]) - _SWU_NUMBER)
+        spat.append((swu_sign[pos], nums[-2], nums[-1]))
+        pos += 3
+    if any(n < 250 or n > 749 for n in nums):
+        return None
+    style = swu_sign[pos:] if swu_sign[pos : pos + 1] == "-" else ""
+    return SignScan(tuple(seq), box, (nums[0], nums[1]), tuple(spat), style)
+
+
+__all__ = [
+    "SignScan",
+    "Spatial",
+    "fsw_scan_sign",
+    "swu_scan_sign",
+]
@@ -0,0 +1,370 @@
+"""
+Priority scheduling of render jobs on a worker pool.
+
+Jobs are queued by priority class, such as interactive page renders and
+bulk exports. Each class has a bounded queue and a limit on the workers it
+may occupy, so bulk jobs only take the capacity left by interactive jobs
+and never all of it. A full queue blocks the submitter, which gives
+producers of bulk work backpressure instead of an unbounded backlog.
+
+Within a class, jobs run in order of a virtual deadline: the arrival time
+plus the estimated cost of the job. Cheap jobs overtake expensive ones that
+arrived shortly before them, but no job waits behind newer ones forever.
+"""
+
+import heapq
+import itertools
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from . import fsw, swu
+from .metrics import observe_schedule_wait
+
+PIXELS_PER_COST = 2500
+"""Output pixels that cost as much to rasterize as one symbol to compose."""
+
+SYMBOL_AREA = 2500
+"""Pixel area assumed per symbol when a png size is not given."""
+
+# Symbols with a coordinate, leaving out the sorting prefix of a sign
+_fsw_spatial = re.compile(r"S[123][0-9a-f]{2}[0-5][0-9a-f][0-9]{3}x[0-9]{3}")
+_swu_spatial = re.compile("[\U00040001-\U0004f480][\U0001d80c-\U0001d9ff]{2}")
+
+
+class PriorityClass(NamedTuple):
+    """
+    Settings of a priority class.
+    """
+
+    name: str
+    """Name used to submit jobs."""
+    limit: Optional[int] = None
+    """Maximum workers for the class, None for all, negative for all but that many."""
+    queue_size: int = 1024
+    """Maximum number of queued jobs before submitting blocks."""
+
+
+class ClassInfo(NamedTuple):
+    """
+    State of a priority class.
+    """
+
+    queued: int
+    """Number of jobs waiting."""
+    running: int
+    """Number of jobs running."""
+    completed: int
+    """Number of jobs finished, with a result or an exception."""
+    limit: int
+    """Maximum number of workers running jobs of the class."""
+    queue_size: int
+    """Maximum number of queued jobs."""
+
+
+DEFAULT_CLASSES = (
+    PriorityClass("interactive", None, 256),
+    PriorityClass("bulk", -1, 4096),
+)
+"""Interactive jobs may use every worker; bulk jobs leave one free."""
+
+
+def estimate_cost(
+    kind: str, format: str, text: str, options: Optional[Mapping[str, Any]] = None
+) -> float:
+    """
+    Estimates the relative cost of a render from its symbols and pixel area.
+
+    One unit is the composition of one symbol. PNG output adds the
+    rasterization of its pixel area, taken from the scale when it gives a
+    size and estimated from the number of symbols otherwise.
+
+    Args:
+        kind: 'symbol', 'sign' or 'columns'
+        format: 'svg' or 'png'
+        text: FSW or SWU symbol, sign or text
+        options: scale for symbols and signs, column options for columns
+
+    Returns:
+        estimated cost
+
+    Example:
+        >>> estimate_cost('sign', 'png', 'M525x535S2e748483x510S10011501x466', {'width': 200})
+        18.0
+    """
+    pattern = _fsw_spatial if text.isascii() else _swu_spatial
+    spatials = max(1, len(pattern.findall(text)))
+    if format != "png":
+        return float(spatials)
+    width = float(options.get("width") or 0) if options else 0.0
+    height = float(options.get("height") or 0) if options else 0.0
+    if kind != "columns" and (width or height):
+        area = (width or height) * (height or width)
+    else:
+        area = float(spatials * SYMBOL_AREA)
+    return spatials + area / PIXELS_PER_COST
+
+
+def _renderer(kind: str, format: str, text: str) -> Callable[..., Any]:
+    if kind not in ("symbol", "sign", "columns") or format not in ("svg", "png"):
+        raise ValueError(f"unknown render job: {kind} {format}")
+    module, prefix = (fsw, "fsw") if text.isascii() else (swu, "swu")
+    return getattr(module, f"{prefix}_{kind}_{format}")  # type: ignore[no-any-return]
+
+
+class _Job(NamedTuple):
+    future: "Future[Any]"
+    func: Callable[..., Any]
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    queued: float
+
+
+class RenderScheduler:
+    """
+    Runs render jobs on worker threads by priority class.
+
+    Args:
+        workers: number of worker threads
+        classes: priority classes from highest to lowest priority
+        cost_seconds: seconds of waiting that one unit of estimated cost
+            is worth when ordering the jobs of a class
+
+    Example:
+        >>> with RenderScheduler(workers=4) as scheduler:
+        ...     page = scheduler.render('sign', 'png', fsw_sign)
+        ...     export = scheduler.render('columns', 'svg', fsw_text, priority='bulk')
+        ...     png = page.result()
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        classes: Sequence[PriorityClass] = DEFAULT_CLASSES,
+        cost_seconds: float = 0.001,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if not classes:
+            raise ValueError("at least one priority class is required")
+        self.workers = workers
+        self.cost_seconds = cost_seconds
+        self._classes = {c.name: c for c in classes}
+        self._order = [c.name for c in classes]
+        self._limits = {
+            c.name: workers if c.limit is None else _limit(c.limit, workers)
+            for c in classes
+        }
+        self._queues: Dict[str, List[Tuple[float, int, _Job]]] = {
+            name: [] for name in self._order
+        }
+        self._running = dict.fromkeys(self._order, 0)
+        self._completed = dict.fromkeys(self._order, 0)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(
+                target=self._work, name=f"render-scheduler-{i}", daemon=True
+            )
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        priority: str = "interactive",
+        cost: float = 1.0,
+        block: bool = True,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> "Future[Any]":
+        """
+        Queues a call of a render function.
+
+        Args:
+            func: render function
+            args: positional arguments of the function
+            priority: name of the priority class
+            cost: estimated cost, see `estimate_cost`
+            block: wait for space when the queue of the class is full
+            timeout: seconds to wait for space, None waits forever
+            kwargs: keyword arguments of the function
+
+        Returns:
+            future of the result
+
+        Raises:
+            queue.Full: if the queue stays full
+            RuntimeError: if the scheduler is shut down
+        """
+        settings = self._classes.get(priority)
+        if settings is None:
+            raise ValueError(f"unknown priority class: {priority}")
+        pending = self._queues[priority]
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._shutdown or len(pending) < settings.queue_size,
+                timeout if block else 0,
+            ):
+                raise queue.Full(f"{priority} queue is full")
+            if self._shutdown:
+                raise RuntimeError("cannot submit after shutdown")
+            now = time.monotonic()
+            future: "Future[Any]" = Future()
+            deadline = now + cost * self.cost_seconds
+            job = _Job(future, func, args, kwargs, now)
+            heapq.heappush(pending, (deadline, next(self._sequence), job))
+            self._cond.notify_all()
+        return future
+
+    def render(
+        self,
+        kind: str,
+        format: str,
+        text: str,
+        options: Optional[Mapping[str, Any]] = None,
+        priority: str = "interactive",
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> "Future[Any]":
+        """
+        Queues a render of an FSW or SWU symbol, sign or text.
+
+        Args:
+            kind: 'symbol', 'sign' or 'columns'
+            format: 'svg' or 'png'
+            text: FSW or SWU symbol, sign or text
+            options: scale for png symbols and signs, column options for
+                columns
+            priority: name of the priority class
+            block: wait for space when the queue of the class is full
+            timeout: seconds to wait for space, None waits forever
+
+        Returns:
+            future of the svg string, png bytes or list of columns
+        """
+        func = _renderer(kind, format, text)
+        args: Tuple[Any, ...] = (text,)
+        if options is not None and (kind == "columns" or format == "png"):
+            args += (options,)
+        return self.submit(
+            func,
+            *args,
+            priority=priority,
+            cost=estimate_cost(kind, format, text, options),
+            block=block,
+            timeout=timeout,
+        )
+
+    def _next(self) -> Optional[Tuple[str, _Job]]:
+        for name in self._order:
+            pending = self._queues[name]
+            if pending and self._running[name] < self._limits[name]:
+                return name, heapq.heappop(pending)[2]
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    picked = self._next()
+                    if picked is not None:
+                        break
+                    if self._shutdown and not any(self._queues.values()):
+                        return
+                    self._cond.wait()
+                name, job = picked
+                self._running[name] += 1
+                # Space in the queue for blocked submitters.
+                self._cond.notify_all()
+            observe_schedule_wait(name, time.monotonic() - job.queued)
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    try:
+                        result = job.func(*job.args, **job.kwargs)
+                    except BaseException as error:
+                        job.future.set_exception(error)
+                    else:
+                        job.future.set_result(result)
+            finally:
+                with self._cond:
+                    self._running[name] -= 1
+                    self._completed[name] += 1
+                    self._cond.notify_all()
+
+    def info(self) -> Dict[str, ClassInfo]:
+        """
+        Returns the state of every priority class.
+
+        Returns:
+            dict mapping class name to its state
+        """
+        with self._cond:
+            return {
+                name: ClassInfo(
+                    len(self._queues[name]),
+                    self._running[name],
+                    self._completed[name],
+                    self._limits[name],
+                    self._classes[name].queue_size,
+                )
+                for name in self._order
+            }
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """
+        Stops accepting jobs and stops the workers once the queues are empty.
+
+        Args:
+            wait: wait for the workers to finish
+            cancel_pending: cancel the queued jobs instead of running them
+        """
+        with self._cond:
+            self._shutdown = True
+            if cancel_pending:
+                for pending in self._queues.values():
+                    for _, _, job in pending:
+                        job.future.cancel()
+                    pending.clear()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self) -> "RenderScheduler":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.shutdown()
+
+
+def _limit(limit: int, workers: int) -> int:
+    return max(1, workers + limit if limit < 0 else min(limit, workers))
+
+
+__all__ = [
+    "PIXELS_PER_COST",
+    "SYMBOL_AREA",
+    "DEFAULT_CLASSES",
+    "PriorityClass",
+    "ClassInfo",
+    "RenderScheduler",
+    "estimate_cost",
+]
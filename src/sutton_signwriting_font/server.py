@@ -0,0 +1,680 @@
+"""
+Local HTTP service rendering symbols, signs and columns.
+
+The service answers GET requests such as ``/fsw/sign.svg?text=...``,
+``/swu/symbol.png?text=...&width=100`` and
+``/fsw/columns.png?text=...&width=150&height=250&column=1``, and POST
+requests to ``/batch`` with a JSON list of renders. Responses carry a strong
+ETag computed from their content, and requests with a matching
+If-None-Match header are answered with 304 Not Modified.
+
+Renders are kept in memory, with identical concurrent requests rendered
+once, and optionally in a disk cache shared across restarts, either a
+directory or a packed archive. Rendering runs
+on a pool of worker threads or processes, so the event loop stays
+responsive. On SIGINT or SIGTERM the server stops accepting connections and
+finishes the requests in flight before exiting.
+
+Only the standard library is used. Run it with::
+
+    python -m sutton_signwriting_font.server --port 8080 --cache-dir /tmp/sutton
+"""
+
+import argparse
+import asyncio
+import base64
+import functools
+import hashlib
+import json
+import re
+import signal
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+from typing import (
+    Any,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from urllib.parse import parse_qs, urlsplit
+
+from . import fsw, swu
+from .archive import EXTENSION, ArchiveCache
+from .metrics import metrics_text
+from .processes import mp_context
+from .raster import svg_to_png
+from .render_cache import DiskCache, RenderCache
+
+MAX_BODY = 1 << 20
+"""Maximum size in bytes of a request body."""
+
+MAX_BATCH = 1000
+"""Maximum number of renders in a batch request."""
+
+_route = re.compile(r"^/(fsw|swu)/(symbol|sign|columns)\.(svg|png)$")
+_content_types = {"svg": "image/svg+xml", "png": "image/png"}
+
+
+class RenderRequest(NamedTuple):
+    """
+    A render requested from the service.
+    """
+
+    script: str
+    """'fsw' or 'swu'."""
+    kind: str
+    """'symbol', 'sign' or 'columns'."""
+    format: str
+    """'svg' or 'png'."""
+    text: str
+    """Symbol, sign or text to render."""
+    width: Optional[int] = None
+    """Width of a png symbol or sign, or of the columns."""
+    height: Optional[int] = None
+    """Height of a png symbol or sign, or of the columns."""
+    column: int = 0
+    """Index of the column to return for columns."""
+    css: bool = False
+    """Set the colors of signs and columns with CSS rules."""
+
+    def key(self) -> str:
+        """
+        Returns a canonical path of the render, used as its cache key.
+
+        Returns:
+            path with the query parameters in a fixed order
+        """
+        return (
+            f"/{self.script}/{self.kind}.{self.format}?text={self.text}"
+            f"&width={self.width}&height={self.height}"
+            f"&column={self.column}&css={int(self.css)}"
+        )
+
+
+class Rendered(NamedTuple):
+    """
+    A finished render.
+    """
+
+    body: bytes
+    """Encoded image, empty if nothing was rendered."""
+    etag: str
+    """Strong entity tag of the body."""
+    columns: int
+    """Number of columns of the text, 1 for symbols and signs."""
+
+
+class Response(NamedTuple):
+    """
+    An HTTP response.
+    """
+
+    status: int
+    """Status code."""
+    headers: Dict[str, str]
+    """Response headers."""
+    body: bytes = b""
+    """Response body."""
+
+
+def make_etag(body: bytes) -> str:
+    """
+    Returns a strong entity tag for a response body.
+
+    Args:
+        body: response body
+
+    Returns:
+        quoted entity tag
+
+    Example:
+        >>> make_etag(b'<svg></svg>')
+        '"b12e0d83ce2357d80b89c57694814d0a"'
+    """
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Checks an If-None-Match header against an entity tag.
+
+    The comparison is weak, as required for If-None-Match.
+
+    Args:
+        if_none_match: header value, a list of entity tags or '*'
+        etag: entity tag of the current response
+
+    Returns:
+        True if the client copy is current
+    """
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def _check_request(request: RenderRequest) -> None:
+    if request.script not in ("fsw", "swu"):
+        raise ValueError(f"unknown script: {request.script}")
+    if request.kind not in ("symbol", "sign", "columns"):
+        raise ValueError(f"unknown kind: {request.kind}")
+    if request.format not in _content_types:
+        raise ValueError(f"unknown format: {request.format}")
+
+
+def _size(request: RenderRequest) -> Dict[str, Any]:
+    size: Dict[str, Any] = {}
+    if request.width:
+        size["width"] = request.width
+    if request.height:
+        size["height"] = request.height
+    return size
+
+
+def _column_rendered(svg: str, png: bool, columns: int) -> Rendered:
+    body = svg_to_png(svg) if png and svg else svg.encode("utf-8")
+    return Rendered(body, make_etag(body), columns)
+
+
+def render_columns(request: RenderRequest) -> List[str]:
+    """
+    Renders the SVG images of every column of a text.
+
+    The column and format of the request are ignored, so one render serves
+    the requests for all the columns of the text.
+
+    Args:
+        request: requested columns render
+
+    Returns:
+        svg of each column
+
+    Raises:
+        ValueError: if the script is unknown
+    """
+    _check_request(request)
+    module = fsw if request.script == "fsw" else swu
+    columns_svg = getattr(module, f"{request.script}_columns_svg")
+    svgs: List[str] = columns_svg(request.text, _size(request), request.css)
+    return svgs
+
+
+def render_request(request: RenderRequest) -> Rendered:
+    """
+    Renders a request.
+
+    Args:
+        request: requested render
+
+    Returns:
+        encoded image with its entity tag and column count
+
+    Raises:
+        ValueError: if the script, kind or format is unknown
+    """
+    _check_request(request)
+    module = fsw if request.script == "fsw" else swu
+    prefix = request.script
+    size = _size(request)
+    if request.kind == "columns":
+        svgs = render_columns(request)
+        svg = svgs[request.column] if 0 <= request.column < len(svgs) else ""
+        return _column_rendered(svg, request.format == "png", len(svgs))
+    if request.format == "png":
+        body = getattr(module, f"{prefix}_{request.kind}_png")(
+            request.text, size or None
+        )
+    elif request.kind == "sign":
+        body = getattr(module, f"{prefix}_sign_svg")(request.text, request.css)
+        body = body.encode("utf-8")
+    else:
+        body = getattr(module, f"{prefix}_symbol_svg")(request.text).encode("utf-8")
+    return Rendered(body, make_etag(body), 1)
+
+
+def _parse_int(value: Any, name: str) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer") from None
+    if number < 0:
+        raise ValueError(f"{name} must not be negative")
+    return number
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def parse_request(
+    script: str, kind: str, format: str, params: Mapping[str, Any]
+) -> RenderRequest:
+    """
+    Creates a render request from query or JSON parameters.
+
+    Args:
+        script: 'fsw' or 'swu'
+        kind: 'symbol', 'sign' or 'columns'
+        format: 'svg' or 'png'
+        params: text, and optionally width, height, column and css
+
+    Returns:
+        render request
+
+    Raises:
+        ValueError: if a parameter is missing or invalid
+    """
+    text = params.get("text")
+    if not isinstance(text, str) or not text:
+        raise ValueError("text is required")
+    return RenderRequest(
+        script,
+        kind,
+        format,
+        text,
+        _parse_int(params.get("width"), "width"),
+        _parse_int(params.get("height"), "height"),
+        _parse_int(params.get("column"), "column") or 0,
+        _parse_bool(params.get("css", False)),
+    )
+
+
+def _response(
+    status: int, body: bytes = b"", content_type: str = "text/plain; charset=utf-8"
+) -> Response:
+    return Response(status, {"Content-Type": content_type}, body)
+
+
+def _error(status: int, message: str) -> Response:
+    return _response(status, message.encode("utf-8") + b"\n")
+
+
+class RenderServer:
+    """
+    Asyncio HTTP server rendering symbols, signs and columns.
+
+    Args:
+        host: interface to listen on
+        port: port to listen on, 0 for any free port
+        workers: number of render workers
+        processes: render in worker processes instead of threads
+        cache_size: number of renders kept in memory
+        cache_dir: directory of the disk cache, or a .sswa file to cache in a
+            packed archive, None for no disk cache
+        cache_bytes: size limit of a disk cache directory, None for no limit
+        max_age: seconds clients may reuse a response without revalidating
+        grace: seconds to wait for requests in flight on shutdown
+
+    Example:
+        >>> server = RenderServer(port=8080, cache_dir='/var/cache/sutton-font')
+        >>> asyncio.run(server.serve_forever())
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        workers: int = 4,
+        processes: bool = False,
+        cache_size: int = 1024,
+        cache_dir: Optional[str] = None,
+        cache_bytes: Optional[int] = None,
+        max_age: int = 86400,
+        grace: float = 10.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.max_age = max_age
+        self.grace = grace
+        self.executor: Executor = (
+            ProcessPoolExecutor(workers, mp_context)
+            if processes
+            else ThreadPoolExecutor(workers)
+        )
+        self.renders = RenderCache(cache_size, name="server")
+        self.disk: Optional[Union[DiskCache, ArchiveCache]] = None
+        if cache_dir and cache_dir.endswith(EXTENSION):
+            self.disk = ArchiveCache(cache_dir)
+        elif cache_dir:
+            self.disk = DiskCache(cache_dir, cache_bytes)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._closing = False
+        self._active = 0
+        self._idle: Optional[asyncio.Condition] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        """Starts listening, setting `port` to the port in use."""
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._idle = asyncio.Condition()
+        self._server = await asyncio.start_server(
+            self._connection, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """
+        Serves requests until SIGINT or SIGTERM, or until `stop` is called.
+        """
+        if self._server is None:
+            await self.start()
+        assert self._stop is not None
+        loop = asyncio.get_running_loop()
+        handled = []
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+                handled.append(signum)
+            except (NotImplementedError, RuntimeError):
+                # Not supported on this platform or outside the main thread
+                pass
+        try:
+            await self._stop.wait()
+        finally:
+            for signum in handled:
+                loop.remove_signal_handler(signum)
+            await self.close()
+
+    def stop(self) -> None:
+        """Asks `serve_forever` to shut down the server, from any thread."""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def close(self) -> None:
+        """
+        Stops accepting connections, waits up to `grace` seconds for the
+        requests in flight and closes the remaining connections.
+        """
+        self._closing = True
+        if self._server is not None:
+            self._server.close()
+        if self._idle is not None:
+            async with self._idle:
+                try:
+                    await asyncio.wait_for(
+                        self._idle.wait_for(lambda: self._active == 0), self.grace
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        for writer in list(self._writers):
+            writer.close()
+        if self._server is not None:
+            await self._server.wait_closed()
+        # Waiting for the workers blocks, so it runs off the event loop.
+        await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(self.executor.shutdown, cancel_futures=True)
+        )
+        if isinstance(self.disk, ArchiveCache):
+            self.disk.close()
+
+    async def _connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._writers.add(writer)
+        try:
+            while not self._closing:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode("latin-1").split()
+                if len(parts) != 3:
+                    writer.write(self._encode(_error(400, "bad request line"), False))
+                    break
+                method, target, version = parts
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = (
+                    connection != "close"
+                    if version == "HTTP/1.1"
+                    else connection == "keep-alive"
+                )
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    writer.write(self._encode(_error(413, "body too large"), False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+                self._active += 1
+                try:
+                    response = await self.handle(method, target, headers, body)
+                finally:
+                    self._active -= 1
+                    assert self._idle is not None
+                    async with self._idle:
+                        self._idle.notify_all()
+                keep_alive = keep_alive and not self._closing
+                writer.write(self._encode(response, keep_alive, method == "HEAD"))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    @staticmethod
+    def _encode(response: Response, keep_alive: bool, head: bool = False) -> bytes:
+        reason = HTTPStatus(response.status).phrase
+        headers = dict(response.headers)
+        headers["Content-Length"] = str(len(response.body))
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+        lines = [f"HTTP/1.1 {response.status} {reason}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        head_bytes = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        if head or response.status == 304:
+            return head_bytes
+        return head_bytes + response.body
+
+    async def handle(
+        self, method: str, target: str, headers: Mapping[str, str], body: bytes = b""
+    ) -> Response:
+        """
+        Answers a request.
+
+        Args:
+            method: request method
+            target: request path and query
+            headers: request headers with lowercase names
+            body: request body
+
+        Returns:
+            response
+        """
+        url = urlsplit(target)
+        if url.path == "/batch":
+            if method != "POST":
+                return _error(405, "use POST")
+            return await self._batch(body)
+        if method not in ("GET", "HEAD"):
+            return _error(405, "use GET")
+        if url.path == "/healthz":
+            return _error(503 if self._closing else 200, "ok")
+        if url.path == "/metrics":
+            text = metrics_text().encode("utf-8")
+            return _response(200, text, "text/plain; version=0.0.4; charset=utf-8")
+        route = _route.match(url.path)
+        if route is None:
+            return _error(404, "not found")
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            script, kind, format = route.groups()
+            request = parse_request(script, kind, format, query)
+            rendered = await self.render(request)
+        except (ValueError, KeyError) as error:
+            return _error(400, str(error))
+        except Exception as error:
+            # Rasterizer and worker pool failures, such as BrokenProcessPool
+            return _error(500, f"render failed: {error!r}")
+        if not rendered.body:
+            return _error(404, "nothing to render")
+        response_headers = {
+            "Content-Type": _content_types[request.format],
+            "ETag": rendered.etag,
+            "Cache-Control": f"public, max-age={self.max_age}",
+        }
+        if request.kind == "columns":
+            response_headers["X-Column-Count"] = str(rendered.columns)
+        if etag_matches(headers.get("if-none-match", ""), rendered.etag):
+            return Response(304, response_headers)
+        return Response(200, response_headers, rendered.body)
+
+    async def render(self, request: RenderRequest) -> Rendered:
+        """
+        Returns a render from the memory cache, the disk cache or a worker.
+
+        Args:
+            request: requested render
+
+        Returns:
+            finished render
+        """
+        return await self.renders.render_async(self._load, request)
+
+    def _load(self, request: RenderRequest) -> Rendered:
+        # Runs in a worker thread of the event loop.
+        key = request.key()
+        if self.disk is not None:
+            data = self.disk.get(key)
+            if data is not None:
+                columns, _, body = data.partition(b"\n")
+                return Rendered(body, make_etag(body), int(columns))
+        if request.kind == "columns":
+            rendered = self._load_column(request)
+        else:
+            rendered = self.executor.submit(render_request, request).result()
+        if self.disk is not None and rendered.body:
+            self.disk.put(key, b"%d\n" % rendered.columns + rendered.body)
+        return rendered
+
+    def _load_column(self, request: RenderRequest) -> Rendered:
+        # The columns of a text are rendered together and cached without the
+        # column index, so the requests for each column share one render.
+        _check_request(request)
+        whole = request._replace(format="svg", column=0)
+        svgs = self.renders.render(self._load_columns, whole)
+        svg = svgs[request.column] if 0 <= request.column < len(svgs) else ""
+        return self.executor.submit(
+            _column_rendered, svg, request.format == "png", len(svgs)
+        ).result()
+
+    def _load_columns(self, request: RenderRequest) -> Tuple[str, ...]:
+        return tuple(self.executor.submit(render_columns, request).result())
+
+    async def _batch(self, body: bytes) -> Response:
+        try:
+            data = json.loads(body or b"{}")
+            items = data["items"]
+            if not isinstance(items, list):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            return _error(400, "expected a JSON object with a list of items")
+        if len(items) > MAX_BATCH:
+            return _error(413, f"at most {MAX_BATCH} items")
+        results = await asyncio.gather(
+            *(self._batch_item(data, item) for item in items)
+        )
+        body = json.dumps({"items": results}).encode("utf-8")
+        return _response(200, body, "application/json")
+
+    async def _batch_item(self, defaults: Mapping[str, Any], item: Any) -> Any:
+        if isinstance(item, str):
+            item = {"text": item}
+        if not isinstance(item, dict):
+            return {"error": "expected a text or an object"}
+        params = {**defaults, **item}
+        params.pop("items", None)
+        text = params.get("text")
+        script = params.get("script") or (
+            "fsw" if isinstance(text, str) and text.isascii() else "swu"
+        )
+        format = params.get("format", "svg")
+        try:
+            request = parse_request(script, params.get("kind", "sign"), format, params)
+            rendered = await self.render(request)
+        except (ValueError, KeyError) as error:
+            return {"error": str(error)}
+        except Exception as error:
+            return {"error": f"render failed: {error!r}"}
+        result: Dict[str, Any] = {"etag": rendered.etag}
+        if request.kind == "columns":
+            result["columns"] = rendered.columns
+        if format == "png":
+            result["png"] = base64.b64encode(rendered.body).decode("ascii")
+        else:
+            result["svg"] = rendered.body.decode("utf-8")
+        return result
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Runs the render service from the command line.
+
+    Args:
+        argv: command line arguments, None for `sys.argv`
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m sutton_signwriting_font.server",
+        description="Serve SignWriting symbols, signs and columns over HTTP.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--processes", action="store_true", help="render in worker processes"
+    )
+    parser.add_argument("--cache-size", type=int, default=1024)
+    parser.add_argument(
+        "--cache-dir", help="directory of the disk cache, or a .sswa archive"
+    )
+    parser.add_argument("--cache-bytes", type=int, help="size limit of the disk cache")
+    parser.add_argument("--max-age", type=int, default=86400)
+    args = parser.parse_args(argv)
+    server = RenderServer(
+        args.host,
+        args.port,
+        args.workers,
+        args.processes,
+        args.cache_size,
+        args.cache_dir,
+        args.cache_bytes,
+        args.max_age,
+    )
+    asyncio.run(server.serve_forever())
+
+
+__all__ = [
+    "MAX_BODY",
+    "MAX_BATCH",
+    "RenderRequest",
+    "Rendered",
+    "Response",
+    "RenderServer",
+    "make_etag",
+    "etag_matches",
+    "parse_request",
+    "render_columns",
+    "render_request",
+    "main",
+]
+
+
+if __name__ == "__main__":
+    main()
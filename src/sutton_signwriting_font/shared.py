@@ -0,0 +1,318 @@
+"""
+Symbol store in shared memory for worker processes on one host.
+
+One process publishes the symbol fragments and sizes into a
+`multiprocessing.shared_memory` segment with `publish_symbol_store`, and the
+other processes attach to it read-only with `attach_symbol_store`. The
+symbol queries of every process are then answered from the single shared
+copy, and attaching takes no database reads.
+
+The segment starts with a header holding the format and package versions,
+followed by a table with one fixed size entry per possible symbol key and
+the UTF-8 svg fragments. A process only attaches to a segment written by
+the same format and package version.
+"""
+
+import atexit
+import os
+import struct
+import sqlite3
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterator, List, Mapping, Optional, Tuple
+
+from . import __version__
+from .db import SymbolInfo, get_db_path, set_symbol_store
+from .metrics import observe_query
+
+SHARED_FORMAT = 1
+"""Version of the segment layout."""
+
+_MAGIC = b"SSWF"
+# magic, format, ready flag, package version, symbol count, blob size
+_HEADER = struct.Struct("<4sHH16sII")
+_READY = struct.Struct("<H")
+_READY_OFFSET = 6
+# offset, length, width, height
+_ENTRY = struct.Struct("<IIHH")
+
+# Symbol keys S100 to S38b, with 6 fills and 16 rotations each
+_BASES = 0x38C - 0x100
+_SLOTS = _BASES * 96
+_TABLE = _HEADER.size
+_BLOB = _TABLE + _SLOTS * _ENTRY.size
+
+
+def default_segment_name() -> str:
+    """Returns the segment name for this format and package version."""
+    return f"sutton_font_{__version__}_v{SHARED_FORMAT}"
+
+
+def _buffer(shm: SharedMemory) -> memoryview:
+    buf = shm.buf
+    if buf is None:
+        raise ValueError(f"shared memory segment is closed: {shm.name}")
+    return buf
+
+
+def _slot(key: str) -> int:
+    if len(key) != 6 or key[0] != "S":
+        return -1
+    try:
+        base = int(key[1:4], 16) - 0x100
+        fill = int(key[4], 16)
+        rotation = int(key[5], 16)
+    except ValueError:
+        return -1
+    if not 0 <= base < _BASES or fill > 5:
+        return -1
+    return base * 96 + fill * 16 + rotation
+
+
+def _key(slot: int) -> str:
+    base, rest = divmod(slot, 96)
+    fill, rotation = divmod(rest, 16)
+    return f"S{base + 0x100:03x}{fill:x}{rotation:x}"
+
+
+class SharedSymbolStore(Mapping[str, SymbolInfo]):
+    """
+    Read-only mapping of symbol keys to symbol information in shared memory.
+
+    Created by `publish_symbol_store` and `attach_symbol_store`.
+    """
+
+    def __init__(self, shm: SharedMemory, owner: bool) -> None:
+        self.shm = shm
+        self.owner = owner
+        self._pid = os.getpid()
+        self._buf: Optional[memoryview] = _buffer(shm).toreadonly()
+        self._count = int(_HEADER.unpack_from(self._buf)[4])
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory segment."""
+        return self.shm.name
+
+    def _entry(self, key: str) -> Optional[Tuple[int, int, int, int]]:
+        if self._buf is None:
+            raise ValueError("shared symbol store is closed")
+        slot = _slot(key) if isinstance(key, str) else -1
+        if slot < 0:
+            return None
+        entry = _ENTRY.unpack_from(self._buf, _TABLE + slot * _ENTRY.size)
+        return entry if entry[1] else None
+
+    def __getitem__(self, key: str) -> SymbolInfo:
+        entry = self._entry(key)
+        if entry is None or self._buf is None:
+            raise KeyError(key)
+        offset, length, width, height = entry
+        start = _BLOB + offset
+        svg = bytes(self._buf[start : start + length]).decode("utf-8")
+        return {"svg": svg, "width": width, "height": height}
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._entry(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for slot in range(_SLOTS):
+            key = _key(slot)
+            if self._entry(key) is not None:
+                yield key
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """
+        Detaches this process from the segment.
+
+        The owner also removes the segment, after which no other process
+        can attach to it.
+        """
+        if self._buf is None:
+            return
+        if _attached is self:
+            detach_symbol_store()
+            return
+        self._buf.release()
+        self._buf = None
+        self.shm.close()
+        # A forked worker inherits the owner's exit handler, but only the
+        # publishing process removes the segment.
+        if self.owner and os.getpid() == self._pid:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __repr__(self) -> str:
+        return f"SharedSymbolStore(name={self.name!r}, symbols={self._count})"
+
+
+_attached: Optional[SharedSymbolStore] = None
+
+
+def _install(store: SharedSymbolStore) -> SharedSymbolStore:
+    global _attached
+    if _attached is not None:
+        _attached.close()
+    _attached = store
+    set_symbol_store(store)
+    atexit.register(store.close)
+    return store
+
+
+def _check_header(shm: SharedMemory, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        magic, fmt, ready, version, _, size = _HEADER.unpack_from(_buffer(shm))
+        # The magic is zero until the publisher has written the header.
+        if magic != bytes(4):
+            if magic != _MAGIC:
+                raise ValueError(f"not a shared symbol store: {shm.name}")
+            if fmt != SHARED_FORMAT:
+                raise ValueError(
+                    f"shared symbol store format {fmt}, expected {SHARED_FORMAT}"
+                )
+            version = version.rstrip(b"\0").decode("ascii")
+            if version != __version__:
+                raise ValueError(
+                    f"shared symbol store version {version}, expected {__version__}"
+                )
+            if ready:
+                if shm.size < _BLOB + size:
+                    raise ValueError(f"shared symbol store is truncated: {shm.name}")
+                return
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"shared symbol store is not ready: {shm.name}")
+        time.sleep(0.01)
+
+
+def attach_symbol_store(
+    name: Optional[str] = None, timeout: float = 10.0
+) -> SharedSymbolStore:
+    """
+    Answers the symbol queries from a published shared symbol store.
+
+    Args:
+        name: segment name, defaults to `default_segment_name`
+        timeout: seconds to wait for a segment that is still being written
+
+    Returns:
+        the attached store
+
+    Raises:
+        FileNotFoundError: if no segment of that name exists
+        ValueError: if the segment has another format or package version
+
+    Example:
+        >>> attach_symbol_store()
+        SharedSymbolStore(name='sutton_font_1.0.0_v1', symbols=37811)
+    """
+    name = name or default_segment_name()
+    if _attached is not None and _attached.name == name:
+        return _attached
+    shm = SharedMemory(name)
+    if os.name == "posix":
+        # Attaching registers the segment with the resource tracker of this
+        # process, which would remove it when this process exits.
+        resource_tracker.unregister(
+            shm._name, "shared_memory"  # type: ignore[attr-defined]
+        )
+    try:
+        _check_header(shm, timeout)
+    except BaseException:
+        shm.close()
+        raise
+    return _install(SharedSymbolStore(shm, owner=False))
+
+
+def publish_symbol_store(name: Optional[str] = None) -> SharedSymbolStore:
+    """
+    Writes every symbol of the database to a new shared memory segment.
+
+    The segment is removed when the publishing process exits or calls
+    `detach_symbol_store`. If another process already published the
+    segment, this process attaches to it instead.
+
+    Args:
+        name: segment name, defaults to `default_segment_name`
+
+    Returns:
+        the published store
+
+    Example:
+        >>> publish_symbol_store()
+        SharedSymbolStore(name='sutton_font_1.0.0_v1', symbols=37811)
+    """
+    name = name or default_segment_name()
+    if _attached is not None and _attached.name == name:
+        return _attached
+    conn = sqlite3.connect(get_db_path())
+    try:
+        rows = conn.execute("SELECT symkey, svg, width, height FROM symbol").fetchall()
+    finally:
+        conn.close()
+    observe_query("symbol_store", len(rows))
+
+    entries: List[Tuple[int, bytes, int, int]] = []
+    for key, svg, width, height in rows:
+        slot = _slot(key)
+        if slot >= 0:
+            entries.append((slot, svg.encode("utf-8"), width, height))
+    size = sum(len(svg) for _, svg, _, _ in entries)
+
+    try:
+        shm = SharedMemory(name, create=True, size=_BLOB + size)
+    except FileExistsError:
+        return attach_symbol_store(name)
+    try:
+        buf = _buffer(shm)
+        buf[:_BLOB] = bytes(_BLOB)
+        version = __version__.encode("ascii")
+        _HEADER.pack_into(buf, 0, _MAGIC, SHARED_FORMAT, 0, version, len(entries), size)
+        offset = 0
+        for slot, svg, width, height in entries:
+            _ENTRY.pack_into(
+                buf, _TABLE + slot * _ENTRY.size, offset, len(svg), width, height
+            )
+            start = _BLOB + offset
+            buf[start : start + len(svg)] = svg
+            offset += len(svg)
+        # The ready flag is set last, so attaching processes wait for the
+        # complete segment.
+        _READY.pack_into(buf, _READY_OFFSET, 1)
+        del buf
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    return _install(SharedSymbolStore(shm, owner=True))
+
+
+def detach_symbol_store() -> None:
+    """
+    Detaches from the shared symbol store and returns to SQLite queries.
+
+    The publishing process also removes the segment.
+    """
+    global _attached
+    store, _attached = _attached, None
+    if store is None:
+        return
+    set_symbol_store(None)
+    atexit.unregister(store.close)
+    store.close()
+
+
+__all__ = [
+    "SHARED_FORMAT",
+    "SharedSymbolStore",
+    "default_segment_name",
+    "publish_symbol_store",
+    "attach_symbol_store",
+    "detach_symbol_store",
+]
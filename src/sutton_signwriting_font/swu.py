@@ -1,35 +1,59 @@
-from typing import Dict, List, Optional
-
-import base64
-
-import cairosvg
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Sequence, Tuple
 
 from sutton_signwriting_core.swu import (
     swu_is_type,
     swu_colorize,
     swu_column_defaults_merge,
     swu_columns,
-    swu_info,
-    swu_parse_sign,
-    swu_parse_symbol,
+    swu_parse_text,
 )
 
 from sutton_signwriting_core.datatypes import (
-    SignSpatial,
     ColumnSegment,
     ColumnOptions,
     StyleObject,
 )
 
 from .datatypes import (
+    PngOptions,
     ScaleObject,
 )
 
-from sutton_signwriting_core.style import style_parse, style_compose
-
 from sutton_signwriting_core.convert import coord_to_swu, swu_to_key, to_zoom
 
-from .db import get_symbol_size, get_symbol_svg, get_symbols_info
+from .db import SymbolInfo, get_symbol_size, get_symbol_svg, get_symbols_info
+
+from .columns import ColumnDocument, LazyColumns
+
+from .scan import SignScan, Spatial
+
+from .cache import (
+    swu_parse_symbol_cached,
+    swu_scan_sign_cached,
+    style_compose_cached,
+    style_parse_cached,
+    memoize,
+)
+
+from .css import css_style_block, scope_css_rules, sign_css_rules
+
+from .display import DisplayItem, DisplayList, sign_display_box
+
+from .lod import get_symbol_svg_lod, sign_lod_level
+
+from .minify import minify_svg
+
+from .raster import png_data_url, svg_to_array, svg_to_png, svgs_to_array
+
+from .metrics import counted_render
+
+from .timing import timed_function
+
+if TYPE_CHECKING:
+    import numpy
+
+# Column layout, timed as a render stage
+_swu_layout = timed_function("layout")(swu_columns)
 
 
 def swu_symbol_normalize(swu_sym: str) -> str:
@@ -46,7 +70,7 @@ def swu_symbol_normalize(swu_sym: str) -> str:
         >>> swu_symbol_normalize('񀀁-C')
         '񀀁𝣿𝣷-C'
     """
-    parsed = swu_parse_symbol(swu_sym)
+    parsed = swu_parse_symbol_cached(swu_sym)
     if not parsed.get("symbol"):
         return ""
 
@@ -77,16 +101,28 @@ def swu_symbol_svg_body(swu_sym: str) -> str:
         >>> swu_symbol_svg_body('񀀁-C')
         '  <text font-size="0">񆇡-C</text>\\n  <svg x="493" y="485">...</svg>'
     """
-    parsed = swu_parse_symbol(swu_sym)
+    return _swu_symbol_svg_body(swu_sym, None)
+
+
+@timed_function("compose")
+def _swu_symbol_svg_body(
+    swu_sym: str, symbols: Optional[Mapping[str, SymbolInfo]]
+) -> str:
+    # Symbol body with the symbol information given, or from the store
+    parsed = swu_parse_symbol_cached(swu_sym)
     if not parsed.get("symbol"):
         return ""
 
-    res = get_symbol_svg(swu_to_key(parsed["symbol"]))
+    if symbols is None:
+        res = get_symbol_svg(swu_to_key(parsed["symbol"]))
+    else:
+        info = symbols.get(swu_to_key(parsed["symbol"]))
+        res = (info["svg"], info["width"], info["height"]) if info else None
     if not res:
         return ""
     sym_svg, sym_width, sym_height = res
 
-    styling = style_parse(parsed.get("style", ""))
+    styling = style_parse_cached(parsed.get("style", ""))
 
     if coord := parsed.get("coord"):
         x1, y1 = coord
@@ -128,12 +164,16 @@ def swu_symbol_svg_body(swu_sym: str) -> str:
     return f'  <text font-size="0">{swu_sym}</text>{background}\n{sym_svg}'
 
 
-def swu_symbol_svg(swu_sym: str) -> str:
+def swu_symbol_svg(
+    swu_sym: str, compact: bool = False, precision: Optional[int] = None
+) -> str:
     """
     Creates an SVG image from an SWU symbol key with an optional style string.
 
     Args:
         swu_sym: an SWU symbol key with optional style string
+        compact: drop optional markup and whitespace, see `minify_svg`
+        precision: with ``compact``, decimals to round coordinates to
 
     Returns:
         symbol svg
@@ -142,18 +182,30 @@ def swu_symbol_svg(swu_sym: str) -> str:
         >>> swu_symbol_svg('񀀁-C')
         '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" ...>...</svg>'
     """
-    parsed = swu_parse_symbol(swu_sym)
+    return _swu_symbol_svg(swu_sym, None, compact, precision)
+
+
+@counted_render("symbol", "svg")
+@timed_function("compose")
+def _swu_symbol_svg(
+    swu_sym: str,
+    symbols: Optional[Mapping[str, SymbolInfo]],
+    compact: bool = False,
+    precision: Optional[int] = None,
+) -> str:
+    # Symbol image with the symbol information given, or from the store
+    parsed = swu_parse_symbol_cached(swu_sym)
     blank = '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="1" height="1"></svg>'
     if not parsed.get("symbol"):
         return blank
 
     if not parsed.get("coord"):
         norm = swu_symbol_normalize(swu_sym)
-        parsed = swu_parse_symbol(norm)
+        parsed = swu_parse_symbol_cached(norm)
         if not parsed.get("symbol"):
             return blank
 
-    styling = style_parse(parsed.get("style", ""))
+    styling = style_parse_cached(parsed.get("style", ""))
 
     coord = parsed["coord"]
     x1, y1 = coord
@@ -178,18 +230,25 @@ def swu_symbol_svg(swu_sym: str) -> str:
         sizing = f' width="{width}" height="{height}"'
     svg = f'<svg{classes}{id_} version="1.1" xmlns="http://www.w3.org/2000/svg"{sizing} viewBox="{x1} {y1} {(x2 - x1)} {(y2 - y1)}">\n'
 
-    body = swu_symbol_svg_body(swu_sym)
+    body = _swu_symbol_svg_body(swu_sym, symbols)
 
-    return svg + body + "\n</svg>"
+    svg += body + "\n</svg>"
+    return minify_svg(svg, precision) if compact else svg
 
 
-def swu_symbol_png(swu_sym: str, scale: Optional[ScaleObject] = None) -> bytes:
+@counted_render("symbol", "png")
+def swu_symbol_png(
+    swu_sym: str,
+    scale: Optional[ScaleObject] = None,
+    encoding: Optional[PngOptions] = None,
+) -> bytes:
     """
     Creates a binary PNG image from an SWU symbol key with an optional style string.
 
     Args:
         swu_sym: an SWU symbol key with optional style string
         scale: options for scaling to specific width or height
+        encoding: pixel mode and compression of the png
 
     Returns:
         symbol png bytes
@@ -200,23 +259,27 @@ def swu_symbol_png(swu_sym: str, scale: Optional[ScaleObject] = None) -> bytes:
         True
     """
     svg = swu_symbol_svg(swu_sym)
-    png = cairosvg.svg2png(
-        bytestring=svg.encode("utf-8"),
-        output_width=scale.get("width") if scale else None,
-        output_height=scale.get("height") if scale else None,
+    return svg_to_png(
+        svg,
+        scale.get("width") if scale else None,
+        scale.get("height") if scale else None,
+        encoding,
     )
-    if not isinstance(png, bytes):
-        raise ValueError("Failed to convert SVG to PNG")
-    return png
 
 
-def swu_symbol_png_data_url(swu_sym: str, scale: Optional[ScaleObject] = None) -> str:
+@counted_render("symbol", "data_url")
+def swu_symbol_png_data_url(
+    swu_sym: str,
+    scale: Optional[ScaleObject] = None,
+    encoding: Optional[PngOptions] = None,
+) -> str:
     """
     Creates a data url PNG image from an SWU symbol key with an optional style string.
 
     Args:
         swu_sym: an SWU symbol key with optional style string
         scale: options for scaling to specific width or height
+        encoding: pixel mode and compression of the png
 
     Returns:
         symbol png data url
@@ -225,8 +288,44 @@ def swu_symbol_png_data_url(swu_sym: str, scale: Optional[ScaleObject] = None) -
         >>> swu_symbol_png_data_url('񀀁-C').startswith('data:image/png;base64,')
         True
     """
-    png = swu_symbol_png(swu_sym, scale)
-    return "data:image/png;base64," + base64.b64encode(png).decode("utf-8")
+    png = swu_symbol_png(swu_sym, scale, encoding)
+    return png_data_url(png)
+
+
+@counted_render("symbol", "array")
+def swu_symbol_array(
+    swu_sym: str,
+    scale: Optional[ScaleObject] = None,
+    canvas: Optional[Tuple[int, int]] = None,
+    mask: bool = False,
+    center: bool = True,
+) -> "numpy.ndarray":
+    """
+    Creates an RGBA pixel array from an SWU symbol key with an optional style string.
+
+    Args:
+        swu_sym: an SWU symbol key with optional style string
+        scale: options for scaling to specific width or height
+        canvas: fixed output width and height
+        mask: return the alpha channel only
+        center: center the symbol on the canvas
+
+    Returns:
+        (height, width, 4) uint8 array, or (height, width) uint8 mask
+
+    Example:
+        >>> swu_symbol_array('񀀁-C').dtype
+        dtype('uint8')
+    """
+    svg = swu_symbol_svg(swu_sym)
+    return svg_to_array(
+        svg,
+        scale.get("width") if scale else None,
+        scale.get("height") if scale else None,
+        canvas,
+        mask,
+        center,
+    )
 
 
 def swu_sign_normalize(swu_sign: str) -> str:
@@ -243,33 +342,32 @@ def swu_sign_normalize(swu_sign: str) -> str:
         >>> swu_sign_normalize('𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭')
         '𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭'
     """
-    parsed = swu_parse_sign(swu_sign)
-    if not parsed.get("spatials"):
+    scan = swu_scan_sign_cached(swu_sign)
+    if not scan or not scan.spatials:
         return ""
 
-    symbols = [swu_to_key(spatial["symbol"]) for spatial in parsed["spatials"]]
-    symbolsizes = get_symbols_info(symbols)
+    symbolsizes = get_symbols_info(
+        [swu_to_key(symbol) for symbol, _, _ in scan.spatials]
+    )
     if not symbolsizes:
         return ""
 
-    def bbox(spatials: List[SignSpatial]) -> Dict[str, int]:
-        x1 = min(s["coord"][0] for s in spatials)
-        y1 = min(s["coord"][1] for s in spatials)
+    def bbox(spatials: Sequence[Spatial]) -> Dict[str, int]:
+        x1 = min(x for _, x, _ in spatials)
+        y1 = min(y for _, _, y in spatials)
         x2 = max(
-            s["coord"][0] + symbolsizes[swu_to_key(s["symbol"])]["width"]
-            for s in spatials
+            x + symbolsizes[swu_to_key(symbol)]["width"] for symbol, x, _ in spatials
         )
         y2 = max(
-            s["coord"][1] + symbolsizes[swu_to_key(s["symbol"])]["height"]
-            for s in spatials
+            y + symbolsizes[swu_to_key(symbol)]["height"] for symbol, _, y in spatials
         )
         return {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
 
-    hsyms = [s for s in parsed["spatials"] if swu_is_type(s["symbol"], "hcenter")]
+    hsyms = [s for s in scan.spatials if swu_is_type(s[0], "hcenter")]
 
-    vsyms = [s for s in parsed["spatials"] if swu_is_type(s["symbol"], "vcenter")]
+    vsyms = [s for s in scan.spatials if swu_is_type(s[0], "vcenter")]
 
-    abox = bbox(parsed["spatials"])
+    abox = bbox(scan.spatials)
     max_ = [abox["x2"], abox["y2"]]
 
     if hsyms:
@@ -287,21 +385,19 @@ def swu_sign_normalize(swu_sign: str) -> str:
         (abox["y2"] + abox["y1"]) // 2 - 500,
     ]
 
-    sequence_part = "𝠀" + "".join(parsed["sequence"]) if parsed.get("sequence") else ""
-    box = parsed["box"]
+    sequence_part = "𝠀" + "".join(scan.sequence) if scan.sequence else ""
     new_max_str = coord_to_swu([max_[0] - offset[0], max_[1] - offset[1]])
     spatials_str = "".join(
         [
-            s["symbol"]
-            + coord_to_swu([s["coord"][0] - offset[0], s["coord"][1] - offset[1]])
-            for s in parsed["spatials"]
+            symbol + coord_to_swu([x - offset[0], y - offset[1]])
+            for symbol, x, y in scan.spatials
         ]
     )
-    style = parsed.get("style", "")
 
-    return sequence_part + box + new_max_str + spatials_str + style
+    return sequence_part + scan.box + new_max_str + spatials_str + scan.style
 
 
+@timed_function("compose")
 def swu_sign_svg_body(swu_sign: str) -> str:
     """
     Creates the body of an SVG image from an SWU sign with an optional style string.
@@ -316,29 +412,60 @@ def swu_sign_svg_body(swu_sign: str) -> str:
         >>> swu_sign_svg_body('𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭-C')
         '  <text font-size="0">𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭-C</text>\\n  <svg x="476" y="466">...</svg>...'
     """
-    parsed = swu_parse_sign(swu_sign)
-    spatials = parsed.get("spatials")
-    if not spatials:
+    scan = swu_scan_sign_cached(swu_sign)
+    if not scan or not scan.spatials:
         return (
             ""  # Or call swu_symbol_svg_body if desired, but matching JS returns blank
         )
 
-    styling = style_parse(parsed.get("style", ""))
+    return _swu_sign_svg_body(swu_sign, scan, style_parse_cached(scan.style))
 
-    # Apply detailsym to spatials
-    if detailsym := styling.get("detailsym"):
-        for sym in detailsym:
-            index = sym.get("index", 0) - 1
-            if 0 <= index < len(spatials):
-                spatials[index]["detail"] = sym.get("detail", [])
 
-    syms_info = get_symbols_info([swu_to_key(s["symbol"]) for s in spatials])
+@memoize("swu_sign_css_symbols")
+def _swu_sign_css_symbols(
+    spatials: Tuple[Spatial, ...], lod: Optional[int] = None
+) -> str:
+    # Style-independent symbol part of a sign in CSS mode
+    return _swu_sign_css_svgs(
+        spatials,
+        lod,
+        get_symbols_info([swu_to_key(symbol) for symbol, _, _ in spatials]),
+    )
 
-    x_coords = [s["coord"][0] for s in spatials]
-    y_coords = [s["coord"][1] for s in spatials]
-    x1 = min(x_coords)
-    y1 = min(y_coords)
-    x2, y2 = parsed["max"]
+
+def _swu_sign_css_svgs(
+    spatials: Tuple[Spatial, ...],
+    lod: Optional[int],
+    syms_info: Mapping[str, SymbolInfo],
+) -> str:
+    svgs: List[str] = []
+    for index, (symbol, x, y) in enumerate(spatials, 1):
+        info = syms_info.get(swu_to_key(symbol))
+        if info:
+            sym_svg = _symbol_svg_lod(symbol, info["svg"], lod)
+            svgs.append(f'  <svg class="sym-{index}" x="{x}" y="{y}">{sym_svg}</svg>')
+    return "\n".join(svgs)
+
+
+def _symbol_svg_lod(symbol: str, svg: str, lod: Optional[int]) -> str:
+    if lod is None:
+        return svg
+    return get_symbol_svg_lod(swu_to_key(symbol), lod) or svg
+
+
+def _swu_sign_svg_body(
+    swu_sign: str,
+    scan: SignScan,
+    styling: StyleObject,
+    css: bool = False,
+    lod: Optional[int] = None,
+    symbols: Optional[Mapping[str, SymbolInfo]] = None,
+) -> str:
+    spatials = scan.spatials
+
+    x1 = min(x for _, x, _ in spatials)
+    y1 = min(y for _, _, y in spatials)
+    x2, y2 = scan.max
 
     background = ""
     if padding := styling.get("padding"):
@@ -351,24 +478,43 @@ def swu_sign_svg_body(swu_sign: str) -> str:
 
     svg_body = f'  <text font-size="0">{swu_sign}</text>{background}'
 
+    if css:
+        if symbols is None:
+            sym_svgs = _swu_sign_css_symbols(spatials, lod)
+        else:
+            sym_svgs = _swu_sign_css_svgs(spatials, lod, symbols)
+        return svg_body + "\n" + sym_svgs if sym_svgs else svg_body
+
+    # Apply detailsym to spatials
+    details: Dict[int, List[str]] = {}
+    for sym in styling.get("detailsym", []):
+        index = sym.get("index", 0) - 1
+        if 0 <= index < len(spatials):
+            details[index] = sym.get("detail", [])
+
+    syms_info = (
+        get_symbols_info([swu_to_key(symbol) for symbol, _, _ in spatials])
+        if symbols is None
+        else symbols
+    )
+
     detail = styling.get("detail", [])
 
     line_base = detail[0] if detail else ""
     fill_base = detail[1] if len(detail) > 1 else ""
 
     svgs: List[str] = []
-    for spatial in spatials:
-        symbol = spatial["symbol"]
-        coord = spatial["coord"]
+    for index, (symbol, x, y) in enumerate(spatials):
         info = syms_info.get(swu_to_key(symbol))
         if not info:
             continue
-        sym_svg = info["svg"]
+        sym_svg = _symbol_svg_lod(symbol, info["svg"], lod)
+        sym_detail = details.get(index, [])
 
         # Line color
         line = line_base
-        if "detail" in spatial and spatial["detail"]:
-            line = spatial["detail"][0]
+        if sym_detail:
+            line = sym_detail[0]
         elif styling.get("colorize"):
             line = swu_colorize(symbol)
         if line:
@@ -378,14 +524,14 @@ def swu_sign_svg_body(swu_sign: str) -> str:
 
         # Fill color
         fill = fill_base
-        if "detail" in spatial and len(spatial["detail"]) > 1:
-            fill = spatial["detail"][1]
+        if len(sym_detail) > 1:
+            fill = sym_detail[1]
         if fill:
             sym_svg = sym_svg.replace(
                 'class="sym-fill" fill="#ffffff"', f'class="sym-fill" fill="{fill}"'
             )
 
-        svgs.append(f'  <svg x="{coord[0]}" y="{coord[1]}">{sym_svg}</svg>')
+        svgs.append(f'  <svg x="{x}" y="{y}">{sym_svg}</svg>')
 
     if svgs:
         svg_body += "\n" + "\n".join(svgs)
@@ -393,12 +539,30 @@ def swu_sign_svg_body(swu_sign: str) -> str:
     return svg_body
 
 
-def swu_sign_svg(swu_sign: str) -> str:
+def swu_sign_svg(
+    swu_sign: str,
+    css: bool = False,
+    lod: Optional[int] = None,
+    compact: bool = False,
+    precision: Optional[int] = None,
+) -> str:
     """
     Creates an SVG image from an SWU sign with an optional style string.
 
+    With ``css`` set, the symbol fragments are left unchanged and the colors
+    of the style string are set by a ``<style>`` block in the header, so the
+    symbols can be reused for any color scheme. The rules are scoped by a
+    class on the root element, see `scope_css_rules`.
+
+    With ``lod`` set, the symbols are drawn with the simplified paths of
+    that level of detail, for images too small to show the curves.
+
     Args:
         swu_sign: an SWU sign with optional style string
+        css: set colors with CSS rules instead of rewriting the fragments
+        lod: level of detail from `lod_level`, or None for full detail
+        compact: drop optional markup and whitespace, see `minify_svg`
+        precision: with ``compact``, decimals to round coordinates to
 
     Returns:
         sign svg
@@ -407,47 +571,104 @@ def swu_sign_svg(swu_sign: str) -> str:
         >>> swu_sign_svg('𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭-C')
         '<svg ...> ... </svg>'
     """
-    parsed = swu_parse_sign(swu_sign)
+    return _swu_sign_svg(swu_sign, None, None, css, lod, compact, precision)
+
+
+@counted_render("sign", "svg")
+@timed_function("compose")
+def _swu_sign_svg(
+    swu_sign: str,
+    scan: Optional[SignScan],
+    symbols: Optional[Mapping[str, SymbolInfo]],
+    css: bool = False,
+    lod: Optional[int] = None,
+    compact: bool = False,
+    precision: Optional[int] = None,
+) -> str:
+    # Sign image from a sign scan and symbol information, when the render
+    # pipeline has them already, or scanned and looked up here
+    if scan is None:
+        scan = swu_scan_sign_cached(swu_sign)
     blank = '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="1" height="1"></svg>'
-    if not parsed.get("box"):
+    if not scan:
         return blank
 
-    info = swu_info(swu_sign)
-    x1 = info["minX"]
-    y1 = info["minY"]
-    x2 = x1 + info["width"]
-    y2 = y1 + info["height"]
+    styling = style_parse_cached(scan.style)
 
-    styling = style_parse(parsed.get("style", ""))
-
-    classes = f' class="{styling["classes"]}"' if styling.get("classes") else ""
+    # Sizing as gathered by swu_info
+    if scan.spatials:
+        x1 = min(x for _, x, _ in scan.spatials)
+        y1 = min(y for _, _, y in scan.spatials)
+        width = (scan.max[0] - x1) or 20
+        height = (scan.max[1] - y1) or 20
+        info_padding = styling.get("padding", 0)
+        info_zoom = styling.get("zoom", 1)
+    else:
+        x1 = 490
+        y1 = 490
+        width = 20
+        height = 20
+        info_padding = 0
+        info_zoom = 1
+    x2 = x1 + width
+    y2 = y1 + height
+
+    rules: List[str] = []
+    class_names = [styling["classes"]] if styling.get("classes") else []
+    if css and scan.spatials:
+        sign_symbols = [symbol for symbol, _, _ in scan.spatials]
+        rules = sign_css_rules(styling, sign_symbols, swu_colorize)
+        if rules:
+            scope, rules = scope_css_rules(rules)
+            class_names.append(scope)
+
+    classes = f' class="{" ".join(class_names)}"' if class_names else ""
     id_ = f' id="{styling["id"]}"' if styling.get("id") else ""
 
-    padding = styling.get("padding", 0) + info["padding"]
+    padding = styling.get("padding", 0) + info_padding
     x1 -= padding
     y1 -= padding
     x2 += padding
     y2 += padding
 
     sizing = ""
-    zoom = to_zoom(styling.get("zoom")) * to_zoom(info["zoom"])
+    zoom = to_zoom(styling.get("zoom")) * to_zoom(info_zoom)
     if zoom != "x":
         sizing = f' width="{(x2 - x1) * zoom}" height="{(y2 - y1) * zoom}"'
 
     svg = f'<svg{classes}{id_} version="1.1" xmlns="http://www.w3.org/2000/svg"{sizing} viewBox="{x1} {y1} {(x2 - x1)} {(y2 - y1)}" preserveAspectRatio="xMidYMid meet">\n'
 
-    body = swu_sign_svg_body(swu_sign)
+    if not scan.spatials:
+        return svg + "\n</svg>"
+
+    svg += css_style_block(rules)
+    svg += _swu_sign_svg_body(swu_sign, scan, styling, css, lod, symbols)
+    svg += "\n</svg>"
+    return minify_svg(svg, precision) if compact else svg
 
-    return svg + body + "\n</svg>"
 
+def _swu_sign_lod(swu_sign: str, scale: Optional[ScaleObject]) -> Optional[int]:
+    # Level of detail for a raster image of a sign
+    scan = swu_scan_sign_cached(swu_sign)
+    if not scan:
+        return None
+    zoom = to_zoom(style_parse_cached(scan.style).get("zoom"))
+    return sign_lod_level(scan, scale, zoom)
 
-def swu_sign_png(swu_sign: str, scale: Optional[ScaleObject] = None) -> bytes:
+
+@counted_render("sign", "png")
+def swu_sign_png(
+    swu_sign: str,
+    scale: Optional[ScaleObject] = None,
+    encoding: Optional[PngOptions] = None,
+) -> bytes:
     """
     Creates a binary PNG image from an SWU sign with an optional style string.
 
     Args:
         swu_sign: an SWU sign with optional style string
         scale: options for scaling to specific width or height
+        encoding: pixel mode and compression of the png
 
     Returns:
         sign png bytes
@@ -457,24 +678,28 @@ def swu_sign_png(swu_sign: str, scale: Optional[ScaleObject] = None) -> bytes:
         >>> png[:8] == b'\\x89PNG\\r\\n\x1a\\n'  # Valid PNG header
         True
     """
-    svg = swu_sign_svg(swu_sign)
-    png = cairosvg.svg2png(
-        bytestring=svg.encode("utf-8"),
-        output_width=scale.get("width") if scale else None,
-        output_height=scale.get("height") if scale else None,
+    svg = swu_sign_svg(swu_sign, lod=_swu_sign_lod(swu_sign, scale))
+    return svg_to_png(
+        svg,
+        scale.get("width") if scale else None,
+        scale.get("height") if scale else None,
+        encoding,
     )
-    if not isinstance(png, bytes):
-        raise ValueError("Failed to convert SVG to PNG")
-    return png
 
 
-def swu_sign_png_data_url(swu_sign: str, scale: Optional[ScaleObject] = None) -> str:
+@counted_render("sign", "data_url")
+def swu_sign_png_data_url(
+    swu_sign: str,
+    scale: Optional[ScaleObject] = None,
+    encoding: Optional[PngOptions] = None,
+) -> str:
     """
     Creates a data url PNG image from an SWU sign with an optional style string.
 
     Args:
         swu_sign: an SWU sign with optional style string
         scale: options for scaling to specific width or height
+        encoding: pixel mode and compression of the png
 
     Returns:
         sign png data url
@@ -483,12 +708,211 @@ def swu_sign_png_data_url(swu_sign: str, scale: Optional[ScaleObject] = None) ->
         >>> swu_sign_png_data_url('𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭-C').startswith('data:image/png;base64,')
         True
     """
-    png = swu_sign_png(swu_sign, scale)
-    return "data:image/png;base64," + base64.b64encode(png).decode("utf-8")
+    png = swu_sign_png(swu_sign, scale, encoding)
+    return png_data_url(png)
+
+
+@counted_render("sign", "array")
+def swu_sign_array(
+    swu_sign: str,
+    scale: Optional[ScaleObject] = None,
+    canvas: Optional[Tuple[int, int]] = None,
+    mask: bool = False,
+    center: bool = True,
+) -> "numpy.ndarray":
+    """
+    Creates an RGBA pixel array from an SWU sign with an optional style string.
+
+    The pixels are read straight from the rasterizer, without encoding and
+    decoding a PNG image.
+
+    Args:
+        swu_sign: an SWU sign with optional style string
+        scale: options for scaling to specific width or height
+        canvas: fixed output width and height
+        mask: return the alpha channel only
+        center: center the sign on the canvas
+
+    Returns:
+        (height, width, 4) uint8 array, or (height, width) uint8 mask
+
+    Example:
+        >>> swu_sign_array('𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭-C', canvas=(64, 96), mask=True).shape
+        (96, 64)
+    """
+    svg = swu_sign_svg(swu_sign, lod=_swu_sign_lod(swu_sign, scale))
+    return svg_to_array(
+        svg,
+        scale.get("width") if scale else None,
+        scale.get("height") if scale else None,
+        canvas,
+        mask,
+        center,
+    )
+
+
+@counted_render("signs", "array")
+def swu_signs_array(
+    swu_signs: Sequence[str],
+    canvas: Tuple[int, int],
+    scale: Optional[ScaleObject] = None,
+    mask: bool = False,
+    center: bool = True,
+    out: Optional["numpy.ndarray"] = None,
+) -> "numpy.ndarray":
+    """
+    Creates a batch of pixel arrays from SWU signs on a fixed size canvas.
+
+    Args:
+        swu_signs: SWU signs with optional style strings
+        canvas: output width and height
+        scale: options for scaling to specific width or height
+        mask: return the alpha channels only
+        center: center the signs on the canvas
+        out: array to write the batch to, shaped like the output
+
+    Returns:
+        (count, height, width, 4) uint8 array, or (count, height, width) uint8 masks
+
+    Example:
+        >>> swu_signs_array(['𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭'] * 3, (64, 64)).shape
+        (3, 64, 64, 4)
+    """
+    return svgs_to_array(
+        [
+            swu_sign_svg(swu_sign, lod=_swu_sign_lod(swu_sign, scale))
+            for swu_sign in swu_signs
+        ],
+        canvas,
+        scale.get("width") if scale else None,
+        scale.get("height") if scale else None,
+        mask,
+        center,
+        out,
+    )
+
+
+def _swu_sign_display_items(
+    scan: SignScan, styling: StyleObject, dx: float, dy: float, zoom: float
+) -> List[DisplayItem]:
+    # Symbols of a sign colored as by _swu_sign_svg_body, scaled by zoom and
+    # moved by dx and dy
+    spatials = scan.spatials
+    details: Dict[int, List[str]] = {}
+    for sym in styling.get("detailsym", []):
+        index = sym.get("index", 0) - 1
+        if 0 <= index < len(spatials):
+            details[index] = sym.get("detail", [])
+
+    syms_info = get_symbols_info([swu_to_key(symbol) for symbol, _, _ in spatials])
+
+    detail = styling.get("detail", [])
+
+    items: List[DisplayItem] = []
+    for index, (symbol, x, y) in enumerate(spatials):
+        if not syms_info.get(swu_to_key(symbol)):
+            continue
+        sym_detail = details.get(index, [])
+        line = detail[0] if detail else ""
+        if sym_detail:
+            line = sym_detail[0]
+        elif styling.get("colorize"):
+            line = swu_colorize(symbol)
+        fill = detail[1] if len(detail) > 1 else ""
+        if len(sym_detail) > 1:
+            fill = sym_detail[1]
+        items.append(
+            DisplayItem(
+                swu_to_key(symbol),
+                dx + x * zoom,
+                dy + y * zoom,
+                line or "black",
+                fill or "white",
+                zoom,
+            )
+        )
+    return items
+
+
+def _swu_symbol_display_items(
+    swu_sym: str, dx: float, dy: float, zoom: float
+) -> List[DisplayItem]:
+    # The symbol placed and colored as by swu_symbol_svg_body
+    parsed = swu_parse_symbol_cached(swu_sym)
+    if not parsed.get("symbol"):
+        return []
+    size = get_symbol_size(swu_to_key(parsed["symbol"]))
+    if not size:
+        return []
+    if coord := parsed.get("coord"):
+        x, y = coord
+    else:
+        x = 500 - ((size[0] + 1) // 2)
+        y = 500 - ((size[1] + 1) // 2)
+
+    styling = style_parse_cached(parsed.get("style", ""))
+    detail = styling.get("detail", [])
+    line = detail[0] if detail else "black"
+    if styling.get("colorize"):
+        line = swu_colorize(parsed["symbol"])
+    fill = detail[1] if len(detail) > 1 else "white"
+    return [
+        DisplayItem(
+            swu_to_key(parsed["symbol"]), dx + x * zoom, dy + y * zoom, line, fill, zoom
+        )
+    ]
+
+
+@counted_render("sign", "display")
+def swu_sign_display_list(swu_sign: str) -> Optional[DisplayList]:
+    """
+    Creates a display list from an SWU sign with an optional style string.
+
+    The symbols are placed and colored as in `swu_sign_svg`, for clients
+    that draw the symbol glyphs themselves.
+
+    Args:
+        swu_sign: an SWU sign with optional style string
+
+    Returns:
+        display list, or None if the sign is not valid
+
+    Example:
+        >>> display = swu_sign_display_list('𝠀񁲡񈩧𝠃𝤘𝤣񁲡𝣳𝣩񈩧𝤉𝣻-D_red_')
+        >>> display.box, display.items[0]
+        ((481.0, 471.0, 37.0, 58.0), DisplayItem(symbol='S14c20', x=481.0, y=471.0, line='red', fill='white', zoom=1.0))
+    """
+    scan = swu_scan_sign_cached(swu_sign)
+    if not scan:
+        return None
+    styling = style_parse_cached(scan.style)
+    zoom = to_zoom(styling.get("zoom"))
+    return DisplayList(
+        sign_display_box(scan, styling.get("padding", 0), zoom),
+        _swu_sign_display_items(scan, styling, 0, 0, zoom),
+    )
+
+
+def _swu_column_item_text(item: ColumnSegment, values: ColumnOptions) -> str:
+    # Text of a column item with the column style merged into its own
+    text = item["text"]
+    dash_index = text.find("-")
+    if dash_index > 0:
+        item_style = text[dash_index:]
+        new_style: StyleObject = {
+            **values["style"],
+            **style_parse_cached(item_style),
+        }
+        return text.replace(item_style, style_compose_cached(new_style) or "")
+    return text + (style_compose_cached(values["style"]) or "")
 
 
 def swu_column_svg(
-    column: List[ColumnSegment], options: Optional[ColumnOptions] = None
+    column: List[ColumnSegment],
+    options: Optional[ColumnOptions] = None,
+    css: bool = False,
+    compact: bool = False,
+    precision: Optional[int] = None,
 ) -> str:
     """
     Creates an SVG column image for an array of column data.
@@ -500,6 +924,9 @@ def swu_column_svg(
     Args:
         column: an array of column data
         options: an object of column options
+        css: set the colors of signs with CSS rules, see `swu_sign_svg`
+        compact: drop optional markup and whitespace, see `minify_svg`
+        precision: with ``compact``, decimals to round coordinates to
 
     Returns:
         svg column
@@ -509,6 +936,20 @@ def swu_column_svg(
         >>> swu_column_svg(col, {"height": 250, "width": 150}).startswith('<svg')
         True
     """
+    return _swu_column_svg(column, options, None, css, compact, precision)
+
+
+@counted_render("column", "svg")
+@timed_function("compose")
+def _swu_column_svg(
+    column: List[ColumnSegment],
+    options: Optional[ColumnOptions],
+    symbols: Optional[Mapping[str, SymbolInfo]],
+    css: bool = False,
+    compact: bool = False,
+    precision: Optional[int] = None,
+) -> str:
+    # Column image with the symbol information given, or from the store
     blank = '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="1" height="1"></svg>'
     if not isinstance(column, list):
         return blank
@@ -525,35 +966,41 @@ def swu_column_svg(
 
     sizing = f' width="{values["width"]}" height="{values["height"]}"'
 
-    svg = f'<svg version="1.1" xmlns="http://www.w3.org/2000/svg"{sizing} viewBox="{x1} {y1} {(x2 - x1)} {(y2 - y1)}">\n{background}'
-
-    for item in column:
-        dash_index = item["text"].find("-")
-        if dash_index > 0:
-            item_style = item["text"][dash_index:]
-            new_style: StyleObject = {**values["style"], **style_parse(item_style)}
-            item["text"] = item["text"].replace(
-                item_style, style_compose(new_style) or ""
-            )
-        else:
-            item["text"] += style_compose(values["style"]) or ""
-
-        item["zoom"] = to_zoom(item["zoom"]) * to_zoom(values["style"]["zoom"])
-
-        svg += f'<g transform="translate({item["x"]},{item["y"]}) scale({item["zoom"]}) translate({-item["minX"]},{-item["minY"]}) ">\n'
-        if item["segment"] == "sign":
-            svg += swu_sign_svg_body(item["text"])
-        else:
-            svg += swu_symbol_svg_body(item["text"])
-        svg += "\n</g>\n"
-
-    svg += "</svg>"
-
-    return svg
-
-
+    rules: List[str] = []
+    body = ""
+    for index, item in enumerate(column, 1):
+        text = _swu_column_item_text(item, values)
+        zoom = to_zoom(item["zoom"]) * to_zoom(values["style"]["zoom"])
+
+        group = f' class="item-{index}"' if css else ""
+        body += f'<g{group} transform="translate({item["x"]},{item["y"]}) scale({zoom}) translate({-item["minX"]},{-item["minY"]}) ">\n'
+        if item["segment"] != "sign":
+            body += _swu_symbol_svg_body(text, symbols)
+        elif (scan := swu_scan_sign_cached(text)) and scan.spatials:
+            styling = style_parse_cached(scan.style)
+            if css:
+                sign_symbols = [symbol for symbol, _, _ in scan.spatials]
+                rules += sign_css_rules(
+                    styling, sign_symbols, swu_colorize, f".item-{index} "
+                )
+            body += _swu_sign_svg_body(text, scan, styling, css, symbols=symbols)
+        body += "\n</g>\n"
+
+    classes = ""
+    if rules:
+        scope, rules = scope_css_rules(rules)
+        classes = f' class="{scope}"'
+
+    svg = f'<svg{classes} version="1.1" xmlns="http://www.w3.org/2000/svg"{sizing} viewBox="{x1} {y1} {(x2 - x1)} {(y2 - y1)}">\n'
+    svg += css_style_block(rules) + background + body + "</svg>"
+    return minify_svg(svg, precision) if compact else svg
+
+
+@counted_render("column", "png")
 def swu_column_png(
-    column: List[ColumnSegment], options: Optional[ColumnOptions] = None
+    column: List[ColumnSegment],
+    options: Optional[ColumnOptions] = None,
+    encoding: Optional[PngOptions] = None,
 ) -> bytes:
     """
     Creates a binary PNG column image for an array of column data.
@@ -565,6 +1012,7 @@ def swu_column_png(
     Args:
         column: an array of column data
         options: an object of column options
+        encoding: pixel mode and compression of the png
 
     Returns:
         png column bytes
@@ -575,14 +1023,16 @@ def swu_column_png(
         True
     """
     svg = swu_column_svg(column, options)
-    png = cairosvg.svg2png(bytestring=svg.encode("utf-8"))
-    if not isinstance(png, bytes):
-        raise ValueError("Failed to convert SVG to PNG")
-    return png
+    return svg_to_png(svg, encoding=encoding)
 
 
+@counted_render("columns", "svg")
 def swu_columns_svg(
-    swu_text: str, options: Optional[ColumnOptions] = None
+    swu_text: str,
+    options: Optional[ColumnOptions] = None,
+    css: bool = False,
+    compact: bool = False,
+    precision: Optional[int] = None,
 ) -> List[str]:
     """
     Creates an array of SVG column images for an SWU text.
@@ -590,6 +1040,9 @@ def swu_columns_svg(
     Args:
         swu_text: a text of SWU signs and punctuation
         options: an object of column options
+        css: set the colors of signs with CSS rules, see `swu_sign_svg`
+        compact: drop optional markup and whitespace, see `minify_svg`
+        precision: with ``compact``, decimals to round coordinates to
 
     Returns:
         array of svg columns
@@ -600,17 +1053,26 @@ def swu_columns_svg(
         >>> len(swu_columns_svg(swu_text, opts))
         1
     """
-    cols = swu_columns(swu_text, options)
+    cols = _swu_layout(swu_text, options)
     svgs = []
     for i, col in enumerate(cols["columns"]):
         svgs.append(
-            swu_column_svg(col, {**cols["options"], "width": cols["widths"][i]})
+            swu_column_svg(
+                col,
+                {**cols["options"], "width": cols["widths"][i]},
+                css,
+                compact,
+                precision,
+            )
         )
     return svgs
 
 
+@counted_render("columns", "png")
 def swu_columns_png(
-    swu_text: str, options: Optional[ColumnOptions] = None
+    swu_text: str,
+    options: Optional[ColumnOptions] = None,
+    encoding: Optional[PngOptions] = None,
 ) -> List[bytes]:
     """
     Creates an array of PNG column images for an SWU text.
@@ -618,6 +1080,7 @@ def swu_columns_png(
     Args:
         swu_text: a text of SWU signs and punctuation
         options: an object of column options
+        encoding: pixel mode and compression of the pngs
 
     Returns:
         array of PNG data
@@ -629,15 +1092,14 @@ def swu_columns_png(
         1
     """
     svgs = swu_columns_svg(swu_text, options)
-    pngs = []
-    for svg in svgs:
-        png = cairosvg.svg2png(bytestring=svg.encode("utf-8"))
-        pngs.append(png)
-    return pngs
+    return [svg_to_png(svg, encoding=encoding) for svg in svgs]
 
 
+@counted_render("columns", "data_url")
 def swu_columns_png_data_url(
-    swu_text: str, options: Optional[ColumnOptions] = None
+    swu_text: str,
+    options: Optional[ColumnOptions] = None,
+    encoding: Optional[PngOptions] = None,
 ) -> List[str]:
     """
     Creates an array of PNG data url column images for an SWU text.
@@ -645,6 +1107,7 @@ def swu_columns_png_data_url(
     Args:
         swu_text: a text of SWU signs and punctuation
         options: an object of column options
+        encoding: pixel mode and compression of the pngs
 
     Returns:
         array of PNG data urls
@@ -655,26 +1118,183 @@ def swu_columns_png_data_url(
         >>> all(u.startswith('data:image/png;base64,') for u in swu_columns_png_data_url(swu_text, opts))
         True
     """
-    pngs = swu_columns_png(swu_text, options)
+    pngs = swu_columns_png(swu_text, options, encoding)
+    return [png_data_url(png) for png in pngs]
+
+
+@counted_render("column", "display")
+def swu_column_display_list(
+    column: List[ColumnSegment], options: Optional[ColumnOptions] = None
+) -> DisplayList:
+    """
+    Creates a display list for an array of column data.
+
+    .. note:: This is an internal helper; `column` and `options` must be generated in tandem
+              by the calling function (`swu_columns_display_list`) to ensure compatibility.
+              Standalone use may produce incorrect output if values are mismatched.
+
+    Args:
+        column: an array of column data
+        options: an object of column options
+
+    Returns:
+        display list of the column
+
+    Example:
+        >>> col = [{"x": 56, "y": 20, "minX": 481, "minY": 471, "width": 37, "height": 58, "lane": 0, "padding": 0, "segment": "sign", "text": "𝠀񁲡񈩧𝠃𝤘𝤣񁲡𝣳𝣩񈩧𝤉𝣻", "zoom": 1}]
+        >>> swu_column_display_list(col, {"height": 250, "width": 150}).items[0]
+        DisplayItem(symbol='S14c20', x=56.0, y=20.0, line='black', fill='white', zoom=1.0)
+    """
+    if not isinstance(column, list):
+        return DisplayList((0, 0, 1, 1), [])
+
+    values = swu_column_defaults_merge(options)
+    items: List[DisplayItem] = []
+    for item in column:
+        text = _swu_column_item_text(item, values)
+        zoom = to_zoom(item["zoom"]) * to_zoom(values["style"]["zoom"])
+        dx = item["x"] - zoom * item["minX"]
+        dy = item["y"] - zoom * item["minY"]
+        if item["segment"] != "sign":
+            items += _swu_symbol_display_items(text, dx, dy, zoom)
+        elif scan := swu_scan_sign_cached(text):
+            styling = style_parse_cached(scan.style)
+            items += _swu_sign_display_items(scan, styling, dx, dy, zoom)
+    return DisplayList((0, 0, values["width"], values["height"]), items)
+
+
+@counted_render("columns", "display")
+def swu_columns_display_list(
+    swu_text: str, options: Optional[ColumnOptions] = None
+) -> List[DisplayList]:
+    """
+    Creates an array of display lists, one per column, for an SWU text.
+
+    Args:
+        swu_text: a text of SWU signs and punctuation
+        options: an object of column options
+
+    Returns:
+        array of column display lists
+    """
+    cols = _swu_layout(swu_text, options)
     return [
-        "data:image/png;base64," + base64.b64encode(png).decode("utf-8") for png in pngs
+        swu_column_display_list(col, {**cols["options"], "width": cols["widths"][i]})
+        for i, col in enumerate(cols["columns"])
     ]
 
 
+def swu_columns_svg_lazy(
+    swu_text: str, options: Optional[ColumnOptions] = None, prefetch: int = 0
+) -> LazyColumns[str]:
+    """
+    Creates a lazy sequence of SVG column images for an SWU text.
+
+    The text is laid out once. The column count and widths are available
+    immediately and each column is rendered only when it is accessed.
+
+    Args:
+        swu_text: a text of SWU signs and punctuation
+        options: an object of column options
+        prefetch: number of following columns to render in the background after an access
+
+    Returns:
+        lazy sequence of svg columns
+
+    Example:
+        >>> swu_text = "𝠀񁲡񈩧𝠃𝤘𝤣񁲡𝣳𝣩񈩧𝤉𝣻 𝠀񃊢񃊫񋛕񆇡𝠃𝤘𝤧񃊫𝣻𝤕񃊢𝣴𝣼񆇡𝤎𝤂񋛕𝤆𝣦 񏌁𝣢𝤂"
+        >>> cols = swu_columns_svg_lazy(swu_text, {"height": 250, "width": 150})
+        >>> len(cols), cols.widths
+        (1, [150])
+        >>> cols[0].startswith('<svg')
+        True
+    """
+    return LazyColumns(_swu_layout(swu_text, options), swu_column_svg, prefetch)
+
+
+def swu_columns_png_lazy(
+    swu_text: str, options: Optional[ColumnOptions] = None, prefetch: int = 0
+) -> LazyColumns[bytes]:
+    """
+    Creates a lazy sequence of PNG column images for an SWU text.
+
+    The text is laid out once. The column count and widths are available
+    immediately and each column is rendered only when it is accessed.
+
+    Args:
+        swu_text: a text of SWU signs and punctuation
+        options: an object of column options
+        prefetch: number of following columns to render in the background after an access
+
+    Returns:
+        lazy sequence of PNG data
+
+    Example:
+        >>> swu_text = "𝠀񁲡񈩧𝠃𝤘𝤣񁲡𝣳𝣩񈩧𝤉𝣻 𝠀񃊢񃊫񋛕񆇡𝠃𝤘𝤧񃊫𝣻𝤕񃊢𝣴𝣼񆇡𝤎𝤂񋛕𝤆𝣦 񏌁𝣢𝤂"
+        >>> cols = swu_columns_png_lazy(swu_text, {"height": 250, "width": 150})
+        >>> len(cols[0]) > 0
+        True
+    """
+    return LazyColumns(_swu_layout(swu_text, options), swu_column_png, prefetch)
+
+
+def swu_columns_document(
+    swu_text: str, options: Optional[ColumnOptions] = None
+) -> ColumnDocument:
+    """
+    Creates an editable column document for an SWU text.
+
+    Edits re-run the layout only from the column before the edited sign and
+    keep the rendered images of every column that did not change.
+
+    Args:
+        swu_text: a text of SWU signs and punctuation
+        options: an object of column options
+
+    Returns:
+        column document
+
+    Example:
+        >>> swu_text = "𝠀񁲡񈩧𝠃𝤘𝤣񁲡𝣳𝣩񈩧𝤉𝣻 𝠀񃊢񃊫񋛕񆇡𝠃𝤘𝤧񃊫𝣻𝤕񃊢𝣴𝣼񆇡𝤎𝤂񋛕𝤆𝣦 񏌁𝣢𝤂"
+        >>> doc = swu_columns_document(swu_text, {"height": 250, "width": 150})
+        >>> doc.svg(0).startswith('<svg')
+        True
+        >>> doc.replace(1, '񏌁𝣢𝤂')
+        [0]
+    """
+    return ColumnDocument(
+        swu_text,
+        options,
+        _swu_layout,
+        swu_parse_text,
+        swu_column_svg,
+        swu_column_png,
+    )
+
+
 __all__ = [
     "swu_symbol_normalize",
     "swu_symbol_svg_body",
     "swu_symbol_svg",
     "swu_symbol_png",
     "swu_symbol_png_data_url",
+    "swu_symbol_array",
     "swu_sign_normalize",
     "swu_sign_svg_body",
     "swu_sign_svg",
     "swu_sign_png",
     "swu_sign_png_data_url",
+    "swu_sign_array",
+    "swu_signs_array",
+    "swu_sign_display_list",
     "swu_column_svg",
     "swu_column_png",
+    "swu_column_display_list",
     "swu_columns_svg",
     "swu_columns_png",
     "swu_columns_png_data_url",
+    "swu_columns_display_list",
+    "swu_columns_svg_lazy",
+    "swu_columns_png_lazy",
+    "swu_columns_document",
 ]
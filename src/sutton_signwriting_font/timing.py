@@ -0,0 +1,254 @@
+"""
+Per-stage timing hooks for the render functions.
+
+Render calls are split into stages: parse, lookup, layout, compose,
+rasterize and encode. When timing is enabled, every stage reports its
+duration to the collectors opened with `collect_timings` in the current
+context and to the callbacks registered with `add_timing_hook`.
+
+Stage times are exclusive: when a stage runs inside another, such as the
+symbol lookup inside sign composition, its time is subtracted from the
+enclosing stage, so the stage totals of a call add up to its duration.
+
+With no collector open and no hook registered, a stage costs one global
+check.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from types import TracebackType
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    ParamSpec,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+STAGES = ("parse", "lookup", "layout", "compose", "rasterize", "encode")
+"""Names of the render stages."""
+
+TimingHook = Callable[[str, float], None]
+"""A callback that receives a stage name and its duration in seconds."""
+
+
+class StageTiming(NamedTuple):
+    """
+    Accumulated timing of a stage.
+    """
+
+    calls: int
+    """Number of times the stage ran."""
+    seconds: float
+    """Total exclusive duration in seconds."""
+
+
+class Timings:
+    """
+    Collects the durations of render stages.
+
+    Example:
+        >>> with collect_timings() as timings:
+        ...     fsw_sign_png('M525x535S2e748483x510S10011501x466')
+        >>> sorted(timings.stages())
+        ['compose', 'lookup', 'parse', 'rasterize']
+    """
+
+    def __init__(self) -> None:
+        self._stages: Dict[str, StageTiming] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        """
+        Adds one run of a stage.
+
+        Args:
+            stage: stage name
+            seconds: duration in seconds
+        """
+        with self._lock:
+            calls, total = self._stages.get(stage, (0, 0.0))
+            self._stages[stage] = StageTiming(calls + 1, total + seconds)
+
+    def stages(self) -> Dict[str, StageTiming]:
+        """Returns the accumulated timing of each stage."""
+        with self._lock:
+            return dict(self._stages)
+
+    def total(self) -> float:
+        """Returns the total duration of all stages in seconds."""
+        with self._lock:
+            return sum(timing.seconds for timing in self._stages.values())
+
+    def __repr__(self) -> str:
+        return f"Timings({self.stages()!r})"
+
+
+_hooks: List[TimingHook] = []
+_collectors: ContextVar[Tuple[Timings, ...]] = ContextVar(
+    "sutton_font_timings", default=()
+)
+_current: ContextVar[Optional["_Timer"]] = ContextVar("sutton_font_timer", default=None)
+_active = 0
+_active_lock = threading.Lock()
+
+
+def _activate(delta: int) -> None:
+    global _active
+    with _active_lock:
+        _active += delta
+
+
+def add_timing_hook(hook: TimingHook) -> None:
+    """
+    Registers a callback for the duration of every stage in every context.
+
+    Args:
+        hook: function called with the stage name and duration in seconds
+    """
+    _hooks.append(hook)
+    _activate(1)
+
+
+def remove_timing_hook(hook: TimingHook) -> None:
+    """
+    Removes a registered callback.
+
+    Args:
+        hook: a callback registered with `add_timing_hook`
+    """
+    _hooks.remove(hook)
+    _activate(-1)
+
+
+@contextmanager
+def collect_timings() -> Iterator[Timings]:
+    """
+    Collects the stage durations of render calls in the current context.
+
+    Collectors follow the context, so concurrent requests on other threads
+    or asyncio tasks are not mixed in. Nested collectors all receive the
+    stages.
+
+    Returns:
+        context manager that yields the collected timings
+    """
+    timings = Timings()
+    token = _collectors.set(_collectors.get() + (timings,))
+    _activate(1)
+    try:
+        yield timings
+    finally:
+        _activate(-1)
+        _collectors.reset(token)
+
+
+def _record(stage: str, seconds: float) -> None:
+    for timings in _collectors.get():
+        timings.add(stage, seconds)
+    for hook in list(_hooks):
+        hook(stage, seconds)
+
+
+class _Timer:
+    __slots__ = ("stage", "start", "children", "parent", "token")
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self.children = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.parent = _current.get()
+        self.token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        elapsed = time.perf_counter() - self.start
+        _current.reset(self.token)
+        if self.parent is not None:
+            self.parent.children += elapsed
+        _record(self.stage, elapsed - self.children)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: object) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(stage: str) -> "_Timer | _NullTimer":
+    """
+    Returns a context manager that times a stage when timing is enabled.
+
+    Args:
+        stage: stage name, one of `STAGES`
+
+    Returns:
+        context manager
+
+    Example:
+        >>> with timed("compose"):
+        ...     svg = compose()
+    """
+    return _Timer(stage) if _active else _NULL_TIMER
+
+
+def timed_function(stage: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    Decorator that times every call of a function as a stage.
+
+    Args:
+        stage: stage name, one of `STAGES`
+
+    Returns:
+        decorator
+    """
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        @wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if not _active:
+                return func(*args, **kwargs)
+            with _Timer(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+__all__ = [
+    "STAGES",
+    "StageTiming",
+    "TimingHook",
+    "Timings",
+    "add_timing_hook",
+    "remove_timing_hook",
+    "collect_timings",
+    "timed",
+    "timed_function",
+]
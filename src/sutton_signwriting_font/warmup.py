@@ -0,0 +1,123 @@
+"""
+Warm-up for pre-fork servers.
+
+A pre-fork server such as gunicorn or uWSGI can call `warm_up` in the
+master process before it forks its workers. The symbol store, the compiled
+patterns, the rasterizer and the caches are then loaded once and shared by
+every worker through copy-on-write memory.
+"""
+
+import gc
+import re
+import time
+from typing import Iterable, NamedTuple
+
+from sutton_signwriting_core.regex import fsw_pattern_symbol, swu_pattern_symbol
+
+from .cache import style_parse_cached
+from .db import load_symbol_store
+from .fsw import fsw_columns_svg, fsw_sign_svg, fsw_symbol_svg
+from .raster import load_rasterizer, load_surface
+from .scan import fsw_scan_sign, swu_scan_sign
+from .swu import swu_columns_svg, swu_sign_svg, swu_symbol_svg
+
+
+class WarmUpReport(NamedTuple):
+    """
+    What `warm_up` loaded.
+    """
+
+    symbols: int
+    """Number of symbols in the symbol store."""
+    rendered: int
+    """Number of hot list entries rendered."""
+    rasterizer: bool
+    """True if the rasterizer and its surface classes were imported."""
+    frozen: bool
+    """True if long-lived objects were frozen out of the garbage collector."""
+    seconds: float
+    """Duration of the warm-up."""
+
+
+_fsw_symbol = re.compile(fsw_pattern_symbol)
+_swu_symbol = re.compile(swu_pattern_symbol)
+
+
+def _render(text: str) -> bool:
+    if " " in text.strip():
+        if text.isascii():
+            fsw_columns_svg(text)
+        else:
+            swu_columns_svg(text)
+    elif fsw_scan_sign(text):
+        fsw_sign_svg(text)
+    elif swu_scan_sign(text):
+        swu_sign_svg(text)
+    elif _fsw_symbol.match(text):
+        fsw_symbol_svg(text)
+    elif _swu_symbol.match(text):
+        swu_symbol_svg(text)
+    else:
+        return False
+    return True
+
+
+def warm_up(
+    hot_list: Iterable[str] = (),
+    rasterizer: bool = True,
+    freeze: bool = True,
+) -> WarmUpReport:
+    """
+    Loads everything a render needs so that later calls start warm.
+
+    Loads the symbol store, compiles the sign and style patterns, imports
+    the rasterizer with the surface classes that the png encoding options
+    and the array functions draw on, and renders each entry of the hot list
+    as svg to fill the parse caches. Then moves every tracked object to the permanent generation
+    of the garbage collector with `gc.freeze`, so that collections in forked
+    workers do not write to the shared pages.
+
+    Args:
+        hot_list: FSW or SWU symbols, signs or texts to render ahead
+        rasterizer: import cairosvg if it is installed
+        freeze: freeze the long-lived objects after loading
+
+    Returns:
+        what was loaded
+
+    Example:
+        >>> warm_up(['AS14c20S27106M518x529S14c20481x471S27106503x489'])
+        WarmUpReport(symbols=37811, rendered=1, rasterizer=True, frozen=True, seconds=0.41)
+    """
+    start = time.perf_counter()
+    symbols = load_symbol_store()
+
+    # Compile the patterns used by the scanners and the style parser.
+    fsw_scan_sign("AS10011M510x515S10011490x485-D_black_")
+    swu_scan_sign("𝠀񀀒𝠃𝤛𝤟񀀒𝣴𝣩-D_black_")
+    style_parse_cached("-CP10G_white_D_black,white_Z2-D01_black_")
+
+    loaded = False
+    if rasterizer:
+        try:
+            load_rasterizer()
+            load_surface()
+            loaded = True
+        except (ImportError, OSError):
+            loaded = False
+
+    rendered = sum(1 for text in hot_list if _render(text))
+
+    if freeze:
+        gc.collect()
+        gc.freeze()
+
+    return WarmUpReport(
+        symbols, rendered, loaded, freeze, round(time.perf_counter() - start, 3)
+    )
+
+
+__all__ = [
+    "WarmUpReport",
+    "warm_up",
+]
@@ -0,0 +1,172 @@
+import os
+
+import pytest
+
+from sutton_signwriting_font import archive
+from sutton_signwriting_font.archive import (
+    ArchiveCache,
+    ArchiveReader,
+    ArchiveWriter,
+    compact_archive,
+)
+from sutton_signwriting_font.cli import MANIFEST, item_key, main, read_manifest
+from sutton_signwriting_font.fsw import fsw_sign_svg
+
+SIGNS = [
+    "AS14c20S27106M518x529S14c20481x471S27106503x489",
+    "M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475-C",
+    "AS18701S1870aS2e734S20500M518x533S1870a489x515S18701482x490S20500508x496S2e734500x468",
+]
+
+
+def test_write_and_read(tmp_path):
+    path = str(tmp_path / "test.sswa")
+    payloads = {f"{i:04d}.svg": f"<svg>{i}</svg>".encode() for i in range(500)}
+    with ArchiveWriter(path) as writer:
+        for name, data in payloads.items():
+            writer.add(name, data)
+    with ArchiveReader(path) as reader:
+        assert len(reader) == 500
+        assert dict(reader) == payloads
+        assert reader["0042.svg"] == b"<svg>42</svg>"
+        assert bytes(reader.view("0007.svg")) == b"<svg>7</svg>"
+        assert "0500.svg" not in reader
+        with pytest.raises(KeyError):
+            reader["0500.svg"]
+
+
+def test_append_segments_and_replace(tmp_path):
+    path = str(tmp_path / "test.sswa")
+    with ArchiveWriter(path) as writer:
+        writer.add("a", b"1")
+        writer.add("b", b"2")
+    with ArchiveWriter(path) as writer:
+        assert "a" in writer
+        writer.add("a", b"3")
+        writer.add("c", b"4")
+        writer.commit()
+        writer.add("c", b"5")
+        writer.add("c", b"6")
+    with ArchiveReader(path) as reader:
+        assert dict(reader) == {"a": b"3", "b": b"2", "c": b"6"}
+    size = os.path.getsize(path)
+    assert compact_archive(path) == 3
+    assert os.path.getsize(path) < size
+    with ArchiveReader(path) as reader:
+        assert dict(reader) == {"a": b"3", "b": b"2", "c": b"6"}
+
+
+def test_dedupe(tmp_path):
+    data = bytes(range(256)) * 40
+    sizes = []
+    for dedupe in (True, False):
+        path = str(tmp_path / f"{dedupe}.sswa")
+        with ArchiveWriter(path, dedupe=dedupe) as writer:
+            for i in range(10):
+                writer.add(f"{i}.png", data)
+        with ArchiveWriter(path, dedupe=dedupe) as writer:
+            writer.add("10.png", data)
+        with ArchiveReader(path) as reader:
+            assert all(reader[f"{i}.png"] == data for i in range(11))
+        sizes.append(os.path.getsize(path))
+    assert sizes[0] < len(data) * 2 < sizes[1]
+
+
+def test_merged_index(tmp_path):
+    path = str(tmp_path / "test.sswa")
+    for i in range(10):
+        with ArchiveWriter(path, merge_segments=4) as writer:
+            writer.add(f"{i}.svg", f"<svg>{i}</svg>".encode())
+            writer.add("last.svg", f"<svg>{i}</svg>".encode())
+        with ArchiveReader(path) as reader:
+            # Lookups search at most four indexes, the oldest of them merged.
+            assert len(reader._segments) == i % 4 + 1
+            assert reader["last.svg"] == f"<svg>{i}</svg>".encode()
+            assert dict(reader) == {
+                "last.svg": f"<svg>{i}</svg>".encode(),
+                **{f"{j}.svg": f"<svg>{j}</svg>".encode() for j in range(i + 1)},
+            }
+
+
+def test_open_reads_payload_hashes(tmp_path, monkeypatch):
+    path = str(tmp_path / "test.sswa")
+    with ArchiveWriter(path) as writer:
+        for i in range(20):
+            writer.add(f"{i}.png", bytes([i]) * 100)
+    size = os.path.getsize(path)
+    hashed = []
+    payload_hash = archive._payload_hash
+    monkeypatch.setattr(
+        archive, "_payload_hash", lambda data: hashed.append(data) or payload_hash(data)
+    )
+    with ArchiveWriter(path) as writer:
+        assert hashed == []
+        writer.add("copy.png", bytes([7]) * 100)
+    assert hashed == [bytes([7]) * 100]
+    with ArchiveReader(path) as reader:
+        assert reader.find("copy.png").offset == reader.find("7.png").offset
+    assert os.path.getsize(path) < size + 100
+
+
+def test_interrupted_append(tmp_path):
+    path = str(tmp_path / "test.sswa")
+    with ArchiveWriter(path) as writer:
+        writer.add("a", b"1")
+    writer = ArchiveWriter(path)
+    writer.add("b", b"2")
+    # The writer stops without committing, as if the process was killed.
+    writer._file.flush()
+    writer._file.close()
+    with ArchiveReader(path) as reader:
+        assert dict(reader) == {"a": b"1"}
+    with ArchiveWriter(path) as writer:
+        writer.add("c", b"3")
+    with ArchiveReader(path) as reader:
+        assert dict(reader) == {"a": b"1", "c": b"3"}
+
+    (tmp_path / "other.sswa").write_bytes(b"PK\x03\x04" + bytes(20))
+    with pytest.raises(ValueError):
+        ArchiveReader(str(tmp_path / "other.sswa"))
+
+
+def test_archive_cache(tmp_path):
+    path = str(tmp_path / "cache.sswa")
+    cache = ArchiveCache(path, commit_every=2)
+    cache.put("/fsw/sign.svg?text=a", b"A")
+    assert cache.get("/fsw/sign.svg?text=a") == b"A"
+    cache.put("/fsw/sign.svg?text=b", b"B")
+    cache.put("/fsw/sign.svg?text=c", b"C")
+    assert cache.get("/fsw/sign.svg?text=d") is None
+    cache.close()
+    reopened = ArchiveCache(path)
+    assert reopened.get("/fsw/sign.svg?text=c") == b"C"
+    reopened.close()
+
+
+def test_render_to_archive(tmp_path):
+    inputs = tmp_path / "signs.txt"
+    inputs.write_text("\n".join(SIGNS))
+    archive = str(tmp_path / "signs.sswa")
+    assert main(["render", str(inputs), "-o", archive, "-j", "1", "-q"]) == 0
+    with ArchiveReader(archive) as reader:
+        assert len(reader) == 4
+        for sign in SIGNS:
+            assert reader[f"{item_key(sign)}.svg"].decode() == fsw_sign_svg(sign)
+        assert MANIFEST in reader
+
+    # Resuming renders the items whose segment was not committed.
+    manifest = read_manifest(archive + ".parts/" + MANIFEST)
+    assert len(manifest) == 3
+    os.remove(archive)
+    assert main(["render", str(inputs), "-o", archive, "-j", "1", "-q"]) == 0
+    with ArchiveReader(archive) as reader:
+        assert len(reader) == 4
+
+    # Sharded renders are packed by merge.
+    for i in range(2):
+        argv = ["render", str(inputs), "-o", str(tmp_path / "shards.sswa")]
+        assert main(argv + ["--shard", f"{i}/2", "-q"]) == 0
+    argv = ["merge", str(tmp_path / "shards.sswa.parts")]
+    assert main(argv + ["-o", str(tmp_path / "shards.sswa")]) == 0
+    with ArchiveReader(str(tmp_path / "shards.sswa")) as reader:
+        assert len(reader) == 4
@@ -0,0 +1,151 @@
+import threading
+
+import pytest
+
+from sutton_signwriting_core.style import style_compose, style_parse
+
+from sutton_signwriting_font.cache import (
+    LRUCache,
+    cache_clear,
+    cache_info,
+    freeze,
+    hashable_key,
+    fsw_parse_symbol_cached,
+    fsw_scan_sign_cached,
+    memoize,
+    style_compose_cached,
+    style_parse_cached,
+    thaw,
+)
+from sutton_signwriting_font.fsw import fsw_columns_svg, fsw_sign_svg
+from sutton_signwriting_font.scan import SignScan
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.get("b") is None
+    info = cache.info()
+    assert (info.hits, info.misses, info.evictions, info.currsize) == (1, 1, 1, 2)
+    assert cache.items() == [("a", 1), ("c", 3)]
+
+
+def test_lru_cache_resize_and_disable():
+    cache = LRUCache(3)
+    for i in range(3):
+        cache.put(i, i)
+    cache.resize(1)
+    assert len(cache) == 1
+    assert cache.info().evictions == 2
+    cache.resize(0)
+    cache.put("x", 1)
+    assert len(cache) == 0
+
+
+def test_lru_cache_threads():
+    cache = LRUCache(50)
+
+    def work(offset):
+        for i in range(500):
+            key = (offset + i) % 100
+            if cache.get(key) is None:
+                cache.put(key, key)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    info = cache.info()
+    assert info.currsize == 50
+    assert info.hits + info.misses == 4000
+
+
+def test_freeze_thaw_roundtrip():
+    value = {"detail": ["red", "blue"], "detailsym": [{"index": 1, "detail": ["x"]}]}
+    frozen = freeze(value)
+    with pytest.raises(TypeError):
+        frozen["detail"] = []
+    assert frozen["detail"] == ("red", "blue")
+    assert thaw(frozen) == value
+
+
+def test_cached_results_are_read_only():
+    cache_clear()
+    styling = style_parse_cached("-CP10G_blue_D_red,white_")
+    with pytest.raises(TypeError):
+        styling["padding"] = 0
+    with pytest.raises(AttributeError):
+        styling["detail"].append("green")
+    assert style_parse_cached("-CP10G_blue_D_red,white_") is styling
+
+    scan = fsw_scan_sign_cached("M525x535S2e748483x510S10011501x466")
+    assert isinstance(scan, SignScan)
+    assert fsw_scan_sign_cached("M525x535S2e748483x510S10011501x466") is scan
+
+    parsed = fsw_parse_symbol_cached("S10000500x500-C")
+    assert parsed["coord"] == (500, 500)
+
+
+@pytest.mark.parametrize(
+    "style",
+    [
+        "-C",
+        "-P10G_blue_D_red,white_Z2-D01_blue_D02_red,yellow_",
+        "-Z1.5-D01_white_",
+        "-D_blue_",
+    ],
+)
+def test_style_compose_cached(style):
+    expected = style_compose(style_parse(style))
+    assert style_compose_cached(style_parse_cached(style)) == expected
+    assert style_compose_cached(style_parse(style)) == expected
+
+
+def test_hashable_key_keeps_number_types():
+    keys = {hashable_key({"zoom": value}) for value in (1, 1.0, True)}
+    assert len(keys) == 3
+    assert hashable_key({"detail": ["red"]}) == hashable_key({"detail": ("red",)})
+
+
+def test_style_compose_cached_number_types():
+    text = "AS14c20S27106M518x529S14c20481x471S27106503x489"
+    zooms = (1, 1.0, 2, 2.0)
+    expected = []
+    for zoom in zooms:
+        cache_clear()
+        expected.append(fsw_columns_svg(text, {"style": {"zoom": zoom}}))
+    cache_clear()
+    assert [fsw_columns_svg(text, {"style": {"zoom": zoom}}) for zoom in zooms] == (
+        expected
+    )
+    assert style_compose_cached({"zoom": 1}) == "-Z1"
+    assert style_compose_cached({"zoom": 1.0}) == "-Z1.0"
+
+
+def test_cache_info_counts_renders():
+    cache_clear()
+    sign = "AS14c20S27106M518x529S14c20481x471S27106503x489-D_blue_"
+    first = fsw_sign_svg(sign)
+    assert fsw_sign_svg(sign) == first
+    info = cache_info()["fsw_scan_sign"]
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_memoize_registers_cache():
+    calls = []
+
+    @memoize("test_memoize", maxsize=2)
+    def double(value):
+        calls.append(value)
+        return [value, value]
+
+    assert double(1) == (1, 1)
+    assert double(1) == (1, 1)
+    assert calls == [1]
+    assert cache_info()["test_memoize"].hits == 1
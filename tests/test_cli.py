@@ -0,0 +1,163 @@
+import io
+import json
+import os
+import zipfile
+
+from sutton_signwriting_core.convert import fsw_to_swu
+
+from sutton_signwriting_font import raster
+import pytest
+
+from sutton_signwriting_font.cli import (
+    MANIFEST,
+    item_key,
+    main,
+    manifest_name,
+    merge_manifests,
+    parse_shard,
+    read_inputs,
+    read_manifest,
+    render_files,
+    shard_of,
+)
+from sutton_signwriting_font.fsw import fsw_columns_svg, fsw_sign_svg
+
+SIGNS = [
+    "AS14c20S27106M518x529S14c20481x471S27106503x489",
+    "M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475-C",
+    "AS18701S1870aS2e734S20500M518x533S1870a489x515S18701482x490S20500508x496S2e734500x468",
+]
+# The first sign placed elsewhere
+MOVED = "AS14c20S27106M528x539S14c20491x481S27106513x499"
+
+
+def test_item_key():
+    assert item_key(SIGNS[0]) == item_key(MOVED)
+    assert item_key(SIGNS[0]) != item_key(SIGNS[1])
+    assert item_key(SIGNS[0]) != item_key(SIGNS[0], format="png")
+    assert item_key(SIGNS[0]) != item_key(SIGNS[0], options={"width": 100})
+    assert item_key("not a sign") == item_key(" not a sign ")
+
+
+def test_read_inputs(tmp_path):
+    path = tmp_path / "signs.txt"
+    path.write_text(f"{SIGNS[0]}\n\n  {SIGNS[1]}  \n")
+    stdin = io.StringIO(SIGNS[2] + "\n")
+    assert list(read_inputs([str(path), "-"], stdin)) == SIGNS
+
+
+def test_render_files_deduplicates_and_resumes(tmp_path):
+    inputs = SIGNS + [MOVED, SIGNS[1], fsw_to_swu(SIGNS[2])]
+    summary = render_files(inputs, str(tmp_path))
+    assert summary == (4, 0, 2, 0)
+    for sign in SIGNS:
+        assert (tmp_path / f"{item_key(sign)}.svg").read_text() == fsw_sign_svg(sign)
+    entries = read_manifest(str(tmp_path / MANIFEST))
+    assert entries[item_key(MOVED)]["text"] == SIGNS[0]
+
+    assert render_files(inputs, str(tmp_path)) == (0, 4, 2, 0)
+
+    # An interrupted run leaves a partly written manifest line.
+    manifest = tmp_path / MANIFEST
+    lines = manifest.read_text().splitlines(keepends=True)
+    manifest.write_text("".join(lines[:2]) + lines[2][:20])
+    assert render_files(inputs, str(tmp_path)) == (2, 2, 2, 0)
+    assert len(read_manifest(str(manifest))) == 4
+
+
+def test_render_files_columns_and_errors(tmp_path):
+    text = " ".join(SIGNS)
+    options = {"width": 150, "height": 250}
+    summary = render_files([text, "junk"], str(tmp_path), "columns", options=options)
+    assert summary.rendered == 1 and summary.errors == 1
+    entries = read_manifest(str(tmp_path / MANIFEST))
+    files = entries[item_key(text, "columns", "svg", options)]["files"]
+    svgs = fsw_columns_svg(text, options)
+    assert [(tmp_path / name).read_text() for name in files] == svgs
+    assert "error" in entries[item_key("junk", "columns", "svg", options)]
+
+
+def test_render_files_in_processes(tmp_path):
+    summary = render_files(SIGNS * 3, str(tmp_path), jobs=2)
+    assert summary == (3, 0, 6, 0)
+    for sign in SIGNS:
+        assert (tmp_path / f"{item_key(sign)}.svg").read_text() == fsw_sign_svg(sign)
+
+
+def test_main_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(raster, "_svg2png", lambda **kwargs: b"PNG")
+    inputs = tmp_path / "signs.txt"
+    inputs.write_text("\n".join(SIGNS))
+    archive = tmp_path / "signs.zip"
+    argv = ["render", str(inputs), "-o", str(archive), "--format", "png"]
+    assert main(argv + ["--width", "100", "-j", "1", "-q"]) == 0
+    with zipfile.ZipFile(archive) as z:
+        names = z.namelist()
+        key = item_key(SIGNS[0], "sign", "png", {"width": 100})
+        assert z.read(f"{key}.png") == b"PNG"
+        manifest = [json.loads(line) for line in z.read(MANIFEST).splitlines()]
+    assert len(names) == 4 and len(manifest) == 3
+
+    inputs.write_text("junk")
+    assert main(["render", str(inputs), "-o", str(tmp_path / "out"), "-q"]) == 0
+    argv = ["render", str(inputs), "-o", str(tmp_path / "cols"), "-q"]
+    assert main(argv + ["--kind", "columns"]) == 1
+
+
+def test_shards():
+    assert parse_shard("2/8") == (2, 8)
+    for shard in ("8/8", "-1/8", "1", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(shard)
+    assert shard_of(SIGNS[0], 4) == shard_of(MOVED, 4)
+    assert {shard_of(f"S1{i:02x}00", 3, "symbol") for i in range(30)} == {0, 1, 2}
+
+
+def test_sharded_render_and_merge(tmp_path):
+    inputs = SIGNS + [MOVED] + [f"M510x510S1{i:02x}00490x490" for i in range(20)]
+    with pytest.raises(ValueError):
+        merge_manifests(str(tmp_path))
+    summaries = [render_files(inputs, str(tmp_path), shard=(i, 3)) for i in range(3)]
+    assert sum(summary.rendered for summary in summaries) == len(
+        set(map(item_key, inputs))
+    )
+    assert all(summary.rendered for summary in summaries)
+    for i in range(3):
+        assert (tmp_path / manifest_name((i, 3))).exists()
+
+    report = merge_manifests(str(tmp_path), inputs)
+    assert report.ok and report.shards == 3
+    assert report.items == len(read_manifest(str(tmp_path / MANIFEST)))
+
+    # A shard that stopped early misses its last item.
+    manifest = tmp_path / manifest_name((1, 3))
+    lines = manifest.read_text().splitlines(keepends=True)
+    manifest.write_text("".join(lines[:-1]))
+    lost = json.loads(lines[-1])
+    # A shard that rendered an item of another shard duplicates it.
+    with open(tmp_path / manifest_name((2, 3)), "a") as f:
+        f.write(lines[0])
+    report = merge_manifests(str(tmp_path), inputs)
+    assert not report.ok
+    assert report.missing == [lost["text"]]
+    assert report.duplicates == [json.loads(lines[0])["key"]]
+
+    os.remove(tmp_path / manifest_name((0, 3)))
+    assert merge_manifests(str(tmp_path)).missing_shards == [0]
+    (tmp_path / manifest_name((0, 2))).write_text("")
+    with pytest.raises(ValueError):
+        merge_manifests(str(tmp_path))
+
+
+def test_main_merge(tmp_path):
+    inputs = tmp_path / "signs.txt"
+    inputs.write_text("\n".join(SIGNS))
+    archive = str(tmp_path / "signs.tar")
+    for i in range(2):
+        argv = ["render", str(inputs), "-o", archive, "--shard", f"{i}/2", "-q"]
+        assert main(argv) == 0
+    assert not os.path.exists(archive)
+    argv = ["merge", archive + ".parts", "--inputs", str(inputs), "-o", archive]
+    assert main(argv + ["--shards", "3"]) == 1
+    assert main(argv + ["--shards", "2"]) == 0
+    assert os.path.exists(archive)
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from sutton_signwriting_core.convert import fsw_to_swu  # noqa: E402
+from sutton_signwriting_core.fsw import fsw_parse_sign  # noqa: E402
+
+from sutton_signwriting_font.cli import main  # noqa: E402
+from sutton_signwriting_font.dataset import (  # noqa: E402
+    INDEX,
+    METADATA,
+    Augmentation,
+    _truncate_shard,
+    augment_sign,
+    build_dataset,
+    load_shards,
+)
+from sutton_signwriting_font.fsw import fsw_sign_array  # noqa: E402
+
+SIGNS = [
+    "AS14c20S27106M518x529S14c20481x471S27106503x489",
+    "M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475",
+    "AS18701S1870aS2e734S20500M518x533S1870a489x515S18701482x490S20500508x496S2e734500x468",
+]
+
+
+def test_augment_sign():
+    augmentation = Augmentation(jitter=3, scale=(0.5, 2.0), colors=("red", "blue"))
+    sign, width = augment_sign(SIGNS[1], augmentation, "0:1")
+    assert (sign, width) == augment_sign(SIGNS[1], augmentation, "0:1")
+    assert sign != augment_sign(SIGNS[1], augmentation, "0:2")[0]
+    assert width is not None and 20 <= width <= 110
+    original = fsw_parse_sign(SIGNS[1])["spatials"]
+    for before, after in zip(original, fsw_parse_sign(sign)["spatials"]):
+        assert before["symbol"] == after["symbol"]
+        assert all(abs(a - b) <= 3 for a, b in zip(before["coord"], after["coord"]))
+    assert augment_sign(SIGNS[1], Augmentation()) == (SIGNS[1], None)
+    assert augment_sign("junk", augmentation) == ("junk", None)
+
+
+@pytest.mark.parametrize("version", [(1, 0), (2, 0)])
+def test_truncate_shard(tmp_path, version):
+    path = str(tmp_path / "shard-00000.npy")
+    shard = numpy.lib.format.open_memmap(
+        path, mode="w+", dtype=numpy.uint8, shape=(10, 6, 8), version=version
+    )
+    shard[:] = numpy.arange(10, dtype=numpy.uint8).reshape(10, 1, 1)
+    shard.flush()
+    del shard
+    _truncate_shard(path, 3)
+    rows = numpy.load(path, mmap_mode="r")
+    assert rows.shape == (3, 6, 8) and rows.dtype == numpy.uint8
+    assert [int(row[0, 0]) for row in rows] == [0, 1, 2]
+    assert (rows == numpy.arange(3).reshape(3, 1, 1)).all()
+    assert (tmp_path / "shard-00000.npy").stat().st_size == rows.offset + rows.nbytes
+
+
+def test_build_dataset(tmp_path):
+    texts = SIGNS + ["junk", fsw_to_swu(SIGNS[0])]
+    summary = build_dataset(texts, str(tmp_path), (64, 48), shard_size=3)
+    assert summary == (5, 2, 1)
+    shards = load_shards(str(tmp_path))
+    assert [shard.shape for shard in shards] == [(3, 48, 64), (2, 48, 64)]
+    rows = numpy.concatenate(shards)
+    # Gray rows are ink on white.
+    mask = fsw_sign_array(SIGNS[0], canvas=(64, 48), mask=True)
+    assert (rows[0][mask == 0] == 255).all() and (rows[0] < 255).any()
+    assert (rows[3] == 255).all()
+    assert (rows[4] == rows[0]).all()
+
+    index = [json.loads(line) for line in (tmp_path / INDEX).read_text().splitlines()]
+    assert [entry["row"] for entry in index] == list(range(5))
+    assert index[3]["shard"] == "shard-00001.npy" and "error" in index[3]
+    metadata = json.loads((tmp_path / METADATA).read_text())
+    assert metadata["rows"] == 5 and metadata["shape"] == [48, 64]
+
+
+def test_build_dataset_deterministic(tmp_path):
+    texts = SIGNS * 4
+    augmentation = Augmentation(jitter=4, scale=(0.8, 1.2), colors=("red", "blue"))
+    arrays = []
+    for jobs in (1, 2):
+        directory = str(tmp_path / str(jobs))
+        summary = build_dataset(
+            texts, directory, (32, 32), "rgba", 5, jobs, augmentation, 7, 2
+        )
+        assert summary == (12, 3, 0)
+        arrays.append(numpy.concatenate(load_shards(directory)))
+    assert arrays[0].shape == (12, 32, 32, 4)
+    assert (arrays[0] == arrays[1]).all()
+    assert (arrays[0][0] != arrays[0][3]).any()
+
+    with pytest.raises(ValueError):
+        build_dataset(texts, str(tmp_path), mode="cmyk")
+
+
+def test_main_dataset(tmp_path):
+    inputs = tmp_path / "signs.txt"
+    inputs.write_text("\n".join(SIGNS))
+    output = tmp_path / "data"
+    argv = ["dataset", str(inputs), "-o", str(output), "--size", "40x30"]
+    assert main(argv + ["--mode", "mask", "--jitter", "2", "-j", "1", "-q"]) == 0
+    (shard,) = load_shards(str(output))
+    assert shard.shape == (3, 30, 40)
+    metadata = json.loads((output / METADATA).read_text())
+    assert metadata["augmentation"]["jitter"] == 2
@@ -0,0 +1,75 @@
+import json
+import struct
+
+import pytest
+
+from sutton_signwriting_font import fsw, swu
+from sutton_signwriting_font.display import (
+    MAGIC,
+    DisplayItem,
+    DisplayList,
+    display_list_json,
+    pack_display_list,
+    sign_display_box,
+    unpack_display_list,
+)
+from sutton_signwriting_font.scan import fsw_scan_sign
+
+DISPLAY = DisplayList(
+    (471, 461, 57, 78),
+    [
+        DisplayItem("S14c20", 481, 471, "red", "white", 1),
+        DisplayItem("S27106", 503.5, 489, "#0000CC", "white", 1.5),
+    ],
+)
+
+
+def test_display_list_json():
+    data = json.loads(display_list_json(DISPLAY))
+    assert data["box"] == [471, 461, 57, 78]
+    assert data["symbols"][1] == {
+        "symbol": "S27106",
+        "x": 503.5,
+        "y": 489,
+        "line": "#0000CC",
+        "fill": "white",
+        "zoom": 1.5,
+    }
+    assert " " not in display_list_json(DISPLAY)
+
+
+def test_pack_display_list():
+    packed = pack_display_list(DISPLAY)
+    assert packed.startswith(MAGIC)
+    # Header, three distinct colors and 16 bytes per symbol
+    assert len(packed) == 24 + (1 + 3) + (1 + 5) + (1 + 7) + 2 * 16
+    assert unpack_display_list(packed) == DISPLAY
+    assert unpack_display_list(pack_display_list(DisplayList((0, 0, 1, 1), []))) == (
+        (0, 0, 1, 1),
+        [],
+    )
+
+
+def test_pack_display_list_invalid():
+    colors = [DisplayItem("S10000", 0, 0, f"#{i:06x}", "white", 1) for i in range(255)]
+    with pytest.raises(ValueError):
+        pack_display_list(DisplayList((0, 0, 1, 1), colors))
+    packed = pack_display_list(DISPLAY)
+    for data in (b"SSWA" + packed[4:], packed[:-1], packed[:20]):
+        with pytest.raises(ValueError):
+            unpack_display_list(data)
+    with pytest.raises(ValueError):
+        unpack_display_list(packed[:4] + struct.pack("<B", 2) + packed[5:])
+
+
+def test_sign_display_box():
+    scan = fsw_scan_sign("M518x529S14c20481x471S27106503x489")
+    assert sign_display_box(scan) == (481, 471, 37, 58)
+    assert sign_display_box(scan, 10, 2) == (942, 922, 114, 156)
+    assert sign_display_box(fsw_scan_sign("M500x500")) == (490, 490, 20, 20)
+
+
+def test_display_list_functions_exported():
+    for module, prefix in ((fsw, "fsw"), (swu, "swu")):
+        for kind in ("sign", "column", "columns"):
+            assert f"{prefix}_{kind}_display_list" in module.__all__
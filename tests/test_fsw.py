@@ -1,15 +1,25 @@
 import base64
+import re
 
 import pytest
+from sutton_signwriting_core.fsw import fsw_columns
 
 from sutton_signwriting_font.fsw import (
     fsw_column_png,
     fsw_column_svg,
+    fsw_columns_display_list,
+    fsw_columns_document,
     fsw_columns_png,
+    fsw_columns_png_lazy,
     fsw_columns_svg,
+    fsw_columns_svg_lazy,
+    fsw_sign_array,
+    fsw_sign_display_list,
     fsw_sign_normalize,
     fsw_sign_png,
     fsw_sign_svg,
+    fsw_signs_array,
+    fsw_symbol_array,
     fsw_symbol_normalize,
     fsw_symbol_png,
     fsw_symbol_svg,
@@ -164,6 +174,13 @@ def test_fsw_sign_png():
     assert len(png) > 0
 
 
+@pytest.mark.parametrize("mode, color", [("gray", 4), ("bilevel", 0), ("palette", 3)])
+def test_fsw_sign_png_encoding(mode, color):
+    png = fsw_sign_png("M507x515S10e00492x485", encoding={"mode": mode, "level": 9})
+    assert png[25] == color
+    assert len(png) < len(fsw_sign_png("M507x515S10e00492x485"))
+
+
 def test_fsw_sign_png_invalid():
     png = fsw_sign_png("invalid")
     base64_png = base64.b64encode(png).decode("utf-8")[:45]
@@ -175,6 +192,53 @@ def test_fsw_sign_png_invalid():
     )
 
 
+# -------------------------
+# Sign arrays
+# -------------------------
+
+
+def test_fsw_sign_array():
+    pytest.importorskip("numpy")
+    rgba = fsw_sign_array("M507x515S10e00492x485")
+    assert rgba.dtype.name == "uint8" and rgba.shape[2] == 4
+    assert rgba[..., 3].any()
+    mask = fsw_sign_array("M507x515S10e00492x485", mask=True)
+    assert (mask == rgba[..., 3]).all()
+    symbol = fsw_symbol_array("S10000", {"width": 30})
+    assert symbol.shape[1] == 30
+
+
+def test_fsw_sign_array_canvas():
+    pytest.importorskip("numpy")
+    mask = fsw_sign_array("M507x515S10e00492x485", mask=True)
+    rows, cols = mask.shape
+    centered = fsw_sign_array(
+        "M507x515S10e00492x485", canvas=(cols + 20, rows + 10), mask=True
+    )
+    assert (centered[5 : 5 + rows, 10 : 10 + cols] == mask).all()
+    assert not centered[:5].any() and not centered[:, :10].any()
+    corner = fsw_sign_array(
+        "M507x515S10e00492x485", canvas=(cols + 20, rows + 10), mask=True, center=False
+    )
+    assert (corner[:rows, :cols] == mask).all()
+    small = fsw_sign_array("M507x515S10e00492x485", canvas=(10, 10))
+    assert small.shape == (10, 10, 4) and small[..., 3].any()
+
+
+def test_fsw_signs_array():
+    np = pytest.importorskip("numpy")
+    signs = ["M507x515S10e00492x485", "invalid", "M507x515S10e00492x485-C"]
+    batch = fsw_signs_array(signs, (64, 48))
+    assert batch.shape == (3, 48, 64, 4)
+    assert (batch[0] == fsw_sign_array(signs[0], canvas=(64, 48))).all()
+    assert not batch[1].any()
+    out = np.ones((3, 48, 64), np.uint8)
+    assert fsw_signs_array(signs, (64, 48), mask=True, out=out) is out
+    assert (out == batch[..., 3]).all()
+    with pytest.raises(ValueError):
+        fsw_signs_array(signs, (48, 64), out=out)
+
+
 # -------------------------
 # Column rendering
 # -------------------------
@@ -327,3 +391,201 @@ def test_fsw_columns_svg(fsw_text, options, expected_len):
     assert len(svgs) == expected_len
     for svg in svgs:
         assert svg.startswith("<svg")
+
+
+# -------------------------
+# Lazy columns
+# -------------------------
+
+LONG_TEXT = (
+    "AS14c20S27106M518x529S14c20481x471S27106503x489 "
+    "AS18701S1870aS2e734S20500M518x533S1870a489x515S18701482x490S20500508x496S2e734500x468 "
+    "S38800464x496 "
+) * 4
+
+
+def test_fsw_columns_svg_lazy():
+    cols = fsw_columns_svg_lazy(LONG_TEXT, {"height": 250, "width": 150})
+    assert len(cols) == 4
+    assert cols.widths == [150, 150, 150, 150]
+    assert not any(cols.is_rendered(i) for i in range(len(cols)))
+    assert cols[2].startswith("<svg")
+    assert [cols.is_rendered(i) for i in range(len(cols))] == [
+        False,
+        False,
+        True,
+        False,
+    ]
+    assert list(cols) == fsw_columns_svg(LONG_TEXT, {"height": 250, "width": 150})
+
+
+def test_fsw_columns_svg_lazy_prefetch():
+    with fsw_columns_svg_lazy(
+        LONG_TEXT, {"height": 250, "width": 150}, prefetch=2
+    ) as cols:
+        first = cols[0]
+        assert cols[0] is first
+        assert (
+            cols[1:3] == fsw_columns_svg(LONG_TEXT, {"height": 250, "width": 150})[1:3]
+        )
+        assert cols.is_rendered(1)
+        assert cols.is_rendered(2)
+
+
+def test_fsw_columns_svg_lazy_empty():
+    cols = fsw_columns_svg_lazy("")
+    assert len(cols) == 0
+    with pytest.raises(IndexError):
+        cols[0]
+
+
+def test_fsw_columns_png_lazy():
+    cols = fsw_columns_png_lazy(LONG_TEXT, {"height": 250, "width": 150})
+    assert len(cols) == 4
+    assert cols[-1].startswith(b"\x89PNG")
+
+
+# -------------------------
+# Column document
+# -------------------------
+
+
+def test_fsw_columns_document():
+    doc = fsw_columns_document(LONG_TEXT, {"height": 250, "width": 150})
+    assert len(doc) == 4
+    assert doc.svgs() == fsw_columns_svg(LONG_TEXT, {"height": 250, "width": 150})
+
+
+def test_fsw_columns_document_replace():
+    doc = fsw_columns_document(LONG_TEXT, {"height": 250, "width": 150})
+    svgs = doc.svgs()
+    changed = doc.replace(len(doc.segments) - 2, "S38800464x496")
+    assert changed == [3]
+    assert doc.svgs()[:3] == svgs[:3]
+    assert doc.svg(0) is svgs[0]
+    assert doc.svgs() == fsw_columns_svg(doc.text, {"height": 250, "width": 150})
+
+
+def test_fsw_columns_document_insert_delete():
+    doc = fsw_columns_document(LONG_TEXT, {"height": 250, "width": 150})
+    doc.svgs()
+    sign = doc.segments[0]
+    changed = doc.insert(0, sign)
+    assert 0 in changed
+    assert doc.segments[:2] == [sign, sign]
+    assert doc.svgs() == fsw_columns_svg(doc.text, {"height": 250, "width": 150})
+    doc.delete(0)
+    assert doc.text == LONG_TEXT.strip()
+    assert doc.svgs() == fsw_columns_svg(LONG_TEXT, {"height": 250, "width": 150})
+
+
+def test_fsw_columns_document_invalid_index():
+    doc = fsw_columns_document("")
+    assert len(doc) == 0
+    with pytest.raises(IndexError):
+        doc.delete(0)
+
+
+# -------------------------
+# CSS styling
+# -------------------------
+
+CSS_SIGN = "AS14c20S27106M518x529S14c20481x471S27106503x489"
+
+
+def test_fsw_sign_svg_css():
+    svg = fsw_sign_svg(CSS_SIGN + "-D_red,white_Z2-D02_green_", css=True)
+    assert ".sym-line{fill:red}.css-" in svg and " .sym-fill{fill:white}" in svg
+    assert ".sym-2 .sym-line{fill:green}" in svg
+    assert 'class="sym-line" fill=' not in svg
+    assert '<svg class="sym-1"' in svg and '<svg class="sym-2"' in svg
+
+
+def test_fsw_sign_svg_css_themes_share_symbols():
+    light = fsw_sign_svg(CSS_SIGN + "-D_black_", css=True)
+    dark = fsw_sign_svg(CSS_SIGN + "-D_white_G_black_", css=True)
+    assert light.split('<svg class="sym-1"')[1] == dark.split('<svg class="sym-1"')[1]
+    assert fsw_sign_svg(CSS_SIGN, css=True) == fsw_sign_svg(CSS_SIGN).replace(
+        '<svg x="', '<svg class="sym-1" x="', 1
+    ).replace('<svg x="', '<svg class="sym-2" x="', 1)
+
+
+def test_fsw_sign_svg_css_scoped():
+    red = fsw_sign_svg(CSS_SIGN + "-D_red_", css=True)
+    blue = fsw_sign_svg(CSS_SIGN + "-D_blue_", css=True)
+    document = f"<html><body>{red}{blue}{red}</body></html>"
+    red_scope = re.findall(r'<svg class="(css-[0-9a-f]{8})"', red)
+    blue_scope = re.findall(r'<svg class="(css-[0-9a-f]{8})"', blue)
+    assert len(red_scope) == len(blue_scope) == 1
+    assert red_scope != blue_scope
+    assert re.findall(r"<style>(.*?)</style>", document) == [
+        f".{red_scope[0]} .sym-line{{fill:red}}",
+        f".{blue_scope[0]} .sym-line{{fill:blue}}",
+        f".{red_scope[0]} .sym-line{{fill:red}}",
+    ]
+
+
+def test_fsw_sign_svg_css_colorize():
+    svg = fsw_sign_svg(CSS_SIGN + "-C", css=True)
+    assert ".sym-1 .sym-line{fill:" in svg
+    assert ".sym-2 .sym-line{fill:" in svg
+
+
+def test_fsw_columns_svg_css():
+    text = CSS_SIGN + "-D_red_ " + CSS_SIGN
+    svgs = fsw_columns_svg(text, {"height": 250, "width": 150}, css=True)
+    assert len(svgs) == 1
+    assert ".item-1 .sym-line{fill:red}" in svgs[0]
+    assert ".item-2 .sym-line{fill:black}" in svgs[0]
+    assert '<g class="item-2"' in svgs[0]
+    (scope,) = re.findall(r'^<svg class="(css-[0-9a-f]{8})"', svgs[0])
+    assert f".{scope} .item-1 .sym-line{{fill:red}}" in svgs[0]
+
+
+def test_fsw_sign_svg_lod():
+    svg = fsw_sign_svg(CSS_SIGN + "-D_red_")
+    small = fsw_sign_svg(CSS_SIGN + "-D_red_", lod=2)
+    assert len(small) < len(svg)
+    assert small.split("<g", 1)[0] == svg.split("<g", 1)[0]
+    assert small.count('class="sym-line" fill="red"') == 2
+    assert all("c" not in d.split('"')[0] for d in small.split(' d="')[1:])
+
+
+def test_fsw_svg_compact():
+    svg = fsw_sign_svg(CSS_SIGN + "-D_red_")
+    compact = fsw_sign_svg(CSS_SIGN + "-D_red_", compact=True)
+    assert len(compact) < len(svg)
+    assert "\n" not in compact and "<text" not in compact
+    assert "<svg x=" not in compact and compact.count("<svg") == 1
+    assert compact.count('class="sym-line" fill="red"') == 2
+    rounded = fsw_sign_svg(CSS_SIGN, compact=True, precision=1)
+    assert "translate(481.2,501.8)" in rounded
+    assert "<text" not in fsw_symbol_svg("S10000", compact=True)
+    text = CSS_SIGN + " S38800464x496"
+    (column,) = fsw_columns_svg(text, {"height": 250, "width": 150}, compact=True)
+    assert column.count("<g") == 5 and "<svg x=" not in column
+
+
+def test_fsw_sign_display_list():
+    display = fsw_sign_display_list(CSS_SIGN + "-CP05D_red_Z2-D02_blue,yellow_")
+    assert display.box == (952, 932, 94, 136)
+    assert [item.symbol for item in display.items] == ["S14c20", "S27106"]
+    assert display.items[0][1:] == (962, 942, "#0000CC", "white", 2)
+    assert display.items[1][1:] == (1006, 978, "blue", "yellow", 2)
+    assert fsw_sign_display_list("junk") is None
+
+
+def test_fsw_columns_display_list():
+    text = CSS_SIGN + " S38800464x496-D_red_"
+    options = {"height": 250, "width": 150, "style": {"zoom": 0.5}}
+    (column,) = fsw_columns_display_list(text, options)
+    assert column.box == (0, 0, 150, 250)
+    assert [item.symbol for item in column.items] == ["S14c20", "S27106", "S38800"]
+    # The first symbol is at the top left of its sign, the second is placed
+    # at half its offset within the sign
+    sign, punctuation = fsw_columns(text, options)["columns"][0]
+    first, second, third = column.items
+    assert (first.x, first.y) == (sign["x"], sign["y"])
+    assert (second.x - first.x, second.y - first.y) == (11, 9)
+    assert (third.x, third.y) == (punctuation["x"], punctuation["y"])
+    assert third[3:] == ("red", "white", 0.5)
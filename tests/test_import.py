@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+import pytest
+
+import sutton_signwriting_font
+
+
+def run(code):
+    return subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def test_import_does_not_load_submodules():
+    code = (
+        "import sys, sutton_signwriting_font; "
+        "print(sorted(m for m in sys.modules if m.startswith('sutton_signwriting_font.')))"
+    )
+    assert run(code) == "[]"
+
+
+def test_svg_render_does_not_load_cairosvg():
+    code = (
+        "import sys, sutton_signwriting_font as font; "
+        "font.fsw_sign_svg('M525x535S2e748483x510S10011501x466'); "
+        "print('cairosvg' in sys.modules)"
+    )
+    assert run(code) == "False"
+
+
+def test_public_names_resolve():
+    for name in sutton_signwriting_font.__all__:
+        assert getattr(sutton_signwriting_font, name) is not None
+    assert "fsw_sign_svg" in dir(sutton_signwriting_font)
+
+
+def test_unknown_name():
+    with pytest.raises(AttributeError):
+        sutton_signwriting_font.fsw_unknown
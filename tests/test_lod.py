@@ -0,0 +1,54 @@
+import pytest
+
+from sutton_signwriting_font.db import get_symbol_svg
+from sutton_signwriting_font.lod import (
+    LOD_TOLERANCES,
+    get_symbol_svg_lod,
+    lod_level,
+    sign_lod_level,
+    simplify_path,
+    simplify_symbol_svg,
+)
+from sutton_signwriting_font.scan import fsw_scan_sign
+
+
+@pytest.mark.parametrize(
+    "scale, expected", [(2, None), (0.5, 0), (0.25, 1), (0.1, 2), (0.01, 3)]
+)
+def test_lod_level(scale, expected):
+    assert lod_level(scale) == expected
+
+
+def test_sign_lod_level():
+    scan = fsw_scan_sign("M518x529S14c20481x471S27106503x489")
+    assert sign_lod_level(scan) is None
+    assert sign_lod_level(scan, {"width": 37}) is None
+    assert sign_lod_level(scan, {"width": 10}) == 0
+    assert sign_lod_level(scan, {"width": 37, "height": 5}) == 2
+    assert sign_lod_level(scan, zoom=0.1) == 2
+
+
+def test_simplify_path():
+    assert simplify_path("M0 0 l10 0 10 1 10 0 0 10 -30 0z", 2) == (
+        "M0 0l30 1 0 10 -30 0z"
+    )
+    assert simplify_path("M0 0 L10 0 10 10 0 10z", 0.1) == "M0 0l10 0 0 10 -10 0z"
+    # A quarter circle keeps a few corners, close to the curve
+    path = simplify_path("M100 0C100 55 55 100 0 100L0 0z", 1)
+    assert 3 < path.count(" ") // 2 < 12
+
+
+def test_simplify_symbol_svg():
+    svg = get_symbol_svg("S10000")[0]
+    small = simplify_symbol_svg(svg, LOD_TOLERANCES[1])
+    assert len(small) < len(svg)
+    assert small.count("<path") == svg.count("<path")
+    assert small.split(' d="')[0] == svg.split(' d="')[0]
+    assert simplify_symbol_svg("<g></g>", 1) == "<g></g>"
+
+
+def test_get_symbol_svg_lod():
+    sizes = [len(get_symbol_svg_lod("S14c20", level)) for level in range(4)]
+    assert sizes == sorted(sizes, reverse=True)
+    assert get_symbol_svg_lod("S14c20", 0) is get_symbol_svg_lod("S14c20", 0)
+    assert get_symbol_svg_lod("S99999", 0) is None
@@ -0,0 +1,95 @@
+import pytest
+
+from sutton_signwriting_font import raster
+from sutton_signwriting_font.cache import cache_clear
+from sutton_signwriting_font.fsw import (
+    fsw_columns_svg,
+    fsw_sign_png,
+    fsw_sign_svg,
+)
+from sutton_signwriting_font.metrics import (
+    Counter,
+    Histogram,
+    get_metric,
+    metrics_text,
+    register_metric,
+    reset_metrics,
+)
+
+SIGN = "AS14c20S27106M518x529S14c20481x471S27106503x489"
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    reset_metrics()
+    cache_clear()
+    yield
+    reset_metrics()
+
+
+def test_counter_and_histogram_text():
+    counter = Counter("test_total", "Test counter.", ["kind"])
+    counter.inc(kind="a")
+    counter.inc(2, kind='b"')
+    assert counter.samples() == ['test_total{kind="a"} 1', 'test_total{kind="b\\""} 2']
+    with pytest.raises(ValueError):
+        counter.inc(-1, kind="a")
+
+    histogram = Histogram("test_seconds", "Test histogram.", buckets=[0.1, 1])
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+    assert histogram.count() == 3
+    assert histogram.samples() == [
+        'test_seconds_bucket{le="0.1"} 1',
+        'test_seconds_bucket{le="1"} 2',
+        'test_seconds_bucket{le="+Inf"} 3',
+        "test_seconds_sum 5.55",
+        "test_seconds_count 3",
+    ]
+
+
+def test_register_duplicate_metric():
+    with pytest.raises(ValueError):
+        register_metric(Counter("sutton_font_renders_total", "Duplicate."))
+
+
+def test_render_metrics():
+    svg = fsw_sign_svg(SIGN)
+    fsw_sign_svg(SIGN)
+    renders = get_metric("sutton_font_renders_total")
+    assert renders.value(kind="sign", format="svg") == 2
+    assert get_metric("sutton_font_output_bytes_total").value(format="svg") == 2 * len(
+        svg
+    )
+    assert get_metric("sutton_font_db_queries_total").value(query="symbols_info") == 2
+    assert get_metric("sutton_font_db_rows_total").value(query="symbols_info") == 4
+
+
+def test_nested_renders_count_once():
+    fsw_columns_svg(SIGN + " " + SIGN, {"height": 250, "width": 150})
+    renders = get_metric("sutton_font_renders_total")
+    assert renders.value(kind="columns", format="svg") == 1
+    assert renders.value(kind="column", format="svg") == 0
+    assert renders.value(kind="sign", format="svg") == 0
+
+
+def test_png_metrics(monkeypatch):
+    monkeypatch.setattr(raster, "_svg2png", lambda **kwargs: b"png")
+    assert fsw_sign_png(SIGN) == b"png"
+    assert get_metric("sutton_font_renders_total").value(kind="sign", format="png") == 1
+    assert get_metric("sutton_font_output_bytes_total").value(format="png") == 3
+    assert get_metric("sutton_font_rasterize_seconds").count() == 1
+
+
+def test_metrics_text():
+    fsw_sign_svg(SIGN)
+    fsw_sign_svg(SIGN)
+    text = metrics_text()
+    assert "# TYPE sutton_font_renders_total counter\n" in text
+    assert 'sutton_font_renders_total{kind="sign",format="svg"} 2\n' in text
+    assert "# TYPE sutton_font_rasterize_seconds histogram\n" in text
+    assert 'sutton_font_cache_hits_total{cache="fsw_scan_sign"} 1\n' in text
+    assert 'sutton_font_cache_misses_total{cache="fsw_scan_sign"} 1\n' in text
+    assert "# TYPE sutton_font_cache_currsize gauge\n" in text
+    assert text.endswith("\n")
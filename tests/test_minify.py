@@ -0,0 +1,58 @@
+import pytest
+
+from sutton_signwriting_font.minify import minify_path, minify_svg
+
+SYMBOL = (
+    '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="30.0" height="40.0"'
+    ' viewBox="485 480 30 40" preserveAspectRatio="xMidYMid meet">\n'
+    '  <text font-size="0">S10000</text>\n'
+    '  <rect x="485" y="480" width="30" height="40" style="fill:yellow;" />\n'
+    '  <svg class="sym-1" x="490" y="485"><g transform="translate(0.25,30.0)'
+    ' scale(0.0099002518,-0.01)"><path class="sym-line" d="M0 0 l10 -20z"/></g></svg>\n'
+    "</svg>"
+)
+
+
+@pytest.mark.parametrize(
+    "d, precision, expected",
+    [
+        (
+            "M980 2602 l0 -498 -75 -74 c-61 -61 -77 -72 -85 -60z",
+            None,
+            "M980 2602l0-498-75-74c-61-61-77-72-85-60z",
+        ),
+        ("M0 0 l10 -20 z m 5 5 l1 1z", None, "M0 0l10-20zm5 5l1 1z"),
+        ("M0.25 1.5 l-2.04 3.96z", 1, "M0.2 1.5l-2 4z"),
+        ("M0.5 0.5 l1e2 -0.0001z", 2, "M0.5 0.5l100 0z"),
+    ],
+)
+def test_minify_path(d, precision, expected):
+    assert minify_path(d, precision) == expected
+
+
+def test_minify_svg():
+    assert minify_svg(SYMBOL) == (
+        '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="30" height="40"'
+        ' viewBox="485 480 30 40">'
+        '<rect x="485" y="480" width="30" height="40" style="fill:yellow;"/>'
+        '<g class="sym-1" transform="translate(490.25,515) scale(0.0099002518,-0.01)">'
+        '<path class="sym-line" d="M0 0l10-20z"/></g></svg>'
+    )
+    assert 'transform="translate(490.2,515) scale(0.0099,-0.01)"' in minify_svg(
+        SYMBOL, 1
+    )
+
+
+def test_minify_svg_column_groups():
+    column = (
+        '<svg width="150" height="250" viewBox="0 0 150 250">\n'
+        '<g class="item-1" transform="translate(56,20) scale(0.5) translate(-481,-471) ">\n'
+        "</g>\n"
+        '<g transform="translate(39,98) scale(1.0) translate(-464,-496) ">\n'
+        "</g>\n</svg>"
+    )
+    assert minify_svg(column) == (
+        '<svg width="150" height="250" viewBox="0 0 150 250">'
+        '<g class="item-1" transform="translate(-184.5,-215.5) scale(0.5)"></g>'
+        '<g transform="translate(-425,-398)"></g></svg>'
+    )
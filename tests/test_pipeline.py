@@ -0,0 +1,171 @@
+import itertools
+
+import pytest
+
+from sutton_signwriting_core.convert import fsw_to_swu
+
+from sutton_signwriting_font import raster
+from sutton_signwriting_font.fsw import fsw_columns_svg, fsw_sign_svg, fsw_symbol_svg
+from sutton_signwriting_font.pipeline import (
+    RenderItem,
+    RenderPipeline,
+    Stage,
+    default_stages,
+    parse,
+    render_items,
+    resolve,
+)
+from sutton_signwriting_font.swu import swu_sign_svg
+
+SIGNS = [
+    "AS14c20S27106M518x529S14c20481x471S27106503x489",
+    "M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475-C",
+    "AS18701S1870aS2e734S20500M518x533S1870a489x515S18701482x490S20500508x496S2e734500x468",
+]
+TEXT = " ".join(SIGNS) + " S38800464x496"
+
+
+def upper(item):
+    return item._replace(output=item.output.upper())
+
+
+def test_pipeline_matches_render_functions():
+    pipeline = RenderPipeline(default_stages(workers=2))
+    items = list(pipeline.run(render_items(SIGNS * 4)))
+    assert [item.output for item in items] == [fsw_sign_svg(s) for s in SIGNS * 4]
+    assert all(item.error is None for item in items)
+    assert items[0].parsed.spatials[0][0] == "S14c20"
+    assert set(items[0].symbols) == {"S14c20", "S27106"}
+
+    swu = [fsw_to_swu(sign) for sign in SIGNS]
+    assert [item.output for item in pipeline.run(render_items(swu))] == [
+        swu_sign_svg(sign) for sign in swu
+    ]
+
+    symbols = list(pipeline.run(render_items(["S10000", "S2e748-C"], "symbol")))
+    assert [item.output for item in symbols] == [
+        fsw_symbol_svg("S10000"),
+        fsw_symbol_svg("S2e748-C"),
+    ]
+
+    options = {"height": 250, "width": 150}
+    (columns,) = pipeline.run(render_items([TEXT], "columns", options=options))
+    assert columns.output == fsw_columns_svg(TEXT, options)
+    assert len(columns.layout["columns"]) == len(columns.output)
+
+
+def test_pipeline_unordered():
+    pipeline = RenderPipeline(default_stages(workers=4))
+    items = pipeline.run(render_items(SIGNS * 10), ordered=False)
+    assert sorted(item.output for item in items) == sorted(
+        fsw_sign_svg(s) for s in SIGNS * 10
+    )
+
+
+def test_pipeline_custom_stages():
+    def watermark(item):
+        return item._replace(svgs=tuple(svg + "<!-- sample -->" for svg in item.svgs))
+
+    def skip_prefixed(item):
+        return None if item.text.startswith("A") else item
+
+    pipeline = RenderPipeline()
+    pipeline.insert_after("compose", Stage("watermark", watermark))
+    pipeline.insert_before("parse", Stage("skip", skip_prefixed))
+    pipeline.remove("rasterize")
+    pipeline.replace(
+        "encode", Stage("encode", lambda item: item._replace(output=item.svgs[0]))
+    )
+    assert [stage.name for stage in pipeline.stages] == [
+        "skip",
+        "parse",
+        "resolve",
+        "layout",
+        "compose",
+        "watermark",
+        "encode",
+    ]
+    (item,) = pipeline.run(render_items(SIGNS))
+    assert item.output == fsw_sign_svg(SIGNS[1]) + "<!-- sample -->"
+    with pytest.raises(KeyError):
+        pipeline.remove("upload")
+
+
+def test_pipeline_compose_uses_stage_results():
+    def resolve_marked(item):
+        symbols = resolve(item).symbols
+        marked = {**symbols["S14c20"], "svg": '<g id="marker"/>'}
+        return item._replace(symbols={**symbols, "S14c20": marked})
+
+    def parse_shifted(item):
+        if item.kind != "sign":
+            return parse(item)
+        scan = parse(item).parsed
+        spatials = tuple((s, x + 100, y) for s, x, y in scan.spatials)
+        max_ = (scan.max[0] + 100, scan.max[1])
+        return item._replace(parsed=scan._replace(spatials=spatials, max=max_))
+
+    pipeline = RenderPipeline()
+    pipeline.replace("parse", Stage("parse", parse_shifted))
+    pipeline.replace("resolve", Stage("resolve", resolve_marked))
+    (sign,) = pipeline.run(render_items(SIGNS[:1]))
+    assert sign.output.count('<g id="marker"/>') == 1
+    assert '<svg x="581" y="471"><g id="marker"/></svg>' in sign.output
+
+    (symbol,) = pipeline.run(render_items(["S14c20"], "symbol"))
+    assert '<g id="marker"/>' in symbol.output
+
+    (columns,) = pipeline.run(render_items([SIGNS[0]], "columns"))
+    assert '<g id="marker"/>' in columns.output[0]
+
+
+def test_pipeline_errors():
+    def fail_on_colors(item):
+        if item.text.endswith("-C"):
+            raise ValueError("colors not allowed")
+        return item
+
+    pipeline = RenderPipeline()
+    pipeline.insert_before("compose", Stage("check", fail_on_colors))
+    items = list(pipeline.run(render_items(SIGNS)))
+    assert isinstance(items[1].error, ValueError)
+    assert items[1].svgs == () and items[1].output is None
+    assert items[0].output == fsw_sign_svg(SIGNS[0])
+    assert items[2].output == fsw_sign_svg(SIGNS[2])
+
+    def broken_input():
+        yield RenderItem(SIGNS[0])
+        raise OSError("input closed")
+
+    with pytest.raises(OSError):
+        list(pipeline.run(broken_input()))
+
+
+def test_pipeline_png(monkeypatch):
+    monkeypatch.setattr(raster, "_svg2png", lambda **kwargs: b"PNG")
+    pipeline = RenderPipeline(default_stages(rasterize_workers=2))
+    (png,) = pipeline.run(render_items(SIGNS[:1], format="png"))
+    assert png.output == b"PNG"
+    (url,) = pipeline.run(render_items(SIGNS[:1], format="data_url"))
+    assert url.output == "data:image/png;base64,UE5H"
+
+
+def test_pipeline_process_stage():
+    pipeline = RenderPipeline()
+    pipeline.stages.append(Stage("upper", upper, workers=2, processes=True))
+    items = list(pipeline.run(render_items(SIGNS)))
+    assert [item.output for item in items] == [fsw_sign_svg(s).upper() for s in SIGNS]
+
+
+def test_pipeline_reads_input_lazily():
+    read = itertools.count()
+
+    def endless():
+        for _ in read:
+            yield RenderItem(SIGNS[0])
+
+    stages = [stage._replace(queue_size=2) for stage in default_stages()]
+    results = RenderPipeline(stages).run(endless())
+    assert len(list(itertools.islice(results, 3))) == 3
+    results.close()
+    assert next(read) < 50
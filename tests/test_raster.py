@@ -0,0 +1,123 @@
+import struct
+import zlib
+
+import pytest
+
+from sutton_signwriting_font import raster
+from sutton_signwriting_font.raster import encode_png, png_data_url
+
+WIDTH, HEIGHT = 5, 3
+# Transparent, black, white, half transparent black and red pixels
+PIXELS = [
+    (0, 0, 0, 0),
+    (0, 0, 0, 255),
+    (255, 255, 255, 255),
+    (0, 0, 0, 128),
+    (255, 0, 0, 255),
+]
+RGBA = bytes(value for _ in range(HEIGHT) for pixel in PIXELS for value in pixel)
+NOISE = bytes((i * 7919) % 251 for i in range(37 * 11 * 4))
+
+
+def read_png(png):
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    chunks = {}
+    position = 8
+    while position < len(png):
+        (length,) = struct.unpack(">I", png[position : position + 4])
+        kind = png[position + 4 : position + 8]
+        data = png[position + 8 : position + 8 + length]
+        (crc,) = struct.unpack(
+            ">I", png[position + 8 + length : position + 12 + length]
+        )
+        assert crc == zlib.crc32(kind + data)
+        chunks[kind] = chunks.get(kind, b"") + data
+        position += 12 + length
+    width, height, depth, color = struct.unpack(">IIBB", chunks[b"IHDR"][:10])
+    return width, height, depth, color, chunks
+
+
+def read_rows(png, step, row_size):
+    *_, chunks = read_png(png)
+    data = zlib.decompress(chunks[b"IDAT"])
+    rows = []
+    previous = bytes(row_size)
+    for start in range(0, len(data), row_size + 1):
+        kind, row = data[start], bytearray(data[start + 1 : start + 1 + row_size])
+        for i in range(row_size):
+            if kind == 1:
+                row[i] = (row[i] + (row[i - step] if i >= step else 0)) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + previous[i]) & 0xFF
+        rows.append(bytes(row))
+        previous = row
+    return rows
+
+
+@pytest.mark.parametrize("filter", ["none", "sub", "up"])
+def test_encode_png_rgba(filter):
+    png = encode_png(RGBA, WIDTH, HEIGHT, {"filter": filter, "level": 9})
+    assert read_png(png)[:4] == (WIDTH, HEIGHT, 8, 6)
+    assert b"".join(read_rows(png, 4, WIDTH * 4)) == RGBA
+
+
+@pytest.mark.parametrize("filter", ["sub", "up"])
+def test_encode_png_filter_noise(filter):
+    png = encode_png(NOISE, 37, 11, {"filter": filter})
+    assert b"".join(read_rows(png, 4, 37 * 4)) == NOISE
+
+
+@pytest.mark.parametrize("mode", ["rgba", "gray", "bilevel", "palette"])
+@pytest.mark.parametrize("filter", ["none", "sub", "up"])
+def test_encode_png_numpy_matches_standard_library(monkeypatch, mode, filter):
+    pytest.importorskip("numpy")
+    options = {"mode": mode, "filter": filter}
+    images = [(RGBA, WIDTH, HEIGHT), (NOISE, 37, 11)]
+    expected = [encode_png(*image, options) for image in images]
+    monkeypatch.setattr(raster, "_optional_numpy", lambda: None)
+    assert [encode_png(*image, options) for image in images] == expected
+
+
+def test_encode_png_gray():
+    png = encode_png(RGBA, WIDTH, HEIGHT, {"mode": "gray", "strategy": "rle"})
+    assert read_png(png)[:4] == (WIDTH, HEIGHT, 8, 4)
+    row = read_rows(png, 2, WIDTH * 2)[0]
+    assert row == bytes([0, 0, 0, 255, 255, 255, 0, 128, 76, 255])
+
+
+def test_encode_png_bilevel():
+    png = encode_png(RGBA, WIDTH, HEIGHT, {"mode": "bilevel"})
+    *header, chunks = read_png(png)
+    assert header == [WIDTH, HEIGHT, 1, 0]
+    assert chunks[b"tRNS"] == b"\x00\x01"
+    # Black for dark, mostly opaque pixels, transparent white for the rest,
+    # with the row padded to a byte
+    assert read_rows(png, 1, 1) == [bytes([0b10100111])] * HEIGHT
+
+
+def test_encode_png_palette():
+    png = encode_png(RGBA, WIDTH, HEIGHT, {"mode": "palette", "level": 1})
+    *header, chunks = read_png(png)
+    assert header == [WIDTH, HEIGHT, 8, 3]
+    palette = [chunks[b"PLTE"][i : i + 3] for i in range(0, len(chunks[b"PLTE"]), 3)]
+    alphas = chunks[b"tRNS"].ljust(len(palette), b"\xff")
+    indexes = read_rows(png, 1, WIDTH)[0]
+    assert [tuple(palette[i] + alphas[i : i + 1]) for i in indexes] == PIXELS
+
+    noise = bytes((i * 7919) % 251 for i in range(64 * 64 * 4))
+    *header, chunks = read_png(encode_png(noise, 64, 64, {"mode": "palette"}))
+    assert len(chunks[b"PLTE"]) <= 256 * 3
+
+
+def test_encode_png_invalid():
+    with pytest.raises(ValueError):
+        encode_png(RGBA, WIDTH, HEIGHT, {"mode": "cmyk"})
+    with pytest.raises(ValueError):
+        encode_png(RGBA, WIDTH, HEIGHT, {"filter": "paeth"})
+    with pytest.raises(ValueError):
+        encode_png(RGBA, WIDTH + 1, HEIGHT)
+
+
+def test_png_data_url():
+    png = encode_png(RGBA, WIDTH, HEIGHT, {"mode": "gray"})
+    assert png_data_url(png).startswith("data:image/png;base64,iVBORw0KGgo")
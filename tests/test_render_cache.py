@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from sutton_signwriting_font.cache import cache_info
+from sutton_signwriting_font.fsw import fsw_sign_svg
+from sutton_signwriting_font.metrics import get_metric, reset_metrics
+from sutton_signwriting_font.render_cache import (
+    AsyncSingleFlight,
+    RenderCache,
+    SingleFlight,
+)
+
+SIGN = "AS14c20S27106M518x529S14c20481x471S27106503x489"
+
+
+class SlowRender:
+    def __init__(self, delay=0.1, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, text, scale=None):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return f"{text}:{scale}"
+
+
+def run_threads(count, target):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as error:
+            results[i] = error
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_render_cache_coalesces_threads():
+    reset_metrics()
+    render = SlowRender()
+    renders = RenderCache(name="test_threads")
+    results = run_threads(8, lambda: renders.render(render, "a", {"width": 10}))
+    assert render.calls == 1
+    assert results == ["a:{'width': 10}"] * 8
+    assert get_metric("sutton_font_coalesced_total").value(cache="test_threads") == 7
+    # Finished renders are served from the cache.
+    assert renders.render(render, "a", {"width": 10}) == results[0]
+    assert renders.render(render, "b") == "b:None"
+    assert render.calls == 2
+    assert cache_info()["test_threads"].currsize == 2
+
+
+def test_render_cache_renders_fsw_sign():
+    renders = RenderCache(name="test_sign")
+    assert renders.render(fsw_sign_svg, SIGN) == fsw_sign_svg(SIGN)
+    assert renders.render(fsw_sign_svg, SIGN, css=True) == fsw_sign_svg(SIGN, True)
+    assert cache_info()["test_sign"].currsize == 2
+
+
+def test_render_cache_keeps_number_types():
+    renders = RenderCache(name="test_number_types")
+    results = [
+        renders.render(SlowRender(0), "a", {"zoom": zoom}) for zoom in (1, 1.0, True)
+    ]
+    assert results == ["a:{'zoom': 1}", "a:{'zoom': 1.0}", "a:{'zoom': True}"]
+    assert cache_info()["test_number_types"].currsize == 3
+
+
+def test_single_flight_propagates_errors():
+    render = SlowRender(error=ValueError("bad sign"))
+    flight = SingleFlight()
+    results = run_threads(4, lambda: flight.do("a", lambda: render("a")))
+    assert render.calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.in_flight() == 0
+    # Errors are not cached.
+    with pytest.raises(ValueError):
+        flight.do("a", lambda: render("a"))
+    assert render.calls == 2
+
+
+def test_single_flight_timeout():
+    render = SlowRender(delay=0.3)
+    flight = SingleFlight()
+    leader = threading.Thread(target=flight.do, args=("a", lambda: render("a")))
+    leader.start()
+    time.sleep(0.05)
+    with pytest.raises(TimeoutError):
+        flight.do("a", lambda: render("a"), timeout=0.01)
+    leader.join()
+    assert render.calls == 1
+
+
+def test_render_cache_leader_rechecks_cache(monkeypatch):
+    render = SlowRender(delay=0)
+    renders = RenderCache(name="test_recheck")
+    assert renders.render(render, "a") == "a:None"
+    # Callers that missed the cache just before the first render was stored,
+    # then found it when leading their own call.
+    lookup = renders.cache.lookup
+    misses = iter([(False, None), None, (False, None)])
+    monkeypatch.setattr(
+        renders.cache, "lookup", lambda key: next(misses, None) or lookup(key)
+    )
+    assert renders.render(render, "a") == "a:None"
+    assert asyncio.run(renders.render_async(render, "a")) == "a:None"
+    assert render.calls == 1
+
+
+def test_render_cache_coalesces_tasks():
+    render = SlowRender()
+    renders = RenderCache(name="test_tasks")
+
+    async def main():
+        return await asyncio.gather(
+            *(renders.render_async(render, "a") for _ in range(8))
+        )
+
+    assert asyncio.run(main()) == ["a:None"] * 8
+    assert render.calls == 1
+    assert renders.render(render, "a") == "a:None"
+    assert render.calls == 1
+
+
+def test_render_cache_async_timeout_and_errors():
+    render = SlowRender(delay=0.2)
+    renders = RenderCache(timeout=0.01, name="test_timeout")
+
+    async def main():
+        with pytest.raises(TimeoutError):
+            await renders.render_async(render, "a")
+        # The render goes on for the other callers.
+        await asyncio.sleep(0.3)
+
+    asyncio.run(main())
+    assert render.calls == 1
+    assert renders.render(render, "a") == "a:None"
+
+    failing = SlowRender(delay=0.01, error=KeyError("S99999"))
+    flight = AsyncSingleFlight()
+
+    async def call():
+        return await flight.do("a", lambda: asyncio.to_thread(failing, "a"))
+
+    async def fail():
+        return await asyncio.gather(call(), call(), return_exceptions=True)
+
+    results = asyncio.run(fail())
+    assert failing.calls == 1
+    assert all(isinstance(result, KeyError) for result in results)
+    assert flight.in_flight() == 0
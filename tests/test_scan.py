@@ -0,0 +1,120 @@
+import pytest
+
+from sutton_signwriting_core.fsw import fsw_parse_sign
+from sutton_signwriting_core.swu import swu_parse_sign
+
+from sutton_signwriting_font.scan import SignScan, fsw_scan_sign, swu_scan_sign
+
+
+def as_scan(parsed):
+    if not parsed:
+        return None
+    return SignScan(
+        tuple(parsed.get("sequence", [])),
+        parsed["box"],
+        tuple(parsed["max"]),
+        tuple((s["symbol"], *s["coord"]) for s in parsed.get("spatials", [])),
+        parsed.get("style", ""),
+    )
+
+
+FSW_SIGNS = [
+    "AS10011S10019S2e704S2e748M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475",
+    "M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475-CP10G_blue_D_red,Cyan_",
+    "AS14c20S27106L518x529S14c20481x471S27106503x489-P10Z2-D01_red_",
+    "M500x500",
+    "M500x500S10000500x500-garbage",
+    "AS00000M500x500",
+    "M500x50",
+    "AM500x500",
+    "M500x500S1000g500x500",
+    "S10000500x500",
+    "invalid",
+    "",
+]
+
+SWU_SIGNS = [
+    "𝠀񀀒񀀚񋚥񋛩𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭",
+    "𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭-CP10G_blue_D_red,Cyan_",
+    "𝠃𝤆𝤆",
+    "𝠀𝠃𝤆𝤆",
+    "񀀁𝤆𝤆",
+    "invalid",
+    "",
+]
+
+
+@pytest.mark.parametrize("fsw_sign", FSW_SIGNS)
+def test_fsw_scan_sign_matches_parse(fsw_sign):
+    assert fsw_scan_sign(fsw_sign) == as_scan(fsw_parse_sign(fsw_sign))
+
+
+@pytest.mark.parametrize("swu_sign", SWU_SIGNS)
+def test_swu_scan_sign_matches_parse(swu_sign):
+    assert swu_scan_sign(swu_sign) == as_scan(swu_parse_sign(swu_sign))
+
+
+def test_fsw_scan_sign_fields():
+    scan = fsw_scan_sign("AS10011S10019M525x535S10011501x466S10019476x475-C")
+    assert scan.sequence == ("S10011", "S10019")
+    assert scan.box == "M"
+    assert scan.max == (525, 535)
+    assert scan.spatials == (("S10011", 501, 466), ("S10019", 476, 475))
+    assert scan.style == "-C"
+
+
+@pytest.mark.parametrize(
+    "fsw_sign",
+    [
+        "AS10011S10019S2e704S2e748M525x535S2e748483x510S10011501x466S2e704510x500S10019476x475",
+        "M525x535S2e748483x510S10011501x466-C",
+        "M500x500",
+    ],
+)
+def test_fsw_scan_sign_fast(fsw_sign):
+    assert fsw_scan_sign(fsw_sign, strict=False) == fsw_scan_sign(fsw_sign)
+
+
+@pytest.mark.parametrize(
+    "swu_sign",
+    [
+        "𝠀񀀒񀀚񋚥񋛩𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭",
+        "𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤-C",
+        "𝠃𝤆𝤆",
+    ],
+)
+def test_swu_scan_sign_fast(swu_sign):
+    assert swu_scan_sign(swu_sign, strict=False) == swu_scan_sign(swu_sign)
+
+
+@pytest.mark.parametrize(
+    "fsw_sign",
+    [
+        "M500x50",
+        "AM500x500",
+        "Mabcx500",
+        "",
+        "S10000",
+        "M5_0x500",
+        "M+10x500",
+        "M 10x500",
+        "M-10x500",
+        "M500x5\u0665\u0660",
+        "M525x535S10011+01x466",
+        "M525x535S10011501x4_6",
+        "M525x535S10011501x 66",
+    ],
+)
+def test_fsw_scan_sign_fast_invalid(fsw_sign):
+    assert fsw_scan_sign(fsw_sign, strict=False) is None
+
+
+def test_fsw_scan_sign_fast_style_unchecked():
+    scan = fsw_scan_sign("M500x500S10000500x500-garbage", strict=False)
+    assert scan.style == "-garbage"
+    assert fsw_scan_sign("M500x500S10000500x500-garbage").style == "-"
+
+
+@pytest.mark.parametrize("swu_sign", ["𝠃𝤆", "𝠀𝠃𝤆𝤆", "", "񀀁𝤆𝤆"])
+def test_swu_scan_sign_fast_invalid(swu_sign):
+    assert swu_scan_sign(swu_sign, strict=False) is None
@@ -0,0 +1,149 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from sutton_signwriting_core.convert import fsw_to_swu
+
+from sutton_signwriting_font.fsw import fsw_columns_svg, fsw_sign_svg
+from sutton_signwriting_font.scheduler import (
+    PriorityClass,
+    RenderScheduler,
+    estimate_cost,
+)
+
+SIGN = "AS14c20S27106M518x529S14c20481x471S27106503x489"
+TEXT = f"{SIGN} S38800464x496 {SIGN}"
+
+
+class Gate:
+    """A job that blocks until released and records the order of calls."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.order = []
+        self.running = 0
+        self.max_running = 0
+
+    def __call__(self, name):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        self.release.wait(5)
+        with self.lock:
+            self.running -= 1
+            self.order.append(name)
+        return name
+
+
+def test_estimate_cost():
+    assert estimate_cost("sign", "svg", SIGN) == 2
+    assert estimate_cost("sign", "svg", fsw_to_swu(SIGN)) == 2
+    assert estimate_cost("symbol", "svg", "S10000") == 1
+    assert estimate_cost("sign", "png", SIGN, {"width": 100}) == 6
+    assert estimate_cost("sign", "png", SIGN) == 4
+    assert estimate_cost("columns", "png", TEXT, {"width": 150}) == 10
+
+
+def test_render_jobs():
+    with RenderScheduler(workers=2) as scheduler:
+        sign = scheduler.render("sign", "svg", SIGN)
+        swu = scheduler.render("sign", "svg", fsw_to_swu(SIGN), priority="bulk")
+        columns = scheduler.render("columns", "svg", TEXT, {"width": 150})
+        assert sign.result() == fsw_sign_svg(SIGN)
+        assert swu.result().startswith("<svg")
+        assert columns.result() == fsw_columns_svg(TEXT, {"width": 150})
+    with pytest.raises(ValueError):
+        scheduler.render("page", "svg", SIGN)
+
+
+def test_bulk_leaves_workers_for_interactive():
+    gate = Gate()
+    scheduler = RenderScheduler(workers=3)
+    bulk = [scheduler.submit(gate, f"bulk{i}", priority="bulk") for i in range(6)]
+    deadline = time.monotonic() + 5
+    while scheduler.info()["bulk"].running < 2:
+        assert time.monotonic() < deadline, "bulk jobs did not start"
+        time.sleep(0.01)
+    interactive = scheduler.submit(lambda: "page")
+    # The free worker runs the interactive job while bulk jobs are blocked.
+    assert interactive.result(timeout=5) == "page"
+    # The worker counts the job as completed just after setting its result.
+    deadline = time.monotonic() + 5
+    while scheduler.info()["interactive"].completed == 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    info = scheduler.info()
+    assert info["bulk"].running == 2
+    assert info["bulk"].queued == 4
+    assert info["interactive"].completed == 1
+    gate.release.set()
+    assert [future.result(timeout=5) for future in bulk] == [
+        f"bulk{i}" for i in range(6)
+    ]
+    assert gate.max_running == 2
+    scheduler.shutdown()
+
+
+def test_interactive_jobs_run_before_queued_bulk_jobs():
+    gate = Gate()
+    first = threading.Event()
+    with RenderScheduler(workers=1) as scheduler:
+        scheduler.submit(first.wait, 5)
+        scheduler.submit(gate, "bulk", priority="bulk")
+        scheduler.submit(gate, "page")
+        first.set()
+        gate.release.set()
+    assert gate.order == ["page", "bulk"]
+
+
+def test_cheap_jobs_overtake_expensive_jobs():
+    gate = Gate()
+    gate.release.set()
+    start = threading.Event()
+    with RenderScheduler(workers=1) as scheduler:
+        scheduler.submit(start.wait, 5)
+        scheduler.submit(gate, "export", cost=10000)
+        scheduler.submit(gate, "sign", cost=2)
+        start.set()
+    assert gate.order == ["sign", "export"]
+
+
+def test_full_queue_applies_backpressure():
+    gate = Gate()
+    classes = [PriorityClass("interactive", queue_size=1)]
+    scheduler = RenderScheduler(workers=1, classes=classes)
+    scheduler.submit(gate, "running")
+    while scheduler.info()["interactive"].running == 0:
+        pass
+    scheduler.submit(gate, "queued")
+    with pytest.raises(queue.Full):
+        scheduler.submit(gate, "rejected", block=False)
+    with pytest.raises(queue.Full):
+        scheduler.submit(gate, "rejected", timeout=0.01)
+    gate.release.set()
+    assert scheduler.submit(gate, "accepted").result(timeout=5) == "accepted"
+    scheduler.shutdown()
+    with pytest.raises(RuntimeError):
+        scheduler.submit(gate, "late")
+
+
+def test_errors_and_cancellation():
+    def fail():
+        raise KeyError("S99999")
+
+    gate = Gate()
+    scheduler = RenderScheduler(workers=1)
+    with pytest.raises(KeyError):
+        scheduler.submit(fail).result(timeout=5)
+    running = scheduler.submit(gate, "running")
+    while scheduler.info()["interactive"].running == 0:
+        pass
+    queued = scheduler.submit(gate, "queued")
+    scheduler.shutdown(wait=False, cancel_pending=True)
+    assert queued.cancelled()
+    gate.release.set()
+    scheduler.shutdown()
+    assert running.result() == "running"
@@ -0,0 +1,241 @@
+import asyncio
+import http.client
+import json
+import threading
+import time
+from urllib.parse import quote
+
+import pytest
+
+from sutton_signwriting_core.convert import fsw_to_swu
+
+from sutton_signwriting_font import fsw, raster
+from sutton_signwriting_font.fsw import fsw_columns_svg, fsw_sign_svg, fsw_symbol_svg
+from sutton_signwriting_font.render_cache import DiskCache
+from sutton_signwriting_font.server import (
+    RenderRequest,
+    RenderServer,
+    etag_matches,
+    make_etag,
+)
+from sutton_signwriting_font.swu import swu_sign_svg
+
+SIGN = "AS14c20S27106M518x529S14c20481x471S27106503x489"
+TEXT = f"{SIGN} S38800464x496 {SIGN}"
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    monkeypatch.setattr(raster, "_svg2png", lambda **kwargs: b"PNG")
+    servers = []
+
+    def start(**kwargs):
+        server = RenderServer(port=0, **kwargs)
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        async def main():
+            await server.start()
+            ready.set()
+            await server.serve_forever()
+
+        thread = threading.Thread(target=loop.run_until_complete, args=(main(),))
+        thread.start()
+        assert ready.wait(5)
+        servers.append((server, loop, thread))
+        return server
+
+    yield start
+    for server, loop, thread in servers:
+        server.stop()
+        thread.join(10)
+        loop.close()
+
+
+def get(server, path, headers=None, method="GET", body=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+    connection.request(method, path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response, data
+
+
+def test_etag_matches():
+    etag = make_etag(b"<svg></svg>")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches("", etag)
+
+
+def test_render_and_revalidate(serve):
+    server = serve()
+    response, body = get(server, f"/fsw/sign.svg?text={SIGN}")
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "image/svg+xml"
+    assert body.decode() == fsw_sign_svg(SIGN)
+    etag = response.getheader("ETag")
+    assert etag == make_etag(body)
+    assert "max-age" in response.getheader("Cache-Control")
+
+    response, body = get(server, f"/fsw/sign.svg?text={SIGN}", {"If-None-Match": etag})
+    assert response.status == 304 and body == b""
+    assert response.getheader("ETag") == etag
+
+    swu = fsw_to_swu(SIGN)
+    response, body = get(server, "/swu/sign.svg?css=1&text=" + quote(swu))
+    assert body.decode() == swu_sign_svg(swu, True)
+    response, body = get(server, "/fsw/symbol.svg?text=S10000")
+    assert body.decode() == fsw_symbol_svg("S10000")
+
+
+def test_columns_png_and_head(serve):
+    server = serve()
+    path = f"/fsw/columns.svg?width=150&height=250&text={quote(TEXT)}"
+    response, body = get(server, path)
+    svgs = fsw_columns_svg(TEXT, {"width": 150, "height": 250})
+    assert body.decode() == svgs[0]
+    assert response.getheader("X-Column-Count") == str(len(svgs))
+    response, _ = get(server, path + f"&column={len(svgs)}")
+    assert response.status == 404
+
+    response, body = get(server, f"/fsw/sign.png?width=100&text={SIGN}")
+    assert response.status == 200 and body == b"PNG"
+    assert response.getheader("Content-Type") == "image/png"
+    response, body = get(server, f"/fsw/sign.png?text={SIGN}", method="HEAD")
+    assert body == b"" and response.getheader("Content-Length") == "3"
+
+
+def test_columns_rendered_once(serve, monkeypatch):
+    calls = []
+
+    def columns_svg(*args):
+        calls.append(args)
+        return fsw_columns_svg(*args)
+
+    monkeypatch.setattr(fsw, "fsw_columns_svg", columns_svg)
+    server = serve()
+    path = f"/fsw/columns.svg?width=150&height=100&text={quote(TEXT)}"
+    svgs = fsw_columns_svg(TEXT, {"width": 150, "height": 100})
+    assert len(svgs) > 1
+    for column, svg in enumerate(svgs):
+        response, body = get(server, path + f"&column={column}")
+        assert body.decode() == svg
+    response, body = get(server, path.replace(".svg", ".png") + "&column=1")
+    assert response.status == 200 and body == b"PNG"
+    assert len(calls) == 1
+
+
+def test_errors(serve):
+    server = serve()
+    assert get(server, f"/fsw/page.svg?text={SIGN}")[0].status == 404
+    assert get(server, "/fsw/sign.svg")[0].status == 400
+    assert get(server, f"/fsw/sign.png?width=x&text={SIGN}")[0].status == 400
+    assert get(server, "/batch")[0].status == 405
+    assert get(server, "/fsw/sign.svg", method="DELETE")[0].status == 405
+    assert get(server, "/healthz")[0].status == 200
+    response, body = get(server, "/metrics")
+    assert b"sutton_font_renders_total" in body
+
+
+def test_batch(serve):
+    server = serve()
+    request = {
+        "items": [SIGN, fsw_to_swu(SIGN), {"text": SIGN, "format": "png"}, {}],
+        "kind": "sign",
+    }
+    response, body = get(server, "/batch", method="POST", body=json.dumps(request))
+    assert response.status == 200
+    items = json.loads(body)["items"]
+    assert items[0]["svg"] == fsw_sign_svg(SIGN)
+    assert items[0]["etag"] == make_etag(fsw_sign_svg(SIGN).encode())
+    assert items[1]["svg"] == swu_sign_svg(fsw_to_swu(SIGN))
+    assert items[2]["png"] == "UE5H"
+    assert items[3] == {"error": "text is required"}
+    response, _ = get(server, "/batch", method="POST", body="[]")
+    assert response.status == 400
+
+
+def test_render_failure(serve, monkeypatch):
+    def fail(**kwargs):
+        raise RuntimeError("no surface")
+
+    server = serve()
+    monkeypatch.setattr(raster, "_svg2png", fail)
+    response, body = get(server, f"/fsw/sign.png?text={SIGN}")
+    assert response.status == 500
+    assert b"no surface" in body
+    request = {"items": [SIGN, {"text": SIGN, "format": "png"}]}
+    response, body = get(server, "/batch", method="POST", body=json.dumps(request))
+    assert response.status == 200
+    items = json.loads(body)["items"]
+    assert items[0]["svg"] == fsw_sign_svg(SIGN)
+    assert "no surface" in items[1]["error"]
+
+
+def test_disk_cache(serve, tmp_path):
+    server = serve(cache_dir=str(tmp_path))
+    path = f"/fsw/columns.svg?width=150&height=250&text={quote(TEXT)}"
+    response, body = get(server, path)
+    assert len(list(tmp_path.rglob("*"))) == 2
+    # A new server answers from the disk cache without rendering.
+    restarted = serve(cache_dir=str(tmp_path))
+    restarted.executor.shutdown()
+    response2, body2 = get(restarted, path)
+    assert body2 == body
+    assert response2.getheader("ETag") == response.getheader("ETag")
+    assert response2.getheader("X-Column-Count") == response.getheader("X-Column-Count")
+    assert restarted.renders.cache.info().currsize == 1
+
+
+def test_archive_cache(serve, tmp_path):
+    server = serve(cache_dir=str(tmp_path / "cache.sswa"))
+    response, body = get(server, f"/fsw/sign.svg?text={SIGN}")
+    key = RenderRequest("fsw", "sign", "svg", SIGN).key()
+    assert server.disk.get(key) == b"1\n" + body
+
+
+def test_disk_cache_prunes(tmp_path):
+    disk = DiskCache(str(tmp_path), max_bytes=250)
+    for i in range(5):
+        disk.put(f"key{i}", bytes(100))
+        time.sleep(0.01)
+    assert disk.get("key0") is None
+    assert disk.get("key4") == bytes(100)
+    assert sum(p.stat().st_size for p in tmp_path.rglob("*") if p.is_file()) <= 250
+    disk.clear()
+    assert disk.get("key4") is None
+
+
+def test_graceful_shutdown(serve):
+    server = serve()
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+    connection.request("GET", f"/fsw/sign.svg?text={SIGN}")
+    assert connection.getresponse().read()
+    server.stop()
+    server.grace = 5
+    # The idle keep-alive connection is closed by the shutdown.
+    time.sleep(0.2)
+    with pytest.raises((http.client.HTTPException, ConnectionError)):
+        connection.request("GET", f"/fsw/sign.svg?text={SIGN}")
+        connection.getresponse()
+
+
+def test_close_does_not_block_the_loop():
+    release = threading.Event()
+
+    async def main():
+        server = RenderServer(port=0, workers=1)
+        await server.start()
+        job = server.executor.submit(release.wait, 5)
+        closing = asyncio.ensure_future(server.close())
+        await asyncio.sleep(0.1)
+        # The loop keeps running while close waits for the busy worker.
+        assert not closing.done()
+        release.set()
+        await asyncio.wait_for(closing, 5)
+        assert job.result() is True
+
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+import struct
+import subprocess
+import sys
+import uuid
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+
+from sutton_signwriting_font.db import (
+    get_symbol_size,
+    get_symbol_svg,
+    get_symbols_info,
+    symbol_store_loaded,
+)
+from sutton_signwriting_font.shared import (
+    SHARED_FORMAT,
+    attach_symbol_store,
+    detach_symbol_store,
+    publish_symbol_store,
+)
+
+KEYS = ["S10000", "S14c20", "S27106", "S38800", "S99999"]
+
+
+@pytest.fixture
+def name():
+    return f"sutton_font_test_{uuid.uuid4().hex[:8]}"
+
+
+@pytest.fixture
+def published(name):
+    yield publish_symbol_store(name)
+    detach_symbol_store()
+
+
+def run(code):
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+
+def test_published_store_matches_database(published):
+    assert symbol_store_loaded()
+    assert len(published) > 30000
+    assert "S14c20" in published
+    assert "S99999" not in published
+    assert "S1000" not in published
+    with pytest.raises(KeyError):
+        published["S10060"]
+    from_store = (
+        [get_symbol_size(key) for key in KEYS],
+        [get_symbol_svg(key) for key in KEYS],
+        get_symbols_info(KEYS),
+    )
+    detach_symbol_store()
+    assert not symbol_store_loaded()
+    from_db = (
+        [get_symbol_size(key) for key in KEYS],
+        [get_symbol_svg(key) for key in KEYS],
+        get_symbols_info(KEYS),
+    )
+    assert from_store == from_db
+
+
+def test_store_iterates_symbol_keys(published):
+    keys = list(published)
+    assert len(keys) == len(published)
+    assert keys[0] == "S10000"
+    assert keys == sorted(keys)
+
+
+def test_attach_from_another_process(published, name):
+    svg = run(
+        "from sutton_signwriting_font.shared import attach_symbol_store\n"
+        "from sutton_signwriting_font.db import get_symbol_svg\n"
+        f"attach_symbol_store({name!r})\n"
+        "print(get_symbol_svg('S14c20')[0])"
+    )
+    assert svg == published["S14c20"]["svg"]
+    # The segment outlives the attached process.
+    assert get_symbol_svg("S14c20")[0] == svg
+
+
+def test_publisher_removes_segment_on_exit(name):
+    run(
+        "from sutton_signwriting_font.shared import publish_symbol_store\n"
+        f"publish_symbol_store({name!r})"
+    )
+    with pytest.raises(FileNotFoundError):
+        attach_symbol_store(name)
+
+
+def test_publish_attaches_to_existing_segment(published, name):
+    owner = run(
+        "from sutton_signwriting_font.shared import publish_symbol_store\n"
+        f"print(publish_symbol_store({name!r}).owner)"
+    )
+    assert owner == "False"
+    assert publish_symbol_store(name) is published
+    assert attach_symbol_store(name)["S14c20"] == published["S14c20"]
+
+
+def test_attach_rejects_other_versions(name):
+    shm = SharedMemory(name, create=True, size=4096)
+    try:
+        struct.pack_into("<4sHH16s", shm.buf, 0, b"SSWF", SHARED_FORMAT, 1, b"0.0.1")
+        with pytest.raises(ValueError, match="version 0.0.1"):
+            attach_symbol_store(name)
+        struct.pack_into("<4sH", shm.buf, 0, b"SSWF", SHARED_FORMAT + 1)
+        with pytest.raises(ValueError, match="format"):
+            attach_symbol_store(name)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_attach_waits_for_ready_segment(name):
+    shm = SharedMemory(name, create=True, size=4096)
+    try:
+        with pytest.raises(TimeoutError):
+            attach_symbol_store(name, timeout=0.05)
+    finally:
+        shm.close()
+        shm.unlink()
@@ -1,15 +1,24 @@
 import base64
+import re
 
 import pytest
 
 from sutton_signwriting_font.swu import (
     swu_column_png,
     swu_column_svg,
+    swu_columns_display_list,
+    swu_columns_document,
     swu_columns_png,
+    swu_columns_png_lazy,
     swu_columns_svg,
+    swu_columns_svg_lazy,
+    swu_sign_array,
+    swu_sign_display_list,
     swu_sign_normalize,
     swu_sign_png,
     swu_sign_svg,
+    swu_signs_array,
+    swu_symbol_array,
     swu_symbol_normalize,
     swu_symbol_png,
     swu_symbol_svg,
@@ -164,6 +173,11 @@ def test_swu_sign_png():
     assert len(png) > 0
 
 
+def test_swu_sign_png_encoding():
+    png = swu_sign_png("𝠃𝤍𝤕񀕁𝣾𝣷", {"width": 40}, {"mode": "gray", "level": 1})
+    assert png[16:20] == (40).to_bytes(4, "big") and png[25] == 4
+
+
 def test_swu_sign_png_invalid():
     png = swu_sign_png("invalid")
     base64_png = base64.b64encode(png).decode("utf-8")[:45]
@@ -175,6 +189,53 @@ def test_swu_sign_png_invalid():
     )
 
 
+# -------------------------
+# Sign arrays
+# -------------------------
+
+
+def test_swu_sign_array():
+    pytest.importorskip("numpy")
+    rgba = swu_sign_array("𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭")
+    assert rgba.dtype.name == "uint8" and rgba.shape[2] == 4
+    assert rgba[..., 3].any()
+    mask = swu_sign_array("𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭", mask=True)
+    assert (mask == rgba[..., 3]).all()
+    symbol = swu_symbol_array("񀀁", {"width": 30})
+    assert symbol.shape[1] == 30
+
+
+def test_swu_sign_array_canvas():
+    pytest.importorskip("numpy")
+    mask = swu_sign_array("𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭", mask=True)
+    rows, cols = mask.shape
+    centered = swu_sign_array(
+        "𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭", canvas=(cols + 20, rows + 10), mask=True
+    )
+    assert (centered[5 : 5 + rows, 10 : 10 + cols] == mask).all()
+    assert not centered[:5].any() and not centered[:, :10].any()
+    corner = swu_sign_array(
+        "𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭", canvas=(cols + 20, rows + 10), mask=True, center=False
+    )
+    assert (corner[:rows, :cols] == mask).all()
+    small = swu_sign_array("𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭", canvas=(10, 10))
+    assert small.shape == (10, 10, 4) and small[..., 3].any()
+
+
+def test_swu_signs_array():
+    np = pytest.importorskip("numpy")
+    signs = ["𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭", "invalid", "𝠃𝤟𝤩񋛩𝣵𝤐񀀒𝤇𝣤񋚥𝤐𝤆񀀚𝣮𝣭-C"]
+    batch = swu_signs_array(signs, (64, 48))
+    assert batch.shape == (3, 48, 64, 4)
+    assert (batch[0] == swu_sign_array(signs[0], canvas=(64, 48))).all()
+    assert not batch[1].any()
+    out = np.ones((3, 48, 64), np.uint8)
+    assert swu_signs_array(signs, (64, 48), mask=True, out=out) is out
+    assert (out == batch[..., 3]).all()
+    with pytest.raises(ValueError):
+        swu_signs_array(signs, (48, 64), out=out)
+
+
 # -------------------------
 # Column rendering
 # -------------------------
@@ -323,3 +384,167 @@ def test_swu_columns_svg(swu_text, options, expected_len):
     assert len(svgs) == expected_len
     for svg in svgs:
         assert svg.startswith("<svg")
+
+
+# -------------------------
+# Lazy columns
+# -------------------------
+
+LONG_TEXT = ("𝠀񁲡񈩧𝠃𝤘𝤣񁲡𝣳𝣩񈩧𝤉𝣻 " "𝠀񃊢񃊫񋛕񆇡𝠃𝤘𝤧񃊫𝣻𝤕񃊢𝣴𝣼񆇡𝤎𝤂񋛕𝤆𝣦 " "񏌁𝣢𝤂 ") * 4
+
+
+def test_swu_columns_svg_lazy():
+    cols = swu_columns_svg_lazy(LONG_TEXT, {"height": 250, "width": 150})
+    assert len(cols) == 4
+    assert cols.widths == [150, 150, 150, 150]
+    assert not any(cols.is_rendered(i) for i in range(len(cols)))
+    assert cols[2].startswith("<svg")
+    assert [cols.is_rendered(i) for i in range(len(cols))] == [
+        False,
+        False,
+        True,
+        False,
+    ]
+    assert list(cols) == swu_columns_svg(LONG_TEXT, {"height": 250, "width": 150})
+
+
+def test_swu_columns_svg_lazy_prefetch():
+    with swu_columns_svg_lazy(
+        LONG_TEXT, {"height": 250, "width": 150}, prefetch=2
+    ) as cols:
+        first = cols[0]
+        assert cols[0] is first
+        assert (
+            cols[1:3] == swu_columns_svg(LONG_TEXT, {"height": 250, "width": 150})[1:3]
+        )
+        assert cols.is_rendered(1)
+        assert cols.is_rendered(2)
+
+
+def test_swu_columns_svg_lazy_empty():
+    cols = swu_columns_svg_lazy("")
+    assert len(cols) == 0
+    with pytest.raises(IndexError):
+        cols[0]
+
+
+def test_swu_columns_png_lazy():
+    cols = swu_columns_png_lazy(LONG_TEXT, {"height": 250, "width": 150})
+    assert len(cols) == 4
+    assert cols[-1].startswith(b"\x89PNG")
+
+
+# -------------------------
+# Column document
+# -------------------------
+
+
+def test_swu_columns_document():
+    doc = swu_columns_document(LONG_TEXT, {"height": 250, "width": 150})
+    assert len(doc) == 4
+    assert doc.svgs() == swu_columns_svg(LONG_TEXT, {"height": 250, "width": 150})
+
+
+def test_swu_columns_document_replace():
+    doc = swu_columns_document(LONG_TEXT, {"height": 250, "width": 150})
+    svgs = doc.svgs()
+    changed = doc.replace(len(doc.segments) - 2, "񏌁𝣢𝤂")
+    assert changed == [3]
+    assert doc.svgs()[:3] == svgs[:3]
+    assert doc.svg(0) is svgs[0]
+    assert doc.svgs() == swu_columns_svg(doc.text, {"height": 250, "width": 150})
+
+
+def test_swu_columns_document_insert_delete():
+    doc = swu_columns_document(LONG_TEXT, {"height": 250, "width": 150})
+    doc.svgs()
+    sign = doc.segments[0]
+    changed = doc.insert(0, sign)
+    assert 0 in changed
+    assert doc.segments[:2] == [sign, sign]
+    assert doc.svgs() == swu_columns_svg(doc.text, {"height": 250, "width": 150})
+    doc.delete(0)
+    assert doc.text == LONG_TEXT.strip()
+    assert doc.svgs() == swu_columns_svg(LONG_TEXT, {"height": 250, "width": 150})
+
+
+def test_swu_columns_document_invalid_index():
+    doc = swu_columns_document("")
+    assert len(doc) == 0
+    with pytest.raises(IndexError):
+        doc.delete(0)
+
+
+# -------------------------
+# CSS styling
+# -------------------------
+
+CSS_SIGN = "𝠀񁲡񈩧𝠃𝤘𝤣񁲡𝣳𝣩񈩧𝤉𝣻"
+
+
+def test_swu_sign_svg_css():
+    svg = swu_sign_svg(CSS_SIGN + "-D_red,white_Z2-D02_green_", css=True)
+    assert ".sym-line{fill:red}.css-" in svg and " .sym-fill{fill:white}" in svg
+    assert ".sym-2 .sym-line{fill:green}" in svg
+    assert 'class="sym-line" fill=' not in svg
+    assert '<svg class="sym-1"' in svg and '<svg class="sym-2"' in svg
+
+
+def test_swu_sign_svg_css_themes_share_symbols():
+    light = swu_sign_svg(CSS_SIGN + "-D_black_", css=True)
+    dark = swu_sign_svg(CSS_SIGN + "-D_white_G_black_", css=True)
+    assert light.split('<svg class="sym-1"')[1] == dark.split('<svg class="sym-1"')[1]
+    assert swu_sign_svg(CSS_SIGN, css=True) == swu_sign_svg(CSS_SIGN).replace(
+        '<svg x="', '<svg class="sym-1" x="', 1
+    ).replace('<svg x="', '<svg class="sym-2" x="', 1)
+
+
+def test_swu_sign_svg_css_scoped():
+    red = swu_sign_svg(CSS_SIGN + "-D_red_", css=True)
+    blue = swu_sign_svg(CSS_SIGN + "-D_blue_", css=True)
+    document = f"<html><body>{red}{blue}{red}</body></html>"
+    red_scope = re.findall(r'<svg class="(css-[0-9a-f]{8})"', red)
+    blue_scope = re.findall(r'<svg class="(css-[0-9a-f]{8})"', blue)
+    assert len(red_scope) == len(blue_scope) == 1
+    assert red_scope != blue_scope
+    assert re.findall(r"<style>(.*?)</style>", document) == [
+        f".{red_scope[0]} .sym-line{{fill:red}}",
+        f".{blue_scope[0]} .sym-line{{fill:blue}}",
+        f".{red_scope[0]} .sym-line{{fill:red}}",
+    ]
+
+
+def test_swu_sign_svg_css_colorize():
+    svg = swu_sign_svg(CSS_SIGN + "-C", css=True)
+    assert ".sym-1 .sym-line{fill:" in svg
+    assert ".sym-2 .sym-line{fill:" in svg
+
+
+def test_swu_columns_svg_css():
+    text = CSS_SIGN + "-D_red_ " + CSS_SIGN
+    svgs = swu_columns_svg(text, {"height": 250, "width": 150}, css=True)
+    assert len(svgs) == 1
+    assert ".item-1 .sym-line{fill:red}" in svgs[0]
+    assert ".item-2 .sym-line{fill:black}" in svgs[0]
+    assert '<g class="item-2"' in svgs[0]
+    (scope,) = re.findall(r'^<svg class="(css-[0-9a-f]{8})"', svgs[0])
+    assert f".{scope} .item-1 .sym-line{{fill:red}}" in svgs[0]
+
+
+def test_swu_svg_compact():
+    compact = swu_sign_svg(CSS_SIGN + "-D_red_", compact=True)
+    assert "\n" not in compact and "<text" not in compact
+    assert compact.count("<svg") == 1
+    assert compact.count('class="sym-line" fill="red"') == 2
+    assert "<text" not in swu_symbol_svg("񀀁", compact=True)
+    (column,) = swu_columns_svg(CSS_SIGN, {"height": 250, "width": 150}, compact=True)
+    assert column.count("<g") == 3
+
+
+def test_swu_display_list():
+    display = swu_sign_display_list(CSS_SIGN + "-D_red_")
+    assert display.box == (481, 471, 37, 58)
+    assert [item.symbol for item in display.items] == ["S14c20", "S27106"]
+    assert display.items[0][1:] == (481, 471, "red", "white", 1)
+    (column,) = swu_columns_display_list(CSS_SIGN, {"height": 250, "width": 150})
+    assert column.items[0][1:] == (56, 20, "black", "white", 1)
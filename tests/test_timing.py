@@ -0,0 +1,92 @@
+import threading
+
+from sutton_signwriting_font import raster
+from sutton_signwriting_font.cache import cache_clear
+from sutton_signwriting_font.fsw import (
+    fsw_columns_svg,
+    fsw_sign_png_data_url,
+    fsw_sign_svg,
+)
+from sutton_signwriting_font.timing import (
+    STAGES,
+    add_timing_hook,
+    collect_timings,
+    remove_timing_hook,
+    timed,
+)
+
+SIGN = "AS14c20S27106M518x529S14c20481x471S27106503x489"
+
+
+def test_timed_disabled_is_shared_null_timer():
+    assert timed("parse") is timed("compose")
+
+
+def test_collect_timings_sign_svg():
+    cache_clear()
+    with collect_timings() as timings:
+        fsw_sign_svg(SIGN)
+    stages = timings.stages()
+    assert set(stages) == {"parse", "lookup", "compose"}
+    assert stages["lookup"].calls == 1
+    assert all(timing.seconds >= 0 for timing in stages.values())
+    assert set(stages) <= set(STAGES)
+
+
+def test_collect_timings_columns():
+    with collect_timings() as timings:
+        fsw_columns_svg(SIGN + " " + SIGN, {"height": 250, "width": 150})
+    stages = timings.stages()
+    assert stages["layout"].calls == 1
+    assert "compose" in stages
+
+
+def test_collect_timings_png(monkeypatch):
+    monkeypatch.setattr(raster, "_svg2png", lambda **kwargs: b"png")
+    with collect_timings() as timings:
+        assert fsw_sign_png_data_url(SIGN) == "data:image/png;base64,cG5n"
+    stages = timings.stages()
+    assert stages["rasterize"].calls == 1
+    assert stages["encode"].calls == 1
+
+
+def test_stage_times_are_exclusive():
+    with collect_timings() as outer:
+        with timed("compose"):
+            with timed("lookup"):
+                pass
+    stages = outer.stages()
+    assert stages["compose"].calls == stages["lookup"].calls == 1
+    assert abs(outer.total() - sum(t.seconds for t in stages.values())) < 1e-9
+
+
+def test_timing_hook():
+    calls = []
+
+    def hook(stage, seconds):
+        calls.append(stage)
+
+    add_timing_hook(hook)
+    try:
+        fsw_sign_svg(SIGN)
+    finally:
+        remove_timing_hook(hook)
+    assert "compose" in calls
+    count = len(calls)
+    fsw_sign_svg(SIGN)
+    assert len(calls) == count
+
+
+def test_collectors_are_context_local():
+    other = []
+
+    def render():
+        fsw_sign_svg(SIGN)
+        other.append(True)
+
+    with collect_timings() as timings:
+        thread = threading.Thread(target=render)
+        thread.start()
+        thread.join()
+    assert other == [True]
+    assert timings.stages() == {}
@@ -0,0 +1,78 @@
+import gc
+
+import pytest
+
+from sutton_signwriting_core.convert import fsw_to_swu
+
+from sutton_signwriting_font import raster
+from sutton_signwriting_font.db import (
+    get_symbol_size,
+    get_symbol_svg,
+    get_symbols_info,
+    load_symbol_store,
+    symbol_store_loaded,
+    unload_symbol_store,
+)
+from sutton_signwriting_font.fsw import fsw_columns_svg, fsw_sign_svg
+from sutton_signwriting_font.warmup import warm_up
+
+SIGN = "AS14c20S27106M518x529S14c20481x471S27106503x489"
+KEYS = ["S10000", "S14c20", "S27106", "S38800", "S99999"]
+
+
+@pytest.fixture
+def store():
+    yield load_symbol_store()
+    unload_symbol_store()
+
+
+def test_symbol_store_matches_database(store):
+    assert store > 30000
+    assert symbol_store_loaded()
+    from_store = (
+        [get_symbol_size(key) for key in KEYS],
+        [get_symbol_svg(key) for key in KEYS],
+        get_symbols_info(KEYS),
+    )
+    unload_symbol_store()
+    assert not symbol_store_loaded()
+    from_db = (
+        [get_symbol_size(key) for key in KEYS],
+        [get_symbol_svg(key) for key in KEYS],
+        get_symbols_info(KEYS),
+    )
+    assert from_store == from_db
+    assert from_db[0][-1] is None
+
+
+def test_render_with_symbol_store(store):
+    text = SIGN + " " + SIGN + "-C S38800464x496"
+    svgs = (fsw_sign_svg(SIGN), fsw_columns_svg(text))
+    unload_symbol_store()
+    assert svgs == (fsw_sign_svg(SIGN), fsw_columns_svg(text))
+
+
+def test_warm_up():
+    try:
+        report = warm_up(
+            [SIGN, fsw_to_swu(SIGN), "S10000", SIGN + " " + SIGN, "invalid"],
+            freeze=False,
+        )
+        assert report.symbols > 30000
+        assert report.rendered == 4
+        assert not report.frozen
+        assert symbol_store_loaded()
+        assert report.rasterizer == (raster._surface is not None)
+    finally:
+        unload_symbol_store()
+
+
+def test_warm_up_freeze():
+    try:
+        report = warm_up(rasterizer=False)
+        assert report.frozen
+        assert not report.rasterizer
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+        unload_symbol_store()